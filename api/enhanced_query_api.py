@@ -141,7 +141,8 @@ async def query_and_answer(request: Request):
         answer = query_processor.synthesize_answer(
             query=query_text,
             results=results,
-            provider=data.get("provider", "openai")
+            provider=data.get("provider", "openai"),
+            index_name=data.get("index_name")
         )
         
         # Convert results to dictionaries
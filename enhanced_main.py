@@ -215,7 +215,8 @@ async def query(payload: QueryRequest):
             answer = query_processor.synthesize_answer(
                 query=payload.query,
                 results=results,
-                provider=payload.provider
+                provider=payload.provider,
+                index_name=payload.index_name
             )
             
             return {
@@ -329,7 +330,8 @@ async def enhanced_query(payload: EnhancedQueryRequest):
         answer = query_processor.synthesize_answer(
             query=payload.query,
             results=results,
-            provider=payload.provider
+            provider=payload.provider,
+            index_name=payload.index_name
         )
         
         # Convert results to dictionaries
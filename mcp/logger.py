@@ -3,28 +3,59 @@ MCP Logging Module
 =================
 This module provides functionality to log and retrieve MCP (Model Context Protocol) operations
 from a SQLite database.
+
+Writes never touch the database on the caller's thread: ``log_operation``,
+``log_metric`` and ``register_tool`` enqueue a record on a bounded queue and a
+background writer drains it in batched transactions over one persistent
+WAL-mode connection. Latency is also folded into per-minute histogram buckets
+as it is written, so dashboard percentiles are computed from buckets instead
+of scanning every operation row.
 """
 
 import os
+import atexit
+import bisect
+import queue
 import sqlite3
 import json
+import threading
 import time
 from datetime import datetime, timedelta
 from pathlib import Path
 import logging
-from statistics import mean
-from typing import Any, Dict, List, Optional, Union
+from typing import Any, Dict, List, Optional, Tuple, Union
 
 logger = logging.getLogger(__name__)
 
+# Latency histogram bucket upper bounds in seconds: 1ms growing 25% per bucket (~9 min at the top)
+LATENCY_BUCKETS = [0.001 * (1.25 ** i) for i in range(60)]
+
+_STOP = object()
+
+
+def _latency_bucket(duration: float) -> int:
+    return bisect.bisect_left(LATENCY_BUCKETS, duration)
+
+
+def _bucket_bounds(bucket: int) -> Tuple[float, float]:
+    lower = LATENCY_BUCKETS[bucket - 1] if bucket > 0 else 0.0
+    upper = LATENCY_BUCKETS[bucket] if bucket < len(LATENCY_BUCKETS) else lower * 1.25
+    return lower, upper
+
+
 class MCPLogger:
     """MCP Logger for storing and retrieving model operations data"""
     
-    def __init__(self, db_path: Optional[str] = None):
+    def __init__(self, db_path: Optional[str] = None, queue_size: Optional[int] = None,
+                 batch_size: int = 500, flush_interval: float = 0.05):
         """Initialize the MCP Logger
         
         Args:
             db_path: Path to the SQLite database. If None, uses the default path.
+            queue_size: Maximum pending writes before new records are dropped
+                (env MCP_LOG_QUEUE_SIZE, default 10000).
+            batch_size: Maximum records committed per transaction.
+            flush_interval: Seconds the writer waits to fill a batch.
         """
         if db_path:
             self.db_path = db_path
@@ -33,13 +64,38 @@ class MCPLogger:
             project_root = Path(__file__).resolve().parent.parent
             self.db_path = str(project_root / "mcp_logs.db")
         
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue: "queue.Queue" = queue.Queue(
+            maxsize=int(queue_size or os.getenv("MCP_LOG_QUEUE_SIZE", "10000"))
+        )
+        self._dropped = 0
+        self._written = 0
+        self._last_drop_warning = 0.0
+        
+        # One shared read connection; WAL lets it read while the writer commits
+        self._read_lock = threading.Lock()
+        self._reader: Optional[sqlite3.Connection] = None
+        
         self._init_db()
+        
+        self._writer = threading.Thread(target=self._writer_loop, name="mcp-log-writer", daemon=True)
+        self._writer.start()
+        atexit.register(self.close)
+    
+    def _connect(self, check_same_thread: bool = True) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, timeout=5.0, check_same_thread=check_same_thread)
+        conn.execute("PRAGMA journal_mode=WAL")
+        # WAL + NORMAL: durable at checkpoints, no fsync per commit
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA busy_timeout=5000")
+        return conn
     
     def _init_db(self):
         """Initialize the database and create tables if they don't exist"""
         conn = None
         try:
-            conn = sqlite3.connect(self.db_path)
+            conn = self._connect()
             cursor = conn.cursor()
             
             # Create operations table for logging all MCP operations
@@ -90,6 +146,27 @@ class MCPLogger:
             
             # Ensure legacy databases pick up new columns
             self._ensure_operation_columns(cursor)
+            
+            # Indexes for the dashboard's time-window and status queries
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_mcp_operations_timestamp ON mcp_operations(timestamp)")
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_mcp_operations_status_ts ON mcp_operations(status, timestamp)")
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_mcp_metrics_name_ts ON mcp_metrics(metric_name, timestamp)")
+            
+            # Per-minute latency histogram, maintained by the writer
+            cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='mcp_latency_histogram'")
+            histogram_exists = cursor.fetchone() is not None
+            cursor.execute('''
+            CREATE TABLE IF NOT EXISTS mcp_latency_histogram (
+                minute TEXT NOT NULL,
+                bucket INTEGER NOT NULL,
+                count INTEGER NOT NULL DEFAULT 0,
+                total REAL NOT NULL DEFAULT 0,
+                max REAL,
+                PRIMARY KEY (minute, bucket)
+            )
+            ''')
+            if not histogram_exists:
+                self._backfill_histogram(cursor)
 
             conn.commit()
             logger.info(f"MCP database initialized at {self.db_path}")
@@ -119,6 +196,197 @@ class MCPLogger:
         except sqlite3.Error as e:
             logger.error(f"Failed to extend mcp_operations schema: {e}")
     
+    def _backfill_histogram(self, cursor: sqlite3.Cursor) -> None:
+        """One-time fill of the latency histogram from operations logged before it existed."""
+        aggregates: Dict[Tuple[str, int], List[float]] = {}
+        for timestamp, duration in cursor.execute(
+            "SELECT timestamp, duration FROM mcp_operations WHERE duration IS NOT NULL"
+        ).fetchall():
+            self._add_to_histogram(aggregates, timestamp, duration)
+        self._write_histogram(cursor, aggregates)
+    
+    @staticmethod
+    def _add_to_histogram(aggregates: Dict[Tuple[str, int], List[float]], timestamp: str, duration: float) -> None:
+        key = (timestamp[:16], _latency_bucket(duration))
+        agg = aggregates.get(key)
+        if agg is None:
+            aggregates[key] = [1, duration, duration]
+        else:
+            agg[0] += 1
+            agg[1] += duration
+            agg[2] = max(agg[2], duration)
+    
+    @staticmethod
+    def _write_histogram(cursor: sqlite3.Cursor, aggregates: Dict[Tuple[str, int], List[float]]) -> None:
+        if not aggregates:
+            return
+        cursor.executemany(
+            '''INSERT INTO mcp_latency_histogram (minute, bucket, count, total, max)
+               VALUES (?, ?, ?, ?, ?)
+               ON CONFLICT(minute, bucket)
+               DO UPDATE SET
+                 count = count + excluded.count,
+                 total = total + excluded.total,
+                 max = MAX(max, excluded.max)''',
+            [(minute, bucket, agg[0], agg[1], agg[2]) for (minute, bucket), agg in aggregates.items()]
+        )
+    
+    # ------------------------------------------------------------------ writer
+    def _enqueue(self, kind: str, record: tuple) -> None:
+        try:
+            self._queue.put_nowait((kind, record))
+        except queue.Full:
+            # Never block the request path on logging; count and report drops
+            self._dropped += 1
+            now = time.monotonic()
+            if now - self._last_drop_warning > 10:
+                self._last_drop_warning = now
+                logger.warning(f"MCP log queue full; dropped {self._dropped} records so far")
+    
+    def _writer_loop(self) -> None:
+        conn = None
+        while True:
+            item = self._queue.get()
+            if item is _STOP:
+                self._queue.task_done()
+                break
+            batch = [item]
+            deadline = time.monotonic() + self.flush_interval
+            stop = False
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                try:
+                    nxt = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if nxt is _STOP:
+                    stop = True
+                    break
+                batch.append(nxt)
+            try:
+                if conn is None:
+                    conn = self._connect()
+                self._write_batch(conn, batch)
+                self._written += len(batch)
+            except sqlite3.Error as e:
+                logger.error(f"Error writing MCP log batch ({len(batch)} records): {e}")
+                try:
+                    conn.rollback()
+                except Exception:
+                    pass
+            finally:
+                for _ in range(len(batch) + (1 if stop else 0)):
+                    self._queue.task_done()
+            if stop:
+                break
+        if conn is not None:
+            conn.close()
+    
+    def _write_batch(self, conn: sqlite3.Connection, batch: List[Tuple[str, tuple]]) -> None:
+        """Commit a batch of queued records in a single transaction"""
+        operations, tool_uses, metrics, tools = [], [], [], []
+        histogram: Dict[Tuple[str, int], List[float]] = {}
+        for kind, record in batch:
+            if kind == "operation":
+                operations.append(record)
+                timestamp, duration, tool_name = record[0], record[5], record[7]
+                if duration is not None:
+                    self._add_to_histogram(histogram, timestamp, float(duration))
+                if tool_name:
+                    tool_uses.append((tool_name, timestamp))
+            elif kind == "metric":
+                metrics.append(record)
+            elif kind == "tool":
+                tools.append(record)
+        
+        cursor = conn.cursor()
+        cursor.execute("BEGIN")
+        if tools:
+            cursor.executemany(
+                '''INSERT INTO mcp_tools (name, description, category, last_used) 
+                   VALUES (?, ?, ?, ?) 
+                   ON CONFLICT(name) 
+                   DO UPDATE SET 
+                     description = COALESCE(excluded.description, description),
+                     category = COALESCE(excluded.category, category)''',
+                tools
+            )
+        if operations:
+            cursor.executemany(
+                '''INSERT INTO mcp_operations 
+                   (timestamp, operation, username, user_role, status, duration, details, tool_name,
+                    severity, prompt_tokens, response_tokens, total_tokens, cost, error_code, service) 
+                   VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)''',
+                operations
+            )
+        if tool_uses:
+            # If a tool was used, update the tool usage
+            cursor.executemany(
+                '''INSERT INTO mcp_tools (name, last_used, usage_count) 
+                   VALUES (?, ?, 1) 
+                   ON CONFLICT(name) 
+                   DO UPDATE SET 
+                     last_used = excluded.last_used,
+                     usage_count = usage_count + 1''',
+                tool_uses
+            )
+        if metrics:
+            cursor.executemany(
+                '''INSERT INTO mcp_metrics (timestamp, metric_name, metric_value, details) 
+                   VALUES (?, ?, ?, ?)''',
+                metrics
+            )
+        self._write_histogram(cursor, histogram)
+        conn.commit()
+    
+    def flush(self, timeout: float = 5.0) -> bool:
+        """Wait until every queued record has been written
+        
+        Returns:
+            True if the queue drained within the timeout
+        """
+        deadline = time.monotonic() + timeout
+        while self._queue.unfinished_tasks:
+            if time.monotonic() >= deadline or not self._writer.is_alive():
+                return False
+            time.sleep(0.005)
+        return True
+    
+    def close(self) -> None:
+        """Drain pending records and stop the background writer"""
+        if self._writer.is_alive():
+            self._queue.put(_STOP)
+            self._writer.join(timeout=10)
+        with self._read_lock:
+            if self._reader is not None:
+                self._reader.close()
+                self._reader = None
+    
+    def get_writer_stats(self) -> Dict[str, Any]:
+        """Queue depth and write/drop counters of the background writer"""
+        return {
+            "pending": self._queue.qsize(),
+            "written": self._written,
+            "dropped": self._dropped,
+            "writer_alive": self._writer.is_alive(),
+        }
+    
+    def _acquire_reader(self) -> sqlite3.Connection:
+        """Lock and return the shared read connection, after letting queued writes land"""
+        self.flush(timeout=1.0)
+        self._read_lock.acquire()
+        try:
+            if self._reader is None:
+                self._reader = self._connect(check_same_thread=False)
+            return self._reader
+        except Exception:
+            self._read_lock.release()
+            raise
+    
+    def _release_reader(self) -> None:
+        self._read_lock.release()
+    
+    # ------------------------------------------------------------------ writes
     def log_operation(self, operation: str, username: str, user_role: str,
                       status: str = "success", duration: float = None,
                       details: Dict[str, Any] = None, tool_name: str = None,
@@ -128,6 +396,8 @@ class MCPLogger:
                       service: Optional[str] = None):
         """Log an MCP operation to the database
         
+        The record is queued and written by the background writer.
+        
         Args:
             operation: Name of the operation performed
             username: Username of the user who performed the operation
@@ -137,59 +407,32 @@ class MCPLogger:
             details: Additional details about the operation
             tool_name: Name of the tool used (if applicable)
         """
-        conn = None
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
             timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
             details_json = json.dumps(details) if details else None
             
             if total_tokens is None and (prompt_tokens is not None or response_tokens is not None):
                 total_tokens = (prompt_tokens or 0) + (response_tokens or 0)
 
-            cursor.execute(
-                '''INSERT INTO mcp_operations 
-                   (timestamp, operation, username, user_role, status, duration, details, tool_name,
-                    severity, prompt_tokens, response_tokens, total_tokens, cost, error_code, service) 
-                   VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)''',
-                (
-                    timestamp,
-                    operation,
-                    username,
-                    user_role,
-                    status,
-                    duration,
-                    details_json,
-                    tool_name,
-                    severity,
-                    prompt_tokens,
-                    response_tokens,
-                    total_tokens,
-                    cost,
-                    error_code,
-                    service,
-                )
-            )
-            
-            # If a tool was used, update the tool usage
-            if tool_name:
-                cursor.execute(
-                    '''INSERT INTO mcp_tools (name, last_used, usage_count) 
-                       VALUES (?, ?, 1) 
-                       ON CONFLICT(name) 
-                       DO UPDATE SET 
-                         last_used = excluded.last_used,
-                         usage_count = usage_count + 1''',
-                    (tool_name, timestamp)
-                )
-            
-            conn.commit()
-        except sqlite3.Error as e:
+            self._enqueue("operation", (
+                timestamp,
+                operation,
+                username,
+                user_role,
+                status,
+                duration,
+                details_json,
+                tool_name,
+                severity,
+                prompt_tokens,
+                response_tokens,
+                total_tokens,
+                cost,
+                error_code,
+                service,
+            ))
+        except (TypeError, ValueError) as e:
             logger.error(f"Error logging operation: {e}")
-        finally:
-            if conn:
-                conn.close()
     
     def log_metric(self, metric_name: str, metric_value: float, details: Dict[str, Any] = None):
         """Log a system metric to the database
@@ -199,26 +442,12 @@ class MCPLogger:
             metric_value: Value of the metric
             details: Additional details about the metric
         """
-        conn = None
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
             timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
             details_json = json.dumps(details) if details else None
-            
-            cursor.execute(
-                '''INSERT INTO mcp_metrics (timestamp, metric_name, metric_value, details) 
-                   VALUES (?, ?, ?, ?)''',
-                (timestamp, metric_name, metric_value, details_json)
-            )
-            
-            conn.commit()
-        except sqlite3.Error as e:
+            self._enqueue("metric", (timestamp, metric_name, metric_value, details_json))
+        except (TypeError, ValueError) as e:
             logger.error(f"Error logging metric: {e}")
-        finally:
-            if conn:
-                conn.close()
     
     def register_tool(self, name: str, description: str = None, category: str = None):
         """Register a new MCP tool
@@ -228,28 +457,9 @@ class MCPLogger:
             description: Description of the tool
             category: Category of the tool (e.g., search, analytics)
         """
-        conn = None
-        try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            cursor.execute(
-                '''INSERT INTO mcp_tools (name, description, category, last_used) 
-                   VALUES (?, ?, ?, ?) 
-                   ON CONFLICT(name) 
-                   DO UPDATE SET 
-                     description = COALESCE(excluded.description, description),
-                     category = COALESCE(excluded.category, category)''',
-                (name, description, category, datetime.now().strftime("%Y-%m-%d %H:%M:%S"))
-            )
-            
-            conn.commit()
-        except sqlite3.Error as e:
-            logger.error(f"Error registering tool: {e}")
-        finally:
-            if conn:
-                conn.close()
+        self._enqueue("tool", (name, description, category, datetime.now().strftime("%Y-%m-%d %H:%M:%S")))
     
+    # ------------------------------------------------------------------ reads
     def get_recent_operations(self, limit: int = 20) -> List[Dict[str, Any]]:
         """Get recent operations from the database
         
@@ -262,9 +472,9 @@ class MCPLogger:
         conn = None
         operations = []
         try:
-            conn = sqlite3.connect(self.db_path)
-            conn.row_factory = sqlite3.Row
+            conn = self._acquire_reader()
             cursor = conn.cursor()
+            cursor.row_factory = sqlite3.Row
             
             cursor.execute(
                 '''SELECT * FROM mcp_operations 
@@ -283,45 +493,51 @@ class MCPLogger:
             return []
         finally:
             if conn:
-                conn.close()
+                self._release_reader()
                 
         return operations
 
     def get_latency_stats(self, hours: int = 24) -> Dict[str, Optional[float]]:
-        """Compute latency percentiles for recent operations."""
+        """Compute latency percentiles for recent operations.
+        
+        Reads the per-minute histogram, so cost depends on the number of
+        populated buckets rather than the number of operations. Percentiles
+        are interpolated within a bucket (buckets are 25% wide).
+        """
         conn = None
         try:
-            conn = sqlite3.connect(self.db_path)
+            conn = self._acquire_reader()
             cursor = conn.cursor()
             cursor.execute(
-                '''SELECT duration FROM mcp_operations 
-                   WHERE duration IS NOT NULL AND timestamp >= datetime('now', ?)''',
+                '''SELECT bucket, SUM(count), SUM(total), MAX(max) FROM mcp_latency_histogram 
+                   WHERE minute >= strftime('%Y-%m-%d %H:%M', 'now', ?)
+                   GROUP BY bucket ORDER BY bucket''',
                 (f'-{hours} hours',)
             )
-            durations = [row[0] for row in cursor.fetchall() if row[0] is not None]
-            if not durations:
+            rows = [row for row in cursor.fetchall() if row[1]]
+            if not rows:
                 return {"avg": None, "p95": None, "p99": None, "max": None, "count": 0}
 
-            durations.sort()
-            count = len(durations)
+            count = sum(row[1] for row in rows)
+            observed_max = max(row[3] for row in rows)
 
             def percentile(p: float) -> float:
-                if count == 1:
-                    return durations[0]
-                k = (count - 1) * p
-                f = int(k)
-                c = min(f + 1, count - 1)
-                if f == c:
-                    return durations[int(k)]
-                d0 = durations[f] * (c - k)
-                d1 = durations[c] * (k - f)
-                return d0 + d1
+                rank = (count - 1) * p + 1
+                seen = 0
+                for bucket, bucket_count, _, bucket_max in rows:
+                    if seen + bucket_count >= rank:
+                        lower, upper = _bucket_bounds(bucket)
+                        upper = min(upper, bucket_max)
+                        lower = min(lower, upper)
+                        return lower + (upper - lower) * (rank - seen) / bucket_count
+                    seen += bucket_count
+                return observed_max
 
             return {
-                "avg": mean(durations),
+                "avg": sum(row[2] for row in rows) / count,
                 "p95": percentile(0.95),
                 "p99": percentile(0.99),
-                "max": max(durations),
+                "max": observed_max,
                 "count": count,
             }
         except sqlite3.Error as e:
@@ -329,14 +545,14 @@ class MCPLogger:
             return {"avg": None, "p95": None, "p99": None, "max": None, "count": 0}
         finally:
             if conn:
-                conn.close()
+                self._release_reader()
 
     def get_status_breakdown(self, hours: int = 24) -> Dict[str, int]:
         """Return operation counts grouped by status."""
         conn = None
         breakdown = {"success": 0, "failed": 0, "other": 0}
         try:
-            conn = sqlite3.connect(self.db_path)
+            conn = self._acquire_reader()
             cursor = conn.cursor()
             cursor.execute(
                 '''SELECT status, COUNT(*) FROM mcp_operations 
@@ -355,7 +571,7 @@ class MCPLogger:
             logger.error(f"Error retrieving status breakdown: {e}")
         finally:
             if conn:
-                conn.close()
+                self._release_reader()
         return breakdown
 
     def get_failure_trend(self, days: int = 7) -> List[Dict[str, Union[str, int]]]:
@@ -363,7 +579,7 @@ class MCPLogger:
         conn = None
         trend: List[Dict[str, Union[str, int]]] = []
         try:
-            conn = sqlite3.connect(self.db_path)
+            conn = self._acquire_reader()
             cursor = conn.cursor()
             cursor.execute(
                 '''SELECT DATE(timestamp) AS day, COUNT(*) FROM mcp_operations 
@@ -379,7 +595,7 @@ class MCPLogger:
             logger.error(f"Error retrieving failure trend: {e}")
         finally:
             if conn:
-                conn.close()
+                self._release_reader()
         return trend
 
     def get_recent_alerts(self, limit: int = 10) -> List[Dict[str, Any]]:
@@ -387,9 +603,9 @@ class MCPLogger:
         conn = None
         alerts: List[Dict[str, Any]] = []
         try:
-            conn = sqlite3.connect(self.db_path)
-            conn.row_factory = sqlite3.Row
+            conn = self._acquire_reader()
             cursor = conn.cursor()
+            cursor.row_factory = sqlite3.Row
             cursor.execute(
                 '''SELECT * FROM mcp_operations 
                    WHERE status = 'failed' OR severity IN ('warning', 'critical') 
@@ -405,7 +621,7 @@ class MCPLogger:
             logger.error(f"Error retrieving recent alerts: {e}")
         finally:
             if conn:
-                conn.close()
+                self._release_reader()
         return alerts
 
     def get_token_totals(self, days: int = 7) -> Dict[str, int]:
@@ -413,7 +629,7 @@ class MCPLogger:
         conn = None
         totals = {"prompt": 0, "response": 0, "total": 0}
         try:
-            conn = sqlite3.connect(self.db_path)
+            conn = self._acquire_reader()
             cursor = conn.cursor()
             cursor.execute(
                 '''SELECT COALESCE(SUM(prompt_tokens), 0),
@@ -429,14 +645,14 @@ class MCPLogger:
             logger.error(f"Error aggregating token totals: {e}")
         finally:
             if conn:
-                conn.close()
+                self._release_reader()
         return totals
 
     def get_cost_summary(self, days: int = 7) -> float:
         """Return total recorded cost for time window."""
         conn = None
         try:
-            conn = sqlite3.connect(self.db_path)
+            conn = self._acquire_reader()
             cursor = conn.cursor()
             cursor.execute(
                 '''SELECT COALESCE(SUM(cost), 0) FROM mcp_operations 
@@ -450,7 +666,7 @@ class MCPLogger:
             return 0.0
         finally:
             if conn:
-                conn.close()
+                self._release_reader()
     
     def get_tool_stats(self) -> List[Dict[str, Any]]:
         """Get statistics for all tools
@@ -461,9 +677,9 @@ class MCPLogger:
         conn = None
         tools = []
         try:
-            conn = sqlite3.connect(self.db_path)
-            conn.row_factory = sqlite3.Row
+            conn = self._acquire_reader()
             cursor = conn.cursor()
+            cursor.row_factory = sqlite3.Row
             
             cursor.execute(
                 '''SELECT * FROM mcp_tools ORDER BY usage_count DESC'''
@@ -496,7 +712,7 @@ class MCPLogger:
             return []
         finally:
             if conn:
-                conn.close()
+                self._release_reader()
                 
         return tools
     
@@ -513,7 +729,7 @@ class MCPLogger:
         hour_counts = {hour: 0 for hour in range(24)}
         
         try:
-            conn = sqlite3.connect(self.db_path)
+            conn = self._acquire_reader()
             cursor = conn.cursor()
             
             # Calculate the timestamp for 'days' days ago
@@ -534,7 +750,7 @@ class MCPLogger:
             logger.error(f"Error retrieving operation counts: {e}")
         finally:
             if conn:
-                conn.close()
+                self._release_reader()
                 
         return hour_counts
     
@@ -553,7 +769,7 @@ class MCPLogger:
         
         conn = None
         try:
-            conn = sqlite3.connect(self.db_path)
+            conn = self._acquire_reader()
             cursor = conn.cursor()
             
             # Count operations today
@@ -588,7 +804,7 @@ class MCPLogger:
             logger.error(f"Error retrieving dashboard metrics: {e}")
         finally:
             if conn:
-                conn.close()
+                self._release_reader()
                 
         return metrics
 
@@ -13,8 +13,10 @@ import json
 import pickle
 import numpy as np
 import faiss
-from sentence_transformers import SentenceTransformer
 from utils.weaviate_ingestion_helper import get_weaviate_ingestion_helper
+from utils.embedding_service import get_embedding_service
+from utils.query_result_cache import bump_index_version
+from utils.faiss_segment_store import MANIFEST_NAME
 
 def render_document_ingestion(user, permissions, auth_middleware, available_indexes, INDEX_ROOT, PROJECT_ROOT):
     """Document Ingestion Tab Implementation"""
@@ -560,12 +562,15 @@ def _simple_text_chunks(text: str, chunk_size: int = 800, overlap: int = 100) ->
 
 def _build_faiss_index_from_text(text: str, index_name: str, target_dir: Path, model_name: str = "all-MiniLM-L6-v2") -> None:
     """Build a FAISS index from raw text and save index.faiss + documents.pkl into target_dir."""
+    if (target_dir / MANIFEST_NAME).exists():
+        # Rebuilding would replace the collection and misalign its row metadata
+        raise ValueError(f"{target_dir} is a segment collection; add documents through the ingestion queue instead")
     chunks = _simple_text_chunks(text, chunk_size=800, overlap=120)
     if not chunks:
         raise ValueError("No text chunks produced for FAISS build")
-    # Embed
-    model = SentenceTransformer(model_name)
-    embeddings = model.encode(chunks, convert_to_numpy=True, show_progress_bar=False, normalize_embeddings=True)
+    # Embed (shared model; unchanged chunks are served from the embedding cache)
+    model = get_embedding_service(model_name)
+    embeddings = model.encode_cached(chunks, normalize_embeddings=True)
     embeddings = embeddings.astype('float32')
     dim = embeddings.shape[1]
     index = faiss.IndexFlatIP(dim)
@@ -581,6 +586,8 @@ def _build_faiss_index_from_text(text: str, index_name: str, target_dir: Path, m
     } for i in range(len(chunks))]
     with open(target_dir / "documents.pkl", "wb") as f:
         pickle.dump(docs, f)
+    # Cached query results for this index are now stale
+    bump_index_version(index_name)
 
 
 def delete_faiss_index(index_name: str, index_root: Path) -> bool:
@@ -353,51 +353,58 @@ def execute_multi_vector_search(
             st.caption("Tip: Use 'all-MiniLM-L6-v2' to match 384-dimension Pinecone indexes created by the ingest tab.")
             return
         
-        # Execute searches
-        all_results = []
-        total_searches = sum(len(collections) for collections in store_configs.values())
-        current_search = 0
-        
+        # Validate each collection once, then search all of them concurrently
+        search_targets: Dict[VectorStoreType, List[str]] = {}
         for store_type, collections in store_configs.items():
             for collection in collections:
-                current_search += 1
-                progress_bar.progress(current_search / total_searches)
-                status_text.text(f"Searching {store_type.value}/{collection}...")
-                
+                # Optional: validate index dimension to help avoid silent mismatches
                 try:
-                    # Search with each enhanced query
-                    # Optional: validate index dimension to help avoid silent mismatches
-                    try:
-                        stats = asyncio.run(manager.get_collection_stats(collection, store_type))
-                        index_dim = stats.get('dimension') or stats.get('vector_dimension')
-                    except Exception:
-                        index_dim = None
-                    if index_dim and len(query_embeddings[0]) != int(index_dim):
-                        st.warning(f"Index '{collection}' expects dimension {index_dim}, but the selected embedding model outputs {len(query_embeddings[0])}. Choose a matching model (e.g., MiniLM=384). Skipping this collection.")
-                        continue
-
-                    for i, enhanced_query in enumerate(enhanced_queries):
-                        results = asyncio.run(manager.search(
-                            collection_name=collection,
-                            query=enhanced_query,
-                            query_embedding=(query_embeddings[i] if i < len(query_embeddings) else None),
-                            filters=get_active_metadata_filters(),
-                            limit=top_k,
-                            store_type=store_type
-                        ))
-                        
-                        # Add source information
-                        for result in results:
-                            result.metadata['vector_store'] = store_type.value
-                            result.metadata['collection'] = collection
-                            result.metadata['enhanced_query'] = enhanced_query
-                        
-                        all_results.extend(results)
-                
-                except Exception as e:
-                    st.warning(f"Search failed for {store_type.value}/{collection}: {e}")
-                    if not enable_fallback:
-                        continue
+                    stats = asyncio.run(manager.get_collection_stats(collection, store_type))
+                    index_dim = stats.get('dimension') or stats.get('vector_dimension')
+                except Exception:
+                    index_dim = None
+                if index_dim and len(query_embeddings[0]) != int(index_dim):
+                    st.warning(f"Index '{collection}' expects dimension {index_dim}, but the selected embedding model outputs {len(query_embeddings[0])}. Choose a matching model (e.g., MiniLM=384). Skipping this collection.")
+                    continue
+                search_targets.setdefault(store_type, []).append(collection)
+        
+        # Execute searches: one federated fan-out per enhanced query
+        all_results = []
+        slow_targets = set()
+        fallback_targets = {}
+        for i, enhanced_query in enumerate(enhanced_queries):
+            progress_bar.progress((i + 1) / len(enhanced_queries))
+            status_text.text(f"Searching {sum(len(c) for c in search_targets.values())} collections...")
+            if not search_targets:
+                break
+            
+            try:
+                federated = asyncio.run(manager.federated_search(
+                    query=enhanced_query,
+                    query_embedding=(query_embeddings[i] if i < len(query_embeddings) else None),
+                    filters=get_active_metadata_filters(),
+                    limit=top_k,
+                    targets=search_targets,
+                    timeout=search_timeout,
+                    fallback=enable_fallback
+                ))
+            except Exception as e:
+                st.warning(f"Search failed: {e}")
+                continue
+            
+            slow_targets.update(federated.slow_stores)
+            fallback_targets.update(federated.fallbacks)
+            for label, error in federated.failed_stores.items():
+                st.warning(f"Search failed for {label}: {error}")
+            
+            for result in federated.results:
+                result.metadata['enhanced_query'] = enhanced_query
+            all_results.extend(federated.results)
+        
+        if slow_targets:
+            st.caption(f"Timed out after {search_timeout}s (partial results shown): {', '.join(sorted(slow_targets))}")
+        if fallback_targets:
+            st.caption("Fallback searches: " + ", ".join(f"{missed} -> {alt}" for missed, alt in sorted(fallback_targets.items())))
         
         progress_bar.progress(1.0)
         status_text.text("Processing results...")
@@ -0,0 +1,83 @@
+"""
+Tests for the memory-mapped chunk store and its list views.
+"""
+import os
+import pickle
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.chunk_store import (ChunkDocumentList, ChunkStore, ChunkTextList, documents_to_columns,
+                               open_chunk_store, open_sidecar, write_chunk_store, write_sidecar)
+
+
+def test_round_trip_texts_metadata_and_ids(tmp_path):
+    path = tmp_path / "c.chunks"
+    texts = ["alpha", "", "ünïcode ✓"]
+    metas = [{"page": 1, "score": np.float32(0.5)}, None, {"tags": ["a", "b"]}]
+    write_chunk_store(path, texts, metas, ids=[1, 2, 3], extra={"layout": "x"})
+
+    with ChunkStore(path) as store:
+        assert len(store) == 3 and list(store.texts) == texts
+        assert store.texts[-1] == "ünïcode ✓"
+        assert store.get_metadata(0) == {"page": 1, "score": 0.5}
+        assert store.get_metadata(1) == {}
+        assert store.get_many([2]) == [{"text": "ünïcode ✓", "metadata": {"tags": ["a", "b"]}, "id": "3"}]
+        assert store.extra == {"layout": "x"}
+        assert store.text_bytes() == sum(len(t.encode()) for t in texts)
+        with pytest.raises(IndexError):
+            store.get_text(3)
+
+
+def test_mismatched_columns_and_bad_files(tmp_path):
+    with pytest.raises(ValueError):
+        write_chunk_store(tmp_path / "c.chunks", ["a", "b"], metadatas=[{}])
+    (tmp_path / "bad.chunks").write_bytes(b"not a chunk store")
+    (tmp_path / "empty.chunks").write_bytes(b"")
+
+    assert open_chunk_store(tmp_path / "missing.chunks") is None
+    assert open_chunk_store(tmp_path / "bad.chunks") is None
+    assert open_chunk_store(tmp_path / "empty.chunks") is None
+
+
+def test_sidecar_is_invalidated_when_its_source_changes(tmp_path):
+    source = tmp_path / "documents.pkl"
+    source.write_bytes(pickle.dumps(["a"]))
+    sidecar = tmp_path / "documents.chunks"
+    write_sidecar(sidecar, source, "texts", ["a"]).close()
+
+    store = open_sidecar(sidecar, source, "texts")
+    assert store is not None and list(store.texts) == ["a"]
+    store.close()
+    assert open_sidecar(sidecar, source, "documents") is None
+
+    source.write_bytes(pickle.dumps(["a", "b"]))
+    assert open_sidecar(sidecar, source, "texts") is None
+
+
+def test_document_list_rebuilds_pickled_rows(tmp_path):
+    documents = ["plain", {"content": "body", "source": "s.pdf"}, {"page_content": "pc", "page": 2}]
+    texts, metas = documents_to_columns(documents)
+    write_chunk_store(tmp_path / "d.chunks", texts, metas)
+
+    rows = ChunkDocumentList(ChunkStore(tmp_path / "d.chunks"))
+    assert list(rows) == documents
+    assert pickle.loads(pickle.dumps(rows)) == documents
+    # Rows that would not round-trip keep the pickle
+    assert documents_to_columns([{"content": "x", "obj": object()}]) is None
+
+
+def test_text_list_appends_after_the_mapped_base(tmp_path):
+    write_chunk_store(tmp_path / "t.chunks", ["a", "b"])
+    texts = ChunkTextList(ChunkStore(tmp_path / "t.chunks").texts)
+    texts.extend(["c"])
+    texts.append("d")
+
+    assert len(texts) == 4 and list(texts) == ["a", "b", "c", "d"]
+    assert texts[1] == "b" and texts[-1] == "d" and texts[1:3] == ["b", "c"]
+    # Only the appended rows count towards the heap
+    assert texts.heap_bytes() == 2 * 51
+    assert pickle.loads(pickle.dumps(texts)) == ["a", "b", "c", "d"]
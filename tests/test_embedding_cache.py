@@ -0,0 +1,91 @@
+"""
+Tests for the persistent embedding cache shared between processes.
+"""
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.embedding_cache import EmbeddingCache
+
+
+def _vectors(n, dim=8, seed=0):
+    return np.random.default_rng(seed).random((n, dim), dtype=np.float32)
+
+
+def test_round_trip_and_normalized_keys(tmp_path):
+    cache = EmbeddingCache("model", cache_dir=tmp_path)
+    vecs = _vectors(2)
+    cache.put_many(["alpha  beta", "gamma"], vecs)
+
+    found, missing = cache.get_many(["alpha beta", "delta", "gamma"])
+    assert missing == [1]
+    np.testing.assert_allclose(found[0], vecs[0])
+    np.testing.assert_allclose(found[2], vecs[1])
+
+
+def test_stale_capacity_does_not_truncate_or_overwrite(tmp_path):
+    # Two handles on one directory behave like two processes with separate state
+    a = EmbeddingCache("model", cache_dir=tmp_path, max_entries=4096)
+    a.put_many(["seed"], _vectors(1))
+    b = EmbeddingCache("model", cache_dir=tmp_path, max_entries=4096)
+    assert b.capacity == a.capacity
+
+    texts_a = [f"a-{i}" for i in range(1500)]
+    vecs_a = _vectors(1500, seed=1)
+    a.put_many(texts_a, vecs_a)
+    assert a.capacity > b.capacity
+
+    # b still believes in the old capacity; it must adopt the larger one
+    texts_b = [f"b-{i}" for i in range(10)]
+    vecs_b = _vectors(10, seed=2)
+    b.put_many(texts_b, vecs_b)
+    assert b.capacity == a.capacity
+    assert os.path.getsize(tmp_path / "model" / "ticks.i64") == 8 * a.capacity
+
+    fresh = EmbeddingCache("model", cache_dir=tmp_path, max_entries=4096)
+    found, missing = fresh.get_many(texts_a + texts_b)
+    assert missing == []
+    np.testing.assert_allclose(np.stack(found[:1500]), vecs_a)
+    np.testing.assert_allclose(np.stack(found[1500:]), vecs_b)
+
+
+def test_eviction_at_max_entries(tmp_path):
+    cache = EmbeddingCache("model", cache_dir=tmp_path, max_entries=4)
+    cache.put_many([f"t{i}" for i in range(4)], _vectors(4))
+    cache.get_many(["t0"])  # t1 is now least recently used
+    cache.put_many(["t4"], _vectors(1, seed=3))
+
+    _, missing = cache.get_many(["t0", "t1", "t2", "t3", "t4"])
+    assert missing == [1]
+    assert cache.get_stats()["evictions"] == 1
+
+
+def test_clear_seen_by_other_handle(tmp_path):
+    a = EmbeddingCache("model", cache_dir=tmp_path)
+    b = EmbeddingCache("model", cache_dir=tmp_path)
+    a.put_many(["x"], _vectors(1))
+    b.clear()
+    a.put_many(["y"], _vectors(1, dim=16))
+    assert a.dimension == 16
+    found, missing = EmbeddingCache("model", cache_dir=tmp_path).get_many(["x", "y"])
+    assert missing == [0]
+
+
+def test_entries_written_by_another_process_become_hits(tmp_path):
+    reader = EmbeddingCache("model", cache_dir=tmp_path)
+    writer = EmbeddingCache("model", cache_dir=tmp_path)
+    writer.put_many(["first"], _vectors(1))
+    # Opened after the first write, before the next ones
+    reader_open = EmbeddingCache("model", cache_dir=tmp_path)
+    vecs = _vectors(2, seed=4)
+    writer.put_many(["second", "third"], vecs)
+
+    for cache in (reader, reader_open):
+        found, missing = cache.get_many(["second", "third", "unknown"])
+        assert missing == [2]
+        np.testing.assert_allclose(np.stack(found[:2]), vecs)
+        assert cache.get_stats()["hits"] == 2
@@ -0,0 +1,103 @@
+"""
+Tests for the shared embedding service: one model per process, micro-batched
+encode_many and cache-backed encode_cached.
+
+Model loading needs sentence-transformers; these tests load a small
+deterministic model instead.
+"""
+import os
+import sys
+import threading
+import time
+
+import numpy as np
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils import embedding_service
+from utils.embedding_cache import EmbeddingCache
+from utils.embedding_service import get_embedding_service
+
+
+class _Model:
+    """Embeds a text as (length, number of spaces, 1)"""
+
+    def __init__(self):
+        self.calls = []
+
+    def get_sentence_embedding_dimension(self):
+        return 3
+
+    def encode(self, sentences, normalize_embeddings=False, **kwargs):
+        self.calls.append(list(sentences))
+        vectors = np.array([[len(s), s.count(" "), 1.0] for s in sentences], dtype=np.float32)
+        if normalize_embeddings:
+            vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors
+
+
+@pytest.fixture
+def loads(monkeypatch):
+    loaded = []
+
+    def load(model_name, device):
+        time.sleep(0.05)  # long enough for concurrent first callers to overlap
+        loaded.append(model_name)
+        return _Model()
+
+    monkeypatch.setattr(embedding_service, "_load_sentence_transformer", load)
+    monkeypatch.setattr(embedding_service, "_registry", {})
+    monkeypatch.setattr(embedding_service, "_load_locks", {})
+    return loaded
+
+
+def test_concurrent_first_callers_share_one_load(loads):
+    services = []
+    threads = [threading.Thread(target=lambda: services.append(get_embedding_service("m")))
+               for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert loads == ["m"]
+    assert all(s is services[0] for s in services)
+    assert get_embedding_service("other") is not services[0]
+    assert loads == ["m", "other"]
+
+
+def test_encode_many_coalesces_concurrent_callers(loads, monkeypatch):
+    monkeypatch.setenv("EMBEDDING_MICRO_BATCH_WAIT_MS", "100")
+    service = get_embedding_service("m")
+    texts = [f"query number {i}" + " x" * i for i in range(6)]
+    results = {}
+
+    def call(text):
+        results[text] = service.encode_many([text], use_cache=False)
+
+    threads = [threading.Thread(target=call, args=(text,)) for text in texts]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    # Fewer model calls than callers, and every caller got its own row back
+    assert len(service.model.calls) < len(texts)
+    for text in texts:
+        assert results[text].shape == (1, 3)
+        assert results[text][0][0] == len(text)
+
+
+def test_encode_cached_only_encodes_misses(loads, monkeypatch, tmp_path):
+    service = get_embedding_service("m")
+    cache = EmbeddingCache("m", cache_dir=tmp_path)
+    monkeypatch.setattr(service, "_get_cache", lambda: cache)
+
+    first = service.encode_cached(["alpha", "beta gamma"])
+    second = service.encode_cached(["beta gamma", "delta", "alpha"], normalize_embeddings=True)
+
+    assert service.model.calls == [["alpha", "beta gamma"], ["delta"]]
+    np.testing.assert_allclose(second[0], first[1] / np.linalg.norm(first[1]), rtol=1e-6)
+    np.testing.assert_allclose(np.linalg.norm(second, axis=1), 1.0, rtol=1e-6)
+    assert service.encode_cached([]).shape == (0, 3)
@@ -0,0 +1,77 @@
+"""
+Tests for the LRU index kept alongside cached LLM responses.
+"""
+import os
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils import enterprise_caching_system as ecs
+from utils.enterprise_caching_system import RedisConnectionManager
+
+
+class _Pipeline:
+    def __init__(self, server):
+        self.server = server
+        self.ops = []
+
+    def get(self, key):
+        self.ops.append(lambda: self.server.values.get(key))
+
+    def zadd(self, index_key, mapping, xx=False):
+        def op():
+            index = self.server.zsets.setdefault(index_key, {})
+            for member, score in mapping.items():
+                if not xx or member in index:
+                    index[member] = score
+        self.ops.append(op)
+
+    def execute(self):
+        return [op() for op in self.ops]
+
+
+class _Redis:
+    def __init__(self):
+        self.values = {}
+        self.zsets = {}
+
+    def pipeline(self, transaction=True):
+        return _Pipeline(self)
+
+    def zrem(self, index_key, *members):
+        for member in members:
+            self.zsets.get(index_key, {}).pop(member, None)
+
+    def zcard(self, index_key):
+        return len(self.zsets.get(index_key, {}))
+
+
+def test_redis_miss_removes_expired_member_from_index():
+    connection = RedisConnectionManager()
+    connection.redis_client = _Redis()
+    connection.redis_available = True
+    # "gone" expired through its Redis TTL but is still indexed
+    connection.redis_client.values["live"] = b"x"
+    connection.redis_client.zsets["lru"] = {"live": 1.0, "gone": 1.0}
+
+    assert connection.get_and_touch("live", "lru") == b"x"
+    assert connection.get_and_touch("gone", "lru") is None
+    assert connection.index_size("lru") == 1
+    assert connection.redis_client.zsets["lru"]["live"] > 1.0
+
+
+def test_memory_miss_removes_expired_member_from_index(monkeypatch):
+    monkeypatch.setattr(ecs, "_memory_cache", {})
+    monkeypatch.setattr(ecs, "_cache_timestamps", {})
+    monkeypatch.setattr(ecs, "_memory_indexes", {})
+    connection = RedisConnectionManager()
+    connection.redis_available = False
+
+    connection.set_bounded("a", b"1", ex=60, index_key="lru", max_size=10)
+    connection.set_bounded("b", b"2", ex=60, index_key="lru", max_size=10)
+    ecs._cache_timestamps["b"] = time.time() - 1  # expired
+
+    assert connection.get_and_touch("a", "lru") == b"1"
+    assert connection.get_and_touch("b", "lru") is None
+    assert connection.index_size("lru") == 1
@@ -0,0 +1,97 @@
+"""
+Tests for the FAISS adapter: blocking index work runs off the event loop.
+"""
+import asyncio
+import os
+import sys
+import threading
+
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+pytest.importorskip("faiss")
+
+from utils.adapters.faiss_adapter import FAISSAdapter
+from utils.multi_vector_storage_interface import VectorStoreConfig, VectorStoreType
+
+
+def _adapter(tmp_path):
+    config = VectorStoreConfig(
+        store_type=VectorStoreType.FAISS,
+        connection_params={'index_directory': str(tmp_path), 'vector_dimension': 4},
+    )
+    return FAISSAdapter(config)
+
+
+def test_upsert_and_search_round_trip(tmp_path):
+    adapter = _adapter(tmp_path)
+    docs = [{'id': 'a', 'content': 'alpha'}, {'id': 'b', 'content': 'beta'}]
+
+    async def run():
+        assert await adapter.upsert_documents('col', docs, [[1, 0, 0, 0], [0, 1, 0, 0]])
+        return await adapter.search('col', query_embedding=[1, 0, 0, 0], limit=1)
+
+    results = asyncio.run(run())
+    assert [r.id for r in results] == ['a']
+    assert results[0].content == 'alpha'
+
+
+def test_search_runs_off_the_event_loop(tmp_path):
+    adapter = _adapter(tmp_path)
+    threads = {}
+    original = adapter._search_locked
+
+    def recording(*args, **kwargs):
+        threads['search'] = threading.get_ident()
+        return original(*args, **kwargs)
+
+    adapter._search_locked = recording
+
+    async def run():
+        threads['loop'] = threading.get_ident()
+        await adapter.upsert_documents('col', [{'id': 'a', 'content': 'alpha'}], [[1, 0, 0, 0]])
+        return await adapter.search('col', query_embedding=[1, 0, 0, 0])
+
+    assert asyncio.run(run())
+    assert threads['search'] != threads['loop']
+
+
+def test_delete_documents_hides_rows(tmp_path):
+    adapter = _adapter(tmp_path)
+    docs = [{'id': 'a', 'content': 'alpha'}, {'id': 'b', 'content': 'beta'}]
+
+    async def run():
+        await adapter.upsert_documents('col', docs, [[1, 0, 0, 0], [0.9, 0.1, 0, 0]])
+        assert await adapter.delete_documents('col', ['a'])
+        return await adapter.search('col', query_embedding=[1, 0, 0, 0], limit=5)
+
+    assert [r.id for r in asyncio.run(run())] == ['b']
+
+
+def test_stats_and_maintenance_run_on_the_store_pool(tmp_path):
+    adapter = _adapter(tmp_path)
+    threads = {}
+
+    def recording(name, method):
+        def wrapper(*args, **kwargs):
+            threads[name] = threading.current_thread().name
+            return method(*args, **kwargs)
+        return wrapper
+
+    adapter._get_collection = recording('stats', adapter._get_collection)
+    adapter.compact_sync = recording('compact', adapter.compact_sync)
+    adapter.vacuum_sync = recording('vacuum', adapter.vacuum_sync)
+
+    async def run():
+        await adapter.upsert_documents('col', [{'id': 'a', 'content': 'alpha'}], [[1, 0, 0, 0]])
+        threads.clear()
+        stats = await adapter.get_collection_stats('col')
+        assert await adapter.compact('col')
+        assert await adapter.vacuum('col', force=True)
+        return stats
+
+    stats = asyncio.run(run())
+    assert stats['document_count'] == 1
+    assert set(threads) == {'stats', 'compact', 'vacuum'}
+    assert all(name.startswith('vs-') for name in threads.values())
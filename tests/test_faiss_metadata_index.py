@@ -0,0 +1,106 @@
+"""
+Tests for the metadata bitmap index used to pre-filter FAISS searches.
+"""
+import asyncio
+import os
+import sys
+
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.faiss_metadata_index import MetadataBitmapIndex, row_matches
+
+ROWS = [
+    {"source_type": "pdf", "metadata": {"tab": "bylaws", "tags": ["a", "b"]}},
+    {"source_type": "pdf", "metadata": {"tab": "policies"}},
+    {"source_type": "txt", "tab": "bylaws", "metadata": {"tab": "ignored"}},
+    {"source_type": "pdf", "metadata": {"tab": "minutes"}, "deleted": True},
+]
+
+
+def test_filters_are_anded_across_fields_and_ored_within():
+    index = MetadataBitmapIndex.from_metadata(ROWS)
+
+    assert index.matching_ids({"source_type": "pdf"}).tolist() == [0, 1]
+    assert index.matching_ids({"source_type": "pdf", "tab": ["bylaws", "policies"]}).tolist() == [0, 1]
+    # Top-level fields win over the nested metadata dict
+    assert index.matching_ids({"tab": "bylaws"}).tolist() == [0, 2]
+    # List values match element-wise
+    assert index.matching_ids({"tags": "b"}).tolist() == [0]
+    assert index.matching_ids({"tab": "missing"}).tolist() == []
+    assert index.matching_ids({"unknown_field": "x"}).tolist() == []
+
+
+def test_appended_and_deleted_rows():
+    index = MetadataBitmapIndex.from_metadata(ROWS)
+    index.add_rows(4, [{"source_type": "pdf"}])
+    index.mark_deleted([0])
+
+    assert index.row_count == 5
+    assert index.matching_ids({"source_type": "pdf"}).tolist() == [1, 4]
+    assert index.get_stats()["rows"] == 5
+
+
+def test_can_evaluate_rejects_operator_filters():
+    index = MetadataBitmapIndex()
+    assert index.can_evaluate({"tab": "bylaws", "tags": ["a", 1]})
+    assert not index.can_evaluate({"created_at": {"$gt": "2024-01-01"}})
+    assert not index.can_evaluate({"tags": [["nested"]]})
+
+
+def test_adapter_returns_filtered_rows_outside_the_unfiltered_top_k(tmp_path):
+    pytest.importorskip("faiss")
+    from utils.adapters.faiss_adapter import FAISSAdapter
+    from utils.multi_vector_storage_interface import VectorStoreConfig, VectorStoreType
+
+    adapter = FAISSAdapter(VectorStoreConfig(
+        store_type=VectorStoreType.FAISS,
+        connection_params={"index_directory": str(tmp_path), "vector_dimension": 4},
+    ))
+    docs = [{"id": f"d{i}", "content": f"doc {i}", "metadata": {"tab": "bylaws" if i == 9 else "other"}}
+            for i in range(10)]
+    # The only bylaws row is the least similar one
+    vectors = [[1.0, i / 10, 0, 0] if i < 9 else [0, 0, 1.0, 0] for i in range(10)]
+
+    async def run():
+        await adapter.upsert_documents("col", docs, vectors)
+        return await adapter.search("col", query_embedding=[1, 0, 0, 0], filters={"tab": "bylaws"}, limit=2)
+
+    assert [r.id for r in asyncio.run(run())] == ["d9"]
+
+
+def test_row_matches_agrees_with_the_bitmap():
+    index = MetadataBitmapIndex.from_metadata(ROWS)
+    filters = [{"source_type": "pdf"}, {"tab": ["bylaws", "policies"]}, {"tags": "b"},
+               {"tab": "bylaws", "source_type": "txt"}, {"unknown_field": "x"}]
+    for f in filters:
+        live = [row for row, meta in enumerate(ROWS) if not meta.get("deleted")]
+        assert [row for row in live if row_matches(ROWS[row], f)] == index.matching_ids(f).tolist()
+
+
+def test_unindexed_fields_fall_back_to_the_post_filter(tmp_path):
+    index = MetadataBitmapIndex.from_metadata([{"created_at": "2024-01-01"}])
+    assert not index.can_evaluate({"created_at": "2024-01-01"})
+    assert row_matches({"created_at": "2024-01-01"}, {"created_at": "2024-01-01"})
+
+    pytest.importorskip("faiss")
+    from utils.adapters.faiss_adapter import FAISSAdapter
+    from utils.multi_vector_storage_interface import VectorStoreConfig, VectorStoreType
+
+    adapter = FAISSAdapter(VectorStoreConfig(
+        store_type=VectorStoreType.FAISS,
+        connection_params={"index_directory": str(tmp_path), "vector_dimension": 4},
+    ))
+    docs = [{"id": "old", "content": "old", "created_at": "2024-01-01"},
+            {"id": "new", "content": "new", "created_at": "2025-01-01", "metadata": {"tab": "x"}}]
+
+    async def run(filters):
+        return [r.id for r in await adapter.search("col", query_embedding=[1, 0, 0, 0],
+                                                   filters=filters, limit=5)]
+
+    asyncio.run(adapter.upsert_documents("col", docs, [[1, 0, 0, 0], [1, 0.1, 0, 0]]))
+    assert asyncio.run(run({"created_at": "2024-01-01"})) == ["old"]
+    # Rows without the field do not match, on either path
+    assert asyncio.run(run({"tab": "x"})) == ["new"]
+    assert asyncio.run(run({"tab": [["x"]]})) == []
@@ -0,0 +1,147 @@
+"""
+Tests for manifest-based FAISS segment persistence: appends, tombstones,
+compaction and legacy collections.
+"""
+import os
+import pickle
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+faiss = pytest.importorskip("faiss")
+
+from utils.faiss_segment_store import FAISSSegmentStore, is_collection_dir, load_collection
+
+
+def _index(vectors):
+    index = faiss.IndexFlatIP(4)
+    if len(vectors):
+        index.add(np.asarray(vectors, dtype=np.float32))
+    return index
+
+
+def _load(store):
+    return store.load(lambda dim: faiss.IndexFlatIP(dim), 4)
+
+
+def test_segments_are_replayed_after_the_base(tmp_path):
+    store = FAISSSegmentStore(tmp_path)
+    store.write_base(_index([[1, 0, 0, 0]]), [{"id": "a"}], ["alpha"])
+    store.append_segment(np.eye(4, dtype=np.float32)[1:3], [{"id": "b"}, {"id": "c"}], ["beta", "gamma"])
+
+    index, metadata, documents, manifest = _load(FAISSSegmentStore(tmp_path))
+    assert index.ntotal == 3
+    assert [m["id"] for m in metadata] == ["a", "b", "c"]
+    assert list(documents) == ["alpha", "beta", "gamma"]
+    assert store.pending_rows(manifest) == 2
+
+
+def test_tombstones_flag_rows_deleted(tmp_path):
+    store = FAISSSegmentStore(tmp_path)
+    store.write_base(_index([[1, 0, 0, 0], [0, 1, 0, 0]]), [{"id": "a"}, {"id": "b"}], ["alpha", "beta"])
+    store.append_tombstones([0])
+
+    index, metadata, _, manifest = _load(store)
+    # Vectors stay in the index; the caller filters deleted rows
+    assert index.ntotal == 2
+    assert [m.get("deleted", False) for m in metadata] == [True, False]
+    assert store.pending_rows(manifest) == 0
+
+
+def test_compaction_removes_superseded_files(tmp_path):
+    store = FAISSSegmentStore(tmp_path)
+    store.write_base(_index([[1, 0, 0, 0]]), [{"id": "a"}], ["alpha"])
+    store.append_segment(np.eye(4, dtype=np.float32)[1:2], [{"id": "b"}], ["beta"])
+    before = set(os.listdir(tmp_path))
+
+    manifest = store.write_base(_index([[1, 0, 0, 0], [0, 1, 0, 0]]), [{"id": "a"}, {"id": "b"}],
+                                ["alpha", "beta"])
+
+    after = set(os.listdir(tmp_path))
+    assert manifest["segments"] == [] and manifest["base"]["count"] == 2
+    assert not any(name.startswith("seg-") for name in after)
+    assert not (before - {"manifest.json"}) & after
+    assert list(_load(store)[2]) == ["alpha", "beta"]
+
+
+def test_legacy_collection_is_read_as_base(tmp_path):
+    faiss.write_index(_index([[1, 0, 0, 0]]), str(tmp_path / "index.faiss"))
+    (tmp_path / "metadata.pkl").write_bytes(pickle.dumps([{"id": "a"}]))
+    (tmp_path / "documents.pkl").write_bytes(pickle.dumps(["alpha"]))
+    store = FAISSSegmentStore(tmp_path)
+
+    assert store.exists() and store.signature() is not None
+    index, metadata, documents, manifest = _load(store)
+    assert manifest["legacy"] and index.ntotal == 1
+    assert list(documents) == ["alpha"]
+
+    # The first append upgrades the collection to a manifest
+    store.append_segment(np.eye(4, dtype=np.float32)[1:2], [{"id": "b"}], ["beta"])
+    assert (tmp_path / "manifest.json").exists()
+    assert [m["id"] for m in _load(store)[1]] == ["a", "b"]
+
+
+def test_should_compact_policy(tmp_path):
+    store = FAISSSegmentStore(tmp_path)
+    manifest = {"base": {"count": 100}, "segments": [{"name": "seg-000002", "count": 50}]}
+
+    assert not store.should_compact({"base": {"count": 100}, "segments": []})
+    assert not store.should_compact(manifest, compact_ratio=1.0, min_rows=10)
+    assert store.should_compact(manifest, compact_ratio=0.5, min_rows=10)
+    assert store.should_compact(manifest, max_segments=1)
+    # Small collections wait for min_rows
+    assert not store.should_compact(manifest, compact_ratio=0.1, min_rows=1000)
+
+
+def test_base_without_matching_metadata_is_refused(tmp_path):
+    faiss.write_index(_index([[1, 0, 0, 0], [0, 1, 0, 0]]), str(tmp_path / "index.faiss"))
+    # Tabs-style layout: documents only, no per-row metadata
+    (tmp_path / "documents.pkl").write_bytes(pickle.dumps([{"content": "a"}, {"content": "b"}]))
+    store = FAISSSegmentStore(tmp_path)
+
+    with pytest.raises(ValueError):
+        _load(store)
+
+
+def test_load_collection_for_query_paths(tmp_path):
+    store = FAISSSegmentStore(tmp_path)
+    store.write_base(_index([[1, 0, 0, 0], [0, 1, 0, 0]]), [{"id": "a"}, {"id": "b"}], ["alpha", "beta"])
+    store.append_segment(np.eye(4, dtype=np.float32)[2:3], [{"id": "c"}], ["gamma"])
+    store.append_tombstones([0])
+
+    assert is_collection_dir(tmp_path) and not is_collection_dir(tmp_path / "missing")
+    index, metadata, documents = load_collection(tmp_path)
+    # The deleted row is gone; labels are row positions
+    assert index.ntotal == 2
+    _, labels = index.search(np.eye(4, dtype=np.float32)[:3], 1)
+    assert labels[0][0] != 0
+    assert [documents[int(row)] for row in labels[1:, 0]] == ["beta", "gamma"]
+
+
+def test_query_readers_see_adapter_collections(tmp_path, monkeypatch):
+    from utils.index_manager import IndexManager
+    from utils.vector_db_provider import VectorDBProvider
+
+    collection = tmp_path / "minutes"
+    store = FAISSSegmentStore(collection)
+    store.write_base(faiss.IndexIDMap2(_index([])), [], [])
+    store.append_segment(np.eye(4, dtype=np.float32)[:2],
+                         [{"id": "m1", "source": "a.pdf", "metadata": {"page": 1}},
+                          {"id": "m2", "source": "b.pdf", "metadata": {}}], ["one", "two"])
+
+    assert not (collection / "index.faiss").exists()
+    assert VectorDBProvider._is_faiss_index_dir(collection)
+    index, rows = VectorDBProvider._load_segment_collection(collection)
+    assert index.ntotal == 2 and list(rows["documents"]) == ["one", "two"]
+    assert rows["ids"] == ["m1", "m2"] and rows["metadatas"][0]["page"] == 1
+
+    monkeypatch.setattr(IndexManager, "STANDARD_PATHS", [str(tmp_path)])
+    monkeypatch.setattr(IndexManager, "_index_cache", {})
+    monkeypatch.setattr(IndexManager, "_available_indexes", [], raising=False)
+    assert IndexManager.list_available_indexes(force_refresh=True) == ["minutes"]
+    index, documents = IndexManager.load_index("minutes", force_reload=True)
+    assert [d["content"] for d in documents] == ["one", "two"]
+    assert documents[0]["metadata"] == {"page": 1, "source": "a.pdf"}
@@ -0,0 +1,187 @@
+"""
+Tests for the staged ingestion pipeline: text stages, batched embed/write and
+per-stage throughput.
+
+Parsing runs in threads and the embedding service is replaced by a small
+deterministic encoder, so no model or vector store is needed.
+"""
+import os
+import sys
+import time
+
+import numpy as np
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils import embedding_service, ingestion_pipeline, ingestion_staging
+from utils.ingestion_pipeline import (IngestionPipeline, SourceDocument, StageStats,
+                                      chunk_text, clean_text)
+from utils.ingestion_staging import IngestionSpool
+
+
+class _Encoder:
+    def __init__(self):
+        self.batches = []
+
+    def encode_cached(self, texts, normalize_embeddings=True):
+        self.batches.append(len(texts))
+        return np.array([[len(t), 1.0] for t in texts], dtype=np.float32)
+
+
+class _Sink:
+    def __init__(self, fail=()):
+        self.fail = set(fail)
+        self.writes = []
+
+    def write(self, collection_name, records, vectors):
+        self.writes.append((collection_name, records, vectors))
+        return collection_name not in self.fail
+
+
+def _pipeline(monkeypatch, sink, **kwargs):
+    encoder = _Encoder()
+    monkeypatch.setattr(embedding_service, "get_embedding_service", lambda model: encoder)
+    options = dict(extract_workers=2, chunk_size=20, chunk_overlap=5, use_processes=False,
+                   flush_interval=0.1)
+    options.update(kwargs)
+    return IngestionPipeline(sink, **options), encoder
+
+
+def _doc(collection, name, text):
+    return SourceDocument(collection_name=collection, file_name=name, document_type="TEXT",
+                          content=text.encode())
+
+
+def test_clean_and_chunk_text():
+    assert clean_text("hyphen-\nated\r\n\x07 words  here\n\n\n\nend") == "hyphenated\n words here\n\nend"
+
+    chunks = chunk_text("abcdefghij" * 3, chunk_size=12, chunk_overlap=2)
+    assert chunks[0] == "abcdefghijab"
+    assert chunks[1].startswith("ab")
+    assert "".join(c[:10] for c in chunks[:-1]) + chunks[-1] == "abcdefghij" * 3
+    assert chunk_text("", 10, 2) == []
+
+
+def test_run_embeds_and_writes_every_document(monkeypatch):
+    sink = _Sink()
+    pipeline, encoder = _pipeline(monkeypatch, sink, write_batch_chunks=1000)
+    documents = [_doc("docs", f"d{i}.txt", f"document number {i} " * 4) for i in range(5)]
+
+    report = pipeline.run(documents)
+
+    assert report["success"] and report["succeeded"] == 5
+    written = [r for _, records, _ in sink.writes for r in records]
+    assert len(written) == report["chunks"] == sum(encoder.batches)
+    assert {r["file_name"] for r in written} == {f"d{i}.txt" for i in range(5)}
+    for _, records, vectors in sink.writes:
+        # Each record keeps the vector of its own chunk
+        assert [v[0] for v in vectors] == [len(r["content"]) for r in records]
+
+
+def test_failed_write_fails_only_its_collection(monkeypatch):
+    sink = _Sink(fail={"bad"})
+    pipeline, _ = _pipeline(monkeypatch, sink)
+
+    report = pipeline.run([_doc("good", "a.txt", "some good text"),
+                           _doc("bad", "b.txt", "some bad text"),
+                           _doc("good", "empty.txt", "   ")])
+
+    outcome = {r["file_name"]: (r["success"], r["error"]) for r in report["documents"]}
+    assert outcome["a.txt"] == (True, None)
+    assert outcome["b.txt"] == (False, "Write to vector store failed")
+    assert outcome["empty.txt"] == (False, "No text extracted")
+    assert not report["success"] and report["failed"] == 2
+
+
+def test_throughput_is_measured_from_pipeline_start():
+    stats = StageStats("embed", started_at=time.time() - 10)
+    stats.record(items=5, chunks=50)
+
+    snapshot = stats.snapshot()
+    # Not inflated by measuring from the first recorded item
+    assert 0.45 <= snapshot["items_per_second"] <= 0.5
+    assert 4.5 <= snapshot["chunks_per_second"] <= 5.0
+    assert StageStats("idle").snapshot()["items_per_second"] is None
+
+
+def test_stage_stats_start_with_the_run(monkeypatch):
+    pipeline, _ = _pipeline(monkeypatch, _Sink())
+    pipeline.run([_doc("docs", "a.txt", "some text to embed")])
+
+    starts = {stats.started_at for stats in pipeline.stats.values()}
+    assert starts == {pipeline._started}
+
+
+def test_batch_task_releases_claims_when_the_pipeline_fails(monkeypatch, tmp_path):
+    pytest.importorskip("celery")
+    from utils.ingestion_queue import async_ingest_batch
+
+    spool = IngestionSpool(tmp_path / "spool")
+    monkeypatch.setattr(ingestion_staging, "_spool", spool)
+    blob, _ = spool.stage_claimed(b"some text", "faiss", "docs",
+                                  task_id=async_ingest_batch.request.id)
+
+    class _BrokenPipeline:
+        def __init__(self, sink, **kwargs):
+            pass
+
+        def run(self, documents, progress_callback=None):
+            raise RuntimeError("sink unavailable")
+
+    monkeypatch.setattr(ingestion_pipeline, "IngestionPipeline", _BrokenPipeline)
+    files = [{"file_ref": blob.ref, "file_sha256": blob.sha256,
+              "file_name": "a.txt", "document_type": "TEXT"}]
+    with pytest.raises(RuntimeError):
+        async_ingest_batch("docs", files, "tester", backend="faiss")
+
+    # The content can be ingested again and its blob is gone
+    assert spool.stage_claimed(b"some text", "faiss", "docs", task_id="t2")[1] is None
+    assert spool.get_stats()["blobs"] == 1
+
+
+class _Task:
+    def update_state(self, state=None, meta=None):
+        pass
+
+
+def test_single_and_batch_faiss_ingestion_share_one_collection(monkeypatch, tmp_path):
+    pytest.importorskip("faiss")
+    pytest.importorskip("celery")
+    from utils.ingestion_pipeline import FAISSIngestionSink
+    from utils.ingestion_queue import _ingest_to_faiss
+    from utils.vector_db_provider import VectorDBProvider
+
+    monkeypatch.chdir(tmp_path)
+    pipeline, _ = _pipeline(monkeypatch, FAISSIngestionSink("data/faiss_index"))
+    assert pipeline.run([_doc("docs", "batch.txt", "text from the batch task")])["success"]
+
+    result = _ingest_to_faiss(_Task(), "docs", b"text from a single upload", "single.txt",
+                              "tester", "TEXT", 20, 5)
+    assert result["success"], result
+
+    collection = tmp_path / "data" / "faiss_index" / "docs"
+    assert not (collection / "index.faiss").exists()
+    index, rows = VectorDBProvider._load_segment_collection(collection)
+    assert index.ntotal == len(rows["ids"]) == len(set(rows["ids"]))
+    assert {m["source"] for m in rows["metadatas"]} == {"batch.txt", "single.txt"}
+
+
+def test_faiss_sink_refuses_collections_with_misaligned_metadata(tmp_path):
+    faiss = pytest.importorskip("faiss")
+    import pickle
+    from utils.ingestion_pipeline import FAISSIngestionSink
+
+    # Layout written by the document tab: vectors and documents but no row metadata
+    collection = tmp_path / "docs"
+    collection.mkdir()
+    index = faiss.IndexFlatIP(2)
+    index.add(np.ones((2, 2), dtype=np.float32))
+    faiss.write_index(index, str(collection / "index.faiss"))
+    (collection / "documents.pkl").write_bytes(pickle.dumps([{"text": "a"}, {"text": "b"}]))
+    before = sorted(os.listdir(collection))
+
+    sink = FAISSIngestionSink(str(tmp_path))
+    assert not sink.write("docs", [{"id": "x", "content": "new"}], np.ones((1, 2), dtype=np.float32))
+    sink.close()
+    assert sorted(os.listdir(collection)) == before
@@ -0,0 +1,103 @@
+"""
+Tests for the claim-check ingestion spool.
+"""
+import hashlib
+import io
+import os
+import sys
+import threading
+import time
+
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils import ingestion_staging
+from utils.ingestion_staging import IngestionSpool, forget_collection_claims
+
+
+@pytest.fixture
+def spool(tmp_path):
+    return IngestionSpool(tmp_path / "spool")
+
+
+def test_stage_is_content_addressed(spool, tmp_path):
+    data = b"hello spool" * 1000
+    first = spool.stage(data)
+    second = spool.stage(io.BytesIO(data))
+    path = tmp_path / "doc.txt"
+    path.write_bytes(data)
+    third = spool.stage(path)
+
+    assert first.sha256 == hashlib.sha256(data).hexdigest()
+    assert not first.existed and second.existed and third.existed
+    assert spool.read(first.ref, first.sha256) == data
+    assert spool.get_stats()["blobs"] == 1
+
+
+def test_stage_claimed_detects_duplicates_without_staging(spool):
+    blob, existing = spool.stage_claimed(b"doc", "faiss", "col", task_id="t1")
+    assert existing is None and spool.exists(blob.ref)
+
+    again, existing = spool.stage_claimed(io.BytesIO(b"doc"), "faiss", "col", task_id="t2")
+    assert existing["task_id"] == "t1"
+    assert again.sha256 == blob.sha256
+    assert not list(spool.tmp_dir.iterdir())
+
+    # force replaces the claim
+    _, existing = spool.stage_claimed(b"doc", "faiss", "col", force=True, task_id="t3")
+    assert existing is None
+
+
+def test_release_cannot_drop_a_blob_while_it_is_being_claimed(spool):
+    data = b"shared content"
+    sha256 = spool.stage(data).sha256  # already staged, e.g. by an earlier upload
+    original_claim = spool.claim
+    releaser = {}
+
+    def claim_while_another_worker_releases(*args, **kwargs):
+        # Another worker finishes the same content and releases it right now
+        releaser["thread"] = threading.Thread(target=spool.release, args=(sha256,))
+        releaser["thread"].start()
+        time.sleep(0.1)
+        return original_claim(*args, **kwargs)
+
+    spool.claim = claim_while_another_worker_releases
+    blob, existing = spool.stage_claimed(data, "faiss", "col", task_id="t1")
+    releaser["thread"].join(5)
+
+    assert existing is None
+    assert spool.read(blob.ref) == data
+
+
+def test_release_keeps_blobs_with_pending_claims(spool):
+    blob, _ = spool.stage_claimed(b"doc", "faiss", "col", task_id="t1")
+    assert not spool.release(blob.sha256)
+
+    spool.update_claim("faiss", "col", blob.sha256, status="completed")
+    assert spool.release(blob.sha256)
+    assert not spool.exists(blob.ref)
+
+
+def test_forget_collection_drops_completed_claims(spool, monkeypatch):
+    monkeypatch.setattr(ingestion_staging, "_spool", spool)
+    blob, _ = spool.stage_claimed(b"doc", "weaviate", "Docs", task_id="t1")
+    spool.update_claim("weaviate", "Docs", blob.sha256, status="completed")
+    spool.stage_claimed(b"doc", "faiss", "docs", task_id="t2")
+
+    # Backends may report the collection name in another case
+    assert forget_collection_claims("docs", "weaviate") == 1
+
+    _, existing = spool.stage_claimed(b"doc", "weaviate", "Docs", task_id="t3")
+    assert existing is None
+    # The FAISS claim of the same content is untouched
+    assert spool.stage_claimed(b"doc", "faiss", "docs", task_id="t4")[1]["task_id"] == "t2"
+
+
+def test_purge_drops_abandoned_pending_claims(spool, monkeypatch):
+    blob, _ = spool.stage_claimed(b"doc", "faiss", "col", task_id="t1")
+    monkeypatch.setattr(ingestion_staging, "PENDING_CLAIM_TTL", -1)
+
+    removed = spool.purge(max_age_seconds=-1)
+    assert removed["claims"] == 1 and removed["blobs"] == 1
+    assert not spool.exists(blob.ref)
@@ -0,0 +1,73 @@
+"""
+Tests for concurrent multi-source search: per-source timeouts, deadlines and
+isolation between searches.
+"""
+import os
+import sys
+import threading
+import time
+
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+pytest.importorskip("requests")
+
+from utils.multi_source_search import MultiSourceSearchEngine
+
+
+def _source(content, delay=0.0, relevance=0.5):
+    def search(query, max_results):
+        time.sleep(delay)
+        return [{"content": content, "relevance": relevance}]
+    return search
+
+
+def test_hung_source_does_not_starve_later_searches():
+    release = threading.Event()
+
+    def hung(query, max_results):
+        release.wait(5)
+        return []
+
+    engine = MultiSourceSearchEngine(max_workers=2, source_timeout=0.2, deadline=2)
+    engine.register_source("hung", hung, "web")
+    engine.register_source("fast", _source("fast result"), "index")
+    try:
+        for _ in range(4):
+            started = time.monotonic()
+            results = engine.search("q")
+            assert [r.content for r in results] == ["fast result"]
+            assert time.monotonic() - started < 1.0
+        stats = engine.get_source_stats()
+        assert stats["hung"]["timeouts"] == 4
+        assert stats["fast"]["ok"] == 4
+    finally:
+        release.set()
+
+
+def test_source_timeout_starts_when_source_runs():
+    # One worker: "second" waits for "first" and must still get its full timeout
+    engine = MultiSourceSearchEngine(max_workers=1, source_timeout=0.4, deadline=3)
+    engine.register_source("first", _source("first", delay=0.3), "index")
+    engine.register_source("second", _source("second", delay=0.3), "index")
+
+    outcomes = {outcome.source_name: outcome.status for outcome, _ in engine.search_iter("q")}
+    assert outcomes == {"first": "ok", "second": "ok"}
+
+
+def test_timeout_is_passed_to_sources_that_accept_it():
+    seen = {}
+
+    def source(query, max_results=3, timeout=None):
+        seen["timeout"] = timeout
+        return []
+
+    engine = MultiSourceSearchEngine(source_timeout=2.5)
+    engine.register_source("web", source, "web")
+    engine.register_source("custom", source, "web", timeout=1.0)
+
+    engine.search("q", sources=["web"])
+    assert seen["timeout"] == 2.5
+    engine.search("q", sources=["custom"])
+    assert seen["timeout"] == 1.0
@@ -0,0 +1,121 @@
+"""
+Tests for federated search and latency-aware routing in the multi-vector manager,
+using in-process stores whose search() blocks like a synchronous SDK call.
+"""
+import asyncio
+import os
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.multi_vector_storage_interface import (
+    BaseVectorStore, VectorSearchResult, VectorStoreConfig, VectorStoreStatus, VectorStoreType
+)
+from utils.multi_vector_storage_manager import MultiVectorConfig, MultiVectorStorageManager
+
+
+class BlockingStore(BaseVectorStore):
+    """Store whose search blocks the calling thread for ``delay`` seconds"""
+
+    def __init__(self, store_type: VectorStoreType, delay: float, doc_id: str):
+        super().__init__(VectorStoreConfig(store_type=store_type, connection_params={}))
+        self.delay = delay
+        self.doc_id = doc_id
+
+    async def connect(self): return True
+    async def disconnect(self): pass
+    async def create_collection(self, collection_name, **kwargs): return True
+    async def delete_collection(self, collection_name): return True
+    async def list_collections(self): return ['docs']
+    async def upsert_documents(self, collection_name, documents, embeddings=None): return True
+    async def delete_documents(self, collection_name, document_ids): return True
+    async def get_collection_stats(self, collection_name): return {}
+    async def health_check(self): return True, 'ok'
+
+    async def search(self, collection_name, query=None, query_embedding=None, filters=None,
+                     limit=10, **kwargs):
+        time.sleep(self.delay)  # a blocking client call inside the coroutine
+        return [VectorSearchResult(content=self.doc_id, metadata={}, score=1.0, id=self.doc_id)]
+
+
+def _manager(primary, fallback=None, **config):
+    manager = MultiVectorStorageManager(
+        config=MultiVectorConfig(primary_stores=[], fallback_stores=[], **config))
+    for group, store in (('_primary_stores', primary), ('_fallback_stores', fallback)):
+        if store is None:
+            continue
+        key = f"{store.store_type.value}_1"
+        getattr(manager, group)[key] = store
+        manager._store_status[key] = VectorStoreStatus(store.store_type, True, ['docs'])
+    return manager
+
+
+def test_federated_deadline_with_blocking_store():
+    fast = BlockingStore(VectorStoreType.FAISS, 0.0, 'fast')
+    slow = BlockingStore(VectorStoreType.WEAVIATE, 1.5, 'slow')
+    manager = _manager(fast, slow)
+
+    started = time.perf_counter()
+    report = asyncio.run(manager.federated_search('docs', query='q', timeout=0.3))
+    elapsed = time.perf_counter() - started
+
+    assert report.slow_stores == ['weaviate/docs']
+    assert [r.id for r in report.results] == ['fast']
+    # The deadline fired instead of waiting for the blocked store
+    assert elapsed < 1.0
+
+
+def test_hedge_fires_against_blocking_primary():
+    primary = BlockingStore(VectorStoreType.WEAVIATE, 1.5, 'primary')
+    fallback = BlockingStore(VectorStoreType.FAISS, 0.0, 'fallback')
+    manager = _manager(primary, fallback, hedged_search=True, latency_budget=0.1)
+
+    started = time.perf_counter()
+    results = asyncio.run(manager.search('docs', query='q'))
+    elapsed = time.perf_counter() - started
+
+    assert [r.id for r in results] == ['fallback']
+    assert elapsed < 1.0
+
+
+def test_no_demotion_when_hedging_disabled():
+    primary = BlockingStore(VectorStoreType.WEAVIATE, 0.0, 'primary')
+    fallback = BlockingStore(VectorStoreType.FAISS, 0.0, 'fallback')
+    manager = _manager(primary, fallback, hedged_search=False, latency_budget=0.0, hedge_min_samples=1)
+
+    for _ in range(3):
+        results = asyncio.run(manager.search('docs', query='q'))
+        assert [r.id for r in results] == ['primary']
+    assert not manager._store_status['weaviate_1'].demoted
+
+
+def test_equal_ids_in_different_collections_are_not_merged():
+    store = BlockingStore(VectorStoreType.FAISS, 0.0, 'doc-1')
+    manager = _manager(store)
+
+    report = asyncio.run(manager.federated_search(
+        query='q', targets={VectorStoreType.FAISS: ['docs', 'minutes']}))
+
+    assert sorted(r.metadata['collection'] for r in report.results) == ['docs', 'minutes']
+    assert all(r.id == 'doc-1' for r in report.results)
+
+
+class FailingStore(BlockingStore):
+    async def search(self, collection_name, query=None, query_embedding=None, filters=None,
+                     limit=10, **kwargs):
+        raise ConnectionError('down')
+
+
+def test_fallback_retries_failed_target_on_the_next_store():
+    primary = FailingStore(VectorStoreType.WEAVIATE, 0.0, 'primary')
+    fallback = BlockingStore(VectorStoreType.FAISS, 0.0, 'fallback')
+    targets = {VectorStoreType.WEAVIATE: ['docs']}
+
+    report = asyncio.run(_manager(primary, fallback).federated_search(query='q', targets=targets))
+    assert report.results == [] and 'weaviate/docs' in report.failed_stores
+
+    report = asyncio.run(_manager(primary, fallback).federated_search(query='q', targets=targets,
+                                                                      fallback=True))
+    assert [r.id for r in report.results] == ['fallback']
+    assert report.fallbacks == {'weaviate/docs': 'faiss/docs'}
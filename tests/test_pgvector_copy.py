@@ -0,0 +1,55 @@
+"""
+Tests for the pgvector binary COPY encoding of ingested rows.
+"""
+import os
+import struct
+import sys
+from datetime import datetime, timezone
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.adapters.pgvector_adapter import (
+    PGVectorAdapter, _PG_EPOCH, _pgcopy_binary, _to_timestamptz
+)
+
+
+def _rows(documents, embeddings):
+    # _prepare_rows does not touch connection state
+    adapter = object.__new__(PGVectorAdapter)
+    return adapter._prepare_rows(documents, embeddings)
+
+
+def _timestamp_field(stream: bytes) -> int:
+    """micros-since-2000 of the created_at column of the first row"""
+    offset = 19 + 2  # header, field count
+    for _ in range(6):
+        (length,) = struct.unpack_from('>i', stream, offset)
+        offset += 4 + max(length, 0)
+    (length,) = struct.unpack_from('>i', stream, offset)
+    assert length == 8
+    return struct.unpack_from('>q', stream, offset + 4)[0]
+
+
+def test_copy_accepts_iso_string_created_at():
+    # What the ingestion tabs send: datetime.now().isoformat()
+    created = datetime(2024, 5, 1, 12, 30, 15, 250000)
+    docs = [{'id': 'a', 'content': 'alpha', 'created_at': created.isoformat()}]
+
+    stream = b''.join(_pgcopy_binary(_rows(docs, [[0.1, 0.2]])))
+
+    expected = created.astimezone() - _PG_EPOCH
+    micros = (expected.days * 86400 + expected.seconds) * 1_000_000 + expected.microseconds
+    assert _timestamp_field(stream) == micros
+
+
+def test_created_at_values_become_aware():
+    naive = datetime(2024, 5, 1, 12, 0)
+    assert _to_timestamptz(naive) == naive.astimezone()
+    assert _to_timestamptz('2024-05-01T12:00:00Z') == datetime(2024, 5, 1, 12, tzinfo=timezone.utc)
+    assert _to_timestamptz(None).tzinfo is not None
+    assert _to_timestamptz('not a date').tzinfo is not None
+
+
+def test_missing_created_at_defaults_to_aware_now():
+    rows = _rows([{'id': 'a', 'content': 'alpha'}], [[0.1, 0.2]])
+    assert rows[0][-1].tzinfo is not None
@@ -0,0 +1,98 @@
+"""
+Tests for the Redis query cache's in-process near-cache (L1).
+
+A small in-memory double stands in for the Redis connection.
+"""
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.query_cache import QueryCache
+
+
+class _Pipeline:
+    def __init__(self, server):
+        self.server = server
+        self.ops = []
+
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: self.ops.append((name, args, kwargs))
+
+    def execute(self):
+        for name, args, kwargs in self.ops:
+            getattr(self.server, name)(*args, **kwargs)
+
+
+class _PubSub:
+    def subscribe(self, **handlers):
+        pass
+
+    def run_in_thread(self, **kwargs):
+        return self
+
+    def stop(self):
+        pass
+
+
+class _Redis:
+    def __init__(self):
+        self.hashes = {}
+        self.hmget_calls = 0
+
+    def pipeline(self, transaction=True):
+        return _Pipeline(self)
+
+    def pubsub(self, **kwargs):
+        return _PubSub()
+
+    def delete(self, *keys):
+        for key in keys:
+            self.hashes.pop(key, None)
+
+    def hset(self, key, mapping):
+        self.hashes.setdefault(key, {}).update({k: str(v) for k, v in mapping.items()})
+
+    def hmget(self, key, *fields):
+        self.hmget_calls += 1
+        entry = self.hashes.get(key, {})
+        return [entry.get(f) for f in fields]
+
+    def expire(self, key, ttl):
+        pass
+
+    def publish(self, channel, message):
+        pass
+
+
+def _cache():
+    cache = QueryCache()
+    cache.close()
+    cache.encryption_enabled = False
+    cache._connection = _Redis()
+    cache._start_near_cache()
+    return cache
+
+
+def test_near_cache_hits_return_independent_copies():
+    cache = _cache()
+    cache.set("what is rag", "docs", "faiss", 5, {"results": [{"content": "a"}]})
+
+    first = cache.get("what is rag", "docs", "faiss", 5)
+    first["results"].append({"content": "mutated"})
+    second = cache.get("what is rag", "docs", "faiss", 5)
+
+    assert second == {"results": [{"content": "a"}]}
+    assert first is not second
+    # Both reads were served from L1
+    assert cache._connection.hmget_calls == 0
+
+
+def test_redis_hit_populates_near_cache():
+    cache = _cache()
+    cache.set("q", "docs", "faiss", 5, {"results": [1, 2]})
+    cache._l1.clear()
+
+    assert cache.get("q", "docs", "faiss", 5) == {"results": [1, 2]}
+    assert cache.get("q", "docs", "faiss", 5) == {"results": [1, 2]}
+    assert cache._connection.hmget_calls == 1
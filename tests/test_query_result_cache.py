@@ -0,0 +1,61 @@
+"""
+Tests for the bounded, version-aware query result cache.
+"""
+import os
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.query_result_cache import QueryResultCache, bump_index_version, get_index_generation
+
+
+def test_contains_ignores_version_and_keeps_entry():
+    cache = QueryResultCache(max_entries=10, ttl_seconds=60)
+    cache.put("q", ["r"], version=(3, None))
+
+    assert "q" in cache
+    assert "missing" not in cache
+    # Membership must not evict a versioned entry
+    assert len(cache) == 1
+    assert cache.get("q", version=(3, None)) == ["r"]
+
+
+def test_contains_respects_expiry():
+    cache = QueryResultCache(max_entries=10, ttl_seconds=0.01)
+    cache.put("q", 1)
+    time.sleep(0.02)
+    assert "q" not in cache
+
+
+def test_version_mismatch_is_a_stale_miss():
+    cache = QueryResultCache(max_entries=10, ttl_seconds=60)
+    cache.put("q", 1, version=1)
+    assert cache.get("q", version=2, default=None) is None
+    assert cache.get_stats()["stale"] == 1
+    assert "q" not in cache
+
+
+def test_lru_and_byte_budget():
+    cache = QueryResultCache(max_entries=2, max_bytes=1000, ttl_seconds=60, sizeof=lambda v: v)
+    cache.put("a", 100)
+    cache.put("b", 100)
+    cache.get("a")
+    cache.put("c", 100)
+    assert "a" in cache and "c" in cache and "b" not in cache
+
+    assert cache.put("huge", 5000) is False
+    cache.put("d", 900)  # over the byte budget: the least recently used entry goes
+    assert "a" not in cache and "c" in cache and "d" in cache
+
+
+def test_index_generation_and_invalidation():
+    before = get_index_generation("Board")
+    bump_index_version("board")
+    assert get_index_generation("BOARD") == before + 1
+
+    cache = QueryResultCache(max_entries=10, ttl_seconds=60)
+    cache.put("x", 1, index_name="board")
+    cache.put("y", 2, index_name="other")
+    assert cache.invalidate_index("Board") == 1
+    assert "x" not in cache and "y" in cache
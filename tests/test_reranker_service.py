@@ -0,0 +1,63 @@
+"""
+Tests for the shared reranker registry and the hybrid-search reranker adapter.
+
+Model loading needs transformers/torch; these tests pre-register a scoring
+service so only the registry and adapter logic is exercised.
+"""
+import os
+import sys
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils import reranker_service
+from utils.reranker_service import chunk_key, get_reranker_service
+
+
+class _KeywordService:
+    """Scores a document by how often it contains the query"""
+
+    def __init__(self, model_name):
+        self.model_name = model_name
+        self.model = object()
+
+    def score(self, query, documents):
+        return np.array([doc.count(query) for doc in documents], dtype=np.float32)
+
+
+def _register(monkeypatch, name):
+    service = _KeywordService(name)
+    monkeypatch.setattr(reranker_service, "_registry", {(name, "auto"): service})
+    return service
+
+
+def test_registry_resolves_model_from_environment(monkeypatch):
+    monkeypatch.setenv("RERANKER_MODEL_NAME", "org/custom-reranker")
+    monkeypatch.delenv("RERANKER_DEVICE", raising=False)
+    service = _register(monkeypatch, "org/custom-reranker")
+
+    assert get_reranker_service() is service
+    assert get_reranker_service("org/custom-reranker") is service
+
+
+def test_cross_encoder_reranker_uses_configured_model(monkeypatch):
+    from utils.enterprise_hybrid_search import CrossEncoderReranker, SearchResult
+
+    monkeypatch.setenv("RERANKER_MODEL_NAME", "org/custom-reranker")
+    monkeypatch.delenv("RERANKER_DEVICE", raising=False)
+    _register(monkeypatch, "org/custom-reranker")
+
+    reranker = CrossEncoderReranker()
+    assert reranker.model_name == "org/custom-reranker"
+
+    results = [SearchResult(content=text, source="s")
+               for text in ("no match", "cat cat", "cat")]
+    ranked = reranker.rerank("cat", results, top_k=2)
+    assert [r.content for r in ranked] == ["cat cat", "cat"]
+
+
+def test_chunk_key_is_stable_and_content_based():
+    assert chunk_key("a chunk") == chunk_key("a chunk")
+    assert chunk_key("a chunk") != chunk_key("another chunk")
+    assert chunk_key(None) == chunk_key("")
@@ -0,0 +1,105 @@
+"""
+Tests for the semantic LLM answer cache.
+
+Answers are kept in a dict-backed stand-in for the cache manager and queries
+are embedded as normalized bags of words.
+"""
+import os
+import sys
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.semantic_response_cache import SemanticResponseCache, context_fingerprint
+
+VOCAB = ["what", "is", "the", "quorum", "for", "board", "meetings", "a", "budget", "deadline"]
+
+
+class _Answers:
+    def __init__(self):
+        self.items = {}
+
+    def get_cached_response(self, query, context, model_params=None):
+        return self.items.get((query, context))
+
+    def cache_response(self, query, context, response, ttl, model_params=None):
+        self.items[(query, context)] = response
+        return True
+
+
+class _Embed:
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self, texts):
+        self.calls += 1
+        vectors = np.array([[text.split().count(w) for w in VOCAB] for text in texts], dtype=np.float32)
+        return vectors / np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-9)
+
+
+def _cache(**kwargs):
+    embed = _Embed()
+    cache = SemanticResponseCache(cache_manager=_Answers(), embed=embed, similarity_threshold=0.85, **kwargs)
+    return cache, embed
+
+
+def test_exact_repeat_is_served_without_embedding():
+    cache, embed = _cache()
+    cache.store("What is the quorum?", ["c1", "c2"], {"answer": "5"}, collection="docs", index_version=1)
+    calls = embed.calls
+
+    hit = cache.lookup("  what IS the   quorum?", ["c2", "c1"], collection="docs", index_version=1)
+    assert hit == {"answer": "5", "cache": "exact"}
+    assert embed.calls == calls
+
+
+def test_paraphrase_hits_only_with_the_same_context():
+    cache, _ = _cache()
+    cache.store("what is the quorum for board meetings", ["c1", "c2"], {"answer": "5"},
+                collection="docs", index_version=1)
+
+    hit = cache.lookup("what is the quorum for the board meetings", ["c1", "c2"],
+                       collection="docs", index_version=1)
+    assert hit["cache"] == "semantic" and hit["answer"] == "5"
+    assert hit["matched_query"] == "what is the quorum for board meetings"
+    assert hit["similarity"] >= 0.85
+
+    assert cache.lookup("what is the quorum for the board meetings", ["c1", "c3"],
+                        collection="docs", index_version=1) is None
+    assert cache.lookup("what is the budget deadline", ["c1", "c2"],
+                        collection="docs", index_version=1) is None
+
+
+def test_new_index_version_drops_cached_questions():
+    cache, _ = _cache()
+    cache.store("what is the quorum for board meetings", ["c1"], {"answer": "5"},
+                collection="docs", index_version=1)
+
+    assert cache.lookup("what is the quorum for the board meetings", ["c1"],
+                        collection="docs", index_version=2) is None
+    assert cache.get_stats()["version_resets"] == 1
+    assert cache.get_stats()["indexed_queries"] == {"docs": 0}
+
+
+def test_evicted_answer_forgets_its_question():
+    cache, _ = _cache()
+    cache.store("what is the quorum for board meetings", ["c1"], {"answer": "5"},
+                collection="docs", index_version=1)
+    cache.cache_manager.items.clear()
+
+    assert cache.lookup("what is the quorum for the board meetings", ["c1"],
+                        collection="docs", index_version=1) is None
+    stats = cache.get_stats()
+    assert stats["stale_entries"] == 1 and stats["indexed_queries"] == {"docs": 0}
+
+
+def test_least_recently_used_questions_are_dropped():
+    cache, _ = _cache(max_entries=2)
+    for i, query in enumerate(["what is the quorum", "what is the budget", "what is a deadline"]):
+        cache.store(query, ["c1"], {"answer": str(i)}, collection="docs", index_version=1)
+
+    index = cache._indexes["docs"]
+    assert index.size == 2
+    assert {q for q, _ in index.rows} == {"what is the budget", "what is a deadline"}
+    assert context_fingerprint(["b", "a", None]) == context_fingerprint(["a", "b"])
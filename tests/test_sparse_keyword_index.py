@@ -0,0 +1,89 @@
+"""
+Tests for the postings-based BM25 keyword index.
+"""
+import math
+import os
+import sys
+from collections import Counter
+
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.sparse_keyword_index import SparseKeywordIndex, corpus_signature, tokenize
+
+TEXTS = [
+    "The board approved the budget.",
+    "Budget committee minutes: budget, budget and more budget!",
+    "Bylaws of the association",
+    "",
+    "The association board meets monthly to review the bylaws",
+]
+
+
+def _bm25(texts, query, k1=1.2, b=0.75):
+    """Brute-force BM25 over every document"""
+    docs = [tokenize(t) for t in texts]
+    avg_len = sum(len(d) for d in docs) / len(docs)
+    scores = {}
+    for i, doc in enumerate(docs):
+        tf = Counter(doc)
+        score = 0.0
+        for term, qtf in Counter(tokenize(query)).items():
+            if not tf[term]:
+                continue
+            df = sum(1 for d in docs if term in d)
+            idf = math.log1p((len(docs) - df + 0.5) / (df + 0.5))
+            score += qtf * idf * tf[term] * (k1 + 1) / (tf[term] + k1 * (1 - b + b * len(doc) / avg_len))
+        if score:
+            scores[i] = score
+    return scores
+
+
+def test_search_matches_brute_force_bm25():
+    index = SparseKeywordIndex.build(TEXTS)
+    for query in ("budget", "board bylaws", "the board the", "unknown words"):
+        expected = _bm25(TEXTS, query)
+        results = index.search(query, k=10)
+        assert [doc for doc, _ in results] == sorted(expected, key=lambda d: (-expected[d], d))
+        for doc, score in results:
+            assert score == pytest.approx(expected[doc], rel=1e-5)
+
+
+def test_top_k_breaks_ties_by_document_order():
+    index = SparseKeywordIndex.build(["same words", "other", "same words", "same words"])
+    assert [doc for doc, _ in index.search("same", k=2)] == [0, 2]
+    assert index.search("same", k=0) == []
+
+
+def test_overlap_scores():
+    index = SparseKeywordIndex.build(["a b c", "a d", "e"])
+    jaccard = dict(index.overlap_search("a b", mode="jaccard"))
+    coverage = dict(index.overlap_search("a b x", mode="coverage"))
+
+    assert jaccard == {0: pytest.approx(2 / 3), 1: pytest.approx(1 / 3)}
+    assert coverage == {0: pytest.approx(2 / 3), 1: pytest.approx(1 / 3)}
+
+
+def test_persisted_index_is_reused_only_for_the_same_corpus(tmp_path):
+    source = tmp_path / "docs.txt"
+    source.write_text("x")
+    signature = corpus_signature([source])
+    built = SparseKeywordIndex.load_or_build(tmp_path / "idx", TEXTS, signature)
+
+    loaded = SparseKeywordIndex.load(tmp_path / "idx", signature=signature)
+    assert loaded is not None and len(loaded) == len(TEXTS)
+    assert loaded.search("budget board") == built.search("budget board")
+
+    # Different corpus or BM25 parameters: not reused
+    source.write_text("changed content")
+    assert SparseKeywordIndex.load(tmp_path / "idx", signature=corpus_signature([source])) is None
+    assert SparseKeywordIndex.load(tmp_path / "idx", signature=signature, k1=2.0) is None
+    assert SparseKeywordIndex.load(tmp_path / "missing") is None
+
+
+def test_empty_corpus():
+    index = SparseKeywordIndex.build([])
+    assert len(index) == 0
+    assert index.search("anything") == []
+    assert index.overlap_search("anything") == []
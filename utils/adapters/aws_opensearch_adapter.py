@@ -169,7 +169,7 @@ class AWSOpenSearchAdapter(BaseVectorStore):
             )
             
             # Test connection
-            info = self._client.info()
+            info = await self._run_blocking(self._client.info)
             logger.info(f"Connected to OpenSearch cluster: {info.get('cluster_name', 'unknown')}")
             
             self._connected = True
@@ -184,10 +184,11 @@ class AWSOpenSearchAdapter(BaseVectorStore):
         """Close connection to OpenSearch"""
         if self._client:
             try:
-                self._client.close()
+                await self._run_blocking(self._client.close)
             except Exception as e:
                 logger.error(f"Error disconnecting from OpenSearch: {e}")
         self._connected = False
+        self._shutdown_executor()
     
     async def create_collection(self, collection_name: str, **kwargs) -> bool:
         """Create a new index with k-NN configuration"""
@@ -196,7 +197,7 @@ class AWSOpenSearchAdapter(BaseVectorStore):
                 await self.connect()
             
             # Check if index already exists
-            if self._client.indices.exists(index=collection_name):
+            if await self._run_blocking(self._client.indices.exists, index=collection_name):
                 logger.info(f"Index {collection_name} already exists")
                 return True
             
@@ -206,7 +207,7 @@ class AWSOpenSearchAdapter(BaseVectorStore):
                 replicas = 1
                 # Try to compute awareness requirement and pick minimal valid replicas proactively
                 try:
-                    required_copies = self._get_zone_awareness_required_copies()
+                    required_copies = await self._run_blocking(self._get_zone_awareness_required_copies)
                     if isinstance(required_copies, int) and required_copies > 1:
                         # total copies = replicas + 1 must be multiple of required_copies
                         mod = (1 + replicas) % required_copies
@@ -282,7 +283,8 @@ class AWSOpenSearchAdapter(BaseVectorStore):
             
             # Create the index
             try:
-                response = self._client.indices.create(
+                response = await self._run_blocking(
+                    self._client.indices.create,
                     index=collection_name,
                     body=index_settings
                 )
@@ -311,7 +313,8 @@ class AWSOpenSearchAdapter(BaseVectorStore):
                                 try:
                                     logger.warning(f"Retrying index creation with replicas={adjusted} due to zone awareness requirement [{required}]")
                                     index_settings['settings']['index']['number_of_replicas'] = adjusted
-                                    response = self._client.indices.create(
+                                    response = await self._run_blocking(
+                                        self._client.indices.create,
                                         index=collection_name,
                                         body=index_settings
                                     )
@@ -390,8 +393,8 @@ class AWSOpenSearchAdapter(BaseVectorStore):
             if not self._client:
                 await self.connect()
             
-            if self._client.indices.exists(index=collection_name):
-                response = self._client.indices.delete(index=collection_name)
+            if await self._run_blocking(self._client.indices.exists, index=collection_name):
+                response = await self._run_blocking(self._client.indices.delete, index=collection_name)
                 logger.info(f"Deleted OpenSearch index: {collection_name}")
                 return response.get('acknowledged', False)
             
@@ -408,7 +411,7 @@ class AWSOpenSearchAdapter(BaseVectorStore):
                 await self.connect()
             
             # Get all indices
-            indices = self._client.indices.get_alias(index="*")
+            indices = await self._run_blocking(self._client.indices.get_alias, index="*")
             return list(indices.keys())
             
         except Exception as e:
@@ -453,7 +456,7 @@ class AWSOpenSearchAdapter(BaseVectorStore):
             
             # Execute bulk operation
             if bulk_body:
-                response = self._client.bulk(body=bulk_body, refresh=True)
+                response = await self._run_blocking(self._client.bulk, body=bulk_body, refresh=True)
                 
                 # Check for errors
                 if response.get('errors'):
@@ -539,7 +542,8 @@ class AWSOpenSearchAdapter(BaseVectorStore):
                     }
             
             # Execute search
-            response = self._client.search(
+            response = await self._run_blocking(
+                self._client.search,
                 index=collection_name,
                 body=search_body
             )
@@ -579,7 +583,7 @@ class AWSOpenSearchAdapter(BaseVectorStore):
                 bulk_body.append({"delete": {"_index": collection_name, "_id": doc_id}})
             
             if bulk_body:
-                response = self._client.bulk(body=bulk_body, refresh=True)
+                response = await self._run_blocking(self._client.bulk, body=bulk_body, refresh=True)
                 logger.info(f"Deleted {len(document_ids)} documents from {collection_name}")
                 return not response.get('errors', False)
             
@@ -596,12 +600,12 @@ class AWSOpenSearchAdapter(BaseVectorStore):
                 await self.connect()
             
             # Get index stats
-            stats = self._client.indices.stats(index=collection_name)
+            stats = await self._run_blocking(self._client.indices.stats, index=collection_name)
             index_stats = stats['indices'][collection_name]
             
             # Get index settings and mappings
-            settings = self._client.indices.get_settings(index=collection_name)
-            mappings = self._client.indices.get_mapping(index=collection_name)
+            settings = await self._run_blocking(self._client.indices.get_settings, index=collection_name)
+            mappings = await self._run_blocking(self._client.indices.get_mapping, index=collection_name)
             
             return {
                 "document_count": index_stats['total']['docs']['count'],
@@ -623,7 +627,7 @@ class AWSOpenSearchAdapter(BaseVectorStore):
                 await self.connect()
             
             # Check cluster health
-            health = self._client.cluster.health()
+            health = await self._run_blocking(self._client.cluster.health)
             status = health.get('status', 'red')
             
             if status == 'green':
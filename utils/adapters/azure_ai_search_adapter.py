@@ -121,7 +121,7 @@ class AzureAISearchAdapter(BaseVectorStore):
             )
             
             # Test connection
-            service_stats = self._index_client.get_service_statistics()
+            service_stats = await self._run_blocking(self._index_client.get_service_statistics)
             logger.info(f"Connected to Azure AI Search: {service_stats}")
             
             self._connected = True
@@ -136,6 +136,7 @@ class AzureAISearchAdapter(BaseVectorStore):
         """Close connection to Azure AI Search"""
         # Azure SDK handles connection pooling automatically
         self._connected = False
+        self._shutdown_executor()
     
     def _get_search_client(self, index_name: str) -> SearchClient:
         """Get search client for specific index"""
@@ -158,7 +159,7 @@ class AzureAISearchAdapter(BaseVectorStore):
             
             # Check if index already exists
             try:
-                existing_index = self._index_client.get_index(collection_name)
+                existing_index = await self._run_blocking(self._index_client.get_index, collection_name)
                 if existing_index:
                     logger.info(f"Index {collection_name} already exists")
                     return True
@@ -274,7 +275,7 @@ class AzureAISearchAdapter(BaseVectorStore):
                 semantic_search=semantic_search
             )
             
-            result = self._index_client.create_index(index)
+            result = await self._run_blocking(self._index_client.create_index, index)
             logger.info(f"Created Azure AI Search index: {collection_name}")
             return True
             
@@ -288,7 +289,7 @@ class AzureAISearchAdapter(BaseVectorStore):
             if not self._index_client:
                 await self.connect()
             
-            self._index_client.delete_index(collection_name)
+            await self._run_blocking(self._index_client.delete_index, collection_name)
             logger.info(f"Deleted Azure AI Search index: {collection_name}")
             return True
             
@@ -302,7 +303,7 @@ class AzureAISearchAdapter(BaseVectorStore):
             if not self._index_client:
                 await self.connect()
             
-            indexes = self._index_client.list_indexes()
+            indexes = await self._run_blocking(lambda: list(self._index_client.list_indexes()))
             return [index.name for index in indexes]
             
         except Exception as e:
@@ -343,7 +344,7 @@ class AzureAISearchAdapter(BaseVectorStore):
             
             # Upload documents
             if docs_to_upload:
-                result = search_client.upload_documents(documents=docs_to_upload)
+                result = await self._run_blocking(search_client.upload_documents, documents=docs_to_upload)
                 
                 # Check for errors
                 success_count = sum(1 for r in result if r.succeeded)
@@ -416,9 +417,9 @@ class AzureAISearchAdapter(BaseVectorStore):
                 search_params["query_answer"] = "extractive"
             
             # Execute search
-            results = search_client.search(
-                search_text=search_text,
-                **search_params
+            # The result pager fetches lazily; drain it on the executor too
+            results = await self._run_blocking(
+                lambda: list(search_client.search(search_text=search_text, **search_params))
             )
             
             # Process results
@@ -459,7 +460,7 @@ class AzureAISearchAdapter(BaseVectorStore):
             docs_to_delete = [{"id": doc_id} for doc_id in document_ids]
             
             if docs_to_delete:
-                result = search_client.delete_documents(documents=docs_to_delete)
+                result = await self._run_blocking(search_client.delete_documents, documents=docs_to_delete)
                 
                 success_count = sum(1 for r in result if r.succeeded)
                 logger.info(f"Deleted {success_count} documents from {collection_name}")
@@ -478,18 +479,16 @@ class AzureAISearchAdapter(BaseVectorStore):
                 await self.connect()
             
             # Get index information
-            index = self._index_client.get_index(collection_name)
+            index = await self._run_blocking(self._index_client.get_index, collection_name)
             
             # Get document count (approximate)
             search_client = self._get_search_client(collection_name)
-            count_result = search_client.search(
-                search_text="*",
-                include_total_count=True,
-                top=0
+            document_count = await self._run_blocking(
+                lambda: search_client.search(search_text="*", include_total_count=True, top=0).get_count()
             )
             
             return {
-                "document_count": count_result.get_count(),
+                "document_count": document_count,
                 "field_count": len(index.fields),
                 "vector_search_enabled": index.vector_search is not None,
                 "semantic_search_enabled": index.semantic_search is not None,
@@ -508,7 +507,7 @@ class AzureAISearchAdapter(BaseVectorStore):
                 await self.connect()
             
             # Get service statistics
-            stats = self._index_client.get_service_statistics()
+            stats = await self._run_blocking(self._index_client.get_service_statistics)
             
             return True, f"Service healthy: {stats.get('counters', {}).get('index_counter', {}).get('usage', 0)} indexes"
                 
@@ -3,16 +3,24 @@ FAISS Vector Store Adapter
 Wraps existing FAISS functionality to conform to the unified interface
 """
 
+import os
+import time
 import logging
 from typing import List, Dict, Any, Optional, Tuple
 from datetime import datetime
+from collections import OrderedDict
+from dataclasses import dataclass
 import asyncio
 import json
+import threading
 from pathlib import Path
 
 from ..multi_vector_storage_interface import (
     BaseVectorStore, VectorStoreConfig, VectorSearchResult, VectorStoreType
 )
+from ..faiss_segment_store import FAISSSegmentStore, is_id_mapped
+from ..faiss_metadata_index import MetadataBitmapIndex, row_matches
+from ..chunk_store import ChunkTextList
 
 try:
     import faiss
@@ -31,6 +39,29 @@ except ImportError:
 
 logger = logging.getLogger(__name__)
 
+@dataclass
+class _LoadedCollection:
+    """Resident state of one FAISS collection: index, metadata and documents kept together"""
+    index: Any
+    metadata: List[Dict[str, Any]]
+    documents: ChunkTextList  # base texts are memory-mapped, only segment texts live in the heap
+    filter_index: MetadataBitmapIndex
+    tombstones: int = 0  # deleted rows whose vectors are still physically in the index (e.g. HNSW)
+    signature: Optional[Tuple] = None  # manifest stat when loaded / last written by us
+    memory_bytes: int = 0
+    last_checked: float = 0.0
+
+def _estimate_memory(state: _LoadedCollection) -> int:
+    """Approximate resident bytes of a loaded collection"""
+    index = state.index
+    vector_bytes = index.ntotal * (index.d * 4 + 8)
+    inner = faiss.downcast_index(index.index) if is_id_mapped(index) else index
+    if isinstance(inner, faiss.IndexHNSW):
+        vector_bytes += index.ntotal * inner.hnsw.nb_neighbors(0) * 4  # neighbour lists
+    text_bytes = state.documents.heap_bytes()
+    metadata_bytes = 300 * len(state.metadata)
+    return vector_bytes + text_bytes + metadata_bytes
+
 class FAISSAdapter(BaseVectorStore):
     """FAISS vector store adapter using existing FAISS functionality"""
     
@@ -46,23 +77,30 @@ class FAISSAdapter(BaseVectorStore):
         self.vector_dimension = params.get('vector_dimension', 384)
         self.index_type = params.get('index_type', 'IndexFlatIP')  # IndexFlatIP, IndexHNSWFlat, etc.
         
+        # Segment compaction policy (see FAISSSegmentStore.should_compact)
+        self.compact_ratio = float(params.get('compact_ratio', 1.0))
+        self.max_segments = int(params.get('max_segments', 256))
+        self.compact_min_rows = int(params.get('compact_min_rows', 1000))
+        # Rebuild a collection once this fraction of its rows is deleted
+        self.vacuum_threshold = float(params.get('vacuum_threshold', 0.2))
+        # Filtered searches over at most this many rows are scored exactly in NumPy
+        self.brute_force_threshold = int(params.get('brute_force_threshold', 4096))
+        # Resident collections are unloaded least-recently-used first beyond this budget
+        budget_mb = params.get('memory_budget_mb', os.getenv('FAISS_MEMORY_BUDGET_MB', '2048'))
+        self.memory_budget_bytes = int(float(budget_mb) * 1024 * 1024)
+        # Seconds between checks of the manifest for rebuilds made by other processes
+        self.reload_check_interval = float(params.get('reload_check_interval', 1.0))
+        
         # Create index directory if it doesn't exist
         Path(self.index_directory).mkdir(parents=True, exist_ok=True)
         
-        self._indexes = {}
-        self._metadata_stores = {}
-    
-    def _get_index_path(self, collection_name: str) -> Path:
-        """Get path for FAISS index file"""
-        return Path(self.index_directory) / collection_name / "index.faiss"
+        self._collections: "OrderedDict[str, _LoadedCollection]" = OrderedDict()
+        # Upserts, searches and maintenance run on worker threads and share the resident state
+        self._state_lock = threading.RLock()
     
-    def _get_metadata_path(self, collection_name: str) -> Path:
-        """Get path for metadata file"""
-        return Path(self.index_directory) / collection_name / "metadata.pkl"
-    
-    def _get_documents_path(self, collection_name: str) -> Path:
-        """Get path for documents file"""
-        return Path(self.index_directory) / collection_name / "documents.pkl"
+    def _get_store(self, collection_name: str) -> FAISSSegmentStore:
+        """Get the segment store for a collection directory"""
+        return FAISSSegmentStore(Path(self.index_directory) / collection_name)
     
     async def connect(self) -> bool:
         """Initialize FAISS (no actual connection needed)"""
@@ -77,12 +115,15 @@ class FAISSAdapter(BaseVectorStore):
     
     async def disconnect(self) -> None:
         """Close FAISS resources"""
-        self._indexes.clear()
-        self._metadata_stores.clear()
+        self._collections.clear()
         self._connected = False
     
     def _create_faiss_index(self, dimension: int) -> faiss.Index:
-        """Create a new FAISS index"""
+        """Create a new ID-mapped FAISS index (ids are metadata row positions)"""
+        return faiss.IndexIDMap2(self._create_base_index(dimension))
+    
+    def _create_base_index(self, dimension: int) -> faiss.Index:
+        """Create the underlying FAISS index for the configured index type"""
         if self.index_type == 'IndexFlatIP':
             return faiss.IndexFlatIP(dimension)
         elif self.index_type == 'IndexFlatL2':
@@ -95,33 +136,21 @@ class FAISSAdapter(BaseVectorStore):
     
     async def create_collection(self, collection_name: str, **kwargs) -> bool:
         """Create a new FAISS index"""
+        return await self._run_blocking(self._create_collection_sync, collection_name,
+                                        kwargs.get('dimension', self.vector_dimension))
+    
+    def _create_collection_sync(self, collection_name: str, dimension: int) -> bool:
         try:
-            collection_dir = Path(self.index_directory) / collection_name
-            collection_dir.mkdir(parents=True, exist_ok=True)
-            
-            index_path = self._get_index_path(collection_name)
+            store = self._get_store(collection_name)
             
             # Check if index already exists
-            if index_path.exists():
+            if store.exists():
                 logger.info(f"FAISS index {collection_name} already exists")
                 return True
             
-            # Create new FAISS index
-            dimension = kwargs.get('dimension', self.vector_dimension)
+            # Create new FAISS index and publish it as an empty base
             index = self._create_faiss_index(dimension)
-            
-            # Save empty index
-            faiss.write_index(index, str(index_path))
-            
-            # Initialize empty metadata and documents
-            metadata_path = self._get_metadata_path(collection_name)
-            documents_path = self._get_documents_path(collection_name)
-            
-            with open(metadata_path, 'wb') as f:
-                pickle.dump([], f)
-            
-            with open(documents_path, 'wb') as f:
-                pickle.dump([], f)
+            store.write_base(index, [], [])
             
             logger.info(f"Created FAISS index: {collection_name}")
             return True
@@ -140,10 +169,8 @@ class FAISSAdapter(BaseVectorStore):
                 shutil.rmtree(collection_dir)
                 
                 # Remove from memory
-                if collection_name in self._indexes:
-                    del self._indexes[collection_name]
-                if collection_name in self._metadata_stores:
-                    del self._metadata_stores[collection_name]
+                with self._state_lock:
+                    self._collections.pop(collection_name, None)
                 
                 logger.info(f"Deleted FAISS index: {collection_name}")
             
@@ -162,7 +189,7 @@ class FAISSAdapter(BaseVectorStore):
             
             collections = []
             for item in index_dir.iterdir():
-                if item.is_dir() and (item / "index.faiss").exists():
+                if item.is_dir() and FAISSSegmentStore(item).exists():
                     collections.append(item.name)
             
             return collections
@@ -171,123 +198,270 @@ class FAISSAdapter(BaseVectorStore):
             logger.error(f"Failed to list FAISS indexes: {e}")
             return []
     
-    def _load_index(self, collection_name: str) -> Tuple[Optional[faiss.Index], List[Dict], List[str]]:
-        """Load FAISS index and associated metadata"""
+    def _prepare_index(self, index: faiss.Index) -> faiss.Index:
+        """Upgrade indexes written before ID mapping to IndexIDMap2 (ids = row positions)"""
+        if is_id_mapped(index):
+            return index
+        mapped = self._create_faiss_index(index.d)
+        if index.ntotal:
+            vectors = index.reconstruct_n(0, index.ntotal)
+            mapped.add_with_ids(vectors, np.arange(index.ntotal, dtype=np.int64))
+        return mapped
+    
+    def _remove_rows(self, index: faiss.Index, rows: List[int]) -> int:
+        """Physically remove rows from the index; returns how many remain as tombstones"""
+        if not rows:
+            return 0
         try:
-            if collection_name in self._indexes:
-                return (
-                    self._indexes[collection_name],
-                    self._metadata_stores.get(collection_name, []),
-                    []
-                )
-            
-            index_path = self._get_index_path(collection_name)
-            metadata_path = self._get_metadata_path(collection_name)
-            documents_path = self._get_documents_path(collection_name)
-            
-            if not index_path.exists():
-                return None, [], []
-            
-            # Load FAISS index
-            index = faiss.read_index(str(index_path))
-            
-            # Load metadata
-            metadata = []
-            if metadata_path.exists():
-                with open(metadata_path, 'rb') as f:
-                    metadata = pickle.load(f)
-            
-            # Load documents
-            documents = []
-            if documents_path.exists():
-                with open(documents_path, 'rb') as f:
-                    documents = pickle.load(f)
-            
-            # Cache in memory
-            self._indexes[collection_name] = index
-            self._metadata_stores[collection_name] = metadata
-            
-            return index, metadata, documents
+            index.remove_ids(np.asarray(rows, dtype=np.int64))
+            return 0
+        except RuntimeError:
+            # Index type without removal support (e.g. HNSW): filtered at search time
+            return len(rows)
+    
+    def _load_from_store(self, collection_name: str):
+        """Read a collection from disk with deleted rows removed from the index"""
+        index, metadata, documents, manifest = self._get_store(collection_name).load(
+            self._create_faiss_index, self.vector_dimension, prepare_index=self._prepare_index
+        )
+        residual = 0
+        if index is not None:
+            deleted = [i for i, meta in enumerate(metadata) if meta.get('deleted')]
+            residual = self._remove_rows(index, deleted)
+        return index, metadata, documents, manifest, residual
+    
+    def _register_collection(self, collection_name: str, index: faiss.Index, metadata: List[Dict],
+                             documents: ChunkTextList, tombstones: int = 0) -> _LoadedCollection:
+        """Make a collection resident in memory and enforce the memory budget"""
+        state = _LoadedCollection(
+            index=index,
+            metadata=metadata,
+            documents=documents,
+            filter_index=MetadataBitmapIndex.from_metadata(metadata),
+            tombstones=tombstones,
+            signature=self._get_store(collection_name).signature(),
+            last_checked=time.time(),
+        )
+        state.memory_bytes = _estimate_memory(state)
+        self._collections[collection_name] = state
+        self._collections.move_to_end(collection_name)
+        self._enforce_memory_budget(keep=collection_name)
+        return state
+    
+    def _enforce_memory_budget(self, keep: Optional[str] = None) -> None:
+        """Unload least recently used collections until resident data fits the budget"""
+        total = sum(state.memory_bytes for state in self._collections.values())
+        for name in list(self._collections.keys()):
+            if total <= self.memory_budget_bytes:
+                break
+            if name == keep:
+                continue
+            total -= self._collections.pop(name).memory_bytes
+            logger.info(f"Unloaded cold FAISS collection {name} (memory budget)")
+    
+    def _get_collection(self, collection_name: str) -> Optional[_LoadedCollection]:
+        """Return the resident collection, loading it or reloading it if changed on disk"""
+        state = self._collections.get(collection_name)
+        if state is not None:
+            now = time.time()
+            if now - state.last_checked >= self.reload_check_interval:
+                state.last_checked = now
+                if self._get_store(collection_name).signature() != state.signature:
+                    logger.info(f"FAISS collection {collection_name} changed on disk; reloading")
+                    self._collections.pop(collection_name, None)
+                    state = None
+            if state is not None:
+                self._collections.move_to_end(collection_name)
+                return state
+        
+        index, metadata, documents, _, residual = self._load_from_store(collection_name)
+        if index is None:
+            return None
+        return self._register_collection(collection_name, index, metadata, documents, residual)
+    
+    def _save_index(self, collection_name: str, index: faiss.Index, metadata: List[Dict], documents,
+                    tombstones: int = 0):
+        """Rewrite the collection as a single compacted base"""
+        try:
+            store = self._get_store(collection_name)
+            manifest = store.write_base(index, metadata, documents)
+            # Serve texts from the freshly written chunk store instead of the heap
+            documents = store.open_base_documents(manifest)
+            self._register_collection(collection_name, index, metadata, documents, tombstones)
             
         except Exception as e:
-            logger.error(f"Failed to load FAISS index {collection_name}: {e}")
-            return None, [], []
+            logger.error(f"Failed to save FAISS index {collection_name}: {e}")
+    
+    def _mark_written(self, collection_name: str, state: _LoadedCollection) -> None:
+        """Record our own manifest update so it is not mistaken for an external rebuild"""
+        state.signature = self._get_store(collection_name).signature()
+        state.last_checked = time.time()
+    
+    def compact_sync(self, collection_name: str) -> bool:
+        """Merge all segments of a collection into a new base"""
+        with self._state_lock:
+            return self._compact_locked(collection_name)
     
-    def _save_index(self, collection_name: str, index: faiss.Index, metadata: List[Dict], documents: List[str]):
-        """Save FAISS index and associated metadata"""
+    def _compact_locked(self, collection_name: str) -> bool:
         try:
-            index_path = self._get_index_path(collection_name)
-            metadata_path = self._get_metadata_path(collection_name)
-            documents_path = self._get_documents_path(collection_name)
-            
-            # Save FAISS index
-            faiss.write_index(index, str(index_path))
-            
-            # Save metadata
-            with open(metadata_path, 'wb') as f:
-                pickle.dump(metadata, f)
-            
-            # Save documents
-            with open(documents_path, 'wb') as f:
-                pickle.dump(documents, f)
-            
-            # Update cache
-            self._indexes[collection_name] = index
-            self._metadata_stores[collection_name] = metadata
+            manifest = self._get_store(collection_name).read_manifest()
+            if manifest is None:
+                return False
+            if not manifest.get("segments") and not manifest.get("legacy"):
+                return True
+            state = self._get_collection(collection_name)
+            if state is None:
+                return False
+            self._save_index(collection_name, state.index, state.metadata, state.documents, state.tombstones)
+            logger.info(f"Compacted FAISS index {collection_name} ({state.index.ntotal} vectors)")
+            return True
+        except Exception as e:
+            logger.error(f"Failed to compact FAISS index {collection_name}: {e}")
+            return False
+    
+    async def compact(self, collection_name: str) -> bool:
+        """Merge append-only segments into a single base (runs off the event loop)"""
+        return await self._run_blocking(self.compact_sync, collection_name)
+    
+    def _reconstruct_rows(self, index: faiss.Index, rows: List[int]):
+        """Fetch stored vectors for the given row ids of an ID-mapped index"""
+        if not rows:
+            return np.zeros((0, index.d), dtype=np.float32)
+        ids = faiss.vector_to_array(index.id_map)
+        vectors = faiss.downcast_index(index.index).reconstruct_n(0, index.ntotal)
+        position = np.full(int(max(ids.max(initial=0), max(rows))) + 1, -1, dtype=np.int64)
+        position[ids] = np.arange(len(ids))
+        return vectors[position[np.asarray(rows, dtype=np.int64)]]
+    
+    def vacuum_sync(self, collection_name: str, force: bool = False) -> bool:
+        """Rebuild a collection without its deleted rows, renumbering row ids
+        
+        Runs only when the tombstone ratio reaches ``vacuum_threshold`` unless forced.
+        """
+        with self._state_lock:
+            return self._vacuum_locked(collection_name, force)
+    
+    def _vacuum_locked(self, collection_name: str, force: bool) -> bool:
+        try:
+            state = self._get_collection(collection_name)
+            if state is None:
+                return False
+            index, metadata, documents = state.index, state.metadata, state.documents
+            deleted = sum(1 for meta in metadata if meta.get('deleted'))
+            if not deleted:
+                return True
+            if not force and deleted / max(len(metadata), 1) < self.vacuum_threshold:
+                return True
             
+            live = [i for i, meta in enumerate(metadata) if not meta.get('deleted')]
+            vectors = self._reconstruct_rows(index, live)
+            rebuilt = self._create_faiss_index(index.d)
+            if live:
+                rebuilt.add_with_ids(np.ascontiguousarray(vectors, dtype=np.float32),
+                                     np.arange(len(live), dtype=np.int64))
+            live_metadata = [metadata[i] for i in live]
+            live_documents = [documents[i] if i < len(documents) else '' for i in live]
+            
+            self._save_index(collection_name, rebuilt, live_metadata, live_documents)
+            logger.info(f"Vacuumed FAISS index {collection_name}: dropped {deleted} deleted rows")
+            return True
         except Exception as e:
-            logger.error(f"Failed to save FAISS index {collection_name}: {e}")
+            logger.error(f"Failed to vacuum FAISS index {collection_name}: {e}")
+            return False
+    
+    async def vacuum(self, collection_name: str, force: bool = False) -> bool:
+        """Rebuild without deleted rows once the tombstone ratio crosses the threshold"""
+        return await self._run_blocking(self.vacuum_sync, collection_name, force)
+    
+    def _tombstone_rows(self, collection_name: str, state: _LoadedCollection, rows: List[int]):
+        """Persist deletions as a tombstone segment and drop the vectors from the live index"""
+        self._get_store(collection_name).append_tombstones(rows)
+        for row in rows:
+            state.metadata[row]['deleted'] = True
+        state.filter_index.mark_deleted(rows)
+        state.tombstones += self._remove_rows(state.index, rows)
+        self._mark_written(collection_name, state)
     
     async def upsert_documents(self, 
                              collection_name: str,
                              documents: List[Dict[str, Any]],
                              embeddings: Optional[List[List[float]]] = None) -> bool:
-        """Insert or update documents in FAISS index"""
+        """Insert or update documents in FAISS index (runs off the event loop)"""
+        if not embeddings:
+            logger.error("Embeddings are required for FAISS adapter")
+            return False
+        return await self._run_blocking(self._upsert_documents_sync, collection_name, documents, embeddings)
+    
+    def _upsert_documents_sync(self,
+                               collection_name: str,
+                               documents: List[Dict[str, Any]],
+                               embeddings: List[List[float]]) -> bool:
         try:
-            if not embeddings:
-                logger.error("Embeddings are required for FAISS adapter")
-                return False
-            
-            # Load existing index
-            index, metadata, doc_list = self._load_index(collection_name)
-            
-            if index is None:
-                # Create new index if it doesn't exist
-                await self.create_collection(collection_name)
-                index, metadata, doc_list = self._load_index(collection_name)
-            
-            # Convert embeddings to numpy array
-            vectors = np.array(embeddings, dtype=np.float32)
-            
-            # Normalize vectors for cosine similarity (if using IndexFlatIP)
-            if self.index_type == 'IndexFlatIP':
-                faiss.normalize_L2(vectors)
-            
-            # Add vectors to index
-            index.add(vectors)
-            
-            # Add metadata and documents
-            for i, doc in enumerate(documents):
-                doc_metadata = {
-                    'id': doc.get('id', f"doc_{len(metadata)}_{datetime.now().timestamp()}"),
-                    'source': doc.get('source', ''),
-                    'source_type': doc.get('source_type', 'unknown'),
-                    'created_at': doc.get('created_at', datetime.now().isoformat()),
-                    'metadata': doc.get('metadata', {})
-                }
-                metadata.append(doc_metadata)
-                doc_list.append(doc.get('content', ''))
-            
-            # Save updated index
-            self._save_index(collection_name, index, metadata, doc_list)
-            
-            logger.info(f"Upserted {len(documents)} documents to FAISS index {collection_name}")
-            return True
-            
+            with self._state_lock:
+                return self._upsert_locked(collection_name, documents, embeddings)
         except Exception as e:
             logger.error(f"Failed to upsert documents to FAISS index {collection_name}: {e}")
             return False
     
+    def _upsert_locked(self,
+                       collection_name: str,
+                       documents: List[Dict[str, Any]],
+                       embeddings: List[List[float]]) -> bool:
+        # Load existing index
+        state = self._get_collection(collection_name)
+        
+        if state is None:
+            # Create new index if it doesn't exist
+            self._create_collection_sync(collection_name, self.vector_dimension)
+            state = self._get_collection(collection_name)
+        metadata = state.metadata
+        
+        # Convert embeddings to numpy array
+        vectors = np.array(embeddings, dtype=np.float32)
+        
+        # Normalize vectors for cosine similarity (if using IndexFlatIP)
+        if self.index_type == 'IndexFlatIP':
+            faiss.normalize_L2(vectors)
+        
+        # Build metadata and documents for this batch
+        new_metadata = []
+        new_documents = []
+        for i, doc in enumerate(documents):
+            doc_metadata = {
+                'id': doc.get('id', f"doc_{len(metadata) + i}_{datetime.now().timestamp()}"),
+                'source': doc.get('source', ''),
+                'source_type': doc.get('source_type', 'unknown'),
+                'created_at': doc.get('created_at', datetime.now().isoformat()),
+                'metadata': doc.get('metadata', {})
+            }
+            new_metadata.append(doc_metadata)
+            new_documents.append(doc.get('content', ''))
+        
+        # Existing rows with the same ids are replaced
+        new_ids = {meta['id'] for meta in new_metadata}
+        replaced = [i for i, meta in enumerate(metadata)
+                    if not meta.get('deleted') and meta.get('id') in new_ids]
+        if replaced:
+            self._tombstone_rows(collection_name, state, replaced)
+        
+        # Persist only this batch as an append-only segment, then apply it in memory
+        store = self._get_store(collection_name)
+        manifest = store.append_segment(vectors, new_metadata, new_documents)
+        row_ids = np.arange(len(metadata), len(metadata) + len(new_metadata), dtype=np.int64)
+        state.index.add_with_ids(vectors, row_ids)
+        state.filter_index.add_rows(len(metadata), new_metadata)
+        metadata.extend(new_metadata)
+        state.documents.extend(new_documents)
+        state.memory_bytes = _estimate_memory(state)
+        self._mark_written(collection_name, state)
+        self._enforce_memory_budget(keep=collection_name)
+        
+        if store.should_compact(manifest, self.compact_ratio, self.max_segments, self.compact_min_rows):
+            self.compact_sync(collection_name)
+        
+        logger.info(f"Upserted {len(documents)} documents to FAISS index {collection_name}")
+        return True
+    
     async def search(self, 
                     collection_name: str,
                     query: Optional[str] = None,
@@ -295,101 +469,143 @@ class FAISSAdapter(BaseVectorStore):
                     filters: Optional[Dict[str, Any]] = None,
                     limit: int = 10,
                     **kwargs) -> List[VectorSearchResult]:
-        """Search FAISS index"""
+        """Search FAISS index (runs off the event loop)"""
+        if not query_embedding:
+            logger.error("Query embedding is required for FAISS search")
+            return []
+        return await self._run_blocking(self._search_sync, collection_name, query_embedding, filters, limit)
+    
+    def _search_sync(self,
+                     collection_name: str,
+                     query_embedding: List[float],
+                     filters: Optional[Dict[str, Any]],
+                     limit: int) -> List[VectorSearchResult]:
         try:
-            if not query_embedding:
-                logger.error("Query embedding is required for FAISS search")
-                return []
-            
-            # Load index
-            index, metadata, documents = self._load_index(collection_name)
-            
-            if index is None:
-                logger.warning(f"FAISS index {collection_name} not found")
-                return []
-            
-            # Convert query to numpy array
-            query_vector = np.array([query_embedding], dtype=np.float32)
-            
-            # Normalize for cosine similarity
-            if self.index_type == 'IndexFlatIP':
-                faiss.normalize_L2(query_vector)
-            
-            # Search
-            scores, indices = index.search(query_vector, min(limit, index.ntotal))
-            
-            # Process results
-            results = []
-            for i, (score, idx) in enumerate(zip(scores[0], indices[0])):
-                if idx == -1:  # Invalid index
-                    continue
-                
-                # Apply filters if provided
-                if filters and idx < len(metadata):
-                    doc_metadata = metadata[idx]
-                    skip = False
-                    
-                    for field, value in filters.items():
-                        if field in doc_metadata:
-                            if isinstance(value, list):
-                                if doc_metadata[field] not in value:
-                                    skip = True
-                                    break
-                            else:
-                                if doc_metadata[field] != value:
-                                    skip = True
-                                    break
-                    
-                    if skip:
-                        continue
-                
-                # Create result
-                doc_meta = metadata[idx] if idx < len(metadata) else {}
-                content = documents[idx] if idx < len(documents) else ''
-                
-                result = VectorSearchResult(
-                    content=content,
-                    metadata=doc_meta.get('metadata', {}),
-                    score=float(score),
-                    source=doc_meta.get('source'),
-                    id=doc_meta.get('id', str(idx))
-                )
-                results.append(result)
-            
-            logger.info(f"FAISS returned {len(results)} results for query in {collection_name}")
-            return results
-            
+            with self._state_lock:
+                return self._search_locked(collection_name, query_embedding, filters, limit)
         except Exception as e:
             logger.error(f"Search failed in FAISS index {collection_name}: {e}")
             return []
     
+    def _search_locked(self,
+                       collection_name: str,
+                       query_embedding: List[float],
+                       filters: Optional[Dict[str, Any]],
+                       limit: int) -> List[VectorSearchResult]:
+        # Load index
+        state = self._get_collection(collection_name)
+        
+        if state is None:
+            logger.warning(f"FAISS index {collection_name} not found")
+            return []
+        index, metadata, documents = state.index, state.metadata, state.documents
+        
+        # Convert query to numpy array
+        query_vector = np.array([query_embedding], dtype=np.float32)
+        
+        # Normalize for cosine similarity
+        if self.index_type == 'IndexFlatIP':
+            faiss.normalize_L2(query_vector)
+        
+        if filters and state.filter_index.can_evaluate(filters):
+            # Pre-filter: evaluate metadata bitmap, then search only matching rows
+            candidate_ids = state.filter_index.matching_ids(filters)
+            scores, indices = self._search_subset(index, query_vector, candidate_ids, limit)
+            filters = None
+        else:
+            # Search, over-fetching by the number of tombstones still in the index
+            k = min(limit + state.tombstones, index.ntotal)
+            if k <= 0:
+                return []
+            scores, indices = index.search(query_vector, k)
+        
+        # Process results
+        results = []
+        for i, (score, idx) in enumerate(zip(scores[0], indices[0])):
+            if idx == -1:  # Invalid index
+                continue
+            if idx < len(metadata) and metadata[idx].get('deleted'):
+                continue
+            
+            # Apply filters the bitmap index could not evaluate
+            if filters and idx < len(metadata) and not row_matches(metadata[idx], filters):
+                continue
+            
+            # Create result
+            doc_meta = metadata[idx] if idx < len(metadata) else {}
+            content = documents[idx] if idx < len(documents) else ''
+            
+            result = VectorSearchResult(
+                content=content,
+                metadata=doc_meta.get('metadata', {}),
+                score=float(score),
+                source=doc_meta.get('source'),
+                id=doc_meta.get('id', str(idx))
+            )
+            results.append(result)
+            if len(results) >= limit:
+                break
+        
+        logger.info(f"FAISS returned {len(results)} results for query in {collection_name}")
+        return results
+    
+    def _search_subset(self, index: faiss.Index, query_vector, candidate_ids, limit: int):
+        """Top-k restricted to ``candidate_ids``
+        
+        Small subsets are scored exactly with one matrix product; larger ones
+        go through FAISS with an ``IDSelector`` so only matching ids compete.
+        """
+        k = min(limit, len(candidate_ids))
+        if k <= 0:
+            return np.zeros((1, 0), dtype=np.float32), np.zeros((1, 0), dtype=np.int64)
+        
+        inner_product = index.metric_type == faiss.METRIC_INNER_PRODUCT
+        if len(candidate_ids) <= self.brute_force_threshold:
+            vectors = index.reconstruct_batch(candidate_ids)
+            if inner_product:
+                scores = vectors @ query_vector[0]
+                order_key = -scores
+            else:
+                scores = ((vectors - query_vector[0]) ** 2).sum(axis=1)
+                order_key = scores
+            top = np.argpartition(order_key, k - 1)[:k] if k < len(order_key) else np.arange(len(order_key))
+            top = top[np.argsort(order_key[top], kind="stable")]
+            return scores[top][None, :].astype(np.float32), candidate_ids[top][None, :]
+        
+        params = faiss.SearchParameters(sel=faiss.IDSelectorBatch(candidate_ids))
+        return index.search(query_vector, k, params=params)
+    
     async def delete_documents(self, 
                              collection_name: str,
                              document_ids: List[str]) -> bool:
-        """Delete specific documents from FAISS index"""
+        """Delete specific documents from FAISS index
+        
+        Vectors are removed from the ID-mapped index and the deletion is persisted
+        as a tombstone segment; the collection is vacuumed once the share of
+        deleted rows reaches ``vacuum_threshold``.
+        """
+        return await self._run_blocking(self._delete_documents_sync, collection_name, document_ids)
+    
+    def _delete_documents_sync(self, collection_name: str, document_ids: List[str]) -> bool:
         try:
-            logger.warning("FAISS does not support individual document deletion. "
-                         "Consider rebuilding the index without the unwanted documents.")
-            
-            # For now, we'll mark documents as deleted in metadata
-            # A full implementation would require rebuilding the index
-            
-            index, metadata, documents = self._load_index(collection_name)
-            
-            if index is None:
-                return False
-            
-            # Mark documents as deleted
-            deleted_count = 0
-            for i, doc_meta in enumerate(metadata):
-                if doc_meta.get('id') in document_ids:
-                    doc_meta['deleted'] = True
-                    deleted_count += 1
-            
-            # Save updated metadata
-            self._save_index(collection_name, index, metadata, documents)
+            with self._state_lock:
+                state = self._get_collection(collection_name)
+                
+                if state is None:
+                    return False
+                metadata = state.metadata
+                
+                wanted = set(document_ids)
+                rows = [i for i, doc_meta in enumerate(metadata)
+                        if not doc_meta.get('deleted') and doc_meta.get('id') in wanted]
+                if rows:
+                    self._tombstone_rows(collection_name, state, rows)
+                
+                deleted_total = sum(1 for meta in metadata if meta.get('deleted'))
+                if metadata and deleted_total / len(metadata) >= self.vacuum_threshold:
+                    self.vacuum_sync(collection_name)
             
-            logger.info(f"Marked {deleted_count} documents as deleted in FAISS index {collection_name}")
+            logger.info(f"Deleted {len(rows)} documents from FAISS index {collection_name}")
             return True
             
         except Exception as e:
@@ -397,21 +613,32 @@ class FAISSAdapter(BaseVectorStore):
             return False
     
     async def get_collection_stats(self, collection_name: str) -> Dict[str, Any]:
-        """Get statistics about a FAISS index"""
+        """Get statistics about a FAISS index (loading it runs off the event loop)"""
+        return await self._run_blocking(self._collection_stats_sync, collection_name)
+    
+    def _collection_stats_sync(self, collection_name: str) -> Dict[str, Any]:
         try:
-            index, metadata, documents = self._load_index(collection_name)
-            
-            if index is None:
-                return {"error": f"Index {collection_name} not found"}
-            
-            active_docs = sum(1 for meta in metadata if not meta.get('deleted', False))
+            with self._state_lock:
+                state = self._get_collection(collection_name)
+                
+                if state is None:
+                    return {"error": f"Index {collection_name} not found"}
+                index, metadata = state.index, state.metadata
+                
+                active_docs = sum(1 for meta in metadata if not meta.get('deleted', False))
+                deleted_docs = len(metadata) - active_docs
+                resident_collections = len(self._collections)
             
             return {
                 "document_count": active_docs,
+                "deleted_documents": deleted_docs,
+                "tombstone_ratio": (deleted_docs / len(metadata)) if metadata else 0.0,
                 "total_vectors": index.ntotal,
                 "vector_dimension": index.d,
                 "index_type": self.index_type,
                 "is_trained": index.is_trained,
+                "resident_memory_bytes": state.memory_bytes,
+                "resident_collections": resident_collections,
                 "health": "green"
             }
             
@@ -3,11 +3,16 @@ PGVector Vector Store Adapter
 Implements vector search using PostgreSQL with pgvector extension (Supabase/RDS compatible)
 """
 
+import io
 import json
+import math
+import struct
 import logging
-from typing import List, Dict, Any, Optional, Tuple
-from datetime import datetime
+from typing import List, Dict, Any, Iterable, Iterator, Optional, Tuple
+from datetime import datetime, timezone
 import asyncio
+import re
+import time
 
 try:
     import psycopg2
@@ -40,6 +45,109 @@ from ..multi_vector_storage_interface import (
 
 logger = logging.getLogger(__name__)
 
+# Column order shared by the INSERT path, the COPY staging table and the merge
+_COLUMNS = ('id', 'content', 'vector', 'metadata', 'source', 'source_type', 'created_at')
+
+_PG_EPOCH = datetime(2000, 1, 1, tzinfo=timezone.utc)
+_PGCOPY_HEADER = b'PGCOPY\n\xff\r\n\x00' + struct.pack('>ii', 0, 0)
+
+
+def _encode_vector(vector) -> bytes:
+    """pgvector binary wire format: uint16 dim, uint16 unused, float4[dim] (big-endian)"""
+    arr = np.asarray(vector, dtype='>f4').ravel()
+    return struct.pack('>HH', arr.shape[0], 0) + arr.tobytes()
+
+
+def _decode_vector(data: bytes) -> List[float]:
+    dim, _ = struct.unpack_from('>HH', data)
+    return np.frombuffer(data, dtype='>f4', count=dim, offset=4).astype(np.float32).tolist()
+
+
+def _to_timestamptz(value: Any) -> datetime:
+    """Aware datetime for a created_at value (datetime, ISO-8601 string, epoch seconds or None)
+    
+    Naive values are taken as local time, matching what ``datetime.now()`` and
+    ``datetime.now().isoformat()`` produce in the ingestion code.
+    """
+    if value is None or value == '':
+        return datetime.now().astimezone()
+    if isinstance(value, (int, float)):
+        return datetime.fromtimestamp(value, tz=timezone.utc)
+    if isinstance(value, str):
+        text = value.strip()
+        if text.endswith(('Z', 'z')):
+            text = text[:-1] + '+00:00'
+        try:
+            value = datetime.fromisoformat(text)
+        except ValueError:
+            logger.warning(f"Unparseable created_at {value!r}; using the current time")
+            return datetime.now().astimezone()
+    if value.tzinfo is None:
+        value = value.astimezone()
+    return value
+
+
+def _encode_timestamptz(value: Any) -> bytes:
+    value = _to_timestamptz(value)
+    delta = value - _PG_EPOCH
+    micros = (delta.days * 86400 + delta.seconds) * 1_000_000 + delta.microseconds
+    return struct.pack('>q', micros)
+
+
+def _pgcopy_binary(rows: Iterable[Tuple]) -> Iterator[bytes]:
+    """Encode prepared rows (see _COLUMNS) as a PostgreSQL binary COPY stream"""
+    yield _PGCOPY_HEADER
+    for doc_id, content, vector, metadata, source, source_type, created_at in rows:
+        fields = [
+            doc_id.encode('utf-8'),
+            (content or '').encode('utf-8'),
+            _encode_vector(vector),
+            b'\x01' + metadata.encode('utf-8'),  # jsonb binary format version 1
+            None if source is None else source.encode('utf-8'),
+            None if source_type is None else source_type.encode('utf-8'),
+            _encode_timestamptz(created_at),
+        ]
+        parts = [struct.pack('>h', len(fields))]
+        for value in fields:
+            if value is None:
+                parts.append(struct.pack('>i', -1))
+            else:
+                parts.append(struct.pack('>i', len(value)))
+                parts.append(value)
+        yield b''.join(parts)
+    yield struct.pack('>h', -1)
+
+
+class _ChunkReader(io.RawIOBase):
+    """File-like view over an iterator of byte chunks (for psycopg2 copy_expert)"""
+    
+    def __init__(self, chunks: Iterator[bytes]):
+        self._chunks = chunks
+        self._buffer = b''
+    
+    def readable(self) -> bool:
+        return True
+    
+    def read(self, size: int = -1) -> bytes:
+        while size < 0 or len(self._buffer) < size:
+            chunk = next(self._chunks, None)
+            if chunk is None:
+                break
+            self._buffer += chunk
+        if size < 0:
+            data, self._buffer = self._buffer, b''
+        else:
+            data, self._buffer = self._buffer[:size], self._buffer[size:]
+        return data
+
+
+def ivfflat_lists_for(row_count: int) -> int:
+    """pgvector guidance: rows / 1000 up to 1M rows, sqrt(rows) beyond"""
+    if row_count <= 1_000_000:
+        return max(1, row_count // 1000)
+    return max(1, int(math.sqrt(row_count)))
+
+
 class PGVectorAdapter(BaseVectorStore):
     """PostgreSQL with pgvector extension vector store implementation"""
     
@@ -66,6 +174,19 @@ class PGVectorAdapter(BaseVectorStore):
         self.use_async = params.get('use_async', True)
         self.connection_pool_size = params.get('connection_pool_size', 10)
         
+        # Index / bulk-load configuration
+        self.index_type = str(params.get('index_type', 'ivfflat')).lower()  # ivfflat or hnsw
+        self.hnsw_m = int(params.get('hnsw_m', 16))
+        self.hnsw_ef_construction = int(params.get('hnsw_ef_construction', 64))
+        self.hnsw_ef_search = params.get('hnsw_ef_search')  # None = server default
+        self.ivfflat_probes = params.get('ivfflat_probes')  # None = sqrt(lists)
+        self.ivfflat_min_rows = int(params.get('ivfflat_min_rows', 1000))
+        self.bulk_threshold = int(params.get('bulk_threshold', 1000))
+        self.bulk_batch_size = int(params.get('bulk_batch_size', 10000))
+        self.maintenance_work_mem = params.get('maintenance_work_mem')  # e.g. '1GB' for faster index builds
+        # table -> (expires_at, (access_method, lists) or None)
+        self._index_info_cache: Dict[str, Tuple[float, Optional[Tuple[str, Optional[int]]]]] = {}
+        
         self._connection = None
         self._pool = None
     
@@ -73,6 +194,24 @@ class PGVectorAdapter(BaseVectorStore):
         """Build PostgreSQL connection string"""
         return f"postgresql://{self.username}:{self.password}@{self.host}:{self.port}/{self.database}?sslmode={self.ssl_mode}"
     
+    def _get_operator_class(self) -> str:
+        """Operator class matching the distance metric, for vector index creation"""
+        op_classes = {
+            'cosine': 'vector_cosine_ops',
+            'l2': 'vector_l2_ops',
+            'inner_product': 'vector_ip_ops'
+        }
+        return op_classes.get(self.distance_metric, 'vector_cosine_ops')
+    
+    @staticmethod
+    async def _init_async_connection(conn) -> None:
+        """Ensure pgvector exists and register its binary codec (needed for COPY)"""
+        await conn.execute("CREATE EXTENSION IF NOT EXISTS vector;")
+        await conn.set_type_codec(
+            'vector', schema='public',
+            encoder=_encode_vector, decoder=_decode_vector, format='binary'
+        )
+    
     def _get_distance_operator(self) -> str:
         """Get the appropriate distance operator for pgvector"""
         operators = {
@@ -82,6 +221,11 @@ class PGVectorAdapter(BaseVectorStore):
         }
         return operators.get(self.distance_metric, '<=>')
     
+    @property
+    def native_async(self) -> bool:
+        # asyncpg pools are bound to the loop that created them
+        return bool(self.use_async and self._pool is not None)
+    
     async def connect(self) -> bool:
         """Establish connection to PostgreSQL with pgvector"""
         try:
@@ -90,12 +234,13 @@ class PGVectorAdapter(BaseVectorStore):
                 self._pool = await asyncpg.create_pool(
                     self._get_connection_string(),
                     min_size=1,
-                    max_size=self.connection_pool_size
+                    max_size=self.connection_pool_size,
+                    init=self._init_async_connection
                 )
                 
-                # Test connection and ensure pgvector extension
+                # Test connection (init already ensured the pgvector extension)
                 async with self._pool.acquire() as conn:
-                    await conn.execute("CREATE EXTENSION IF NOT EXISTS vector;")
+                    await conn.execute("SELECT 1;")
                     
             else:
                 # Use psycopg2 for sync operations
@@ -160,9 +305,10 @@ class PGVectorAdapter(BaseVectorStore):
             );
             """
             
-            # Create indexes for better performance
+            # Create indexes for better performance. The vector index is deferred:
+            # ivfflat trains its lists on existing rows, so building it on an empty
+            # table gives poor recall (see build_vector_index)
             create_indexes_sql = [
-                f"CREATE INDEX IF NOT EXISTS {table_name}_vector_idx ON {table_name} USING ivfflat (vector {self._get_distance_operator()}) WITH (lists = 100);",
                 f"CREATE INDEX IF NOT EXISTS {table_name}_source_idx ON {table_name} (source);",
                 f"CREATE INDEX IF NOT EXISTS {table_name}_source_type_idx ON {table_name} (source_type);",
                 f"CREATE INDEX IF NOT EXISTS {table_name}_metadata_idx ON {table_name} USING GIN (metadata);"
@@ -187,6 +333,10 @@ class PGVectorAdapter(BaseVectorStore):
                     self._connection.commit()
             
             logger.info(f"Created PGVector table: {table_name}")
+            
+            # HNSW needs no training data, so it can be built up front unless a bulk load follows
+            if self.index_type == 'hnsw' and not kwargs.get('defer_index', False):
+                await self.build_vector_index(collection_name)
             return True
             
         except Exception as e:
@@ -201,6 +351,7 @@ class PGVectorAdapter(BaseVectorStore):
             
             table_name = self._get_table_name(collection_name)
             drop_sql = f"DROP TABLE IF EXISTS {table_name};"
+            self._index_info_cache.pop(table_name, None)
             
             if self.use_async and self._pool:
                 async with self._pool.acquire() as conn:
@@ -255,11 +406,74 @@ class PGVectorAdapter(BaseVectorStore):
             logger.error(f"Failed to list PGVector collections: {e}")
             return []
     
+    def _prepare_rows(self, documents: List[Dict[str, Any]],
+                      embeddings: Optional[List[List[float]]] = None) -> List[Tuple]:
+        """Turn documents into row tuples in _COLUMNS order (documents without a vector are skipped)"""
+        rows = []
+        for i, doc in enumerate(documents):
+            doc_id = doc.get('id', f"doc_{i}_{datetime.now().timestamp()}")
+            
+            # Get vector
+            if embeddings and i < len(embeddings):
+                vector = embeddings[i]
+            elif 'vector' in doc:
+                vector = doc['vector']
+            else:
+                logger.warning(f"No vector provided for document {doc_id}")
+                continue
+            
+            rows.append((
+                str(doc_id),
+                doc.get('content', ''),
+                vector,
+                json.dumps(doc.get('metadata', {})),
+                doc.get('source', ''),
+                doc.get('source_type', 'unknown'),
+                _to_timestamptz(doc.get('created_at'))
+            ))
+        return rows
+    
+    def _merge_sql(self, table_name: str, source: str) -> str:
+        columns = ', '.join(_COLUMNS)
+        updates = ',\n                '.join(f"{col} = EXCLUDED.{col}" for col in _COLUMNS if col != 'id')
+        return f"""
+            INSERT INTO {table_name} ({columns})
+            {source}
+            ON CONFLICT (id) DO UPDATE SET
+                {updates};
+            """
+    
+    async def _execute(self, sql: str, *args) -> None:
+        if self.use_async and self._pool:
+            async with self._pool.acquire() as conn:
+                await conn.execute(sql, *args)
+        else:
+            def run():
+                with self._connection.cursor() as cursor:
+                    cursor.execute(re.sub(r'\$\d+', '%s', sql), args or None)
+                self._connection.commit()
+            await self._run_blocking(run)
+    
+    async def _fetchrow(self, sql: str, *args) -> Optional[Dict[str, Any]]:
+        if self.use_async and self._pool:
+            async with self._pool.acquire() as conn:
+                row = await conn.fetchrow(sql, *args)
+                return dict(row) if row else None
+        def run():
+            with self._connection.cursor(cursor_factory=RealDictCursor) as cursor:
+                cursor.execute(re.sub(r'\$\d+', '%s', sql), args or None)
+                row = cursor.fetchone()
+            self._connection.commit()
+            return dict(row) if row else None
+        return await self._run_blocking(run)
+    
     async def upsert_documents(self, 
                              collection_name: str,
                              documents: List[Dict[str, Any]],
                              embeddings: Optional[List[List[float]]] = None) -> bool:
-        """Insert or update documents with vectors"""
+        """Insert or update documents with vectors (large batches go through bulk_load)"""
+        if len(documents) >= self.bulk_threshold:
+            return await self.bulk_load(collection_name, documents, embeddings)
         try:
             if not self._connected:
                 await self.connect()
@@ -267,43 +481,10 @@ class PGVectorAdapter(BaseVectorStore):
             table_name = self._get_table_name(collection_name)
             
             # Prepare upsert SQL
-            upsert_sql = f"""
-            INSERT INTO {table_name} (id, content, vector, metadata, source, source_type, created_at)
-            VALUES ($1, $2, $3, $4, $5, $6, $7)
-            ON CONFLICT (id) DO UPDATE SET
-                content = EXCLUDED.content,
-                vector = EXCLUDED.vector,
-                metadata = EXCLUDED.metadata,
-                source = EXCLUDED.source,
-                source_type = EXCLUDED.source_type,
-                created_at = EXCLUDED.created_at;
-            """
+            upsert_sql = self._merge_sql(table_name, "VALUES ($1, $2, $3, $4, $5, $6, $7)")
             
             # Prepare data for batch insert
-            batch_data = []
-            for i, doc in enumerate(documents):
-                doc_id = doc.get('id', f"doc_{i}_{datetime.now().timestamp()}")
-                
-                # Get vector
-                vector = None
-                if embeddings and i < len(embeddings):
-                    vector = embeddings[i]
-                elif 'vector' in doc:
-                    vector = doc['vector']
-                else:
-                    logger.warning(f"No vector provided for document {doc_id}")
-                    continue
-                
-                # Prepare data
-                batch_data.append((
-                    str(doc_id),
-                    doc.get('content', ''),
-                    vector,
-                    json.dumps(doc.get('metadata', {})),
-                    doc.get('source', ''),
-                    doc.get('source_type', 'unknown'),
-                    doc.get('created_at', datetime.now())
-                ))
+            batch_data = self._prepare_rows(documents, embeddings)
             
             # Execute batch upsert
             if self.use_async and self._pool:
@@ -315,12 +496,199 @@ class PGVectorAdapter(BaseVectorStore):
                     self._connection.commit()
             
             logger.info(f"Upserted {len(batch_data)} documents to PGVector table {table_name}")
+            
+            # ivfflat was deferred at create time; build it once there is enough data to train on
+            if await self._vector_index_info(table_name) is None:
+                await self.build_vector_index(collection_name)
             return True
             
         except Exception as e:
             logger.error(f"Failed to upsert documents to PGVector table {collection_name}: {e}")
             return False
     
+    async def bulk_load(self,
+                        collection_name: str,
+                        documents: List[Dict[str, Any]],
+                        embeddings: Optional[List[List[float]]] = None,
+                        build_index: bool = True) -> bool:
+        """Bulk upsert via binary COPY into a temp staging table, then one merge
+        
+        When the load is at least as large as the existing table, the vector
+        index is dropped first and rebuilt afterwards (with ``lists`` sized
+        from the final row count for ivfflat) instead of being maintained row
+        by row.
+        """
+        try:
+            if not self._connected:
+                await self.connect()
+            
+            table_name = self._get_table_name(collection_name)
+            if not await self.create_collection(collection_name, defer_index=True):
+                return False
+            
+            # Last occurrence of an id wins, as it would with sequential upserts
+            rows = list({row[0]: row for row in self._prepare_rows(documents, embeddings)}.values())
+            if not rows:
+                return True
+            
+            existing = (await self._fetchrow(f"SELECT COUNT(*) AS n FROM {table_name};"))['n']
+            drop_index = build_index and len(rows) >= existing and \
+                await self._vector_index_info(table_name, refresh=True) is not None
+            
+            staging = f"{table_name}_staging".lower()
+            started = time.perf_counter()
+            if self.use_async and self._pool:
+                async with self._pool.acquire() as conn:
+                    async with conn.transaction():
+                        if drop_index:
+                            await conn.execute(f"DROP INDEX IF EXISTS {table_name}_vector_idx;")
+                        await conn.execute(
+                            f"CREATE TEMP TABLE {staging} (LIKE {table_name} INCLUDING DEFAULTS) ON COMMIT DROP;"
+                        )
+                        for offset in range(0, len(rows), self.bulk_batch_size):
+                            await conn.copy_records_to_table(
+                                staging, records=rows[offset:offset + self.bulk_batch_size],
+                                columns=list(_COLUMNS)
+                            )
+                        await conn.execute(self._merge_sql(table_name, f"SELECT {', '.join(_COLUMNS)} FROM {staging}"))
+                    await conn.execute(f"ANALYZE {table_name};")
+            else:
+                await self._run_blocking(self._bulk_load_sync, table_name, staging, rows, drop_index)
+            
+            self._index_info_cache.pop(table_name, None)
+            logger.info(f"Bulk loaded {len(rows)} documents into PGVector table {table_name} "
+                        f"in {time.perf_counter() - started:.1f}s")
+            
+            if build_index:
+                await self.build_vector_index(collection_name)
+            return True
+            
+        except Exception as e:
+            logger.error(f"Bulk load into PGVector table {collection_name} failed: {e}")
+            return False
+    
+    def _bulk_load_sync(self, table_name: str, staging: str, rows: List[Tuple], drop_index: bool) -> None:
+        """psycopg2 variant of the bulk load (runs on the store's worker pool)"""
+        try:
+            with self._connection.cursor() as cursor:
+                if drop_index:
+                    cursor.execute(f"DROP INDEX IF EXISTS {table_name}_vector_idx;")
+                cursor.execute(f"CREATE TEMP TABLE {staging} (LIKE {table_name} INCLUDING DEFAULTS) ON COMMIT DROP;")
+                copy_sql = f"COPY {staging} ({', '.join(_COLUMNS)}) FROM STDIN WITH (FORMAT binary)"
+                for offset in range(0, len(rows), self.bulk_batch_size):
+                    batch = rows[offset:offset + self.bulk_batch_size]
+                    cursor.copy_expert(copy_sql, _ChunkReader(_pgcopy_binary(batch)))
+                cursor.execute(self._merge_sql(table_name, f"SELECT {', '.join(_COLUMNS)} FROM {staging}"))
+            self._connection.commit()
+        except Exception:
+            self._connection.rollback()
+            raise
+        with self._connection.cursor() as cursor:
+            cursor.execute(f"ANALYZE {table_name};")
+        self._connection.commit()
+    
+    async def _vector_index_info(self, table_name: str, refresh: bool = False) -> Optional[Tuple[str, Optional[int]]]:
+        """(access method, ivfflat lists) of the table's vector index, or None if it has none"""
+        cached = self._index_info_cache.get(table_name)
+        if cached and not refresh and cached[0] > time.monotonic():
+            return cached[1]
+        row = await self._fetchrow(
+            """
+            SELECT am.amname AS method, c.reloptions AS options
+            FROM pg_class c JOIN pg_am am ON am.oid = c.relam
+            WHERE c.relname = $1;
+            """,
+            f"{table_name}_vector_idx".lower()
+        )
+        info = None
+        if row:
+            lists = None
+            for option in row.get('options') or []:
+                if option.startswith('lists='):
+                    lists = int(option.split('=', 1)[1])
+            info = (row['method'], lists)
+        self._index_info_cache[table_name] = (time.monotonic() + 300, info)
+        return info
+    
+    async def build_vector_index(self,
+                                 collection_name: str,
+                                 index_type: Optional[str] = None,
+                                 lists: Optional[int] = None,
+                                 rebuild: bool = False) -> bool:
+        """Build the vector index for a collection once its data is loaded
+        
+        ivfflat sizes ``lists`` from the row count (rows/1000, sqrt(rows) past
+        1M) and is skipped while the table holds fewer than ``ivfflat_min_rows``
+        rows, where an exact scan is both fast and accurate. HNSW
+        (``index_type='hnsw'``) uses the configured m / ef_construction.
+        """
+        try:
+            if not self._connected:
+                await self.connect()
+            
+            table_name = self._get_table_name(collection_name)
+            index_type = (index_type or self.index_type).lower()
+            if index_type not in ('ivfflat', 'hnsw'):
+                raise ValueError(f"Unsupported vector index type: {index_type}")
+            
+            if not rebuild and await self._vector_index_info(table_name, refresh=True) is not None:
+                return True
+            
+            if index_type == 'ivfflat':
+                row_count = (await self._fetchrow(f"SELECT COUNT(*) AS n FROM {table_name};"))['n']
+                if lists is None:
+                    if row_count < self.ivfflat_min_rows:
+                        logger.info(f"Deferring ivfflat index on {table_name}: {row_count} rows "
+                                    f"(< {self.ivfflat_min_rows}), exact scan until then")
+                        return False
+                    lists = ivfflat_lists_for(row_count)
+                with_clause = f"WITH (lists = {int(lists)})"
+            else:
+                with_clause = f"WITH (m = {self.hnsw_m}, ef_construction = {self.hnsw_ef_construction})"
+            
+            statements = []
+            if self.maintenance_work_mem:
+                statements.append(f"SET maintenance_work_mem = '{self.maintenance_work_mem}';")
+            if rebuild:
+                statements.append(f"DROP INDEX IF EXISTS {table_name}_vector_idx;")
+            statements.append(
+                f"CREATE INDEX IF NOT EXISTS {table_name}_vector_idx ON {table_name} "
+                f"USING {index_type} (vector {self._get_operator_class()}) {with_clause};"
+            )
+            
+            started = time.perf_counter()
+            if self.use_async and self._pool:
+                async with self._pool.acquire() as conn:
+                    for statement in statements:
+                        await conn.execute(statement)
+                    if self.maintenance_work_mem:
+                        await conn.execute("RESET maintenance_work_mem;")
+            else:
+                for statement in statements:
+                    await self._execute(statement)
+            
+            self._index_info_cache.pop(table_name, None)
+            logger.info(f"Built {index_type} index on {table_name} {with_clause} "
+                        f"in {time.perf_counter() - started:.1f}s")
+            return True
+            
+        except Exception as e:
+            logger.error(f"Failed to build vector index for PGVector table {collection_name}: {e}")
+            return False
+    
+    async def _search_settings(self, table_name: str) -> List[str]:
+        """SET LOCAL statements tuning recall of the table's vector index for one query"""
+        info = await self._vector_index_info(table_name)
+        if info is None:
+            return []
+        method, lists = info
+        if method == 'ivfflat':
+            probes = self.ivfflat_probes or max(1, round(math.sqrt(lists or 100)))
+            return [f"SET LOCAL ivfflat.probes = {int(probes)};"]
+        if method == 'hnsw' and self.hnsw_ef_search:
+            return [f"SET LOCAL hnsw.ef_search = {int(self.hnsw_ef_search)};"]
+        return []
+    
     async def search(self, 
                     collection_name: str,
                     query: Optional[str] = None,
@@ -380,11 +748,17 @@ class PGVectorAdapter(BaseVectorStore):
             
             params.append(limit)
             
+            # Index recall settings (ivfflat probes / hnsw ef_search) apply to this query only
+            settings = await self._search_settings(table_name)
+            
             # Execute search
             results = []
             if self.use_async and self._pool:
                 async with self._pool.acquire() as conn:
-                    rows = await conn.fetch(search_sql, *params)
+                    async with conn.transaction():
+                        for setting in settings:
+                            await conn.execute(setting)
+                        rows = await conn.fetch(search_sql, *params)
                     for row in rows:
                         metadata = json.loads(row['metadata']) if row['metadata'] else {}
                         
@@ -398,8 +772,11 @@ class PGVectorAdapter(BaseVectorStore):
                         results.append(result)
             else:
                 with self._connection.cursor(cursor_factory=RealDictCursor) as cursor:
+                    for setting in settings:
+                        cursor.execute(setting)
                     cursor.execute(search_sql, params)
                     rows = cursor.fetchall()
+                    self._connection.commit()
                     for row in rows:
                         metadata = json.loads(row['metadata']) if row['metadata'] else {}
                         
@@ -72,7 +72,7 @@ class PineconeAdapter(BaseVectorStore):
         try:
             self._client = Pinecone(api_key=self.api_key)
             # Test connection
-            indexes = self._client.list_indexes()
+            indexes = await self._run_blocking(self._client.list_indexes)
             logger.info(f"Connected to Pinecone: {len(indexes)} indexes available")
             self._connected = True
             return True
@@ -84,6 +84,7 @@ class PineconeAdapter(BaseVectorStore):
     async def disconnect(self) -> None:
         """Close connection to Pinecone"""
         self._connected = False
+        self._shutdown_executor()
     
     async def create_collection(self, collection_name: str, **kwargs) -> bool:
         """Create a new Pinecone index"""
@@ -93,7 +94,7 @@ class PineconeAdapter(BaseVectorStore):
                     return False
             
             # Check if index already exists
-            indexes = self._client.list_indexes()
+            indexes = await self._run_blocking(self._client.list_indexes)
             existing_names = []
             for idx in indexes:
                 if hasattr(idx, 'name'):
@@ -113,7 +114,8 @@ class PineconeAdapter(BaseVectorStore):
                 region=self.serverless_region
             )
             
-            self._client.create_index(
+            await self._run_blocking(
+                self._client.create_index,
                 name=collection_name,
                 dimension=self.vector_dimension,
                 metric=self.metric,
@@ -134,7 +136,7 @@ class PineconeAdapter(BaseVectorStore):
                 if not await self.connect():
                     return False
             
-            self._client.delete_index(collection_name)
+            await self._run_blocking(self._client.delete_index, collection_name)
             logger.info(f"Deleted Pinecone index: {collection_name}")
             return True
         except Exception as e:
@@ -148,7 +150,7 @@ class PineconeAdapter(BaseVectorStore):
                 if not await self.connect():
                     return []
             
-            indexes = self._client.list_indexes()
+            indexes = await self._run_blocking(self._client.list_indexes)
             names = []
             for idx in indexes:
                 if hasattr(idx, 'name'):
@@ -172,7 +174,7 @@ class PineconeAdapter(BaseVectorStore):
             if collection_name not in self._indexes:
                 if not await self.create_collection(collection_name):
                     return False
-                self._indexes[collection_name] = self._client.Index(collection_name)
+                self._indexes[collection_name] = await self._run_blocking(self._client.Index, collection_name)
             
             index = self._indexes[collection_name]
             
@@ -209,7 +211,7 @@ class PineconeAdapter(BaseVectorStore):
             batch_size = 100
             for i in range(0, len(vectors_to_upsert), batch_size):
                 batch = vectors_to_upsert[i:i + batch_size]
-                index.upsert(vectors=batch)
+                await self._run_blocking(index.upsert, vectors=batch)
             
             logger.info(f"Upserted {len(vectors_to_upsert)} documents to Pinecone index {collection_name}")
             return True
@@ -231,12 +233,13 @@ class PineconeAdapter(BaseVectorStore):
                 return []
             
             if collection_name not in self._indexes:
-                self._indexes[collection_name] = self._client.Index(collection_name)
+                self._indexes[collection_name] = await self._run_blocking(self._client.Index, collection_name)
             
             index = self._indexes[collection_name]
             
             # Perform search
-            search_response = index.query(
+            search_response = await self._run_blocking(
+                index.query,
                 vector=query_embedding,
                 top_k=limit,
                 include_metadata=True,
@@ -266,10 +269,10 @@ class PineconeAdapter(BaseVectorStore):
         """Delete specific documents from Pinecone index"""
         try:
             if collection_name not in self._indexes:
-                self._indexes[collection_name] = self._client.Index(collection_name)
+                self._indexes[collection_name] = await self._run_blocking(self._client.Index, collection_name)
             
             index = self._indexes[collection_name]
-            index.delete(ids=document_ids)
+            await self._run_blocking(index.delete, ids=document_ids)
             return True
         except Exception as e:
             logger.error(f"Failed to delete documents from Pinecone index {collection_name}: {e}")
@@ -282,7 +285,7 @@ class PineconeAdapter(BaseVectorStore):
                 if not await self.connect():
                     return {"error": "Not connected"}
             
-            index_info = self._client.describe_index(collection_name)
+            index_info = await self._run_blocking(self._client.describe_index, collection_name)
             return {
                 "document_count": getattr(index_info, 'total_vector_count', 0),
                 "dimension": getattr(index_info, 'dimension', self.vector_dimension),
@@ -300,7 +303,7 @@ class PineconeAdapter(BaseVectorStore):
                 if not await self.connect():
                     return False, "Connection failed"
             
-            indexes = self._client.list_indexes()
+            indexes = await self._run_blocking(self._client.list_indexes)
             return True, f"Pinecone healthy: {len(indexes)} indexes available"
         except Exception as e:
             return False, f"Health check failed: {e}"
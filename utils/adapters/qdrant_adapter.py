@@ -93,7 +93,7 @@ class QdrantAdapter(BaseVectorStore):
             )
             
             # Test connection
-            collections = self._client.get_collections()
+            collections = await self._run_blocking(self._client.get_collections)
             logger.info(f"Connected to Qdrant: {len(collections.collections)} collections available")
             
             self._connected = True
@@ -108,10 +108,11 @@ class QdrantAdapter(BaseVectorStore):
         """Close connection to Qdrant"""
         if self._client:
             try:
-                self._client.close()
+                await self._run_blocking(self._client.close)
             except Exception as e:
                 logger.error(f"Error disconnecting from Qdrant: {e}")
         self._connected = False
+        self._shutdown_executor()
     
     def _get_distance_metric(self) -> Distance:
         """Convert string distance metric to Qdrant Distance enum"""
@@ -130,7 +131,7 @@ class QdrantAdapter(BaseVectorStore):
             
             # Check if collection already exists
             try:
-                collection_info = self._client.get_collection(collection_name)
+                collection_info = await self._run_blocking(self._client.get_collection, collection_name)
                 if collection_info:
                     logger.info(f"Qdrant collection {collection_name} already exists")
                     return True
@@ -149,7 +150,8 @@ class QdrantAdapter(BaseVectorStore):
             )
             
             # Create collection
-            self._client.create_collection(
+            await self._run_blocking(
+                self._client.create_collection,
                 collection_name=collection_name,
                 vectors_config=vectors_config,
                 on_disk_payload=kwargs.get('on_disk_payload', self.on_disk_payload),
@@ -163,7 +165,7 @@ class QdrantAdapter(BaseVectorStore):
             wait_time = 0
             while wait_time < max_wait:
                 try:
-                    collection_info = self._client.get_collection(collection_name)
+                    collection_info = await self._run_blocking(self._client.get_collection, collection_name)
                     if collection_info.status == CollectionStatus.GREEN:
                         break
                 except:
@@ -185,7 +187,7 @@ class QdrantAdapter(BaseVectorStore):
             if not self._client:
                 await self.connect()
             
-            self._client.delete_collection(collection_name)
+            await self._run_blocking(self._client.delete_collection, collection_name)
             logger.info(f"Deleted Qdrant collection: {collection_name}")
             return True
             
@@ -199,7 +201,7 @@ class QdrantAdapter(BaseVectorStore):
             if not self._client:
                 await self.connect()
             
-            collections = self._client.get_collections()
+            collections = await self._run_blocking(self._client.get_collections)
             return [collection.name for collection in collections.collections]
             
         except Exception as e:
@@ -255,7 +257,8 @@ class QdrantAdapter(BaseVectorStore):
             batch_size = 100
             for i in range(0, len(points), batch_size):
                 batch = points[i:i + batch_size]
-                self._client.upsert(
+                await self._run_blocking(
+                    self._client.upsert,
                     collection_name=collection_name,
                     points=batch
                 )
@@ -308,7 +311,8 @@ class QdrantAdapter(BaseVectorStore):
                     filter_conditions = Filter(must=conditions)
             
             # Perform search
-            search_result = self._client.search(
+            search_result = await self._run_blocking(
+                self._client.search,
                 collection_name=collection_name,
                 query_vector=query_embedding,
                 query_filter=filter_conditions,
@@ -354,7 +358,8 @@ class QdrantAdapter(BaseVectorStore):
                 await self.connect()
             
             # Delete points
-            self._client.delete(
+            await self._run_blocking(
+                self._client.delete,
                 collection_name=collection_name,
                 points_selector=models.PointIdsList(
                     points=[str(doc_id) for doc_id in document_ids]
@@ -375,7 +380,7 @@ class QdrantAdapter(BaseVectorStore):
                 await self.connect()
             
             # Get collection info
-            collection_info = self._client.get_collection(collection_name)
+            collection_info = await self._run_blocking(self._client.get_collection, collection_name)
             
             return {
                 "document_count": collection_info.points_count,
@@ -399,7 +404,7 @@ class QdrantAdapter(BaseVectorStore):
                 await self.connect()
             
             # Get cluster info to test connectivity
-            collections = self._client.get_collections()
+            collections = await self._run_blocking(self._client.get_collections)
             return True, f"Qdrant healthy: {len(collections.collections)} collections available"
                 
         except Exception as e:
@@ -117,7 +117,8 @@ class WeaviateAdapter(BaseVectorStore):
         """Insert or update documents in Weaviate"""
         try:
             if hasattr(self._weaviate_manager, 'add_documents'):
-                return self._weaviate_manager.add_documents(
+                return await self._run_blocking(
+                    self._weaviate_manager.add_documents,
                     collection_name=collection_name,
                     documents=documents,
                     embeddings=embeddings
@@ -125,7 +126,7 @@ class WeaviateAdapter(BaseVectorStore):
             else:
                 # Fallback implementation
                 client = self._weaviate_manager.client
-                actual_name = self._weaviate_manager._resolve_collection_name(collection_name)
+                actual_name = await self._run_blocking(self._weaviate_manager._resolve_collection_name, collection_name)
                 collection = client.collections.get(actual_name)
                 
                 # Prepare objects for batch insert
@@ -148,9 +149,12 @@ class WeaviateAdapter(BaseVectorStore):
                     objects.append(doc_obj)
                 
                 # Batch insert
-                with collection.batch.dynamic() as batch:
-                    for obj in objects:
-                        batch.add_object(properties=obj)
+                def insert_batch():
+                    with collection.batch.dynamic() as batch:
+                        for obj in objects:
+                            batch.add_object(properties=obj)
+                
+                await self._run_blocking(insert_batch)
                 
                 logger.info(f"Upserted {len(documents)} documents to Weaviate collection {collection_name}")
                 return True
@@ -170,7 +174,8 @@ class WeaviateAdapter(BaseVectorStore):
         try:
             if hasattr(self._weaviate_manager, 'search_documents'):
                 # Use existing search method if available
-                results = self._weaviate_manager.search_documents(
+                results = await self._run_blocking(
+                    self._weaviate_manager.search_documents,
                     collection_name=collection_name,
                     query=query,
                     query_embedding=query_embedding,
@@ -194,27 +199,29 @@ class WeaviateAdapter(BaseVectorStore):
             else:
                 # Fallback implementation
                 client = self._weaviate_manager.client
-                actual_name = self._weaviate_manager._resolve_collection_name(collection_name)
+                actual_name = await self._run_blocking(self._weaviate_manager._resolve_collection_name, collection_name)
                 collection = client.collections.get(actual_name)
                 
                 # Build query
                 if query_embedding:
                     # Vector search
-                    response = collection.query.near_vector(
+                    response = await self._run_blocking(
+                        collection.query.near_vector,
                         near_vector=query_embedding,
                         limit=limit,
                         return_metadata=['score']
                     )
                 elif query:
                     # Text search
-                    response = collection.query.bm25(
+                    response = await self._run_blocking(
+                        collection.query.bm25,
                         query=query,
                         limit=limit,
                         return_metadata=['score']
                     )
                 else:
                     # Get all documents
-                    response = collection.query.fetch_objects(limit=limit)
+                    response = await self._run_blocking(collection.query.fetch_objects, limit=limit)
                 
                 # Process results
                 results = []
@@ -11,8 +11,12 @@ import re
 import time
 from dataclasses import dataclass
 
+import numpy as np
+
 logger = logging.getLogger(__name__)
 
+_WORD_RE = re.compile(r'\b\w+\b')
+
 @dataclass
 class RankedResult:
     """Result with comprehensive ranking scores"""
@@ -54,8 +58,8 @@ class AdvancedReranker:
         
         try:
             # Initialize semantic similarity scorer if available
-            from sentence_transformers import SentenceTransformer
-            self.semantic_scorer = SentenceTransformer('all-MiniLM-L6-v2')
+            from utils.embedding_service import get_embedding_service
+            self.semantic_scorer = get_embedding_service('all-MiniLM-L6-v2')
             logger.info("Semantic similarity scorer initialized")
         except Exception as e:
             logger.warning(f"Semantic scorer initialization failed: {e}")
@@ -110,15 +114,21 @@ class AdvancedReranker:
     def _calculate_comprehensive_scores(self, query: str, results: List[Dict[str, Any]]) -> List[RankedResult]:
         """Calculate multiple scoring signals for each result"""
         scored_results = []
+        contents = [result.get('content', '') for result in results]
+        
+        # Query features are computed once and shared by every candidate
+        query_words, query_prefixes = self._query_terms(query)
+        
+        # One batched encode for the query and all candidates
+        semantic_scores = self._batch_semantic_similarity(query, contents)
         
         for i, result in enumerate(results):
-            content = result.get('content', '')
+            content = contents[i]
             
             # Calculate keyword relevance score
-            keyword_score = self._calculate_keyword_relevance(query, content)
+            keyword_score = self._keyword_relevance_from_terms(query_words, query_prefixes, content)
             
-            # Calculate semantic similarity if available
-            semantic_score = self._calculate_semantic_similarity(query, content)
+            semantic_score = semantic_scores[i]
             
             # Calculate content quality score
             quality_score = self._calculate_content_quality(content)
@@ -148,27 +158,34 @@ class AdvancedReranker:
         
         return scored_results
     
+    @staticmethod
+    def _query_terms(query: str) -> Tuple[set, Dict[str, str]]:
+        """Distinct query words plus the 4-char prefix of each word longer than 3 chars"""
+        query_words = set(_WORD_RE.findall((query or '').lower()))
+        query_prefixes = {w: w[:4] for w in query_words if len(w) > 3}
+        return query_words, query_prefixes
+    
     def _calculate_keyword_relevance(self, query: str, content: str) -> float:
         """Calculate keyword-based relevance score"""
+        query_words, query_prefixes = self._query_terms(query)
+        return self._keyword_relevance_from_terms(query_words, query_prefixes, content)
+    
+    def _keyword_relevance_from_terms(self, query_words: set, query_prefixes: Dict[str, str],
+                                      content: str) -> float:
+        """Keyword relevance against a pre-tokenized query (set lookups, no nested word loop)"""
         try:
-            query_words = set(re.findall(r'\b\w+\b', query.lower()))
-            content_words = set(re.findall(r'\b\w+\b', content.lower()))
-            
             if not query_words:
                 return 0.0
             
+            content_words = set(_WORD_RE.findall((content or '').lower()))
+            
             # Calculate exact matches
             exact_matches = len(query_words & content_words)
             exact_score = exact_matches / len(query_words)
             
-            # Calculate partial matches (stemming-like)
-            partial_matches = 0
-            for q_word in query_words:
-                for c_word in content_words:
-                    if len(q_word) > 3 and len(c_word) > 3:
-                        if q_word[:4] == c_word[:4] or c_word[:4] == q_word[:4]:
-                            partial_matches += 0.5
-                            break
+            # Calculate partial matches (stemming-like): query words sharing a 4-char prefix
+            content_prefixes = {w[:4] for w in content_words if len(w) > 3}
+            partial_matches = 0.5 * sum(1 for prefix in query_prefixes.values() if prefix in content_prefixes)
             
             partial_score = min(partial_matches / len(query_words), 0.5)
             
@@ -180,23 +197,29 @@ class AdvancedReranker:
     
     def _calculate_semantic_similarity(self, query: str, content: str) -> float:
         """Calculate semantic similarity score"""
-        if not self.semantic_scorer:
-            return 0.0
+        return self._batch_semantic_similarity(query, [content])[0]
+    
+    def _batch_semantic_similarity(self, query: str, contents: List[str]) -> List[float]:
+        """Cosine similarity of the query to every content from a single batched encode"""
+        if not self.semantic_scorer or not contents:
+            return [0.0] * len(contents)
         
         try:
-            # Encode query and content
-            query_embedding = self.semantic_scorer.encode([query])
-            content_embedding = self.semantic_scorer.encode([content[:512]])  # Limit content length
-            
-            # Calculate cosine similarity
-            from sklearn.metrics.pairwise import cosine_similarity
-            similarity = cosine_similarity(query_embedding, content_embedding)[0][0]
+            # Query first, then contents (limited to 512 chars) - one model batch
+            texts = [query] + [(content or '')[:512] for content in contents]
+            if hasattr(self.semantic_scorer, 'encode_many'):
+                embeddings = self.semantic_scorer.encode_many(texts, normalize_embeddings=True)
+            else:
+                embeddings = self.semantic_scorer.encode(texts, normalize_embeddings=True)
+            embeddings = np.asarray(embeddings, dtype=np.float32)
             
-            return max(0.0, float(similarity))
+            # Normalized vectors: cosine similarity is a single matrix-vector product
+            similarities = embeddings[1:] @ embeddings[0]
+            return np.clip(similarities, 0.0, None).astype(float).tolist()
             
         except Exception as e:
             logger.error(f"Semantic similarity calculation failed: {e}")
-            return 0.0
+            return [0.0] * len(contents)
     
     def _calculate_content_quality(self, content: str) -> float:
         """Calculate content quality score based on various factors"""
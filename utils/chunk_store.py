@@ -0,0 +1,450 @@
+"""
+Memory-Mapped Chunk Store
+Compact on-disk column store for chunk texts, metadata and ids
+
+Index loaders used to unpickle every chunk text and metadata dict into the
+Python heap just to read the handful of rows a query returns. A chunk store
+keeps those columns in one file that is opened with ``mmap``; rows are decoded
+only when they are accessed, so opening is O(1) in the collection size and
+the page cache is shared between worker processes.
+
+File layout (all integers little-endian)::
+
+    b"CHNKSTR1"                 magic
+    uint64                      header length
+    header (JSON)               row count, codec, section offsets, extras
+    padding to 8 bytes
+    texts.offsets   int64[n+1]  byte offsets into texts.blob
+    texts.blob      UTF-8
+    metas.offsets   int64[n+1]
+    metas.blob      one encoded dict per row (msgpack when available, else JSON)
+    ids.offsets     int64[n+1]  (optional)
+    ids.blob        UTF-8       (optional)
+
+Files are written to a temp name and renamed into place, so readers never
+see a partial store.
+"""
+
+import os
+import json
+import mmap
+import struct
+import logging
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Sequence
+
+import numpy as np
+
+try:
+    import ormsgpack
+    _MSGPACK_CODEC = "msgpack"
+
+    def _pack(obj):
+        return ormsgpack.packb(obj, option=ormsgpack.OPT_NON_STR_KEYS | ormsgpack.OPT_SERIALIZE_NUMPY)
+
+    _unpack = ormsgpack.unpackb
+except ImportError:
+    try:
+        import msgpack
+        _MSGPACK_CODEC = "msgpack"
+
+        def _pack(obj):
+            return msgpack.packb(obj, use_bin_type=True, strict_types=False)
+
+        def _unpack(data):
+            return msgpack.unpackb(data, raw=False, strict_map_key=False)
+    except ImportError:
+        _MSGPACK_CODEC = None
+        _pack = _unpack = None
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"CHNKSTR1"
+_ALIGN = 8
+
+
+def _json_default(obj):
+    if isinstance(obj, np.generic):
+        return obj.item()
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    return str(obj)
+
+
+def _encoder(codec: str):
+    if codec == "msgpack":
+        return _pack
+    return lambda obj: json.dumps(obj, default=_json_default, ensure_ascii=False).encode("utf-8")
+
+
+def _decoder(codec: str):
+    if codec == "msgpack":
+        if _unpack is None:
+            raise RuntimeError("Chunk store metadata is msgpack-encoded but no msgpack library is installed")
+        return _unpack
+    return lambda data: json.loads(data.decode("utf-8"))
+
+
+def _column(values: List[bytes]):
+    offsets = np.zeros(len(values) + 1, dtype=np.int64)
+    if values:
+        np.cumsum([len(v) for v in values], out=offsets[1:])
+    return offsets, b"".join(values)
+
+
+def write_chunk_store(path: Path, texts: Sequence[str],
+                      metadatas: Optional[Sequence[Optional[Dict[str, Any]]]] = None,
+                      ids: Optional[Sequence[Any]] = None,
+                      extra: Optional[Dict[str, Any]] = None) -> Path:
+    """Write texts (and optional row-aligned metadata dicts and ids) to ``path``.
+
+    Metadata values that the codec cannot represent are stringified, so the
+    store favours "always writable" over exact round-tripping of exotic types.
+
+    Args:
+        path: Target file.
+        texts: One string per row.
+        metadatas: Optional dict (or None) per row.
+        ids: Optional id per row (stored as strings).
+        extra: JSON-serializable values stored in the header (e.g. a source signature).
+    """
+    path = Path(path)
+    n = len(texts)
+    if metadatas is not None and len(metadatas) != n:
+        raise ValueError("metadatas must have one entry per text")
+    if ids is not None and len(ids) != n:
+        raise ValueError("ids must have one entry per text")
+
+    codec = _MSGPACK_CODEC or "json"
+    encode = _encoder(codec)
+
+    def encode_meta(meta):
+        try:
+            return encode(meta if meta is not None else {})
+        except Exception:
+            # Fall back to JSON-with-str for values the binary codec rejects
+            return encode(json.loads(json.dumps(meta, default=_json_default)))
+
+    sections = [("texts", _column([(t if isinstance(t, str) else str(t or "")).encode("utf-8") for t in texts]))]
+    if metadatas is not None:
+        sections.append(("metas", _column([encode_meta(m) for m in metadatas])))
+    if ids is not None:
+        sections.append(("ids", _column([str(i).encode("utf-8") for i in ids])))
+
+    # Section positions are relative to the (aligned) end of the header
+    layout: Dict[str, Dict[str, int]] = {}
+    pos = 0
+    for name, (offsets, blob) in sections:
+        layout[name] = {"offsets": pos, "blob": pos + offsets.nbytes, "size": len(blob)}
+        pos += offsets.nbytes + len(blob)
+        pos += (-pos) % _ALIGN
+
+    header = json.dumps({"rows": n, "codec": codec, "sections": layout, "extra": extra or {}}).encode("utf-8")
+    prefix_len = len(MAGIC) + 8 + len(header)
+    padding = (-prefix_len) % _ALIGN
+
+    tmp = path.with_name(path.name + ".tmp")
+    with open(tmp, "wb") as f:
+        f.write(MAGIC)
+        f.write(struct.pack("<Q", len(header)))
+        f.write(header)
+        f.write(b"\0" * padding)
+        written = 0
+        for _, (offsets, blob) in sections:
+            f.write(offsets.tobytes())
+            f.write(blob)
+            written += offsets.nbytes + len(blob)
+            pad = (-written) % _ALIGN
+            f.write(b"\0" * pad)
+            written += pad
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+    return path
+
+
+class _Column(Sequence):
+    """Lazy read-only view over one string/dict column of a chunk store."""
+
+    def __init__(self, store: "ChunkStore", name: str, decode):
+        self._store = store
+        self._name = name
+        self._decode = decode
+
+    def __len__(self) -> int:
+        return len(self._store)
+
+    def __getitem__(self, row):
+        if isinstance(row, slice):
+            return [self[i] for i in range(*row.indices(len(self)))]
+        return self._decode(self._store._raw(self._name, row))
+
+    def __iter__(self) -> Iterator:
+        for i in range(len(self)):
+            yield self[i]
+
+
+class ChunkStore:
+    """Read-only, memory-mapped chunk store.
+
+    ``texts``, ``metadatas`` and ``ids`` are sequence views that decode single
+    rows on access; ``get_many`` fetches a batch of rows at once.
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self._file = open(self.path, "rb")
+        try:
+            self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # Empty files cannot be mapped
+            self._file.close()
+            raise ValueError(f"Chunk store {self.path} is empty")
+        try:
+            if self._mm[:len(MAGIC)] != MAGIC:
+                raise ValueError(f"{self.path} is not a chunk store")
+            (header_len,) = struct.unpack_from("<Q", self._mm, len(MAGIC))
+            start = len(MAGIC) + 8
+            header = json.loads(bytes(self._mm[start:start + header_len]).decode("utf-8"))
+            data_start = start + header_len
+            data_start += (-data_start) % _ALIGN
+
+            self.rows = int(header["rows"])
+            self.codec = header.get("codec", "json")
+            self.extra: Dict[str, Any] = header.get("extra", {})
+            self._offsets: Dict[str, np.ndarray] = {}
+            self._blob_start: Dict[str, int] = {}
+            for name, sec in header["sections"].items():
+                self._offsets[name] = np.frombuffer(self._mm, dtype=np.int64, count=self.rows + 1,
+                                                    offset=data_start + sec["offsets"])
+                self._blob_start[name] = data_start + sec["blob"]
+        except Exception:
+            self.close()
+            raise
+
+        self._decode_meta = _decoder(self.codec)
+        self.texts = _Column(self, "texts", lambda b: b.decode("utf-8"))
+        self.metadatas = _Column(self, "metas", self._decode_meta) if "metas" in self._offsets else None
+        self.ids = _Column(self, "ids", lambda b: b.decode("utf-8")) if "ids" in self._offsets else None
+
+    def __len__(self) -> int:
+        return self.rows
+
+    def _raw(self, name: str, row: int) -> bytes:
+        if row < 0:
+            row += self.rows
+        if not 0 <= row < self.rows:
+            raise IndexError(f"chunk store row {row} out of range")
+        offsets = self._offsets[name]
+        base = self._blob_start[name]
+        return self._mm[base + int(offsets[row]):base + int(offsets[row + 1])]
+
+    def get_text(self, row: int) -> str:
+        return self.texts[row]
+
+    def get_metadata(self, row: int) -> Dict[str, Any]:
+        return self.metadatas[row] if self.metadatas is not None else {}
+
+    def get_many(self, rows: Sequence[int]) -> List[Dict[str, Any]]:
+        """Decode the given rows as ``{"text", "metadata", "id"}`` dicts."""
+        out = []
+        for row in rows:
+            item = {"text": self.texts[row], "metadata": self.get_metadata(row)}
+            if self.ids is not None:
+                item["id"] = self.ids[row]
+            out.append(item)
+        return out
+
+    def text_bytes(self) -> int:
+        """Size of the text blob (on disk / page cache, not Python heap)."""
+        return int(self._offsets["texts"][-1]) if self.rows else 0
+
+    def close(self) -> None:
+        mm, self._mm = getattr(self, "_mm", None), None
+        # numpy views keep the buffer exported; drop them before closing the map
+        self._offsets = {}
+        if mm is not None:
+            try:
+                mm.close()
+            except BufferError:
+                # A caller still holds a view; the map is released with it
+                pass
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def open_chunk_store(path: Path) -> Optional[ChunkStore]:
+    """Open a chunk store, returning None (and logging) if it is missing or unreadable."""
+    path = Path(path)
+    if not path.exists():
+        return None
+    try:
+        return ChunkStore(path)
+    except Exception as e:
+        logger.warning(f"Ignoring unreadable chunk store {path}: {e}")
+        return None
+
+
+def file_signature(path: Path) -> Optional[List[int]]:
+    """(size, mtime_ns) of a source file, stored in a sidecar's header to detect staleness."""
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return [st.st_size, st.st_mtime_ns]
+
+
+def open_sidecar(path: Path, source: Path, layout: str) -> Optional[ChunkStore]:
+    """Open the chunk store converted from ``source`` if it is still current.
+
+    A sidecar records the size/mtime of the pickle it was converted from and
+    the layout it holds; any mismatch means the pickle was rewritten and the
+    sidecar must be rebuilt.
+    """
+    store = open_chunk_store(path)
+    if store is None:
+        return None
+    if store.extra.get("layout") != layout or store.extra.get("source") != file_signature(source):
+        store.close()
+        return None
+    return store
+
+
+def write_sidecar(path: Path, source: Path, layout: str, texts: Sequence[str],
+                  metadatas: Optional[Sequence[Optional[Dict[str, Any]]]] = None,
+                  ids: Optional[Sequence[Any]] = None) -> Optional[ChunkStore]:
+    """Convert already-loaded rows to a sidecar chunk store next to ``source``.
+
+    Failures (read-only directory, full disk) are logged and return None so
+    callers keep using the objects they already have.
+    """
+    try:
+        write_chunk_store(path, texts, metadatas, ids,
+                          extra={"layout": layout, "source": file_signature(source)})
+        return open_chunk_store(path)
+    except Exception as e:
+        logger.debug(f"Could not write chunk store sidecar {path}: {e}")
+        return None
+
+
+_TEXT_KEYS = ("content", "page_content", "text")
+_ROW_KEY = "__text_key__"
+_PLAIN_TYPES = (str, int, float, bool, type(None))
+
+
+def _is_plain(value: Any) -> bool:
+    if isinstance(value, _PLAIN_TYPES):
+        return True
+    if isinstance(value, (list, tuple)):
+        return all(_is_plain(v) for v in value)
+    if isinstance(value, dict):
+        return all(isinstance(k, str) and _is_plain(v) for k, v in value.items())
+    return False
+
+
+def documents_to_columns(documents: Sequence[Any]):
+    """Split a pickled document list into (texts, metadatas) for a chunk store.
+
+    Supports lists of strings and of plain dicts (text under ``content``,
+    ``page_content`` or ``text``). Returns None for anything else, so callers
+    keep the pickle rather than store a lossy copy.
+    """
+    texts: List[str] = []
+    metas: List[Dict[str, Any]] = []
+    for doc in documents:
+        if isinstance(doc, str):
+            texts.append(doc)
+            metas.append({})
+        elif isinstance(doc, dict) and _ROW_KEY not in doc and _is_plain(doc):
+            key = next((k for k in _TEXT_KEYS if isinstance(doc.get(k), str)), "")
+            texts.append(doc[key] if key else "")
+            meta = {k: v for k, v in doc.items() if k != key}
+            meta[_ROW_KEY] = key
+            metas.append(meta)
+        else:
+            return None
+    return texts, metas
+
+
+class ChunkDocumentList(Sequence):
+    """Read-only list of documents backed by a chunk store written by ``documents_to_columns``.
+
+    Rows are rebuilt on access into the same strings or dicts that were
+    pickled; pickling the list itself yields a plain ``list``.
+    """
+
+    def __init__(self, store: ChunkStore):
+        self.store = store
+
+    def __len__(self) -> int:
+        return len(self.store)
+
+    def __getitem__(self, row):
+        if isinstance(row, slice):
+            return [self[i] for i in range(*row.indices(len(self)))]
+        text = self.store.texts[row]
+        meta = self.store.get_metadata(row)
+        if _ROW_KEY not in meta:
+            return text
+        key = meta.pop(_ROW_KEY)
+        if key:
+            meta[key] = text
+        return meta
+
+    def __iter__(self) -> Iterator[Any]:
+        for i in range(len(self)):
+            yield self[i]
+
+    def __reduce__(self):
+        return (list, (list(self),))
+
+
+class ChunkTextList(Sequence):
+    """Document texts for a FAISS collection: a memory-mapped base plus appended rows.
+
+    Behaves like the ``List[str]`` it replaces (indexing, ``len``, iteration,
+    ``extend``), but only rows appended since the last compaction live in the
+    Python heap.
+    """
+
+    def __init__(self, base: Optional[Sequence[str]] = None, appended: Optional[List[str]] = None):
+        self._base = base if base is not None else []
+        self._appended: List[str] = list(appended or [])
+
+    def __len__(self) -> int:
+        return len(self._base) + len(self._appended)
+
+    def __getitem__(self, row):
+        if isinstance(row, slice):
+            return [self[i] for i in range(*row.indices(len(self)))]
+        if row < 0:
+            row += len(self)
+        base_len = len(self._base)
+        if row < base_len:
+            return self._base[row]
+        return self._appended[row - base_len]
+
+    def __iter__(self) -> Iterator[str]:
+        yield from self._base
+        yield from self._appended
+
+    def extend(self, texts) -> None:
+        self._appended.extend(texts)
+
+    def append(self, text: str) -> None:
+        self._appended.append(text)
+
+    def __reduce__(self):
+        return (list, (list(self),))
+
+    def heap_bytes(self) -> int:
+        """Approximate Python heap used by the texts (mapped rows cost nothing)."""
+        mapped = 0 if isinstance(self._base, _Column) else sum(len(t) + 50 for t in self._base)
+        return mapped + sum(len(t) + 50 for t in self._appended)
@@ -56,7 +56,7 @@ def get_available_indexes():
         
         # Get all subdirectories that contain index files
         for root, dirs, files in os.walk(faiss_dir):
-            if 'index.faiss' in files and 'index.pkl' in files:
+            if ('index.faiss' in files and 'index.pkl' in files) or 'manifest.json' in files:
                 # Extract the index name from the path
                 index_name = os.path.basename(root).replace('_index', '')
                 indexes.append(index_name)
@@ -142,6 +142,9 @@ def _search_single_index(query: str, index_path: str, index_name: str, top_k: in
     results = []
     try:
         with time_limit(10):  # 10 second timeout
+            if os.path.exists(os.path.join(index_path, 'manifest.json')):
+                return _search_segment_collection(query, index_path, index_name, top_k)
+            
             logger.info(f"Loading FAISS index from {index_path}")
             faiss_index = safe_load_faiss(index_path)
             
@@ -166,6 +169,34 @@ def _search_single_index(query: str, index_path: str, index_name: str, top_k: in
     
     return results
 
+def _search_segment_collection(query: str, index_path: str, index_name: str, top_k: int) -> List[SearchResult]:
+    """Search a collection written by the FAISS adapter (manifest.json + base/segments)"""
+    import faiss
+    import numpy as np
+    from utils.embedding_service import get_embedding_service
+    from utils.faiss_segment_store import load_collection
+    
+    logger.info(f"Loading FAISS collection from {index_path}")
+    index, metadata, documents = load_collection(index_path)
+    query_vector = np.asarray(get_embedding_service().encode_many([query], normalize_embeddings=True),
+                              dtype=np.float32)
+    scores, rows = index.search(query_vector, min(top_k, index.ntotal))
+    inner_product = index.metric_type == faiss.METRIC_INNER_PRODUCT
+    
+    results = []
+    for score, row in zip(scores[0], rows[0]):
+        if row < 0 or row >= len(metadata) or metadata[row].get('deleted'):
+            continue
+        meta = metadata[row]
+        results.append(SearchResult(
+            content=documents[row] if row < len(documents) else '',
+            source_name=f"Index: {index_name}",
+            source_type="index",
+            relevance_score=float(score) if inner_product else 1.0 / (1.0 + float(score)),
+            metadata=dict(meta.get('metadata') or {}, source=meta.get('source', ''), id=meta.get('id'))
+        ))
+    return results
+
 def _get_mock_results(query: str, top_k: int) -> List[SearchResult]:
     """Generate mock search results when FAISS is not available"""
     results = []
@@ -0,0 +1,409 @@
+"""
+Persistent Embedding Cache
+
+Content-addressed on-disk cache of chunk embeddings so re-ingesting a
+document only embeds the chunks whose text actually changed.
+
+Layout (one directory per model under ``data/embedding_cache``)::
+
+    meta.json      model name, dimension, capacity
+    vectors.f32    memory-mapped float32 matrix (capacity x dimension)
+    keys.bin       memory-mapped SHA-256 digest per row (capacity x 32)
+    ticks.i64      memory-mapped last-access counter per row (0 = empty)
+
+The hash -> row index and the LRU order are rebuilt from ``keys.bin`` and
+``ticks.i64`` on open, so there is no separate index file to get out of
+sync; on a miss, rows whose tick changed since then (written by another
+process) are added to it. Every lookup re-checks the stored digest, so a row that was reused
+by eviction can never be returned for the wrong text.
+
+The files are shared by every process using the model (UI, API, Celery
+workers). Writers take an exclusive lock on ``cache.lock`` and re-read
+``meta.json`` and ``ticks.i64`` before growing the files or allocating rows,
+so a process never truncates the files below another's mapping or hands out
+a row another process already owns.
+
+Configuration (environment):
+    EMBEDDING_CACHE_ENABLED      default "true"
+    EMBEDDING_CACHE_DIR          default "data/embedding_cache"
+    EMBEDDING_CACHE_MAX_ENTRIES  default 200000 rows per model
+"""
+
+import os
+import re
+import json
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    try:
+        import portalocker
+    except ImportError:
+        portalocker = None
+
+logger = logging.getLogger(__name__)
+
+_DIGEST_SIZE = 32
+_INITIAL_CAPACITY = 1024
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
+def normalize_chunk_text(text: str) -> str:
+    """Normalize chunk text before hashing (line endings and runs of whitespace)."""
+    return _WHITESPACE_RE.sub(" ", (text or "").replace("\r\n", "\n")).strip()
+
+
+def text_digest(text: str) -> bytes:
+    """SHA-256 digest of the normalized chunk text."""
+    return hashlib.sha256(normalize_chunk_text(text).encode("utf-8")).digest()
+
+
+def _safe_dir_name(model_name: str) -> str:
+    return re.sub(r"[^A-Za-z0-9_.-]+", "_", model_name).strip("_") or "default"
+
+
+class EmbeddingCache:
+    """Memory-mapped, LRU-bounded embedding cache for a single model."""
+
+    def __init__(self, model_name: str, cache_dir: Optional[Path] = None, max_entries: int = 200_000):
+        self.model_name = model_name
+        base = Path(cache_dir or os.getenv("EMBEDDING_CACHE_DIR", "data/embedding_cache"))
+        self.path = base / _safe_dir_name(model_name)
+        self.max_entries = max(1, int(max_entries))
+
+        self._lock = threading.RLock()
+        self.dimension: Optional[int] = None
+        self.capacity = 0
+        self._vectors: Optional[np.memmap] = None
+        self._keys: Optional[np.memmap] = None
+        self._ticks: Optional[np.memmap] = None
+
+        # digest -> row, ordered from least to most recently used
+        self._index: "OrderedDict[bytes, int]" = OrderedDict()
+        self._free_rows: List[int] = []
+        self._tick = 0
+        # Ticks as of the last index refresh, to find rows written by other processes
+        self._known_ticks: Optional[np.ndarray] = None
+
+        self._stats = {"hits": 0, "misses": 0, "writes": 0, "evictions": 0}
+        self._open_existing()
+
+    # ------------------------------------------------------------------ storage
+    def _file(self, name: str) -> Path:
+        return self.path / name
+
+    @contextmanager
+    def _process_lock(self):
+        """Exclusive lock shared with other processes using this cache directory"""
+        self.path.mkdir(parents=True, exist_ok=True)
+        with open(self._file("cache.lock"), "a+b") as fh:
+            if fcntl is not None:
+                fcntl.flock(fh.fileno(), fcntl.LOCK_EX)
+            elif portalocker is not None:
+                portalocker.lock(fh, portalocker.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(fh.fileno(), fcntl.LOCK_UN)
+                elif portalocker is not None:
+                    portalocker.unlock(fh)
+
+    def _read_meta(self) -> Optional[Dict[str, Any]]:
+        try:
+            return json.loads(self._file("meta.json").read_text(encoding="utf-8"))
+        except FileNotFoundError:
+            return None
+
+    def _open_existing(self) -> None:
+        if not self._file("meta.json").exists():
+            return
+        try:
+            with self._process_lock():
+                meta = self._read_meta()
+                if meta is None:
+                    return
+                if meta.get("model_name") != self.model_name:
+                    logger.warning(f"Embedding cache at {self.path} belongs to {meta.get('model_name')}; ignoring")
+                    return
+                self.dimension = int(meta["dimension"])
+                self.capacity = int(meta["capacity"])
+                self._map_files(create=False)
+
+                used = np.nonzero(self._ticks > 0)[0]
+                order = used[np.argsort(self._ticks[used], kind="stable")]
+                for row in order.tolist():
+                    self._index[bytes(self._keys[row])] = row
+                self._free_rows = np.flatnonzero(self._ticks == 0)[::-1].tolist()
+                self._tick = int(self._ticks.max()) if self.capacity else 0
+                self._known_ticks = np.array(self._ticks)
+            logger.info(f"Opened embedding cache {self.path} ({len(self._index)} entries)")
+        except Exception as e:
+            logger.warning(f"Embedding cache at {self.path} unreadable, starting fresh: {e}")
+            with self._process_lock():
+                self._reset()
+
+    def _forget(self) -> None:
+        """Drop in-memory state without touching the files"""
+        self._vectors = self._keys = self._ticks = None
+        self._index.clear()
+        self._free_rows = []
+        self._known_ticks = None
+        self.dimension = None
+        self.capacity = 0
+
+    def _sync_from_disk(self) -> None:
+        """Adopt capacity, free rows and entries written by other processes (caller holds the process lock)"""
+        meta = self._read_meta()
+        if meta is None or meta.get("model_name") != self.model_name:
+            # Cleared (or never created) by another process
+            if self.dimension is not None:
+                self._forget()
+            return
+        dimension, capacity = int(meta["dimension"]), int(meta["capacity"])
+        if dimension != self.dimension:
+            self._forget()
+            self.dimension = dimension
+        if capacity != self.capacity or self._ticks is None:
+            self._flush_maps()
+            self.capacity = capacity
+            self._map_files(create=False)
+        # Rows are live iff their tick is set, whichever process wrote them
+        self._free_rows = np.flatnonzero(self._ticks == 0)[::-1].tolist()
+        if self.capacity:
+            self._tick = max(self._tick, int(self._ticks.max()))
+        self._refresh_index()
+
+    def _refresh_index(self) -> None:
+        """Index rows whose tick changed since the last refresh (caller holds the process lock)"""
+        if self._ticks is None:
+            return
+        ticks = np.array(self._ticks)
+        known = np.zeros_like(ticks)
+        if self._known_ticks is not None:
+            n = min(len(known), len(self._known_ticks))
+            known[:n] = self._known_ticks[:n]
+        changed = np.flatnonzero(ticks != known)
+        live = changed[ticks[changed] > 0]
+        # Oldest first, so the LRU order follows the shared access ticks
+        for row in live[np.argsort(ticks[live], kind="stable")].tolist():
+            digest = bytes(self._keys[row])
+            self._index[digest] = row
+            self._index.move_to_end(digest)
+        self._known_ticks = ticks
+
+    def _map_files(self, create: bool) -> None:
+        mode = "w+" if create else "r+"
+        self._vectors = np.memmap(self._file("vectors.f32"), dtype=np.float32, mode=mode,
+                                  shape=(self.capacity, self.dimension))
+        self._keys = np.memmap(self._file("keys.bin"), dtype=np.uint8, mode=mode,
+                               shape=(self.capacity, _DIGEST_SIZE))
+        self._ticks = np.memmap(self._file("ticks.i64"), dtype=np.int64, mode=mode,
+                                shape=(self.capacity,))
+
+    def _write_meta(self) -> None:
+        meta = {
+            "model_name": self.model_name,
+            "dimension": self.dimension,
+            "capacity": self.capacity,
+        }
+        tmp = self._file("meta.json.tmp")
+        tmp.write_text(json.dumps(meta), encoding="utf-8")
+        os.replace(tmp, self._file("meta.json"))
+
+    def _initialize(self, dimension: int) -> None:
+        self.path.mkdir(parents=True, exist_ok=True)
+        self.dimension = int(dimension)
+        self.capacity = min(_INITIAL_CAPACITY, self.max_entries)
+        self._map_files(create=True)
+        self._free_rows = list(range(self.capacity - 1, -1, -1))
+        self._write_meta()
+
+    def _grow(self) -> bool:
+        """Double capacity (up to ``max_entries``). Returns False when already at the cap."""
+        # Caller holds the process lock and has synced capacity from meta.json,
+        # so the files only ever grow under every other process's mapping
+        new_capacity = min(self.capacity * 2, self.max_entries)
+        if new_capacity <= self.capacity:
+            return False
+        self._flush_maps()
+        self._vectors = self._keys = self._ticks = None
+        for name, row_bytes in (("vectors.f32", 4 * self.dimension),
+                                ("keys.bin", _DIGEST_SIZE),
+                                ("ticks.i64", 8)):
+            with open(self._file(name), "r+b") as f:
+                f.truncate(new_capacity * row_bytes)
+        self._free_rows = list(range(new_capacity - 1, self.capacity - 1, -1)) + self._free_rows
+        self.capacity = new_capacity
+        self._map_files(create=False)
+        self._write_meta()
+        return True
+
+    def _reset(self) -> None:
+        self._vectors = self._keys = self._ticks = None
+        self._index.clear()
+        self._free_rows = []
+        self._known_ticks = None
+        self.dimension = None
+        self.capacity = 0
+        self._tick = 0
+        for name in ("meta.json", "vectors.f32", "keys.bin", "ticks.i64"):
+            try:
+                self._file(name).unlink()
+            except FileNotFoundError:
+                pass
+
+    def _flush_maps(self) -> None:
+        for m in (self._vectors, self._keys, self._ticks):
+            if m is not None:
+                m.flush()
+
+    def _allocate_row(self) -> int:
+        while self._free_rows:
+            row = self._free_rows.pop()
+            if self._ticks[row] == 0:
+                return row
+        if self._grow():
+            return self._free_rows.pop()
+        # Evict the least recently used entry
+        if self._index:
+            digest, row = self._index.popitem(last=False)
+        else:
+            # Every row is owned by entries this process has not seen: take the oldest
+            row = int(np.argmin(self._ticks))
+        self._ticks[row] = 0
+        self._stats["evictions"] += 1
+        return row
+
+    # ------------------------------------------------------------------ API
+    def get_many(self, texts: Sequence[str]) -> Tuple[List[Optional[np.ndarray]], List[int]]:
+        """Look up cached vectors.
+
+        Returns:
+            (vectors, missing) where ``vectors[i]`` is a copy of the cached
+            embedding or None, and ``missing`` lists the indices of misses.
+        """
+        results: List[Optional[np.ndarray]] = [None] * len(texts)
+        digests = [text_digest(text) for text in texts]
+        with self._lock:
+            missing = [i for i, digest in enumerate(digests) if not self._lookup(digest, results, i)]
+            if missing and self._file("meta.json").exists():
+                # Other processes may have written these since the index was built
+                with self._process_lock():
+                    self._sync_from_disk()
+                missing = [i for i in missing if not self._lookup(digests[i], results, i)]
+            self._stats["hits"] += len(texts) - len(missing)
+            self._stats["misses"] += len(missing)
+        return results, missing
+
+    def _lookup(self, digest: bytes, results: List[Optional[np.ndarray]], i: int) -> bool:
+        """Copy the cached vector for ``digest`` into ``results[i]`` (caller holds ``_lock``)"""
+        row = self._index.get(digest)
+        if row is None:
+            return False
+        if self._ticks is None or row >= self.capacity or self._ticks[row] == 0 \
+                or bytes(self._keys[row]) != digest:
+            # Row was evicted or overwritten by another writer; drop the stale mapping
+            self._index.pop(digest, None)
+            return False
+        self._tick += 1
+        self._ticks[row] = self._tick
+        self._index.move_to_end(digest)
+        results[i] = np.array(self._vectors[row], dtype=np.float32)
+        return True
+
+    def put_many(self, texts: Sequence[str], vectors: np.ndarray) -> None:
+        """Store embeddings for ``texts`` (row-aligned with ``vectors``)."""
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if len(texts) == 0:
+            return
+        if vectors.ndim != 2 or vectors.shape[0] != len(texts):
+            raise ValueError("vectors must be a 2-D array with one row per text")
+        with self._lock, self._process_lock():
+            self._sync_from_disk()
+            if self.dimension is None:
+                self._initialize(vectors.shape[1])
+            elif vectors.shape[1] != self.dimension:
+                logger.warning(f"Embedding dimension changed ({self.dimension} -> {vectors.shape[1]}); "
+                               f"resetting cache {self.path}")
+                self._reset()
+                self._initialize(vectors.shape[1])
+
+            for text, vec in zip(texts, vectors):
+                digest = text_digest(text)
+                row = self._index.get(digest)
+                if row is None or bytes(self._keys[row]) != digest:
+                    row = self._allocate_row()
+                # Vector and key are written before the tick marks the row as live
+                self._vectors[row] = vec
+                self._keys[row] = np.frombuffer(digest, dtype=np.uint8)
+                self._tick += 1
+                self._ticks[row] = self._tick
+                self._index[digest] = row
+                self._index.move_to_end(digest)
+                self._stats["writes"] += 1
+            self._flush_maps()
+
+    def clear(self) -> None:
+        """Remove every cached embedding for this model."""
+        with self._lock, self._process_lock():
+            self._reset()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Hit/miss counters and occupancy."""
+        with self._lock:
+            stats = dict(self._stats)
+            lookups = stats["hits"] + stats["misses"]
+            stats.update({
+                "model_name": self.model_name,
+                "entries": len(self._index),
+                "capacity": self.capacity,
+                "max_entries": self.max_entries,
+                "dimension": self.dimension,
+                "hit_rate": (stats["hits"] / lookups) if lookups else 0.0,
+                "path": str(self.path),
+            })
+        return stats
+
+
+# Global registry: one cache per model name
+_caches: Dict[str, EmbeddingCache] = {}
+_caches_lock = threading.Lock()
+
+
+def embedding_cache_enabled() -> bool:
+    return os.getenv("EMBEDDING_CACHE_ENABLED", "true").lower() == "true"
+
+
+def get_embedding_cache(model_name: str) -> Optional[EmbeddingCache]:
+    """Get the shared cache for a model, or None when caching is disabled."""
+    if not embedding_cache_enabled():
+        return None
+    with _caches_lock:
+        cache = _caches.get(model_name)
+        if cache is None:
+            try:
+                max_entries = int(os.getenv("EMBEDDING_CACHE_MAX_ENTRIES", "200000"))
+                cache = EmbeddingCache(model_name, max_entries=max_entries)
+            except Exception as e:
+                logger.warning(f"Embedding cache unavailable for {model_name}: {e}")
+                return None
+            _caches[model_name] = cache
+        return cache
+
+
+def get_embedding_cache_stats() -> List[Dict[str, Any]]:
+    """Stats for every cache opened in this process."""
+    with _caches_lock:
+        caches = list(_caches.values())
+    return [c.get_stats() for c in caches]
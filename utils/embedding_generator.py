@@ -11,11 +11,12 @@ from typing import List, Dict, Any, Tuple, Optional
 from pathlib import Path
 import pickle
 import faiss
-from sentence_transformers import SentenceTransformer
 import json
 from datetime import datetime
 import hashlib
 
+from utils.embedding_service import get_embedding_service
+
 logger = logging.getLogger(__name__)
 
 class EmbeddingGenerator:
@@ -36,22 +37,10 @@ class EmbeddingGenerator:
         self._initialize_model()
     
     def _initialize_model(self):
-        """Initialize the sentence transformer model"""
+        """Attach the shared sentence transformer model (local ./models copies preferred)"""
         try:
-            # Prefer local model directory if available to avoid network fetch
-            local_dir_candidates = [
-                Path("models") / self.model_name,
-                Path("models") / "all-minLM-L6-v2",
-            ]
-            for p in local_dir_candidates:
-                if p.exists():
-                    self.model = SentenceTransformer(str(p))
-                    break
-            if self.model is None:
-                self.model = SentenceTransformer(self.model_name)
-            # Get embedding dimension by encoding a test sentence
-            test_embedding = self.model.encode(["test"])
-            self.embedding_dimension = test_embedding.shape[1]
+            self.model = get_embedding_service(self.model_name)
+            self.embedding_dimension = self.model.dimension
             logger.info(f"Initialized embedding model: {self.model_name} (dim: {self.embedding_dimension})")
         except Exception as e:
             logger.error(f"Failed to initialize embedding model: {e}")
@@ -75,12 +64,13 @@ class EmbeddingGenerator:
             return np.array([])
         
         try:
-            # Process in batches to manage memory
+            # Process in batches to manage memory; unchanged chunks come from the embedding cache
             all_embeddings = []
             
             for i in range(0, len(texts), batch_size):
                 batch_texts = texts[i:i + batch_size]
-                batch_embeddings = self.model.encode(batch_texts, show_progress_bar=True)
+                batch_embeddings = self.model.encode_cached(batch_texts, batch_size=batch_size,
+                                                            show_progress_bar=True)
                 all_embeddings.append(batch_embeddings)
             
             # Concatenate all batches
@@ -0,0 +1,389 @@
+"""
+Shared Embedding Service
+
+Process-wide registry of sentence-transformer models so every search,
+ingestion and reranking path shares one loaded copy per (model, device)
+instead of materializing its own.
+
+Features:
+- One model instance per (model_name, device) per process, loaded lazily
+- Thread-safe loading (concurrent first callers wait for a single load)
+- Local ``models/`` directory resolution to avoid network fetches
+- ``encode_many()`` coalesces concurrent small requests into micro-batches
+- Drop-in ``encode()`` compatible with ``SentenceTransformer.encode``
+- ``encode_cached()`` consults the persistent embedding cache first
+"""
+
+import os
+import logging
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MODEL_NAME = "all-MiniLM-L6-v2"
+
+# Local folder aliases for models that have been downloaded under ./models
+_LOCAL_ALIASES: Dict[str, List[str]] = {
+    "all-minilm-l6-v2": ["all-minLM-L6-v2", "all-MiniLM-L6-v2"],
+}
+
+
+def _resolve_model_source(model_name: str, model_dir: Path = Path("models")) -> List[str]:
+    """Return load candidates for a model, local directories first."""
+    candidates: List[str] = []
+    if model_dir.exists():
+        try:
+            for p in model_dir.iterdir():
+                if p.is_dir() and p.name.lower() == model_name.lower():
+                    candidates.append(str(p))
+        except OSError:
+            pass
+        for alias in _LOCAL_ALIASES.get(model_name.lower(), []):
+            ap = model_dir / alias
+            if ap.exists() and str(ap) not in candidates:
+                candidates.append(str(ap))
+        direct = model_dir / model_name
+        if direct.exists() and str(direct) not in candidates:
+            candidates.append(str(direct))
+    candidates.append(model_name)
+    return candidates
+
+
+def _load_sentence_transformer(model_name: str, device: Optional[str]):
+    """Load a SentenceTransformer, preferring local copies of the model."""
+    from sentence_transformers import SentenceTransformer
+
+    last_error: Optional[Exception] = None
+    for source in _resolve_model_source(model_name):
+        try:
+            if device:
+                return SentenceTransformer(source, device=device)
+            return SentenceTransformer(source)
+        except Exception as e:
+            last_error = e
+            logger.debug(f"Could not load embedding model from {source}: {e}")
+    raise RuntimeError(f"Failed to load embedding model '{model_name}': {last_error}")
+
+
+def _l2_normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+class _EncodeRequest:
+    """A pending ``encode_many`` call waiting for its micro-batch."""
+
+    __slots__ = ("texts", "normalize", "done", "result", "error")
+
+    def __init__(self, texts: List[str], normalize: bool):
+        self.texts = texts
+        self.normalize = normalize
+        self.done = threading.Event()
+        self.result: Optional[np.ndarray] = None
+        self.error: Optional[BaseException] = None
+
+
+class EmbeddingService:
+    """Shared, thread-safe wrapper around a single loaded embedding model.
+
+    Instances are obtained through :func:`get_embedding_service`; the object
+    can be used wherever a ``SentenceTransformer`` was used before, since
+    ``encode()`` accepts the same arguments and unknown attributes are
+    delegated to the underlying model.
+    """
+
+    def __init__(self, model_name: str, device: Optional[str] = None,
+                 max_batch_size: int = 64, max_wait_ms: float = 5.0):
+        self.model_name = model_name
+        self.device = device
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait = max(0.0, float(max_wait_ms)) / 1000.0
+
+        started = time.time()
+        self._model = _load_sentence_transformer(model_name, device)
+        self.load_time = time.time() - started
+        self._model_lock = threading.Lock()
+
+        # Micro-batching state
+        self._cond = threading.Condition()
+        self._pending: List[_EncodeRequest] = []
+        self._worker: Optional[threading.Thread] = None
+
+        self._stats = {
+            "encode_calls": 0,
+            "encode_many_calls": 0,
+            "model_invocations": 0,
+            "texts_encoded": 0,
+            "coalesced_batches": 0,
+        }
+        self._dimension: Optional[int] = None
+        logger.info(f"Loaded shared embedding model {model_name} (device={device or 'auto'}) "
+                    f"in {self.load_time:.2f}s")
+
+    @property
+    def model(self):
+        """The underlying ``SentenceTransformer`` instance."""
+        return self._model
+
+    @property
+    def dimension(self) -> int:
+        """Embedding dimension of the loaded model."""
+        if self._dimension is None:
+            try:
+                self._dimension = int(self._model.get_sentence_embedding_dimension())
+            except Exception:
+                self._dimension = int(self.encode(["dimension probe"]).shape[1])
+        return self._dimension
+
+    def __getattr__(self, name: str) -> Any:
+        # Only called when normal lookup fails; delegate to the wrapped model
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return getattr(self._model, name)
+
+    def encode(self, sentences, **kwargs):
+        """Encode directly on the shared model (same signature as ``SentenceTransformer.encode``).
+
+        Use this for large, already-batched workloads such as ingestion.
+        """
+        with self._model_lock:
+            self._stats["encode_calls"] += 1
+            self._stats["model_invocations"] += 1
+            if isinstance(sentences, str):
+                self._stats["texts_encoded"] += 1
+            else:
+                self._stats["texts_encoded"] += len(sentences)
+            return self._model.encode(sentences, **kwargs)
+
+    def encode_cached(self, texts: Sequence[str], normalize_embeddings: bool = False,
+                      batch_size: int = 32, show_progress_bar: bool = False) -> np.ndarray:
+        """Encode texts, reusing vectors from the persistent embedding cache.
+
+        Only cache misses reach the model; new vectors are written back.
+        Used by the ingestion paths, where most chunks are unchanged between runs.
+        """
+        texts = list(texts)
+        if not texts:
+            return np.zeros((0, self.dimension), dtype=np.float32)
+
+        cache = self._get_cache()
+        if cache is None:
+            return np.asarray(self.encode(texts, batch_size=batch_size,
+                                          normalize_embeddings=normalize_embeddings,
+                                          show_progress_bar=show_progress_bar), dtype=np.float32)
+
+        cached, missing = cache.get_many(texts)
+        if missing:
+            miss_texts = [texts[i] for i in missing]
+            computed = np.asarray(self.encode(miss_texts, batch_size=batch_size,
+                                              show_progress_bar=show_progress_bar), dtype=np.float32)
+            cache.put_many(miss_texts, computed)
+            for i, vec in zip(missing, computed):
+                cached[i] = vec
+        vectors = np.vstack(cached).astype(np.float32, copy=False)
+        return _l2_normalize(vectors) if normalize_embeddings else vectors
+
+    def _get_cache(self):
+        try:
+            from .embedding_cache import get_embedding_cache
+            return get_embedding_cache(self.model_name)
+        except Exception as e:
+            logger.debug(f"Embedding cache unavailable: {e}")
+            return None
+
+    def encode_many(self, texts: Sequence[str], normalize_embeddings: bool = False,
+                    timeout: Optional[float] = 60.0, use_cache: bool = True) -> np.ndarray:
+        """Encode texts, coalescing concurrent callers into shared micro-batches.
+
+        Small requests (typically a single query) arriving within
+        ``max_wait_ms`` of each other are encoded in one model call.
+
+        Args:
+            texts: Texts to embed
+            normalize_embeddings: L2-normalize the returned vectors
+            timeout: Seconds to wait for the batch before raising ``TimeoutError``
+            use_cache: Check the persistent embedding cache before the model
+
+        Returns:
+            float32 array of shape ``(len(texts), dimension)``
+        """
+        texts = list(texts)
+        if not texts:
+            return np.zeros((0, self.dimension), dtype=np.float32)
+
+        with self._cond:
+            self._stats["encode_many_calls"] += 1
+
+        cache = self._get_cache() if use_cache else None
+        if cache is not None:
+            cached, missing = cache.get_many(texts)
+            if missing:
+                miss_texts = [texts[i] for i in missing]
+                computed = self.encode_many(miss_texts, timeout=timeout, use_cache=False)
+                cache.put_many(miss_texts, computed)
+                for i, vec in zip(missing, computed):
+                    cached[i] = vec
+            vectors = np.vstack(cached).astype(np.float32, copy=False)
+            return _l2_normalize(vectors) if normalize_embeddings else vectors
+
+        # Large requests are already a batch; skip the queue.
+        if len(texts) >= self.max_batch_size:
+            out = self.encode(texts, batch_size=self.max_batch_size,
+                              normalize_embeddings=normalize_embeddings,
+                              show_progress_bar=False)
+            return np.asarray(out, dtype=np.float32)
+
+        request = _EncodeRequest(texts, bool(normalize_embeddings))
+        with self._cond:
+            self._pending.append(request)
+            self._ensure_worker()
+            self._cond.notify()
+
+        if not request.done.wait(timeout):
+            raise TimeoutError(f"Embedding request timed out after {timeout}s")
+        if request.error is not None:
+            raise request.error
+        return request.result
+
+    def _ensure_worker(self) -> None:
+        """Start the micro-batch worker thread if needed (caller holds ``_cond``)."""
+        if self._worker is None or not self._worker.is_alive():
+            self._worker = threading.Thread(
+                target=self._batch_loop,
+                name=f"embedding-batcher-{self.model_name}",
+                daemon=True,
+            )
+            self._worker.start()
+
+    def _take_batch(self) -> List[_EncodeRequest]:
+        """Wait for pending requests and collect up to ``max_batch_size`` texts."""
+        with self._cond:
+            while not self._pending:
+                self._cond.wait()
+            deadline = time.time() + self.max_wait
+            while sum(len(r.texts) for r in self._pending) < self.max_batch_size:
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+
+            batch: List[_EncodeRequest] = []
+            size = 0
+            while self._pending and (not batch or size + len(self._pending[0].texts) <= self.max_batch_size):
+                req = self._pending.pop(0)
+                batch.append(req)
+                size += len(req.texts)
+            return batch
+
+    def _batch_loop(self) -> None:
+        while True:
+            batch = self._take_batch()
+            # Requests with different normalization cannot share a model call
+            groups: Dict[bool, List[_EncodeRequest]] = {}
+            for req in batch:
+                groups.setdefault(req.normalize, []).append(req)
+            for normalize, requests in groups.items():
+                self._run_group(requests, normalize)
+
+    def _run_group(self, requests: List[_EncodeRequest], normalize: bool) -> None:
+        flat: List[str] = []
+        for req in requests:
+            flat.extend(req.texts)
+        try:
+            vectors = np.asarray(
+                self.encode(flat, batch_size=self.max_batch_size,
+                            normalize_embeddings=normalize, show_progress_bar=False),
+                dtype=np.float32,
+            )
+            with self._cond:
+                self._stats["coalesced_batches"] += 1
+            offset = 0
+            for req in requests:
+                n = len(req.texts)
+                req.result = vectors[offset:offset + n]
+                offset += n
+        except BaseException as e:  # propagate to every waiting caller
+            for req in requests:
+                req.error = e
+        finally:
+            for req in requests:
+                req.done.set()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Return usage counters for this model instance."""
+        with self._cond:
+            stats = dict(self._stats)
+            stats["pending_requests"] = len(self._pending)
+        stats.update({
+            "model_name": self.model_name,
+            "device": self.device or "auto",
+            "load_time_seconds": round(self.load_time, 3),
+        })
+        return stats
+
+
+# Global registry: one service per (model_name, device)
+_registry: Dict[Tuple[str, str], EmbeddingService] = {}
+_registry_lock = threading.Lock()
+_load_locks: Dict[Tuple[str, str], threading.Lock] = {}
+
+
+def _default_device() -> Optional[str]:
+    return os.getenv("EMBEDDING_DEVICE") or None
+
+
+def get_embedding_service(model_name: Optional[str] = None, device: Optional[str] = None) -> EmbeddingService:
+    """Get or load the shared embedding service for a model/device pair.
+
+    Raises:
+        RuntimeError / ImportError if the model cannot be loaded.
+    """
+    name = model_name or os.getenv("EMBEDDING_MODEL_NAME") or DEFAULT_MODEL_NAME
+    dev = device or _default_device()
+    key = (name, dev or "auto")
+
+    service = _registry.get(key)
+    if service is not None:
+        return service
+
+    with _registry_lock:
+        service = _registry.get(key)
+        if service is not None:
+            return service
+        load_lock = _load_locks.setdefault(key, threading.Lock())
+
+    # Load outside the registry lock so other models can load in parallel
+    with load_lock:
+        service = _registry.get(key)
+        if service is None:
+            max_batch = int(os.getenv("EMBEDDING_MICRO_BATCH_SIZE", "64"))
+            max_wait_ms = float(os.getenv("EMBEDDING_MICRO_BATCH_WAIT_MS", "5"))
+            service = EmbeddingService(name, dev, max_batch_size=max_batch, max_wait_ms=max_wait_ms)
+            with _registry_lock:
+                _registry[key] = service
+    return service
+
+
+def get_embedding_model(model_name: Optional[str] = None, device: Optional[str] = None):
+    """Return the shared raw ``SentenceTransformer`` for callers that need the model object."""
+    return get_embedding_service(model_name, device).model
+
+
+def list_loaded_models() -> List[Dict[str, Any]]:
+    """Describe every model currently resident in this process."""
+    with _registry_lock:
+        services = list(_registry.values())
+    return [s.get_stats() for s in services]
+
+
+def clear_embedding_services() -> None:
+    """Drop all cached models (mainly for tests and memory pressure)."""
+    with _registry_lock:
+        _registry.clear()
+        _load_locks.clear()
@@ -8,6 +8,7 @@ to solve vague query problems and improve retrieval accuracy.
 import logging
 from typing import List, Dict, Any, Optional, Tuple
 import time
+from concurrent.futures import ThreadPoolExecutor, wait
 from dataclasses import dataclass
 import hashlib
 
@@ -28,8 +29,13 @@ class RetrievalResult:
 class EnhancedHybridRetriever:
     """Enhanced hybrid retriever with query expansion and confidence filtering"""
     
-    def __init__(self, confidence_threshold: float = 0.5):
+    def __init__(self, confidence_threshold: float = 0.5, concurrent_queries: bool = True,
+                 max_query_workers: int = 4, query_timeout: Optional[float] = 10.0):
         self.confidence_threshold = confidence_threshold
+        # Expanded query variants run concurrently on a bounded pool under one overall deadline
+        self.concurrent_queries = concurrent_queries
+        self.max_query_workers = max(1, int(max_query_workers))
+        self.query_timeout = query_timeout
         self.query_enhancer = None
         self.enterprise_search = None
         self.reranker = None
@@ -59,19 +65,19 @@ class EnhancedHybridRetriever:
         except Exception as e:
             logger.warning(f"Re-ranker initialization failed: {e}")
     
-    def retrieve_with_expanded_queries(
+    def search_with_expanded_queries(
         self,
-        query: str,
+        user_query: str,
         index_name: str,
         max_results: int = 5,
-        confidence_threshold: float = 0.2,  # Lower threshold for better recall
-        use_metadata_filtering: bool = True
-    ) -> List[Dict[str, Any]]:
+        filter_dict: Optional[Dict[str, Any]] = None,
+        use_confidence_threshold: bool = True
+    ) -> List[RetrievalResult]:
         """
         Search with expanded queries and confidence filtering
         
         Args:
-            query: Original user query
+            user_query: Original user query
             index_name: Index to search
             max_results: Maximum results to return
             filter_dict: Metadata filters to apply
@@ -105,8 +111,8 @@ class EnhancedHybridRetriever:
             else:
                 filtered_results = scored_results
             
-            # Step 5: Handle no results scenario
-            if not filtered_results:
+            # Step 5: Handle no results scenario (the retry itself runs unfiltered)
+            if not filtered_results and use_confidence_threshold:
                 return self._handle_no_results(user_query, index_name, enhanced_query)
             
             return filtered_results[:max_results]
@@ -136,41 +142,92 @@ class EnhancedHybridRetriever:
         filter_dict: Optional[Dict[str, Any]]
     ) -> List[Dict[str, Any]]:
         """Search with multiple expanded queries"""
-        all_results = []
+        per_query = max_results_per_query // 2
         
-        for i, query in enumerate(expanded_queries):
-            try:
-                # Use enterprise search if available
-                if self.enterprise_search:
-                    results = self.enterprise_search.search(query, index_name, max_results_per_query // 2)
-                    
-                    # Convert SearchResult objects to dictionaries
-                    for result in results:
-                        result_dict = {
-                            'content': result.content,
-                            'source': result.source,
-                            'page': result.page,
-                            'section': result.section,
-                            'metadata': result.metadata or {},
-                            'query_match': query,
-                            'query_index': i,
-                            'vector_score': getattr(result, 'vector_score', 0.0),
-                            'keyword_score': getattr(result, 'keyword_score', 0.0),
-                            'rerank_score': getattr(result, 'rerank_score', 0.0)
-                        }
-                        all_results.append(result_dict)
-                else:
-                    # Fallback to basic search
-                    results = self._fallback_search_single(query, index_name, max_results_per_query // 2)
-                    all_results.extend(results)
-                    
-            except Exception as e:
-                logger.error(f"Search failed for query '{query}': {e}")
-                continue
+        if self.concurrent_queries and len(expanded_queries) > 1:
+            variant_results = self._search_variants_concurrently(expanded_queries, index_name, per_query)
+        else:
+            variant_results = [self._search_single_query(query, i, index_name, per_query)
+                               for i, query in enumerate(expanded_queries)]
+        
+        all_results = [result for results in variant_results for result in results]
         
         # Remove duplicates based on content hash
         return self._deduplicate_results(all_results)
     
+    def _search_variants_concurrently(
+        self,
+        expanded_queries: List[str],
+        index_name: str,
+        max_results: int
+    ) -> List[List[Dict[str, Any]]]:
+        """Run all query variants under one deadline; late or failed variants contribute nothing"""
+        if self.enterprise_search and hasattr(self.enterprise_search, 'search_many'):
+            # One corpus load, shared keyword index and a single rerank batch for all variants
+            try:
+                batches = self.enterprise_search.search_many(
+                    expanded_queries, index_name, max_results,
+                    max_workers=self.max_query_workers, timeout=self.query_timeout
+                )
+                return [self._to_result_dicts(results, query, i)
+                        for i, (query, results) in enumerate(zip(expanded_queries, batches))]
+            except Exception as e:
+                logger.error(f"Multi-query search failed: {e}")
+                return []
+        
+        variant_results: List[List[Dict[str, Any]]] = [[] for _ in expanded_queries]
+        executor = ThreadPoolExecutor(max_workers=min(self.max_query_workers, len(expanded_queries)),
+                                      thread_name_prefix="query-variant")
+        try:
+            futures = {
+                executor.submit(self._search_single_query, query, i, index_name, max_results): i
+                for i, query in enumerate(expanded_queries)
+            }
+            done, not_done = wait(futures, timeout=self.query_timeout)
+            for future in done:
+                variant_results[futures[future]] = future.result()
+            if not_done:
+                logger.warning(f"{len(not_done)} of {len(expanded_queries)} query variants "
+                               f"missed the {self.query_timeout}s deadline")
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+        return variant_results
+    
+    def _search_single_query(self, query: str, query_index: int, index_name: str,
+                             max_results: int) -> List[Dict[str, Any]]:
+        """Search one query variant"""
+        try:
+            # Use enterprise search if available
+            if self.enterprise_search:
+                results = self.enterprise_search.search(query, index_name, max_results)
+                return self._to_result_dicts(results, query, query_index)
+            
+            # Fallback to basic search
+            return self._fallback_search_single(query, index_name, max_results)
+            
+        except Exception as e:
+            logger.error(f"Search failed for query '{query}': {e}")
+            return []
+    
+    @staticmethod
+    def _to_result_dicts(results, query: str, query_index: int) -> List[Dict[str, Any]]:
+        """Convert SearchResult objects to dictionaries"""
+        return [
+            {
+                'content': result.content,
+                'source': result.source,
+                'page': result.page,
+                'section': result.section,
+                'metadata': result.metadata or {},
+                'query_match': query,
+                'query_index': query_index,
+                'vector_score': getattr(result, 'vector_score', 0.0),
+                'keyword_score': getattr(result, 'keyword_score', 0.0),
+                'rerank_score': getattr(result, 'rerank_score', 0.0)
+            }
+            for result in results
+        ]
+    
     def _deduplicate_results(self, results: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
         """Remove duplicate results based on content"""
         seen_hashes = set()
@@ -16,6 +16,8 @@ from datetime import datetime
 import hashlib
 import re
 
+from utils.query_result_cache import QueryResultCache, get_index_generation, path_signature
+
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
@@ -58,10 +60,33 @@ except ImportError:
     logger.warning("LLM query module not available.")
     LLM_AVAILABLE = False
 
+# Semantic answer cache (reuses answers across paraphrased questions)
+try:
+    from utils.semantic_response_cache import get_semantic_response_cache
+    SEMANTIC_CACHE_AVAILABLE = True
+except ImportError:
+    logger.warning("Semantic response cache not available.")
+    SEMANTIC_CACHE_AVAILABLE = False
+
 # Default configuration
 DEFAULT_TOP_K = 5
 DEFAULT_RELEVANCE_THRESHOLD = 0.6
 
+
+def _results_size(results: List["QueryResult"]) -> int:
+    """Approximate bytes held by a cached result list"""
+    return 64 + sum(
+        200 + len(r.content or "") + len(str(r.metadata)) + len(r.source or "")
+        for r in results
+    )
+
+def _result_chunk_key(result: "QueryResult") -> str:
+    """Stable identity of a retrieved chunk for context fingerprinting"""
+    if result.chunk_id:
+        return str(result.chunk_id)
+    digest = hashlib.blake2b((result.content or "").encode("utf-8"), digest_size=12).hexdigest()
+    return f"{result.doc_id or result.source}:{digest}"
+
 class QueryPreprocessor:
     """Class to preprocess and expand queries"""
     
@@ -250,13 +275,37 @@ class EnhancedQueryProcessor:
         """Initialize the query processor"""
         self.query_preprocessor = QueryPreprocessor()
         
-        # Initialize query cache
-        self.query_cache = {}
-        self.max_cache_size = 100
+        # Bounded LRU query cache (bytes + entries, per-entry TTL, index-version aware)
+        self.query_cache = QueryResultCache(sizeof=_results_size)
         
         # Initialize feedback tracking
         self.feedback_tracking = {}
     
+    def _index_version(self, index_name: Optional[str]) -> Tuple:
+        """
+        Version token for an index: in-process ingestion generation plus the
+        on-disk signature of a FAISS index, so a re-ingest by another process
+        also invalidates cached results.
+        """
+        disk = None
+        find_index_path = getattr(vector_db_provider, "find_index_path", None)
+        if index_name and callable(find_index_path):
+            try:
+                index_path = find_index_path(index_name)
+                if index_path:
+                    disk = path_signature(Path(index_path) / "index.faiss", Path(index_path) / "manifest.json")
+            except Exception:
+                disk = None
+        return (get_index_generation(index_name), disk)
+    
+    def invalidate_cache(self, index_name: str = None) -> int:
+        """Drop cached results for an index (all entries when index_name is None)"""
+        return self.query_cache.invalidate_index(index_name)
+    
+    def get_cache_stats(self) -> Dict[str, Any]:
+        """Query cache hit-rate and occupancy metrics"""
+        return self.query_cache.get_stats()
+    
     def _search_vector_database(self, 
                                query: str, 
                                index_name: str = None, 
@@ -410,9 +459,12 @@ class EnhancedQueryProcessor:
         cache_key = f"{query}:{index_name}:{top_k}:{relevance_threshold}:{json.dumps(filters or {})}"
         
         # Check cache
-        if use_cache and cache_key in self.query_cache:
-            logger.info(f"Cache hit for query: {query}")
-            return self.query_cache[cache_key]
+        index_version = self._index_version(index_name) if use_cache else None
+        if use_cache:
+            cached = self.query_cache.get(cache_key, version=index_version, default=None)
+            if cached is not None:
+                logger.info(f"Cache hit for query: {query}")
+                return list(cached)
         
         # Preprocess the query
         processed_query = self.query_preprocessor.preprocess_query(query)
@@ -470,30 +522,30 @@ class EnhancedQueryProcessor:
         if deduplicate:
             results = self._deduplicate_results(results)
         
-        # Update cache
+        # Update cache (LRU eviction happens inside the cache)
         if use_cache:
-            # Limit cache size
-            if len(self.query_cache) >= self.max_cache_size:
-                # Remove oldest entries
-                oldest_keys = sorted(self.query_cache.keys())[:len(self.query_cache) // 2]
-                for key in oldest_keys:
-                    del self.query_cache[key]
-            
-            self.query_cache[cache_key] = results
+            self.query_cache.put(cache_key, list(results), version=index_version, index_name=index_name)
         
         return results
     
     def synthesize_answer(self, 
                          query: str,
                          results: List[QueryResult],
-                         provider: str = "openai") -> str:
+                         provider: str = "openai",
+                         index_name: str = None,
+                         use_cache: bool = True) -> str:
         """
         Synthesize an answer from search results using an LLM
         
+        Answers are reused for paraphrases of earlier questions that retrieved
+        the same chunks from the same index version (semantic response cache).
+        
         Args:
             query: The original query string
             results: List of QueryResult objects
             provider: LLM provider to use
+            index_name: Index the results came from (scopes the answer cache)
+            use_cache: Whether to consult and populate the answer cache
             
         Returns:
             Synthesized answer text
@@ -502,17 +554,39 @@ class EnhancedQueryProcessor:
             logger.warning("LLM query module not available. Cannot synthesize answer.")
             return "LLM processing not available. Here are the raw search results."
         
+        semantic_cache = None
+        if use_cache and SEMANTIC_CACHE_AVAILABLE and results:
+            semantic_cache = get_semantic_response_cache()
+            chunk_ids = [_result_chunk_key(result) for result in results]
+            index_version = self._index_version(index_name)
+            model_params = {"provider": provider}
+            try:
+                cached = semantic_cache.lookup(query, chunk_ids, collection=index_name,
+                                               index_version=index_version, model_params=model_params)
+                if cached is not None:
+                    return cached["answer"]
+            except Exception as e:
+                logger.warning(f"Semantic answer cache lookup failed: {e}")
+        
         try:
             # Extract content from results
             chunks = [result.content for result in results]
             
             # Synthesize an answer
             answer = synthesize_answer(query, chunks, provider)
-            return answer
         
         except Exception as e:
             logger.error(f"Error synthesizing answer: {e}")
             return f"Error generating answer: {str(e)}"
+        
+        if semantic_cache is not None and answer and not answer.startswith("[LLM Error]"):
+            try:
+                semantic_cache.store(query, chunk_ids, {"answer": answer, "answer_type": "synthesis"},
+                                     collection=index_name, index_version=index_version,
+                                     model_params=model_params)
+            except Exception as e:
+                logger.warning(f"Semantic answer cache store failed: {e}")
+        return answer
     
     def track_feedback(self, 
                       query: str, 
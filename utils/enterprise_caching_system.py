@@ -3,45 +3,121 @@ Enterprise Redis-Based Caching System
 
 Implements intelligent caching for LLM responses with TTL, invalidation,
 and cache warming strategies for enterprise-grade performance.
+
+Eviction is bounded-cost: every cached key is a member of a sorted set scored
+by last access time. A write stores the entry, indexes it and pops the least
+recently used members past ``max_cache_size`` in one server-side script, and a
+hit refreshes its score in the same round-trip as the read. Entries are
+msgpack (JSON fallback) compressed with zstd (zlib fallback) - never pickle,
+so a poisoned cache cannot execute code on load.
 """
 
 import logging
 import hashlib
 import json
 import time
-from typing import Dict, Any, Optional, List, Callable
-from datetime import datetime, timedelta
-from dataclasses import dataclass, asdict
-import pickle
+import zlib
+from collections import OrderedDict
+from typing import Dict, Any, Iterator, Optional, List, Callable
+from datetime import datetime
 from pathlib import Path
 
+try:
+    import ormsgpack
+
+    def _msgpack_dumps(obj):
+        return ormsgpack.packb(obj, default=str, option=ormsgpack.OPT_NON_STR_KEYS | ormsgpack.OPT_SERIALIZE_NUMPY)
+
+    _msgpack_loads = ormsgpack.unpackb
+except ImportError:
+    try:
+        import msgpack
+
+        def _msgpack_dumps(obj):
+            return msgpack.packb(obj, default=str, use_bin_type=True)
+
+        def _msgpack_loads(data):
+            return msgpack.unpackb(data, raw=False, strict_map_key=False)
+    except ImportError:
+        _msgpack_dumps = _msgpack_loads = None
+
+try:
+    import zstandard
+    _zstd_compressor = zstandard.ZstdCompressor(level=3)
+    _zstd_decompressor = zstandard.ZstdDecompressor()
+except ImportError:
+    zstandard = None
+
 logger = logging.getLogger(__name__)
 
 # Fallback in-memory cache when Redis is not available
 _memory_cache = {}
 _cache_timestamps = {}
+# index key -> OrderedDict of cached keys in access order (memory fallback LRU)
+_memory_indexes: Dict[str, "OrderedDict[str, float]"] = {}
 
-@dataclass
-class CacheEntry:
-    """Cache entry with metadata"""
-    data: Any
-    created_at: datetime
-    expires_at: Optional[datetime] = None
-    access_count: int = 0
-    last_accessed: Optional[datetime] = None
-    cache_key: str = ""
-    metadata: Dict[str, Any] = None
-    
-    def is_expired(self) -> bool:
-        """Check if cache entry is expired"""
-        if self.expires_at is None:
-            return False
-        return datetime.now() > self.expires_at
-    
-    def update_access(self):
-        """Update access statistics"""
-        self.access_count += 1
-        self.last_accessed = datetime.now()
+# Entry encoding: magic, codec (m=msgpack, j=json), compression (z=zstd, d=zlib, -=none), payload
+_ENTRY_MAGIC = b"VMC1"
+_COMPRESS_MIN_BYTES = 256
+
+# SET the entry, index it by access time and evict the least recently used
+# members beyond the size bound - one round-trip, O(log N) per write
+_SET_AND_EVICT_SCRIPT = """
+redis.call('SET', KEYS[1], ARGV[1], 'EX', ARGV[2])
+redis.call('ZADD', KEYS[2], ARGV[3], KEYS[1])
+local excess = redis.call('ZCARD', KEYS[2]) - tonumber(ARGV[4])
+local evicted = 0
+if excess > 0 then
+    local popped = redis.call('ZPOPMIN', KEYS[2], excess)
+    for i = 1, #popped, 2 do
+        evicted = evicted + redis.call('DEL', popped[i])
+    end
+end
+return evicted
+"""
+
+
+def encode_cache_entry(entry: Dict[str, Any]) -> bytes:
+    """Serialize a cache entry dict (msgpack or JSON, then zstd or zlib when large)"""
+    payload = None
+    codec = b"j"
+    if _msgpack_dumps is not None:
+        try:
+            payload = _msgpack_dumps(entry)
+            codec = b"m"
+        except Exception:
+            payload = None
+    if payload is None:
+        payload = json.dumps(entry, default=str, ensure_ascii=False).encode("utf-8")
+        codec = b"j"
+
+    compression = b"-"
+    if len(payload) >= _COMPRESS_MIN_BYTES:
+        if zstandard is not None:
+            payload, compression = _zstd_compressor.compress(payload), b"z"
+        else:
+            payload, compression = zlib.compress(payload, 6), b"d"
+    return _ENTRY_MAGIC + codec + compression + payload
+
+
+def decode_cache_entry(raw: bytes) -> Optional[Dict[str, Any]]:
+    """Inverse of :func:`encode_cache_entry`; None for foreign or legacy (pickled) values"""
+    if not raw or raw[:len(_ENTRY_MAGIC)] != _ENTRY_MAGIC:
+        return None
+    header = len(_ENTRY_MAGIC)
+    codec, compression = raw[header:header + 1], raw[header + 1:header + 2]
+    payload = raw[header + 2:]
+    if compression == b"z":
+        if zstandard is None:
+            raise RuntimeError("Cache entry is zstd-compressed but zstandard is not installed")
+        payload = _zstd_decompressor.decompress(payload)
+    elif compression == b"d":
+        payload = zlib.decompress(payload)
+    if codec == b"m":
+        if _msgpack_loads is None:
+            raise RuntimeError("Cache entry is msgpack-encoded but no msgpack library is installed")
+        return _msgpack_loads(payload)
+    return json.loads(payload.decode("utf-8"))
 
 class RedisConnectionManager:
     """Manages Redis connection with fallback"""
@@ -53,6 +129,7 @@ class RedisConnectionManager:
         self.password = password
         self.redis_client = None
         self.redis_available = False
+        self._set_and_evict = None
         self._connect()
     
     def _connect(self):
@@ -68,6 +145,7 @@ class RedisConnectionManager:
             )
             # Test connection
             self.redis_client.ping()
+            self._set_and_evict = self.redis_client.register_script(_SET_AND_EVICT_SCRIPT)
             self.redis_available = True
             logger.info("Redis connection established")
         except ImportError:
@@ -87,6 +165,8 @@ class RedisConnectionManager:
                 self.redis_available = False
         
         # Fallback to memory cache
+        if not self._memory_alive(key):
+            return None
         return _memory_cache.get(key)
     
     def set(self, key: str, value: bytes, ex: Optional[int] = None) -> bool:
@@ -128,29 +208,129 @@ class RedisConnectionManager:
                 self.redis_available = False
         
         # Check memory cache and expiration
-        if key in _memory_cache:
-            if key in _cache_timestamps:
-                if time.time() > _cache_timestamps[key]:
-                    # Expired
-                    _memory_cache.pop(key, None)
-                    _cache_timestamps.pop(key, None)
-                    return False
-            return True
-        return False
+        return self._memory_alive(key)
+    
+    @staticmethod
+    def _memory_alive(key: str) -> bool:
+        """True if ``key`` is in the memory cache and not expired (expired keys are dropped)"""
+        if key not in _memory_cache:
+            return False
+        if key in _cache_timestamps and time.time() > _cache_timestamps[key]:
+            _memory_cache.pop(key, None)
+            _cache_timestamps.pop(key, None)
+            return False
+        return True
+    
+    def get_and_touch(self, key: str, index_key: str) -> Optional[bytes]:
+        """Get a value and mark it most recently used in ``index_key`` (one round-trip)"""
+        now = time.time()
+        if self.redis_available:
+            try:
+                pipe = self.redis_client.pipeline(transaction=False)
+                pipe.get(key)
+                # XX: refresh the score of indexed keys only, never index a miss
+                pipe.zadd(index_key, {key: now}, xx=True)
+                value, _ = pipe.execute()
+                if value is None:
+                    # Expired by its TTL: drop the stale member so index_size stays accurate
+                    self.redis_client.zrem(index_key, key)
+                return value
+            except Exception as e:
+                logger.error(f"Redis get failed: {e}")
+                self.redis_available = False
+        
+        # Fallback to memory cache
+        value = self.get(key)
+        lru = _memory_indexes.get(index_key)
+        if lru is not None and key in lru:
+            if value is None:
+                lru.pop(key, None)
+            else:
+                lru[key] = now
+                lru.move_to_end(key)
+        return value
+    
+    def set_bounded(self, key: str, value: bytes, ex: int, index_key: str, max_size: int) -> int:
+        """Set a value, index it by access time and evict LRU keys beyond ``max_size``
+        
+        Returns the number of evicted entries.
+        """
+        now = time.time()
+        if self.redis_available:
+            try:
+                return int(self._set_and_evict(keys=[key, index_key], args=[value, int(ex), now, int(max_size)]))
+            except Exception as e:
+                logger.error(f"Redis set failed: {e}")
+                self.redis_available = False
+        
+        # Fallback to memory cache
+        self.set(key, value, ex=ex)
+        lru = _memory_indexes.setdefault(index_key, OrderedDict())
+        lru[key] = now
+        lru.move_to_end(key)
+        evicted = 0
+        while len(lru) > max_size:
+            old_key, _ = lru.popitem(last=False)
+            if _memory_cache.pop(old_key, None) is not None:
+                evicted += 1
+            _cache_timestamps.pop(old_key, None)
+        return evicted
+    
+    def index_size(self, index_key: str) -> int:
+        """Number of keys in an access index (O(1))"""
+        if self.redis_available:
+            try:
+                return int(self.redis_client.zcard(index_key))
+            except Exception as e:
+                logger.error(f"Redis zcard failed: {e}")
+                self.redis_available = False
+        return len(_memory_indexes.get(index_key, ()))
+    
+    def scan(self, pattern: str = "*", count: int = 500) -> Iterator[str]:
+        """Iterate keys matching pattern with SCAN (never blocks the server like KEYS)"""
+        if self.redis_available:
+            try:
+                for key in self.redis_client.scan_iter(match=pattern, count=count):
+                    yield key.decode() if isinstance(key, bytes) else key
+                return
+            except Exception as e:
+                logger.error(f"Redis scan failed: {e}")
+                self.redis_available = False
+        
+        # Fallback to memory cache
+        import fnmatch
+        for key in [k for k in _memory_cache.keys() if fnmatch.fnmatch(k, pattern)]:
+            yield key
     
     def keys(self, pattern: str = "*") -> List[str]:
         """Get keys matching pattern"""
+        return list(self.scan(pattern))
+    
+    def delete_many(self, keys: List[str], index_key: Optional[str] = None) -> int:
+        """Delete keys (and drop them from ``index_key``) in one round-trip"""
+        if not keys:
+            return 0
         if self.redis_available:
             try:
-                return [key.decode() if isinstance(key, bytes) else key 
-                       for key in self.redis_client.keys(pattern)]
+                pipe = self.redis_client.pipeline(transaction=False)
+                pipe.delete(*keys)
+                if index_key:
+                    pipe.zrem(index_key, *keys)
+                return int(pipe.execute()[0])
             except Exception as e:
-                logger.error(f"Redis keys failed: {e}")
+                logger.error(f"Redis delete failed: {e}")
                 self.redis_available = False
         
         # Fallback to memory cache
-        import fnmatch
-        return [key for key in _memory_cache.keys() if fnmatch.fnmatch(key, pattern)]
+        lru = _memory_indexes.get(index_key) if index_key else None
+        deleted = 0
+        for key in keys:
+            if _memory_cache.pop(key, None) is not None:
+                deleted += 1
+            _cache_timestamps.pop(key, None)
+            if lru is not None:
+                lru.pop(key, None)
+        return deleted
 
 class EnterpriseCacheManager:
     """Enterprise-grade caching system with intelligent strategies"""
@@ -163,6 +343,8 @@ class EnterpriseCacheManager:
         self.default_ttl = 3600  # 1 hour
         self.max_cache_size = 1000  # Maximum number of cached items
         self.cache_prefix = "vaultmind_cache:"
+        # Sorted set of cached keys scored by last access (outside the key prefix)
+        self.index_key = "vaultmind_cache_lru"
         
         # Cache statistics
         self.stats = {
@@ -170,6 +352,7 @@ class EnterpriseCacheManager:
             "misses": 0,
             "sets": 0,
             "deletes": 0,
+            "evictions": 0,
             "errors": 0
         }
     
@@ -191,38 +374,30 @@ class EnterpriseCacheManager:
         try:
             cache_key = self.get_cache_key(query, context, model_params)
             
-            if not self.connection.exists(cache_key):
+            # Read and refresh the entry's LRU position in one round-trip
+            cached_data = self.connection.get_and_touch(cache_key, self.index_key)
+            if cached_data is None:
                 self.stats["misses"] += 1
                 return None
             
-            cached_data = self.connection.get(cache_key)
-            if cached_data is None:
+            # Deserialize cache entry (legacy pickled entries are never loaded)
+            cache_entry = decode_cache_entry(cached_data)
+            if cache_entry is None:
+                self.connection.delete_many([cache_key], self.index_key)
                 self.stats["misses"] += 1
                 return None
             
-            # Deserialize cache entry
-            cache_entry = pickle.loads(cached_data)
-            
             # Check if expired
-            if cache_entry.is_expired():
-                self.connection.delete(cache_key)
+            expires_at = cache_entry.get("expires_at")
+            if expires_at is not None and time.time() > expires_at:
+                self.connection.delete_many([cache_key], self.index_key)
                 self.stats["misses"] += 1
                 return None
             
-            # Update access statistics
-            cache_entry.update_access()
-            
-            # Re-save with updated stats
-            self.connection.set(
-                cache_key, 
-                pickle.dumps(cache_entry), 
-                ex=int((cache_entry.expires_at - datetime.now()).total_seconds()) if cache_entry.expires_at else None
-            )
-            
             self.stats["hits"] += 1
             logger.info(f"Cache hit for query: {query[:50]}...")
             
-            return cache_entry.data
+            return cache_entry.get("data")
             
         except Exception as e:
             logger.error(f"Cache retrieval failed: {e}")
@@ -243,34 +418,30 @@ class EnterpriseCacheManager:
             ttl = ttl or self.default_ttl
             
             # Create cache entry
-            cache_entry = CacheEntry(
-                data=response,
-                created_at=datetime.now(),
-                expires_at=datetime.now() + timedelta(seconds=ttl),
-                cache_key=cache_key,
-                metadata={
+            now = time.time()
+            cache_entry = {
+                "data": response,
+                "created_at": now,
+                "expires_at": now + ttl,
+                "cache_key": cache_key,
+                "metadata": {
                     "query_length": len(query),
                     "context_length": len(context),
                     "response_type": response.get("answer_type", "unknown"),
                     "model_params": model_params or {}
                 }
-            )
+            }
             
-            # Serialize and store
-            serialized_entry = pickle.dumps(cache_entry)
-            success = self.connection.set(cache_key, serialized_entry, ex=ttl)
+            # Serialize, store and evict least recently used entries past the bound
+            evicted = self.connection.set_bounded(
+                cache_key, encode_cache_entry(cache_entry), ttl, self.index_key, self.max_cache_size
+            )
             
-            if success:
-                self.stats["sets"] += 1
-                logger.info(f"Cached response for query: {query[:50]}...")
-                
-                # Cleanup old entries if cache is getting large
-                self._cleanup_cache_if_needed()
-                
-                return True
-            else:
-                self.stats["errors"] += 1
-                return False
+            self.stats["sets"] += 1
+            if evicted:
+                self.stats["evictions"] += evicted
+            logger.info(f"Cached response for query: {query[:50]}...")
+            return True
                 
         except Exception as e:
             logger.error(f"Cache storage failed: {e}")
@@ -285,12 +456,14 @@ class EnterpriseCacheManager:
             elif not pattern.startswith(self.cache_prefix):
                 pattern = f"{self.cache_prefix}*{pattern}*"
             
-            keys = self.connection.keys(pattern)
             deleted_count = 0
-            
-            for key in keys:
-                if self.connection.delete(key):
-                    deleted_count += 1
+            batch = []
+            for key in self.connection.scan(pattern):
+                batch.append(key)
+                if len(batch) >= 500:
+                    deleted_count += self.connection.delete_many(batch, self.index_key)
+                    batch = []
+            deleted_count += self.connection.delete_many(batch, self.index_key)
             
             self.stats["deletes"] += deleted_count
             logger.info(f"Invalidated {deleted_count} cache entries")
@@ -329,51 +502,13 @@ class EnterpriseCacheManager:
         logger.info(f"Cache warming completed: {warmed_count} entries added")
         return warmed_count
     
-    def _cleanup_cache_if_needed(self):
-        """Clean up old cache entries if cache is getting large"""
-        try:
-            all_keys = self.connection.keys(f"{self.cache_prefix}*")
-            
-            if len(all_keys) <= self.max_cache_size:
-                return
-            
-            # Get cache entries with access information
-            entries_with_access = []
-            
-            for key in all_keys:
-                try:
-                    cached_data = self.connection.get(key)
-                    if cached_data:
-                        cache_entry = pickle.loads(cached_data)
-                        entries_with_access.append((key, cache_entry))
-                except Exception:
-                    # If we can't deserialize, mark for deletion
-                    self.connection.delete(key)
-            
-            # Sort by last accessed time and access count
-            entries_with_access.sort(
-                key=lambda x: (x[1].last_accessed or x[1].created_at, x[1].access_count)
-            )
-            
-            # Delete oldest entries
-            entries_to_delete = len(entries_with_access) - self.max_cache_size + 100  # Delete extra for buffer
-            
-            for i in range(min(entries_to_delete, len(entries_with_access))):
-                key, _ = entries_with_access[i]
-                self.connection.delete(key)
-            
-            logger.info(f"Cleaned up {entries_to_delete} old cache entries")
-            
-        except Exception as e:
-            logger.error(f"Cache cleanup failed: {e}")
-    
     def get_cache_stats(self) -> Dict[str, Any]:
         """Get cache performance statistics"""
         total_requests = self.stats["hits"] + self.stats["misses"]
         hit_rate = (self.stats["hits"] / total_requests * 100) if total_requests > 0 else 0
         
         try:
-            cache_size = len(self.connection.keys(f"{self.cache_prefix}*"))
+            cache_size = self.connection.index_size(self.index_key)
         except Exception:
             cache_size = 0
         
@@ -383,6 +518,7 @@ class EnterpriseCacheManager:
             "total_misses": self.stats["misses"],
             "total_sets": self.stats["sets"],
             "total_deletes": self.stats["deletes"],
+            "total_evictions": self.stats["evictions"],
             "total_errors": self.stats["errors"],
             "cache_size": cache_size,
             "redis_available": self.connection.redis_available
@@ -11,8 +11,11 @@ from pathlib import Path
 import json
 import re
 import time
+from concurrent.futures import ThreadPoolExecutor, wait
 from dataclasses import dataclass
 
+from utils.sparse_keyword_index import INDEX_DIRNAME, SparseKeywordIndex, corpus_signature
+
 logger = logging.getLogger(__name__)
 
 @dataclass
@@ -29,84 +32,52 @@ class SearchResult:
     metadata: Dict[str, Any] = None
 
 class BM25Retriever:
-    """Simple BM25 keyword retriever implementation"""
+    """BM25 keyword retriever backed by a postings index (see utils.sparse_keyword_index)"""
     
-    def __init__(self, documents: List[Dict[str, Any]], k1: float = 1.2, b: float = 0.75):
+    def __init__(self, documents: List[Dict[str, Any]], k1: float = 1.2, b: float = 0.75,
+                 index_dir: Optional[Path] = None, signature: Any = None):
         self.documents = documents
         self.k1 = k1
         self.b = b
-        self.doc_lengths = [len(doc['content'].split()) for doc in documents]
-        self.avg_doc_length = sum(self.doc_lengths) / len(self.doc_lengths) if documents else 0
-        self.term_frequencies = self._build_term_frequencies()
-        self.document_frequencies = self._build_document_frequencies()
         self.num_docs = len(documents)
-    
-    def _build_term_frequencies(self) -> List[Dict[str, int]]:
-        """Build term frequency maps for each document"""
-        tf_maps = []
-        for doc in self.documents:
-            words = doc['content'].lower().split()
-            tf_map = {}
-            for word in words:
-                tf_map[word] = tf_map.get(word, 0) + 1
-            tf_maps.append(tf_map)
-        return tf_maps
-    
-    def _build_document_frequencies(self) -> Dict[str, int]:
-        """Build document frequency map for all terms"""
-        df_map = {}
-        for tf_map in self.term_frequencies:
-            for term in tf_map.keys():
-                df_map[term] = df_map.get(term, 0) + 1
-        return df_map
+        texts = [doc['content'] for doc in documents]
+        if index_dir is not None and signature is not None:
+            # Reuse the index persisted next to the source files when the corpus is unchanged
+            self.index = SparseKeywordIndex.load_or_build(index_dir, texts, signature, k1=k1, b=b)
+        else:
+            self.index = SparseKeywordIndex.build(texts, k1=k1, b=b)
     
     def search(self, query: str, k: int = 10) -> List[Tuple[int, float]]:
-        """Search documents using BM25 scoring"""
-        query_terms = query.lower().split()
-        scores = []
-        
-        for doc_idx, (doc, tf_map, doc_length) in enumerate(zip(
-            self.documents, self.term_frequencies, self.doc_lengths
-        )):
-            score = 0.0
-            
-            for term in query_terms:
-                if term in tf_map:
-                    tf = tf_map[term]
-                    df = self.document_frequencies.get(term, 0)
-                    
-                    # BM25 formula
-                    idf = max(0.01, (self.num_docs - df + 0.5) / (df + 0.5))
-                    tf_component = (tf * (self.k1 + 1)) / (
-                        tf + self.k1 * (1 - self.b + self.b * (doc_length / self.avg_doc_length))
-                    )
-                    score += idf * tf_component
-            
-            scores.append((doc_idx, score))
-        
-        # Sort by score and return top k
-        scores.sort(key=lambda x: x[1], reverse=True)
-        return scores[:k]
+        """Search documents using BM25 scoring (only documents sharing a query term)"""
+        return self.index.search(query, k)
+    
+    def overlap_search(self, query: str, k: int = 10, mode: str = "jaccard") -> List[Tuple[int, float]]:
+        """Distinct-term overlap scoring over the same postings"""
+        return self.index.overlap_search(query, k, mode)
 
 class CrossEncoderReranker:
-    """Cross-encoder re-ranker for improving search precision"""
+    """Cross-encoder re-ranker for improving search precision
     
-    def __init__(self, model_name: str = "cross-encoder/ms-marco-MiniLM-L-6-v2"):
+    Thin adapter over the process-wide reranker service (see utils.reranker_service),
+    so every caller shares one model, one batching queue and one score cache.
+    """
+    
+    def __init__(self, model_name: Optional[str] = None):
         self.model_name = model_name
-        self.model = None
-        self.tokenizer = None
+        self.service = None
         self._load_model()
     
+    @property
+    def model(self):
+        return self.service.model if self.service is not None else None
+    
     def _load_model(self):
-        """Load the cross-encoder model"""
+        """Attach to the shared cross-encoder service"""
         try:
-            from transformers import AutoTokenizer, AutoModelForSequenceClassification
-            import torch
-            
-            self.tokenizer = AutoTokenizer.from_pretrained(self.model_name)
-            self.model = AutoModelForSequenceClassification.from_pretrained(self.model_name)
-            self.torch = torch
-            logger.info(f"Loaded cross-encoder model: {self.model_name}")
+            from utils.reranker_service import get_reranker_service
+            self.service = get_reranker_service(self.model_name)
+            # None resolves to RERANKER_MODEL_NAME (or the service default)
+            self.model_name = self.service.model_name
         except ImportError:
             logger.warning("Transformers not available, re-ranking will use fallback scoring")
         except Exception as e:
@@ -114,29 +85,15 @@ class CrossEncoderReranker:
     
     def rerank(self, query: str, results: List[SearchResult], top_k: int = 10) -> List[SearchResult]:
         """Re-rank search results using cross-encoder"""
-        if not self.model or not results:
+        if self.service is None or not results:
             return results[:top_k]
         
         try:
-            # Prepare query-document pairs
-            pairs = [[query, result.content] for result in results]
-            
-            # Tokenize
-            features = self.tokenizer(
-                pairs, 
-                padding=True, 
-                truncation=True, 
-                return_tensors="pt", 
-                max_length=512
-            )
-            
-            # Get scores
-            with self.torch.no_grad():
-                scores = self.model(**features).logits.squeeze()
+            scores = self.service.score(query, [result.content for result in results])
             
             # Update results with rerank scores
-            for i, result in enumerate(results):
-                result.rerank_score = float(scores[i]) if scores.dim() > 0 else float(scores)
+            for result, score in zip(results, scores):
+                result.rerank_score = float(score)
             
             # Sort by rerank score
             reranked = sorted(results, key=lambda x: x.rerank_score, reverse=True)
@@ -145,6 +102,28 @@ class CrossEncoderReranker:
         except Exception as e:
             logger.error(f"Re-ranking failed: {e}")
             return results[:top_k]
+    
+    def rerank_many(self, queries: List[str], result_lists: List[List[SearchResult]],
+                    top_k: int = 10, timeout: Optional[float] = None) -> List[List[SearchResult]]:
+        """Re-rank the candidates of several queries with one batched cross-encoder call"""
+        if self.service is None:
+            return [results[:top_k] for results in result_lists]
+        
+        pairs = [(query, result.content) for query, results in zip(queries, result_lists) for result in results]
+        try:
+            scores = self.service.score_pairs(pairs, timeout=timeout if timeout is not None else 60.0)
+        except Exception as e:
+            logger.error(f"Re-ranking failed: {e}")
+            return [results[:top_k] for results in result_lists]
+        
+        reranked_lists = []
+        offset = 0
+        for results in result_lists:
+            for result, score in zip(results, scores[offset:offset + len(results)]):
+                result.rerank_score = float(score)
+            offset += len(results)
+            reranked_lists.append(sorted(results, key=lambda x: x.rerank_score, reverse=True)[:top_k])
+        return reranked_lists
 
 class EnterpriseHybridSearch:
     """Enterprise hybrid search combining vector and keyword search with re-ranking"""
@@ -153,35 +132,25 @@ class EnterpriseHybridSearch:
         self.vector_weight = vector_weight
         self.keyword_weight = keyword_weight
         self.reranker = CrossEncoderReranker()
-        self.bm25_retrievers = {}  # Cache BM25 retrievers per index
+        # index name -> (corpus signature, documents, BM25Retriever); rebuilt when source files change
+        self._corpora: Dict[str, Tuple[Any, List[Dict[str, Any]], BM25Retriever]] = {}
     
     def search(self, query: str, index_name: str, max_results: int = 10) -> List[SearchResult]:
         """Perform hybrid search with re-ranking"""
         try:
-            # Step 1: Get documents from index
-            documents = self._load_documents_from_index(index_name)
+            # Step 1: Get documents (and their keyword index) from index
+            documents, bm25 = self._get_corpus(index_name)
             if not documents:
                 return []
             
-            # Step 2: Vector search
-            vector_results = self._vector_search(query, documents, max_results * 2)
-            
-            # Step 3: Keyword search
-            keyword_results = self._keyword_search(query, index_name, documents, max_results * 2)
-            
-            # Step 4: Combine results
-            combined_results = self._combine_results(vector_results, keyword_results)
+            # Steps 2-4: Vector and keyword search, combined
+            combined_results = self._candidates(query, index_name, documents, bm25, max_results * 2)
             
             # Step 5: Re-rank using cross-encoder
             final_results = self.reranker.rerank(query, combined_results, max_results)
             
             # Step 6: Calculate final scores
-            for result in final_results:
-                result.final_score = (
-                    self.vector_weight * result.vector_score +
-                    self.keyword_weight * result.keyword_score +
-                    0.3 * result.rerank_score  # Re-rank boost
-                )
+            self._apply_final_scores(final_results)
             
             logger.info(f"Hybrid search completed: {len(final_results)} results for '{query}'")
             return final_results
@@ -190,26 +159,129 @@ class EnterpriseHybridSearch:
             logger.error(f"Hybrid search failed: {e}")
             return []
     
+    def search_many(self, queries: List[str], index_name: str, max_results: int = 10,
+                    max_workers: int = 4, timeout: Optional[float] = None) -> List[List[SearchResult]]:
+        """Hybrid search for several query variants against one index
+        
+        The corpus and its keyword index are resolved once and shared by every
+        variant; candidates are generated concurrently on a bounded pool and all
+        variants are re-ranked in a single cross-encoder batch. Variants that
+        fail or miss the overall ``timeout`` (seconds) come back as empty lists.
+        """
+        outputs: List[List[SearchResult]] = [[] for _ in queries]
+        if not queries:
+            return outputs
+        deadline = time.monotonic() + timeout if timeout else None
+        try:
+            documents, bm25 = self._get_corpus(index_name)
+            if not documents:
+                return outputs
+            
+            candidates: Dict[int, List[SearchResult]] = {}
+            executor = ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(queries))),
+                                          thread_name_prefix="hybrid-variant")
+            try:
+                futures = {
+                    executor.submit(self._candidates, query, index_name, documents, bm25, max_results * 2): i
+                    for i, query in enumerate(queries)
+                }
+                remaining = max(0.0, deadline - time.monotonic()) if deadline else None
+                done, not_done = wait(futures, timeout=remaining)
+                for future in done:
+                    try:
+                        candidates[futures[future]] = future.result()
+                    except Exception as e:
+                        logger.error(f"Hybrid search failed for '{queries[futures[future]]}': {e}")
+                if not_done:
+                    logger.warning(f"{len(not_done)} of {len(queries)} query variants missed the "
+                                   f"{timeout}s deadline on {index_name}")
+            finally:
+                # Do not wait for variants that missed the deadline
+                executor.shutdown(wait=False, cancel_futures=True)
+            
+            order = sorted(candidates)
+            remaining = max(0.0, deadline - time.monotonic()) if deadline else None
+            reranked = self.reranker.rerank_many([queries[i] for i in order],
+                                                 [candidates[i] for i in order],
+                                                 max_results, timeout=remaining)
+            for i, final_results in zip(order, reranked):
+                self._apply_final_scores(final_results)
+                outputs[i] = final_results
+            
+            logger.info(f"Hybrid search completed for {len(order)}/{len(queries)} query variants on {index_name}")
+            return outputs
+            
+        except Exception as e:
+            logger.error(f"Hybrid multi-query search failed: {e}")
+            return outputs
+    
+    def _candidates(self, query: str, index_name: str, documents: List[Dict[str, Any]],
+                    bm25: Optional[BM25Retriever], k: int) -> List[SearchResult]:
+        """Combined vector and keyword candidates for one query"""
+        vector_results = self._vector_search(query, documents, k, bm25)
+        keyword_results = self._keyword_search(query, index_name, documents, k)
+        return self._combine_results(vector_results, keyword_results)
+    
+    def _apply_final_scores(self, results: List[SearchResult]) -> None:
+        for result in results:
+            result.final_score = (
+                self.vector_weight * result.vector_score +
+                self.keyword_weight * result.keyword_score +
+                0.3 * result.rerank_score  # Re-rank boost
+            )
+    
+    def _index_source_files(self, index_name: str) -> Tuple[Optional[Path], List[Path]]:
+        """Index directory and the text files its documents are loaded from"""
+        from utils.simple_vector_manager import get_simple_index_path
+        
+        index_path = get_simple_index_path(index_name)
+        if not index_path:
+            return None, []
+        index_path = Path(index_path)
+        files = []
+        extracted_text_path = index_path / "extracted_text.txt"
+        if extracted_text_path.exists():
+            files.append(extracted_text_path)
+        for file_path in sorted(index_path.glob("*.txt")):
+            if file_path.name != "extracted_text.txt" and file_path.name != "index.meta":
+                files.append(file_path)
+        return index_path, files
+    
+    def _get_corpus(self, index_name: str) -> Tuple[List[Dict[str, Any]], Optional[BM25Retriever]]:
+        """Documents and BM25 index for an index, reloaded only when its source files change"""
+        try:
+            index_path, files = self._index_source_files(index_name)
+            if index_path is None:
+                return [], None
+            signature = corpus_signature(files, extra="enterprise_hybrid")
+            cached = self._corpora.get(index_name)
+            if cached and cached[0] == signature:
+                return cached[1], cached[2]
+            
+            documents = self._load_documents_from_index(index_name)
+            if not documents:
+                return [], None
+            bm25 = BM25Retriever(documents, index_dir=index_path / INDEX_DIRNAME / "hybrid",
+                                 signature=signature)
+            self._corpora[index_name] = (signature, documents, bm25)
+            return documents, bm25
+        except Exception as e:
+            logger.error(f"Failed to prepare keyword index for {index_name}: {e}")
+            return self._load_documents_from_index(index_name), None
+    
     def _load_documents_from_index(self, index_name: str) -> List[Dict[str, Any]]:
         """Load documents from the specified index"""
         try:
-            from utils.simple_vector_manager import get_simple_index_path
-            
-            index_path = get_simple_index_path(index_name)
-            if not index_path:
+            index_path, files = self._index_source_files(index_name)
+            if index_path is None:
                 return []
             
-            index_path = Path(index_path)
             documents = []
-            
-            # Load from extracted_text.txt if available
-            extracted_text_path = index_path / "extracted_text.txt"
-            if extracted_text_path.exists():
-                documents.extend(self._load_from_extracted_text(extracted_text_path))
-            
-            # Load from other text files
-            for file_path in index_path.glob("*.txt"):
-                if file_path.name != "extracted_text.txt" and file_path.name != "index.meta":
+            for file_path in files:
+                if file_path.name == "extracted_text.txt":
+                    # Page-structured extracted text
+                    documents.extend(self._load_from_extracted_text(file_path))
+                else:
                     documents.extend(self._load_from_text_file(file_path))
             
             return documents
@@ -279,36 +351,27 @@ class EnterpriseHybridSearch:
         
         return documents
     
-    def _vector_search(self, query: str, documents: List[Dict[str, Any]], k: int) -> List[SearchResult]:
+    def _vector_search(self, query: str, documents: List[Dict[str, Any]], k: int,
+                       bm25: Optional[BM25Retriever] = None) -> List[SearchResult]:
         """Perform vector similarity search"""
         results = []
         
         try:
-            # Simple TF-IDF based similarity for now
+            # Jaccard term overlap as a simple vector score, computed from the
+            # keyword postings so only documents sharing a query term are touched.
             # In production, you'd use proper embeddings
-            query_words = set(query.lower().split())
-            
-            for doc in documents:
-                doc_words = set(doc['content'].lower().split())
-                
-                # Jaccard similarity as a simple vector score
-                intersection = len(query_words & doc_words)
-                union = len(query_words | doc_words)
-                similarity = intersection / union if union > 0 else 0
-                
-                if similarity > 0:
-                    results.append(SearchResult(
-                        content=doc['content'],
-                        source=doc['source'],
-                        page=doc.get('page'),
-                        section=doc.get('section'),
-                        vector_score=similarity,
-                        metadata=doc
-                    ))
-            
-            # Sort by vector score
-            results.sort(key=lambda x: x.vector_score, reverse=True)
-            return results[:k]
+            bm25 = bm25 or BM25Retriever(documents)
+            for doc_idx, similarity in bm25.overlap_search(query, k, mode="jaccard"):
+                doc = documents[doc_idx]
+                results.append(SearchResult(
+                    content=doc['content'],
+                    source=doc['source'],
+                    page=doc.get('page'),
+                    section=doc.get('section'),
+                    vector_score=similarity,
+                    metadata=doc
+                ))
+            return results
             
         except Exception as e:
             logger.error(f"Vector search failed: {e}")
@@ -317,11 +380,12 @@ class EnterpriseHybridSearch:
     def _keyword_search(self, query: str, index_name: str, documents: List[Dict[str, Any]], k: int) -> List[SearchResult]:
         """Perform BM25 keyword search"""
         try:
-            # Get or create BM25 retriever for this index
-            if index_name not in self.bm25_retrievers:
-                self.bm25_retrievers[index_name] = BM25Retriever(documents)
-            
-            bm25 = self.bm25_retrievers[index_name]
+            # Reuse the BM25 index built for this index's corpus
+            cached = self._corpora.get(index_name)
+            if cached and cached[1] is documents:
+                bm25 = cached[2]
+            else:
+                bm25 = BM25Retriever(documents)
             bm25_results = bm25.search(query, k)
             
             results = []
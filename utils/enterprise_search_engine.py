@@ -12,6 +12,8 @@ from pathlib import Path
 import logging
 from datetime import datetime
 
+from utils.sparse_keyword_index import INDEX_DIRNAME, SparseKeywordIndex, corpus_signature
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -45,6 +47,8 @@ class EnterpriseSearchEngine:
             'keyword': self._keyword_search,
             'contextual': self._contextual_search
         }
+        # index path -> (corpus signature, documents, keyword index)
+        self._corpora: Dict[str, tuple] = {}
     
     def search(self, query: str, index_name: str, strategy: str = 'comprehensive', 
                max_results: int = 10) -> List[EnterpriseSearchResult]:
@@ -58,8 +62,8 @@ class EnterpriseSearchEngine:
             logger.error(f"Index not found: {index_name}")
             return []
         
-        # Load and process documents
-        documents = self._load_documents(index_path)
+        # Load and process documents (cached until the index's source files change)
+        documents = self._get_documents(index_path)
         if not documents:
             return []
         
@@ -70,6 +74,39 @@ class EnterpriseSearchEngine:
         logger.info(f"Enterprise search for '{query}' in {index_name}: {len(results)} results")
         return results
     
+    @staticmethod
+    def _source_files(index_path: Path) -> List[Path]:
+        return sorted(p for p in index_path.glob("*")
+                      if p.is_file() and p.suffix.lower() in ['.txt', '.md', '.html'])
+    
+    def _get_documents(self, index_path: str) -> List[Dict[str, Any]]:
+        """Documents for an index, with a persisted keyword index built alongside"""
+        index_dir = Path(index_path)
+        signature = corpus_signature(self._source_files(index_dir), extra="enterprise_engine")
+        cached = self._corpora.get(str(index_dir))
+        if cached and cached[0] == signature:
+            return cached[1]
+        
+        documents = self._load_documents(index_path)
+        keyword_index = None
+        if documents:
+            try:
+                keyword_index = SparseKeywordIndex.load_or_build(
+                    index_dir / INDEX_DIRNAME / "engine",
+                    [doc['content'] for doc in documents],
+                    signature
+                )
+            except Exception as e:
+                logger.warning(f"Keyword index unavailable for {index_path}: {e}")
+        self._corpora[str(index_dir)] = (signature, documents, keyword_index)
+        return documents
+    
+    def _keyword_index_for(self, documents: List[Dict]) -> SparseKeywordIndex:
+        for _, cached_docs, keyword_index in self._corpora.values():
+            if cached_docs is documents and keyword_index is not None:
+                return keyword_index
+        return SparseKeywordIndex.build([doc['content'] for doc in documents])
+    
     def _load_documents(self, index_path: str) -> List[Dict[str, Any]]:
         """Load documents from index path"""
         documents = []
@@ -287,28 +324,20 @@ class EnterpriseSearchEngine:
     def _keyword_search(self, query: str, documents: List[Dict], max_results: int) -> List[EnterpriseSearchResult]:
         """Traditional keyword-based search"""
         results = []
-        query_terms = set(query.lower().split())
         
-        for doc in documents:
-            content = doc['content']
-            content_words = set(content.lower().split())
-            
-            # Calculate keyword overlap
-            overlap = len(query_terms.intersection(content_words))
-            if overlap > 0:
-                relevance = overlap / len(query_terms)
-                
-                result = EnterpriseSearchResult(
-                    content=content,
-                    source=doc.get('source', 'Unknown'),
-                    relevance=relevance,
-                    page=doc.get('page'),
-                    section=doc.get('section')
-                )
-                results.append(result)
+        # Share of distinct query terms present, read from the keyword postings
+        keyword_index = self._keyword_index_for(documents)
+        for doc_idx, relevance in keyword_index.overlap_search(query, max_results, mode="coverage"):
+            doc = documents[doc_idx]
+            results.append(EnterpriseSearchResult(
+                content=doc['content'],
+                source=doc.get('source', 'Unknown'),
+                relevance=relevance,
+                page=doc.get('page'),
+                section=doc.get('section')
+            ))
         
-        results.sort(key=lambda x: x.relevance, reverse=True)
-        return results[:max_results]
+        return results
     
     def _contextual_search(self, query: str, documents: List[Dict], max_results: int) -> List[EnterpriseSearchResult]:
         """Context-aware search considering document structure"""
@@ -0,0 +1,168 @@
+"""
+FAISS Metadata Filter Index
+Columnar inverted index over collection metadata for pre-filtered vector search
+
+Each ``field -> value`` pair maps to the row ids (FAISS ids) carrying that
+value. A filter dict is evaluated into a boolean row bitmap before the vector
+search runs, so the search only ever considers matching rows:
+
+    {"source_type": "pdf", "tab": ["bylaws", "policies"]}
+        -> rows(source_type=pdf) AND (rows(tab=bylaws) OR rows(tab=policies))
+
+Top-level metadata fields are indexed, plus the keys of the nested
+``metadata`` dict (top-level wins on name clashes). List values are indexed
+element-wise, so a filter matches if any element matches. Rows without the
+filtered field do not match. ``row_matches`` applies the same rules to a
+single row, for filters the bitmap cannot evaluate.
+"""
+
+import logging
+from typing import Any, Dict, Hashable, Iterable, List, Optional
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+    np = None
+
+logger = logging.getLogger(__name__)
+
+# Fields that are unique per row and not useful as filters
+_SKIP_FIELDS = {"created_at"}
+_NESTED_FIELD = "metadata"
+
+
+def _indexable_values(value: Any) -> List[Hashable]:
+    if isinstance(value, (list, tuple, set)):
+        return [v for v in value if isinstance(v, Hashable) and not isinstance(v, (list, dict))]
+    if isinstance(value, dict) or value is None:
+        return []
+    return [value] if isinstance(value, Hashable) else []
+
+
+def _row_fields(meta: Dict[str, Any]) -> Dict[str, Any]:
+    """Flatten a metadata row into the fields used for filtering."""
+    fields: Dict[str, Any] = {}
+    nested = meta.get(_NESTED_FIELD)
+    if isinstance(nested, dict):
+        fields.update(nested)
+    for key, value in meta.items():
+        if key != _NESTED_FIELD:
+            fields[key] = value
+    return fields
+
+
+def _as_values(value: Any) -> List[Any]:
+    return list(value) if isinstance(value, (list, tuple, set)) else [value]
+
+
+def row_matches(meta: Dict[str, Any], filters: Dict[str, Any]) -> bool:
+    """True if a metadata row passes ``filters`` (same semantics as ``MetadataBitmapIndex.evaluate``)."""
+    fields = _row_fields(meta or {})
+    for field, value in filters.items():
+        if field not in fields:
+            return False
+        row_values = _as_values(fields[field])
+        if not any(wanted == row_value for wanted in _as_values(value) for row_value in row_values):
+            return False
+    return True
+
+
+class MetadataBitmapIndex:
+    """Inverted ``field -> value -> row ids`` index with bitmap evaluation."""
+
+    def __init__(self):
+        self._postings: Dict[str, Dict[Hashable, List[int]]] = {}
+        # Materialized numpy id arrays, rebuilt lazily after appends
+        self._arrays: Dict[tuple, "np.ndarray"] = {}
+        self._deleted = np.zeros(0, dtype=bool)
+        self.row_count = 0
+
+    @classmethod
+    def from_metadata(cls, metadata: List[Dict[str, Any]]) -> "MetadataBitmapIndex":
+        index = cls()
+        index.add_rows(0, metadata)
+        return index
+
+    def add_rows(self, start_row: int, rows: Iterable[Dict[str, Any]]) -> None:
+        """Index metadata rows whose ids start at ``start_row``."""
+        row = start_row
+        deleted_rows = []
+        for meta in rows:
+            for field, value in _row_fields(meta or {}).items():
+                if field in _SKIP_FIELDS or field == "deleted":
+                    continue
+                for v in _indexable_values(value):
+                    self._postings.setdefault(field, {}).setdefault(v, []).append(row)
+                    self._arrays.pop((field, v), None)
+            if (meta or {}).get("deleted"):
+                deleted_rows.append(row)
+            row += 1
+        self.row_count = max(self.row_count, row)
+        self._grow(self.row_count)
+        if deleted_rows:
+            self.mark_deleted(deleted_rows)
+
+    def _grow(self, size: int) -> None:
+        if len(self._deleted) < size:
+            grown = np.zeros(max(size, 2 * len(self._deleted)), dtype=bool)
+            grown[:len(self._deleted)] = self._deleted
+            self._deleted = grown
+
+    def mark_deleted(self, rows: Iterable[int]) -> None:
+        rows = np.asarray(list(rows), dtype=np.int64)
+        if len(rows):
+            self._grow(int(rows.max()) + 1)
+            self._deleted[rows] = True
+
+    def _ids(self, field: str, value: Hashable) -> Optional["np.ndarray"]:
+        key = (field, value)
+        arr = self._arrays.get(key)
+        if arr is None:
+            rows = self._postings.get(field, {}).get(value)
+            if rows is None:
+                return None
+            arr = np.asarray(rows, dtype=np.int64)
+            self._arrays[key] = arr
+        return arr
+
+    def can_evaluate(self, filters: Dict[str, Any]) -> bool:
+        """True if every filter is on an indexed field with a scalar or a list of scalars."""
+        for field, value in filters.items():
+            if field in _SKIP_FIELDS or field == "deleted":
+                return False
+            if isinstance(value, dict):
+                return False
+            if isinstance(value, (list, tuple, set)):
+                if not all(isinstance(v, Hashable) for v in value):
+                    return False
+            elif not isinstance(value, Hashable):
+                return False
+        return True
+
+    def evaluate(self, filters: Dict[str, Any]) -> "np.ndarray":
+        """Evaluate filters into a bitmap of live matching rows."""
+        mask = ~self._deleted[:self.row_count]
+        for field, value in filters.items():
+            values = value if isinstance(value, (list, tuple, set)) else [value]
+            field_mask = np.zeros(self.row_count, dtype=bool)
+            for v in values:
+                ids = self._ids(field, v)
+                if ids is not None:
+                    field_mask[ids] = True
+            mask &= field_mask
+            if not mask.any():
+                break
+        return mask
+
+    def matching_ids(self, filters: Dict[str, Any]) -> "np.ndarray":
+        """Row ids that pass all filters (ascending)."""
+        return np.flatnonzero(self.evaluate(filters)).astype(np.int64)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "rows": self.row_count,
+            "fields": len(self._postings),
+            "distinct_values": sum(len(v) for v in self._postings.values()),
+        }
@@ -0,0 +1,391 @@
+"""
+FAISS Segment Store
+Incremental, append-only persistence for FAISS collections
+
+A collection directory holds one compacted *base* (FAISS index + metadata +
+documents) plus any number of append-only *segments* written since the last
+compaction. ``manifest.json`` lists the live files; it is the only file ever
+replaced in place, via write-to-temp + ``os.replace``, so a crash at any point
+leaves either the old or the new manifest and never a half-written collection.
+
+Layout::
+
+    manifest.json
+    base-000012.faiss / base-000012.meta.pkl / base-000012.chunks
+    seg-000013.npy / seg-000013.pkl
+    seg-000014.pkl                      (tombstone segment: deleted row ids only)
+
+Base document texts live in a memory-mapped chunk store (``.chunks``, see
+``utils.chunk_store``) so loading a collection does not pull every text into
+the Python heap; bases written before that used a pickled list
+(``.docs.pkl``), which is still read.
+
+Row ids are positions in the collection's metadata list; deleted rows keep
+their position (flagged ``deleted``) until a vacuum renumbers the collection.
+
+Collections written by older versions (``index.faiss`` + ``metadata.pkl`` +
+``documents.pkl`` without a manifest) are read as a base and upgraded on the
+first write.
+
+Query paths outside the adapter (VectorDBProvider, IndexManager, health
+checks) recognise a collection with ``is_collection_dir`` and read it with
+``load_collection``.
+"""
+
+import os
+import json
+import pickle
+import logging
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+try:
+    import faiss
+    import numpy as np
+    FAISS_AVAILABLE = True
+except ImportError:
+    FAISS_AVAILABLE = False
+    faiss = None
+    np = None
+
+from utils.chunk_store import ChunkTextList, open_chunk_store, write_chunk_store
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_NAME = "manifest.json"
+MANIFEST_FORMAT = 1
+
+# File names used by the pre-manifest full-rewrite format
+LEGACY_INDEX = "index.faiss"
+LEGACY_METADATA = "metadata.pkl"
+LEGACY_DOCUMENTS = "documents.pkl"
+
+
+def _fsync_write(path: Path, data: bytes) -> None:
+    """Write bytes to ``path`` via a temp file and atomic rename."""
+    tmp = path.with_name(path.name + ".tmp")
+    with open(tmp, "wb") as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+def is_id_mapped(index) -> bool:
+    """True if ``index`` assigns caller-provided ids (IndexIDMap / IndexIDMap2)."""
+    return isinstance(index, (faiss.IndexIDMap, faiss.IndexIDMap2))
+
+
+def _check_rows(index, metadata: List[Dict[str, Any]], where: Path) -> None:
+    """Raise unless every vector of ``index`` has a metadata row (row ids are metadata positions)."""
+    if is_id_mapped(index):
+        ids = faiss.vector_to_array(index.id_map)
+        consistent = not len(ids) or int(ids.max()) < len(metadata)
+    else:
+        consistent = index.ntotal == len(metadata)
+    if not consistent:
+        raise ValueError(f"FAISS collection {where} has {index.ntotal} vectors but {len(metadata)} "
+                         f"metadata rows; refusing to use it")
+
+
+class FAISSSegmentStore:
+    """Manifest-based storage for a single FAISS collection directory."""
+
+    def __init__(self, collection_dir: Path):
+        self.collection_dir = Path(collection_dir)
+
+    # ------------------------------------------------------------------ manifest
+    @property
+    def manifest_path(self) -> Path:
+        return self.collection_dir / MANIFEST_NAME
+
+    def exists(self) -> bool:
+        """True if the directory holds a manifest or a legacy index."""
+        return self.manifest_path.exists() or (self.collection_dir / LEGACY_INDEX).exists()
+
+    def signature(self) -> Optional[Tuple[int, int, int]]:
+        """Cheap change token: (inode, mtime_ns, size) of the manifest (or legacy index).
+
+        The manifest is replaced by rename on every write, so any rebuild or
+        append by another process changes the token.
+        """
+        for path in (self.manifest_path, self.collection_dir / LEGACY_INDEX):
+            try:
+                st = os.stat(path)
+                return (st.st_ino, st.st_mtime_ns, st.st_size)
+            except FileNotFoundError:
+                continue
+        return None
+
+    def read_manifest(self) -> Optional[Dict[str, Any]]:
+        """Return the current manifest, synthesizing one for legacy collections."""
+        if self.manifest_path.exists():
+            with open(self.manifest_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        if (self.collection_dir / LEGACY_INDEX).exists():
+            return {
+                "format": MANIFEST_FORMAT,
+                "version": 0,
+                "base": {
+                    "index": LEGACY_INDEX,
+                    "metadata": LEGACY_METADATA,
+                    "documents": LEGACY_DOCUMENTS,
+                    "count": None,
+                },
+                "segments": [],
+                "legacy": True,
+            }
+        return None
+
+    def _write_manifest(self, manifest: Dict[str, Any]) -> None:
+        manifest = dict(manifest)
+        manifest.pop("legacy", None)
+        manifest["format"] = MANIFEST_FORMAT
+        manifest["updated_at"] = datetime.now().isoformat()
+        _fsync_write(self.manifest_path, json.dumps(manifest, indent=2).encode("utf-8"))
+
+    # ------------------------------------------------------------------ reads
+    def load(self, create_index: Callable[[int], Any], dimension: int,
+             prepare_index: Optional[Callable[[Any], Any]] = None
+             ) -> Tuple[Optional[Any], List[Dict[str, Any]], ChunkTextList, Optional[Dict[str, Any]]]:
+        """Load base + segments.
+
+        ``prepare_index`` is applied to the base index before segments are
+        replayed (used to upgrade legacy indexes to ID-mapped ones). Rows of
+        tombstone segments are flagged ``deleted`` in the returned metadata;
+        removing their vectors is left to the caller.
+
+        Returns:
+            (index, metadata, documents, manifest); index is None if the
+            collection does not exist. ``documents`` maps the base texts and
+            holds only segment texts in memory.
+        """
+        manifest = self.read_manifest()
+        if manifest is None:
+            return None, [], ChunkTextList(), None
+
+        base = manifest.get("base")
+        metadata: List[Dict[str, Any]] = []
+        documents = ChunkTextList()
+        if base:
+            index = faiss.read_index(str(self.collection_dir / base["index"]))
+            metadata = self._read_pickle(base.get("metadata"), [])
+            # Segment rows are numbered after the base's, so they must line up
+            _check_rows(index, metadata, self.collection_dir)
+            documents = self.open_base_documents(manifest)
+        else:
+            index = create_index(int(manifest.get("dimension") or dimension))
+        if prepare_index is not None:
+            index = prepare_index(index)
+        id_mapped = is_id_mapped(index)
+
+        for seg in manifest.get("segments", []):
+            payload = self._read_pickle(f"{seg['name']}.pkl", {})
+            for row in payload.get("deleted", []):
+                if 0 <= row < len(metadata):
+                    metadata[row]["deleted"] = True
+            if not int(seg.get("count", 0)):
+                continue
+            vectors = np.ascontiguousarray(np.load(self.collection_dir / f"{seg['name']}.npy"), dtype=np.float32)
+            if len(payload.get("metadata", [])) != len(vectors):
+                raise ValueError(f"Segment {seg['name']} of {self.collection_dir} has {len(vectors)} vectors "
+                                 f"but {len(payload.get('metadata', []))} metadata rows")
+            if id_mapped:
+                ids = np.arange(len(metadata), len(metadata) + len(vectors), dtype=np.int64)
+                index.add_with_ids(vectors, ids)
+            else:
+                index.add(vectors)
+            metadata.extend(payload.get("metadata", []))
+            documents.extend(payload.get("documents", []))
+
+        return index, metadata, documents, manifest
+
+    def open_base_documents(self, manifest: Dict[str, Any]) -> ChunkTextList:
+        """Texts of the manifest's base: memory-mapped, or unpickled for older bases."""
+        base = manifest.get("base") or {}
+        if base.get("chunks"):
+            store = open_chunk_store(self.collection_dir / base["chunks"])
+            if store is not None:
+                return ChunkTextList(store.texts)
+            logger.warning(f"Chunk store {base['chunks']} missing in {self.collection_dir}; texts unavailable")
+            return ChunkTextList()
+        return ChunkTextList(self._read_pickle(base.get("documents"), []))
+
+    def _read_pickle(self, name: Optional[str], default):
+        if not name:
+            return default
+        path = self.collection_dir / name
+        if not path.exists():
+            return default
+        with open(path, "rb") as f:
+            return pickle.load(f)
+
+    def pending_rows(self, manifest: Optional[Dict[str, Any]] = None) -> int:
+        """Rows stored in segments that have not been compacted yet."""
+        manifest = manifest if manifest is not None else (self.read_manifest() or {})
+        return sum(int(s.get("count", 0)) for s in manifest.get("segments", []))
+
+    # ------------------------------------------------------------------ writes
+    def append_segment(self, vectors, metadata: List[Dict[str, Any]], documents: List[str]) -> Dict[str, Any]:
+        """Persist a batch as a new segment and publish it in the manifest.
+
+        Only the new rows are written, so the cost of an upsert is
+        proportional to the batch rather than the collection.
+        """
+        manifest = self.read_manifest()
+        if manifest is None:
+            raise FileNotFoundError(f"No FAISS collection at {self.collection_dir}")
+
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+        version = int(manifest.get("version", 0)) + 1
+        name = f"seg-{version:06d}"
+
+        tmp_npy = self.collection_dir / f"{name}.npy.tmp"
+        with open(tmp_npy, "wb") as f:
+            np.save(f, vectors)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_npy, self.collection_dir / f"{name}.npy")
+        _fsync_write(self.collection_dir / f"{name}.pkl",
+                     pickle.dumps({"metadata": metadata, "documents": documents},
+                                  protocol=pickle.HIGHEST_PROTOCOL))
+
+        manifest["version"] = version
+        manifest.setdefault("dimension", int(vectors.shape[1]) if vectors.ndim == 2 else None)
+        manifest.setdefault("segments", []).append({"name": name, "count": int(len(vectors))})
+        self._write_manifest(manifest)
+        return manifest
+
+    def append_tombstones(self, row_ids: List[int]) -> Dict[str, Any]:
+        """Persist deleted row ids as a vector-less segment."""
+        manifest = self.read_manifest()
+        if manifest is None:
+            raise FileNotFoundError(f"No FAISS collection at {self.collection_dir}")
+
+        version = int(manifest.get("version", 0)) + 1
+        name = f"seg-{version:06d}"
+        _fsync_write(self.collection_dir / f"{name}.pkl",
+                     pickle.dumps({"deleted": [int(r) for r in row_ids]},
+                                  protocol=pickle.HIGHEST_PROTOCOL))
+
+        manifest["version"] = version
+        manifest.setdefault("segments", []).append({"name": name, "count": 0, "deleted": len(row_ids)})
+        self._write_manifest(manifest)
+        return manifest
+
+    def write_base(self, index, metadata: List[Dict[str, Any]], documents: Sequence[str]) -> Dict[str, Any]:
+        """Write a full compacted base and drop all segments.
+
+        The new base uses fresh file names, so the previous manifest stays
+        valid until the atomic manifest swap; old files are removed afterwards.
+        """
+        self.collection_dir.mkdir(parents=True, exist_ok=True)
+        previous = self.read_manifest()
+        version = int(previous.get("version", 0)) + 1 if previous else 1
+        stem = f"base-{version:06d}"
+
+        index_name = f"{stem}.faiss"
+        tmp_index = self.collection_dir / f"{index_name}.tmp"
+        faiss.write_index(index, str(tmp_index))
+        with open(tmp_index, "rb+") as f:
+            os.fsync(f.fileno())
+        os.replace(tmp_index, self.collection_dir / index_name)
+        _fsync_write(self.collection_dir / f"{stem}.meta.pkl",
+                     pickle.dumps(metadata, protocol=pickle.HIGHEST_PROTOCOL))
+        write_chunk_store(self.collection_dir / f"{stem}.chunks", documents)
+
+        manifest = {
+            "version": version,
+            "dimension": int(index.d),
+            "base": {
+                "index": index_name,
+                "metadata": f"{stem}.meta.pkl",
+                "chunks": f"{stem}.chunks",
+                "count": int(index.ntotal),
+            },
+            "segments": [],
+        }
+        self._write_manifest(manifest)
+        if previous:
+            self._remove_unreferenced(previous, manifest)
+        return manifest
+
+    def _remove_unreferenced(self, old: Dict[str, Any], new: Dict[str, Any]) -> None:
+        """Delete files referenced by ``old`` but not by ``new``."""
+        def files(m: Dict[str, Any]) -> set:
+            names = set()
+            base = m.get("base") or {}
+            for key in ("index", "metadata", "documents", "chunks"):
+                if base.get(key):
+                    names.add(base[key])
+            for seg in m.get("segments", []):
+                names.update({f"{seg['name']}.npy", f"{seg['name']}.pkl"})
+            return names
+
+        for name in files(old) - files(new):
+            try:
+                (self.collection_dir / name).unlink()
+            except FileNotFoundError:
+                pass
+            except Exception as e:
+                logger.debug(f"Could not remove stale FAISS file {name}: {e}")
+
+    def should_compact(self, manifest: Dict[str, Any], compact_ratio: float = 1.0,
+                       max_segments: int = 256, min_rows: int = 1000) -> bool:
+        """Compaction policy: segments outgrow the base, or too many segment files.
+
+        Compacting when pending rows reach ``compact_ratio`` x base rows keeps
+        the total bytes rewritten linear in the collection size.
+        """
+        segments = manifest.get("segments", [])
+        if not segments:
+            return False
+        if max_segments and len(segments) >= max_segments:
+            return True
+        base_count = int((manifest.get("base") or {}).get("count") or 0)
+        return self.pending_rows(manifest) >= max(min_rows, int(base_count * compact_ratio))
+
+
+def is_collection_dir(path) -> bool:
+    """True if ``path`` holds a FAISS collection, with a manifest or in the legacy layout."""
+    return FAISSSegmentStore(Path(path)).exists()
+
+
+def _id_mapped_copy(index):
+    """ID-mapped copy of a plain index (ids = row positions), so deleted rows can be removed."""
+    if is_id_mapped(index):
+        return index
+    mapped = faiss.IndexIDMap2(faiss.IndexFlat(index.d, index.metric_type))
+    if index.ntotal:
+        mapped.add_with_ids(index.reconstruct_n(0, index.ntotal), np.arange(index.ntotal, dtype=np.int64))
+    return mapped
+
+
+def load_collection(collection_dir) -> Tuple[Any, List[Dict[str, Any]], ChunkTextList]:
+    """Read a collection for a query path: (index, metadata, documents).
+
+    The label FAISS returns for a hit is the row's position in ``metadata`` and
+    ``documents``. Deleted rows are removed from the index; index types without
+    removal (HNSW) keep them, flagged ``deleted`` in their metadata row.
+
+    Raises:
+        FileNotFoundError: No collection at ``collection_dir``.
+        ValueError: Vectors and metadata rows do not line up.
+    """
+    store = FAISSSegmentStore(Path(collection_dir))
+    manifest = store.read_manifest()
+    if manifest is None:
+        raise FileNotFoundError(f"No FAISS collection at {collection_dir}")
+    deletes = any(seg.get("deleted") for seg in manifest.get("segments", []))
+    index, metadata, documents, _ = store.load(
+        lambda dim: faiss.IndexIDMap2(faiss.IndexFlatIP(dim)), int(manifest.get("dimension") or 1),
+        prepare_index=_id_mapped_copy if deletes else None,
+    )
+    deleted = [row for row, meta in enumerate(metadata) if meta.get("deleted")]
+    if deleted:
+        try:
+            index.remove_ids(np.asarray(deleted, dtype=np.int64))
+        except RuntimeError:
+            pass
+    return index, metadata, documents
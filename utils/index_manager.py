@@ -10,6 +10,9 @@ import pickle
 from pathlib import Path
 from typing import List, Dict, Any, Optional, Tuple, Union
 
+from utils.chunk_store import ChunkDocumentList, documents_to_columns, open_sidecar, write_sidecar
+from utils.faiss_segment_store import MANIFEST_NAME, is_collection_dir, load_collection
+
 logger = logging.getLogger(__name__)
 
 class IndexManager:
@@ -117,6 +120,10 @@ class IndexManager:
                 result['success'] = True
                 result['message'] = f"Successfully deleted index '{index_name}' from {len(result['deleted_paths'])} location(s)"
                 
+                # Let documents queued into the old index be ingested again
+                from utils.ingestion_staging import forget_collection_claims
+                forget_collection_claims(index_name, 'faiss')
+                
                 # Force refresh of index lists in Streamlit session
                 try:
                     import streamlit as st
@@ -230,7 +237,7 @@ class IndexManager:
             if os.path.exists(base_path):
                 for item in os.listdir(base_path):
                     item_path = os.path.join(base_path, item)
-                    if os.path.isdir(item_path) and os.path.exists(os.path.join(item_path, "index.faiss")):
+                    if os.path.isdir(item_path) and is_collection_dir(item_path):
                         # Normalize index name (remove _index suffix if present)
                         normalized_name = item
                         if normalized_name.endswith("_index"):
@@ -283,7 +290,16 @@ class IndexManager:
             faiss_path = os.path.join(path, "index.faiss")
             pickle_path = os.path.join(path, "index.pkl")
             
-            if os.path.exists(faiss_path) and os.path.exists(pickle_path):
+            if os.path.exists(os.path.join(path, MANIFEST_NAME)):
+                try:
+                    logger.info(f"Loading segment-store collection from: {path}")
+                    index, documents = cls._load_collection_documents(path)
+                    cls._index_cache[cache_key] = (index, documents)
+                    cls._document_cache[cache_key] = documents
+                    return index, documents
+                except Exception as e:
+                    logger.warning(f"Error loading index from {path}: {str(e)}")
+            elif os.path.exists(faiss_path) and os.path.exists(pickle_path):
                 try:
                     logger.info(f"Loading index from: {path}")
                     
@@ -291,8 +307,7 @@ class IndexManager:
                     index = faiss.read_index(faiss_path)
                     
                     # Load the documents
-                    with open(pickle_path, "rb") as f:
-                        documents = pickle.load(f)
+                    documents = cls._load_documents(pickle_path)
                     
                     # Cache the loaded index
                     cls._index_cache[cache_key] = (index, documents)
@@ -308,6 +323,50 @@ class IndexManager:
         logger.error(error_msg)
         raise FileNotFoundError(error_msg)
     
+    @classmethod
+    def _load_collection_documents(cls, path: str) -> Tuple[Any, List[Dict]]:
+        """
+        Load a collection written by the FAISS adapter as (index, documents)
+        
+        Document ``i`` belongs to FAISS id ``i``; deleted rows keep their
+        position and carry ``deleted: True``.
+        """
+        index, rows, texts = load_collection(path)
+        documents = []
+        for row, text in zip(rows, texts):
+            doc = {k: v for k, v in row.items() if k != "metadata"}
+            doc["content"] = text
+            doc["metadata"] = dict(row.get("metadata") or {}, source=row.get("source", ""))
+            documents.append(doc)
+        return index, documents
+    
+    @classmethod
+    def _load_documents(cls, pickle_path: str):
+        """
+        Load the document list for an index, memory-mapped when possible
+        
+        The pickle is converted once to an ``index.pkl.chunks`` chunk store
+        next to it; later loads map that file and decode rows on access
+        instead of unpickling every document. Document lists the chunk store
+        cannot represent exactly are returned as unpickled.
+        """
+        sidecar_path = pickle_path + ".chunks"
+        store = open_sidecar(sidecar_path, pickle_path, layout="documents")
+        if store is not None:
+            return ChunkDocumentList(store)
+        
+        with open(pickle_path, "rb") as f:
+            documents = pickle.load(f)
+        
+        columns = documents_to_columns(documents) if isinstance(documents, list) else None
+        if columns is not None:
+            texts, metas = columns
+            store = write_sidecar(sidecar_path, pickle_path, "documents", texts, metas)
+            if store is not None:
+                logger.info(f"Converted {pickle_path} to memory-mapped chunk store")
+                return ChunkDocumentList(store)
+        return documents
+    
     @classmethod
     def save_index(cls, index_name: str, index: Any, documents: List[Dict]) -> str:
         """
@@ -0,0 +1,567 @@
+"""
+Ingestion Pipeline
+==================
+
+Staged bulk ingestion: extract -> clean -> chunk -> embed -> write.
+
+* Extract, clean and chunk are CPU-bound and run together per document in a
+  process pool, so a folder of PDFs keeps every core busy; only the chunk
+  texts travel back to the parent
+* Embedding runs in one dedicated thread that keeps the shared model resident
+  and batches chunks across documents (``encode_cached``, so unchanged chunks
+  come from the embedding cache)
+* Writes are coalesced per collection and flushed by size or interval through
+  a sink (FAISS segment store or Weaviate)
+* Stages are connected by bounded queues, so a slow stage applies
+  backpressure instead of buffering the whole corpus
+* Every stage reports items, chunks, busy time and throughput; progress
+  callbacks receive a snapshot of all stages
+
+Example::
+
+    sink = FAISSIngestionSink("data/faiss_index")
+    report = ingest_folder("board_pdfs/", "board_minutes", sink)
+"""
+
+import asyncio
+import logging
+import multiprocessing
+import os
+import queue
+import re
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Executor, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from utils.query_result_cache import bump_index_version
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_EMBEDDING_MODEL = os.getenv("INGESTION_EMBEDDING_MODEL", "all-MiniLM-L6-v2")
+DEFAULT_EXTRACT_WORKERS = int(os.getenv("INGESTION_EXTRACT_WORKERS", "0")) or (os.cpu_count() or 2)
+DEFAULT_EMBED_BATCH_SIZE = int(os.getenv("INGESTION_EMBED_BATCH_SIZE", "256"))
+DEFAULT_WRITE_BATCH_CHUNKS = int(os.getenv("INGESTION_WRITE_BATCH_CHUNKS", "4096"))
+DEFAULT_FLUSH_INTERVAL = float(os.getenv("INGESTION_FLUSH_INTERVAL_SECONDS", "5"))
+
+STAGES = ("extract", "clean", "chunk", "embed", "write")
+
+_SENTINEL = object()
+_HYPHEN_BREAK_RE = re.compile(r"(\w)-\n(\w)")
+_CONTROL_RE = re.compile(r"[\x00-\x08\x0b\x0c\x0e-\x1f\x7f]")
+_SPACES_RE = re.compile(r"[ \t\u00a0]+")
+_BLANK_LINES_RE = re.compile(r"\n\s*\n\s*\n+")
+
+
+# ---- document stages (run in worker processes) ----------------------------
+
+def extract_text(content: bytes, file_name: str, document_type: str = "PDF") -> str:
+    """Plain text of a document; PDFs go through the robust extractor when available"""
+    if document_type.upper() == "PDF":
+        try:
+            from utils.robust_pdf_extractor import extract_text_from_pdf_robust
+            text, _method = extract_text_from_pdf_robust(content, file_name)
+            if text:
+                return text
+        except ImportError:
+            pass
+        try:
+            from pypdf import PdfReader
+            import io
+            reader = PdfReader(io.BytesIO(content))
+            return "\n".join(page.extract_text() or "" for page in reader.pages)
+        except Exception as e:
+            logger.warning(f"PDF extraction failed for {file_name}: {e}")
+    return content.decode("utf-8", errors="ignore")
+
+
+def clean_text(text: str) -> str:
+    """Normalize extracted text: line endings, hyphenated line breaks, control characters, whitespace runs"""
+    text = text.replace("\r\n", "\n").replace("\r", "\n")
+    text = _HYPHEN_BREAK_RE.sub(r"\1\2", text)
+    text = _CONTROL_RE.sub("", text)
+    text = _SPACES_RE.sub(" ", text)
+    text = _BLANK_LINES_RE.sub("\n\n", text)
+    return text.strip()
+
+
+def chunk_text(text: str, chunk_size: int = 800, chunk_overlap: int = 120) -> List[str]:
+    """Overlapping fixed-size character chunks"""
+    if not text:
+        return []
+    step = max(1, chunk_size - chunk_overlap)
+    chunks = []
+    for start in range(0, len(text), step):
+        chunk = text[start:start + chunk_size]
+        if chunk.strip():
+            chunks.append(chunk)
+        if start + chunk_size >= len(text):
+            break
+    return chunks
+
+
+def _prepare_document(path: Optional[str], content: Optional[bytes], file_name: str,
+                      document_type: str, chunk_size: int, chunk_overlap: int) -> Dict[str, Any]:
+    """Extract, clean and chunk one document; returns chunks plus per-stage timings"""
+    t0 = time.perf_counter()
+    if content is None:
+        with open(path, "rb") as f:
+            content = f.read()
+    text = extract_text(content, file_name, document_type)
+    t1 = time.perf_counter()
+    text = clean_text(text)
+    t2 = time.perf_counter()
+    chunks = chunk_text(text, chunk_size, chunk_overlap)
+    t3 = time.perf_counter()
+    return {
+        "chunks": chunks,
+        "bytes": len(content),
+        "chars": len(text),
+        "timings": {"extract": t1 - t0, "clean": t2 - t1, "chunk": t3 - t2},
+    }
+
+
+# ---- data types -----------------------------------------------------------
+
+@dataclass
+class SourceDocument:
+    """A document to ingest, given by path or by content"""
+    collection_name: str
+    file_name: str
+    document_type: str = "PDF"
+    path: Optional[str] = None
+    content: Optional[bytes] = None
+    doc_id: Optional[str] = None
+    username: str = "system"
+    metadata: Dict[str, Any] = field(default_factory=dict)
+
+    @property
+    def key(self) -> str:
+        return self.doc_id or self.file_name
+
+
+@dataclass
+class StageStats:
+    """Counters for one pipeline stage (throughput is measured from ``started_at``, the pipeline start)"""
+    name: str
+    items: int = 0
+    chunks: int = 0
+    bytes: int = 0
+    errors: int = 0
+    busy_seconds: float = 0.0
+    started_at: Optional[float] = None
+    last_at: Optional[float] = None
+
+    def record(self, items: int = 1, chunks: int = 0, nbytes: int = 0, busy: float = 0.0) -> None:
+        self.last_at = time.time()
+        self.items += items
+        self.chunks += chunks
+        self.bytes += nbytes
+        self.busy_seconds += busy
+
+    def snapshot(self) -> Dict[str, Any]:
+        elapsed = (self.last_at - self.started_at) if self.started_at and self.last_at else 0.0
+        return {
+            "items": self.items,
+            "chunks": self.chunks,
+            "bytes": self.bytes,
+            "errors": self.errors,
+            "busy_seconds": round(self.busy_seconds, 3),
+            "items_per_second": round(self.items / elapsed, 2) if elapsed > 0 else None,
+            "chunks_per_second": round(self.chunks / elapsed, 2) if elapsed > 0 else None,
+        }
+
+
+# ---- sinks ----------------------------------------------------------------
+
+class FAISSIngestionSink:
+    """Appends coalesced batches to FAISS collections through the segment-store adapter"""
+
+    def __init__(self, index_directory: str = "data/faiss_index", index_type: str = "IndexFlatIP"):
+        self.index_directory = index_directory
+        self.index_type = index_type
+        self._adapter = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def _get_adapter(self, dimension: int):
+        if self._adapter is None:
+            from utils.adapters.faiss_adapter import FAISSAdapter
+            from utils.multi_vector_storage_interface import VectorStoreConfig, VectorStoreType
+            self._adapter = FAISSAdapter(VectorStoreConfig(
+                store_type=VectorStoreType.FAISS,
+                connection_params={
+                    "index_directory": self.index_directory,
+                    "vector_dimension": dimension,
+                    "index_type": self.index_type,
+                },
+            ))
+            self._loop = asyncio.new_event_loop()
+        return self._adapter
+
+    def write(self, collection_name: str, records: List[Dict[str, Any]], vectors: np.ndarray) -> bool:
+        adapter = self._get_adapter(int(vectors.shape[1]))
+        ok = self._loop.run_until_complete(adapter.upsert_documents(collection_name, records, list(vectors)))
+        if ok:
+            bump_index_version(collection_name)
+        return bool(ok)
+
+    def close(self) -> None:
+        if self._loop is not None:
+            self._loop.close()
+            self._loop = None
+
+
+class WeaviateIngestionSink:
+    """Writes coalesced batches (with precomputed vectors) to Weaviate collections"""
+
+    def __init__(self):
+        from utils.weaviate_manager import get_weaviate_manager
+        self.manager = get_weaviate_manager()
+        self._resolved: Dict[str, str] = {}
+
+    def write(self, collection_name: str, records: List[Dict[str, Any]], vectors: np.ndarray) -> bool:
+        actual = self._resolved.get(collection_name)
+        if actual is None:
+            try:
+                actual = self.manager._resolve_collection_name(collection_name)
+            except Exception:
+                actual = collection_name
+            self._resolved[collection_name] = actual
+        documents = [dict(record, vector=vector.tolist()) for record, vector in zip(records, vectors)]
+        for doc in documents:
+            # Row id and creation time are FAISS metadata, not collection properties
+            doc.pop("id", None)
+            doc.pop("created_at", None)
+        diag = self.manager.add_documents_with_stats(actual, documents)
+        ok = diag.get("success", False) if isinstance(diag, dict) else bool(diag)
+        bump_index_version(collection_name)
+        if actual != collection_name:
+            bump_index_version(actual)
+        return bool(ok)
+
+    def close(self) -> None:
+        pass
+
+
+# ---- pipeline -------------------------------------------------------------
+
+class IngestionPipeline:
+    """Bulk ingestion with a process pool for parsing and batched embed/write workers"""
+
+    def __init__(self,
+                 sink,
+                 embedding_model: str = DEFAULT_EMBEDDING_MODEL,
+                 extract_workers: int = DEFAULT_EXTRACT_WORKERS,
+                 chunk_size: int = 800,
+                 chunk_overlap: int = 120,
+                 embed_batch_size: int = DEFAULT_EMBED_BATCH_SIZE,
+                 write_batch_chunks: int = DEFAULT_WRITE_BATCH_CHUNKS,
+                 flush_interval: float = DEFAULT_FLUSH_INTERVAL,
+                 max_inflight: Optional[int] = None,
+                 use_processes: bool = True):
+        """
+        Args:
+            sink: Object with ``write(collection_name, records, vectors) -> bool``
+            embedding_model: Model served by the shared embedding service
+            extract_workers: Processes (or threads) for extract/clean/chunk
+            chunk_size: Chunk length in characters
+            chunk_overlap: Overlap between consecutive chunks
+            embed_batch_size: Chunks gathered across documents per encode call
+            write_batch_chunks: Buffered chunks per collection that trigger a write
+            flush_interval: Seconds after which buffered chunks are written anyway
+            max_inflight: Documents being parsed at once (default 2x workers)
+            use_processes: Parse in a process pool; threads are used when False
+                or when running inside a daemonic process (e.g. a Celery prefork worker)
+        """
+        self.sink = sink
+        self.embedding_model = embedding_model
+        self.extract_workers = max(1, extract_workers)
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+        self.embed_batch_size = max(1, embed_batch_size)
+        self.write_batch_chunks = max(1, write_batch_chunks)
+        self.flush_interval = flush_interval
+        self.max_inflight = max_inflight or 2 * self.extract_workers
+        self.use_processes = use_processes and not multiprocessing.current_process().daemon
+
+        self.stats: Dict[str, StageStats] = {}
+        self._lock = threading.Lock()
+        self._results: Dict[str, Dict[str, Any]] = {}
+        self._total = 0
+        self._started = 0.0
+
+    # ---- bookkeeping ------------------------------------------------------
+
+    def _finish(self, doc: SourceDocument, ok: bool, chunks: int = 0, error: Optional[str] = None) -> None:
+        with self._lock:
+            self._results[doc.key] = {
+                "doc_id": doc.key,
+                "file_name": doc.file_name,
+                "collection_name": doc.collection_name,
+                "success": ok,
+                "chunks": chunks,
+                "error": error,
+            }
+
+    def progress(self) -> Dict[str, Any]:
+        """Snapshot of document progress and per-stage throughput"""
+        with self._lock:
+            done = len(self._results)
+            failed = sum(1 for r in self._results.values() if not r["success"])
+        return {
+            "total": self._total,
+            "completed": done,
+            "failed": failed,
+            "elapsed_seconds": round(time.time() - self._started, 3) if self._started else 0.0,
+            "stages": {name: stats.snapshot() for name, stats in self.stats.items()},
+        }
+
+    def _executor(self) -> Executor:
+        if self.use_processes:
+            method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+            return ProcessPoolExecutor(max_workers=self.extract_workers,
+                                       mp_context=multiprocessing.get_context(method))
+        return ThreadPoolExecutor(max_workers=self.extract_workers, thread_name_prefix="ingest-extract")
+
+    # ---- embed stage ------------------------------------------------------
+
+    def _embed_loop(self, embed_queue: "queue.Queue", write_queue: "queue.Queue") -> None:
+        try:
+            from utils.embedding_service import get_embedding_service
+            service, load_error = get_embedding_service(self.embedding_model), None
+        except Exception as e:
+            # Keep consuming so every queued document is reported as failed
+            service, load_error = None, e
+        stats = self.stats["embed"]
+        pending: List[Tuple[SourceDocument, List[str]]] = []
+        pending_chunks = 0
+        done = False
+        while not done:
+            try:
+                item = embed_queue.get(timeout=0.05 if pending else None)
+            except queue.Empty:
+                item = None
+            if item is _SENTINEL:
+                done = True
+            elif item is not None:
+                pending.append(item)
+                pending_chunks += len(item[1])
+                if pending_chunks < self.embed_batch_size:
+                    continue
+            # Batch full, input idle, or shutting down
+            if not pending:
+                continue
+            texts = [text for _, chunks in pending for text in chunks]
+            start = time.perf_counter()
+            try:
+                if service is None:
+                    raise RuntimeError(f"embedding model unavailable: {load_error}")
+                vectors = np.asarray(service.encode_cached(texts, normalize_embeddings=True), dtype=np.float32)
+            except Exception as e:
+                logger.error(f"Embedding batch of {len(texts)} chunks failed: {e}")
+                stats.errors += len(pending)
+                for doc, _ in pending:
+                    self._finish(doc, False, error=f"Embedding failed: {e}")
+            else:
+                stats.record(items=len(pending), chunks=len(texts), busy=time.perf_counter() - start)
+                offset = 0
+                for doc, chunks in pending:
+                    write_queue.put((doc, chunks, vectors[offset:offset + len(chunks)]))
+                    offset += len(chunks)
+            pending, pending_chunks = [], 0
+        write_queue.put(_SENTINEL)
+
+    # ---- write stage ------------------------------------------------------
+
+    def _records(self, doc: SourceDocument, chunks: List[str]) -> List[Dict[str, Any]]:
+        now = datetime.now().isoformat()
+        return [{
+            "id": f"{doc.key}:{i}",
+            "content": text,
+            "source": doc.file_name,
+            "source_type": doc.document_type.lower(),
+            "document_type": doc.document_type,
+            "file_name": doc.file_name,
+            "uploaded_by": doc.username,
+            "upload_date": now,
+            "created_at": now,
+            "chunk_index": i + 1,
+            "total_chunks": len(chunks),
+            "metadata": dict(doc.metadata, chunk_index=i + 1, total_chunks=len(chunks),
+                             chunk_size=len(text), chunking_method="basic"),
+        } for i, text in enumerate(chunks)]
+
+    def _flush(self, collection_name: str, batch: List[Tuple[SourceDocument, List[str], np.ndarray]]) -> None:
+        records: List[Dict[str, Any]] = []
+        for doc, chunks, _ in batch:
+            records.extend(self._records(doc, chunks))
+        vectors = np.concatenate([v for _, _, v in batch]) if batch else np.zeros((0, 0), np.float32)
+        start = time.perf_counter()
+        try:
+            ok = self.sink.write(collection_name, records, vectors)
+            error = None if ok else "Write to vector store failed"
+        except Exception as e:
+            logger.error(f"Writing {len(records)} chunks to {collection_name} failed: {e}")
+            ok, error = False, str(e)
+        stats = self.stats["write"]
+        if ok:
+            stats.record(items=len(batch), chunks=len(records), busy=time.perf_counter() - start)
+        else:
+            stats.errors += len(batch)
+        for doc, chunks, _ in batch:
+            self._finish(doc, ok, chunks=len(chunks), error=error)
+
+    def _write_loop(self, write_queue: "queue.Queue") -> None:
+        buffers: Dict[str, List[Tuple[SourceDocument, List[str], np.ndarray]]] = {}
+        sizes: Dict[str, int] = {}
+        oldest: Dict[str, float] = {}
+        done = False
+        while not done:
+            try:
+                item = write_queue.get(timeout=min(1.0, self.flush_interval))
+            except queue.Empty:
+                item = None
+            if item is _SENTINEL:
+                done = True
+            elif item is not None:
+                doc, chunks, vectors = item
+                if not chunks:
+                    self._finish(doc, False, error="No text extracted")
+                    continue
+                name = doc.collection_name
+                buffers.setdefault(name, []).append(item)
+                sizes[name] = sizes.get(name, 0) + len(chunks)
+                oldest.setdefault(name, time.time())
+            now = time.time()
+            for name in list(buffers):
+                if done or sizes[name] >= self.write_batch_chunks or now - oldest[name] >= self.flush_interval:
+                    self._flush(name, buffers.pop(name))
+                    sizes.pop(name)
+                    oldest.pop(name)
+
+    # ---- driver -----------------------------------------------------------
+
+    def run(self,
+            documents: Iterable[SourceDocument],
+            progress_callback: Optional[Callable[[Dict[str, Any]], None]] = None,
+            progress_interval: float = 1.0) -> Dict[str, Any]:
+        """
+        Ingest ``documents`` and block until every one is written or failed
+
+        Returns a report with per-document results and per-stage statistics.
+        """
+        documents = list(documents)
+        self._started = time.time()
+        self.stats = {name: StageStats(name, started_at=self._started) for name in STAGES}
+        self._results = {}
+        self._total = len(documents)
+
+        embed_queue: "queue.Queue" = queue.Queue(maxsize=self.max_inflight)
+        write_queue: "queue.Queue" = queue.Queue(maxsize=self.max_inflight)
+        embedder = threading.Thread(target=self._embed_loop, args=(embed_queue, write_queue),
+                                    name="ingest-embed", daemon=True)
+        writer = threading.Thread(target=self._write_loop, args=(write_queue,),
+                                  name="ingest-write", daemon=True)
+        embedder.start()
+        writer.start()
+
+        last_report = 0.0
+
+        def report(force: bool = False) -> None:
+            nonlocal last_report
+            if progress_callback and (force or time.time() - last_report >= progress_interval):
+                last_report = time.time()
+                try:
+                    progress_callback(self.progress())
+                except Exception as e:
+                    logger.debug(f"Progress callback failed: {e}")
+
+        def collect(future, doc: SourceDocument) -> None:
+            try:
+                prepared = future.result()
+            except Exception as e:
+                logger.error(f"Extracting {doc.file_name} failed: {e}")
+                self.stats["extract"].errors += 1
+                self._finish(doc, False, error=f"Extraction failed: {e}")
+                return
+            timings = prepared["timings"]
+            chunks = prepared["chunks"]
+            self.stats["extract"].record(nbytes=prepared["bytes"], busy=timings["extract"])
+            self.stats["clean"].record(nbytes=prepared["chars"], busy=timings["clean"])
+            self.stats["chunk"].record(chunks=len(chunks), busy=timings["chunk"])
+            # Blocks while the embedder is behind (backpressure on parsing)
+            embed_queue.put((doc, chunks))
+
+        executor = self._executor()
+        inflight: Dict[Any, SourceDocument] = {}
+        try:
+            for doc in documents:
+                while len(inflight) >= self.max_inflight:
+                    finished, _ = wait(list(inflight), timeout=progress_interval, return_when=FIRST_COMPLETED)
+                    for future in finished:
+                        collect(future, inflight.pop(future))
+                    report()
+                # Documents given by path are read inside the worker, not pickled across
+                future = executor.submit(_prepare_document, doc.path, doc.content, doc.file_name,
+                                         doc.document_type, self.chunk_size, self.chunk_overlap)
+                inflight[future] = doc
+            while inflight:
+                finished, _ = wait(list(inflight), timeout=progress_interval, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    collect(future, inflight.pop(future))
+                report()
+        finally:
+            executor.shutdown(wait=True)
+            embed_queue.put(_SENTINEL)
+            while embedder.is_alive() or writer.is_alive():
+                writer.join(timeout=progress_interval)
+                report()
+            close = getattr(self.sink, "close", None)
+            if callable(close):
+                close()
+
+        report(force=True)
+        results = list(self._results.values())
+        summary = self.progress()
+        summary.update({
+            "success": all(r["success"] for r in results) and len(results) == self._total,
+            "succeeded": sum(1 for r in results if r["success"]),
+            "chunks": sum(r["chunks"] for r in results if r["success"]),
+            "documents": results,
+        })
+        logger.info(
+            f"Ingested {summary['succeeded']}/{self._total} documents "
+            f"({summary['chunks']} chunks) in {summary['elapsed_seconds']:.1f}s"
+        )
+        return summary
+
+
+def ingest_folder(folder,
+                  collection_name: str,
+                  sink=None,
+                  patterns: Sequence[str] = ("*.pdf", "*.txt", "*.md"),
+                  recursive: bool = True,
+                  username: str = "system",
+                  progress_callback: Optional[Callable[[Dict[str, Any]], None]] = None,
+                  progress_interval: float = 1.0,
+                  **pipeline_kwargs) -> Dict[str, Any]:
+    """Ingest every matching file under ``folder`` into one collection (FAISS by default)"""
+    folder = Path(folder)
+    paths = sorted({p for pattern in patterns
+                    for p in (folder.rglob(pattern) if recursive else folder.glob(pattern)) if p.is_file()})
+    documents = [SourceDocument(
+        collection_name=collection_name,
+        file_name=p.name,
+        document_type="PDF" if p.suffix.lower() == ".pdf" else "TEXT",
+        path=str(p),
+        doc_id=str(p.relative_to(folder)),
+        username=username,
+        metadata={"relative_path": str(p.relative_to(folder))},
+    ) for p in paths]
+    pipeline = IngestionPipeline(sink or FAISSIngestionSink(), **pipeline_kwargs)
+    return pipeline.run(documents, progress_callback=progress_callback, progress_interval=progress_interval)
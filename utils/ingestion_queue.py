@@ -5,16 +5,29 @@ Ingestion Queue - Celery Task System
 Async task queue for document ingestion using Celery + Redis.
 Provides non-blocking UI, automatic retries, and progress tracking.
 
+Documents travel by claim check: ``enqueue_document_ingestion`` stages the
+file in the content-addressed spool (``utils.ingestion_staging``) and the task
+message carries only the spool reference and SHA-256. Re-uploads of content
+already queued or ingested into the same collection are skipped.
+
+Bulk uploads go through ``enqueue_batch_ingestion``: one task runs the staged
+pipeline (``utils.ingestion_pipeline``) over all files, parsing in parallel and
+batching embedding and writes across documents.
+
 P0 Critical Fix #1: Async Processing with Celery
 """
 
 from celery import Celery, Task
 from celery.result import AsyncResult
-from typing import Dict, Any, Optional
+from celery.utils import uuid
+from typing import Dict, Any, Iterable, List, Optional, BinaryIO, Tuple, Union
 import logging
 import time
 from datetime import datetime
 import os
+from pathlib import Path
+
+from utils.ingestion_staging import get_ingestion_spool
 
 logger = logging.getLogger(__name__)
 
@@ -77,7 +90,7 @@ class IngestionTask(Task):
 )
 def async_ingest_document(self,
                          collection_name: str,
-                         file_content_b64: str,  # Base64 encoded
+                         file_ref: str,  # Spool reference (spool://<sha256>)
                          file_name: str,
                          username: str,
                          document_type: str,
@@ -85,6 +98,7 @@ def async_ingest_document(self,
                          chunk_size: int = 1500,
                          chunk_overlap: int = 300,
                          use_semantic_chunking: bool = True,
+                         file_sha256: Optional[str] = None,
                          **kwargs) -> Dict[str, Any]:
     """
     Async task for document ingestion with retry logic
@@ -92,7 +106,7 @@ def async_ingest_document(self,
     Args:
         self: Task instance (bound)
         collection_name: Target collection/index name
-        file_content_b64: Base64 encoded file content
+        file_ref: Spool reference of the staged file (see enqueue_document_ingestion)
         file_name: Original filename
         username: User who initiated ingestion
         document_type: Type of document (PDF, TEXT, URL)
@@ -100,13 +114,12 @@ def async_ingest_document(self,
         chunk_size: Size of text chunks
         chunk_overlap: Overlap between chunks
         use_semantic_chunking: Use semantic chunking strategy
+        file_sha256: Expected SHA-256 of the staged file
         **kwargs: Additional parameters
         
     Returns:
         Dictionary with ingestion results
     """
-    import base64
-    
     task_id = self.request.id
     start_time = time.time()
     
@@ -123,9 +136,24 @@ def async_ingest_document(self,
         }
     )
     
+    spool = get_ingestion_spool()
+    sha256 = file_sha256
+    
     try:
-        # Decode file content
-        file_content = base64.b64decode(file_content_b64)
+        # Load file content from the spool
+        try:
+            sha256 = sha256 or spool.sha_from_ref(file_ref)
+            file_content = spool.read(file_ref, sha256)
+        except (OSError, ValueError) as e:
+            # Retrying cannot bring back a missing or corrupt blob
+            error_msg = f"Staged file unavailable: {e}"
+            logger.error(f"Task {task_id}: {error_msg}")
+            _finish_staged(collection_name, backend, sha256, ok=False, task_id=task_id)
+            return {
+                'success': False,
+                'error': error_msg,
+                'task_id': task_id
+            }
         
         # Update progress
         self.update_state(
@@ -140,7 +168,6 @@ def async_ingest_document(self,
         
         # Validate file (P0 Fix #2)
         from utils.ingestion_validator import get_ingestion_validator
-        from pathlib import Path
         
         validator = get_ingestion_validator()
         is_valid, errors, metadata = validator.validate_file(
@@ -152,6 +179,7 @@ def async_ingest_document(self,
         if not is_valid:
             error_msg = f"Validation failed: {'; '.join(errors)}"
             logger.error(f"Task {task_id}: {error_msg}")
+            _finish_staged(collection_name, backend, sha256, ok=False, task_id=task_id)
             return {
                 'success': False,
                 'error': error_msg,
@@ -220,10 +248,12 @@ def async_ingest_document(self,
             })
             
             logger.info(f"Task {task_id} completed in {duration_ms}ms")
+            _finish_staged(collection_name, backend, sha256, ok=True, task_id=task_id)
             return result
         else:
             error_msg = result.get('error', 'Unknown error') if result else 'Ingestion failed'
             logger.error(f"Task {task_id} failed: {error_msg}")
+            _finish_staged(collection_name, backend, sha256, ok=False, task_id=task_id)
             return {
                 'success': False,
                 'error': error_msg,
@@ -239,6 +269,7 @@ def async_ingest_document(self,
             logger.info(f"Retrying task {task_id} (attempt {self.request.retries + 1}/{self.max_retries})")
             raise self.retry(exc=e)
         else:
+            _finish_staged(collection_name, backend, sha256, ok=False, task_id=task_id)
             return {
                 'success': False,
                 'error': f"Task failed after {self.max_retries} retries: {str(e)}",
@@ -246,6 +277,106 @@ def async_ingest_document(self,
             }
 
 
+def _finish_staged(collection_name: str,
+                   backend: str,
+                   sha256: Optional[str],
+                   ok: bool,
+                   task_id: Optional[str] = None) -> None:
+    """Settle the claim for a staged file and drop the blob once nothing else needs it"""
+    if not sha256:
+        return
+    try:
+        spool = get_ingestion_spool()
+        if ok:
+            spool.update_claim(backend, collection_name, sha256, status='completed', task_id=task_id)
+        else:
+            # Let a later upload of the same content try again
+            spool.release_claim(backend, collection_name, sha256, task_id=task_id)
+        spool.release(sha256)
+    except Exception as e:
+        logger.warning(f"Could not settle staged file {sha256[:12]}: {e}")
+
+
+def enqueue_document_ingestion(collection_name: str,
+                               file_content: Union[bytes, BinaryIO, str, Path],
+                               file_name: str,
+                               username: str,
+                               document_type: str,
+                               backend: str = "weaviate",
+                               chunk_size: int = 1500,
+                               chunk_overlap: int = 300,
+                               use_semantic_chunking: bool = True,
+                               force: bool = False,
+                               **kwargs) -> Dict[str, Any]:
+    """
+    Stage a document in the spool and queue its ingestion by reference
+    
+    Args:
+        collection_name: Target collection/index name
+        file_content: File bytes, a binary file object or a path to the file
+        file_name: Original filename
+        username: User who initiated ingestion
+        document_type: Type of document (PDF, TEXT, URL)
+        backend: Storage backend (weaviate, faiss, both)
+        chunk_size: Size of text chunks
+        chunk_overlap: Overlap between chunks
+        use_semantic_chunking: Use semantic chunking strategy
+        force: Re-ingest even if the same content is already queued or ingested
+        **kwargs: Additional task parameters
+        
+    Returns:
+        Dictionary with the task id, content hash and whether it was a duplicate
+    """
+    spool = get_ingestion_spool()
+    task_id = uuid()
+    # Claim before the blob is published so a concurrent release cannot drop it
+    blob, existing = spool.stage_claimed(file_content, backend, collection_name, force=force,
+                                         task_id=task_id, file_name=file_name, username=username)
+    if existing is not None:
+        logger.info(f"Skipping duplicate upload of {file_name} ({blob.sha256[:12]}) "
+                    f"into {collection_name}: {existing.get('status')}")
+        return {
+            'duplicate': True,
+            'task_id': existing.get('task_id'),
+            'status': existing.get('status'),
+            'sha256': blob.sha256,
+            'size': blob.size,
+            'file_name': existing.get('file_name', file_name)
+        }
+    
+    try:
+        async_ingest_document.apply_async(
+            kwargs=dict(
+                kwargs,
+                collection_name=collection_name,
+                file_ref=blob.ref,
+                file_sha256=blob.sha256,
+                file_name=file_name,
+                username=username,
+                document_type=document_type,
+                backend=backend,
+                chunk_size=chunk_size,
+                chunk_overlap=chunk_overlap,
+                use_semantic_chunking=use_semantic_chunking
+            ),
+            task_id=task_id
+        )
+    except Exception:
+        spool.release_claim(backend, collection_name, blob.sha256)
+        spool.release(blob.sha256)
+        raise
+    
+    logger.info(f"Queued {file_name} ({blob.size} bytes, {blob.sha256[:12]}) as task {task_id}")
+    return {
+        'duplicate': False,
+        'task_id': task_id,
+        'status': 'pending',
+        'sha256': blob.sha256,
+        'size': blob.size,
+        'file_name': file_name
+    }
+
+
 def _ingest_to_weaviate(task: Task,
                        collection_name: str,
                        file_content: bytes,
@@ -344,10 +475,14 @@ def _ingest_to_faiss(task: Task,
                     document_type: str,
                     chunk_size: int,
                     chunk_overlap: int) -> Dict[str, Any]:
-    """Helper function to ingest to FAISS"""
+    """Helper function to ingest to FAISS
+    
+    Writes through the same segment-store sink as bulk ingestion, so single
+    uploads append to the collection instead of replacing it and the query
+    readers see one on-disk format.
+    """
     try:
-        from pathlib import Path
-        from tabs.document_ingestion import _build_faiss_index_from_text
+        from utils.ingestion_pipeline import FAISSIngestionSink, IngestionPipeline, SourceDocument
         
         task.update_state(
             state='PROGRESS',
@@ -359,27 +494,28 @@ def _ingest_to_faiss(task: Task,
             }
         )
         
-        # Extract text
-        if document_type.upper() == 'PDF':
-            # Use PDF extraction
-            try:
-                from pypdf import PdfReader
-                import io
-                reader = PdfReader(io.BytesIO(file_content))
-                text_content = ""
-                for page in reader.pages:
-                    text_content += page.extract_text() or ""
-            except Exception as e:
-                logger.error(f"PDF extraction failed: {e}")
-                text_content = file_content.decode('utf-8', errors='ignore')
-        else:
-            text_content = file_content.decode('utf-8', errors='ignore')
-        
-        # Build FAISS index
-        faiss_target = Path("data") / "faiss_index" / index_name
-        faiss_target.mkdir(parents=True, exist_ok=True)
+        faiss_root = Path("data") / "faiss_index"
+        pipeline = IngestionPipeline(
+            FAISSIngestionSink(str(faiss_root)),
+            extract_workers=1,
+            chunk_size=chunk_size,
+            chunk_overlap=chunk_overlap,
+            use_processes=False
+        )
+        report = pipeline.run([SourceDocument(
+            collection_name=index_name,
+            file_name=file_name,
+            document_type=document_type,
+            content=file_content,
+            username=username
+        )])
         
-        _build_faiss_index_from_text(text_content, index_name, faiss_target)
+        if not report['success']:
+            errors = [d['error'] for d in report['documents'] if d.get('error')]
+            return {
+                'success': False,
+                'error': f"FAISS ingestion failed: {errors[0] if errors else 'write refused'}"
+            }
         
         task.update_state(
             state='PROGRESS',
@@ -394,7 +530,8 @@ def _ingest_to_faiss(task: Task,
         return {
             'success': True,
             'index_name': index_name,
-            'index_path': str(faiss_target),
+            'index_path': str(faiss_root / index_name),
+            'chunks': report['chunks'],
             'backend': 'faiss'
         }
         
@@ -406,6 +543,159 @@ def _ingest_to_faiss(task: Task,
         }
 
 
+@celery_app.task(
+    bind=True,
+    base=IngestionTask,
+    max_retries=1,
+    default_retry_delay=60
+)
+def async_ingest_batch(self,
+                       collection_name: str,
+                       files: List[Dict[str, Any]],
+                       username: str,
+                       backend: str = "faiss",
+                       chunk_size: int = 800,
+                       chunk_overlap: int = 120) -> Dict[str, Any]:
+    """
+    Bulk ingestion of staged files through the staged pipeline
+    
+    Parsing runs on a pool of extract workers, embedding is batched across
+    documents and writes are coalesced per collection (see utils.ingestion_pipeline).
+    
+    Args:
+        self: Task instance (bound)
+        collection_name: Target collection/index name
+        files: Staged files as dicts with ``file_ref``, ``file_sha256``,
+            ``file_name`` and ``document_type``
+        username: User who initiated ingestion
+        backend: Storage backend (faiss or weaviate)
+        chunk_size: Size of text chunks
+        chunk_overlap: Overlap between chunks
+        
+    Returns:
+        Pipeline report with per-document results and per-stage throughput
+    """
+    from utils.ingestion_pipeline import (
+        FAISSIngestionSink, WeaviateIngestionSink, IngestionPipeline, SourceDocument
+    )
+    
+    task_id = self.request.id
+    spool = get_ingestion_spool()
+    
+    def on_progress(progress: Dict[str, Any]) -> None:
+        total = max(1, progress['total'])
+        self.update_state(
+            state='PROGRESS',
+            meta={
+                'current': int(100 * progress['completed'] / total),
+                'total': 100,
+                'status': f"Ingested {progress['completed']}/{progress['total']} documents",
+                'filename': collection_name,
+                'stages': progress['stages']
+            }
+        )
+    
+    settled = set()
+    try:
+        documents = [SourceDocument(
+            collection_name=collection_name,
+            file_name=f['file_name'],
+            document_type=f.get('document_type', 'PDF'),
+            path=str(spool.path_for(f['file_ref'])),
+            doc_id=f['file_sha256'],
+            username=username,
+            metadata={'sha256': f['file_sha256']}
+        ) for f in files]
+        
+        sink = WeaviateIngestionSink() if backend == 'weaviate' else FAISSIngestionSink()
+        pipeline = IngestionPipeline(sink, chunk_size=chunk_size, chunk_overlap=chunk_overlap)
+        report = pipeline.run(documents, progress_callback=on_progress)
+        
+        # Settle each staged file's claim by its own outcome
+        outcomes = {r['doc_id']: r['success'] for r in report['documents']}
+        for doc in documents:
+            _finish_staged(collection_name, backend, doc.doc_id, ok=outcomes.get(doc.doc_id, False), task_id=task_id)
+            settled.add(doc.doc_id)
+    finally:
+        # A sink or pipeline failure must not leave claims pending until they expire
+        for f in files:
+            if f['file_sha256'] not in settled:
+                _finish_staged(collection_name, backend, f['file_sha256'], ok=False, task_id=task_id)
+    
+    report['task_id'] = task_id
+    return report
+
+
+def enqueue_batch_ingestion(collection_name: str,
+                            files: Iterable[Union[str, Path, Tuple[str, bytes]]],
+                            username: str,
+                            backend: str = "faiss",
+                            chunk_size: int = 800,
+                            chunk_overlap: int = 120,
+                            force: bool = False) -> Dict[str, Any]:
+    """
+    Stage many files and queue them as one pipelined bulk ingestion task
+    
+    Args:
+        collection_name: Target collection/index name
+        files: Paths, or (file_name, content) pairs
+        username: User who initiated ingestion
+        backend: Storage backend (faiss or weaviate)
+        chunk_size: Size of text chunks
+        chunk_overlap: Overlap between chunks
+        force: Re-ingest content already queued or ingested into the collection
+        
+    Returns:
+        Dictionary with the task id and the staged and duplicate file names
+    """
+    spool = get_ingestion_spool()
+    task_id = uuid()
+    staged, duplicates = [], []
+    for item in files:
+        if isinstance(item, tuple):
+            file_name, content = item
+        else:
+            file_name, content = Path(item).name, item
+        blob, existing = spool.stage_claimed(content, backend, collection_name, force=force,
+                                             task_id=task_id, file_name=file_name, username=username)
+        if existing is not None:
+            duplicates.append(file_name)
+            continue
+        staged.append({
+            'file_ref': blob.ref,
+            'file_sha256': blob.sha256,
+            'file_name': file_name,
+            'document_type': 'PDF' if file_name.lower().endswith('.pdf') else 'TEXT'
+        })
+    
+    if staged:
+        try:
+            async_ingest_batch.apply_async(
+                kwargs=dict(
+                    collection_name=collection_name,
+                    files=staged,
+                    username=username,
+                    backend=backend,
+                    chunk_size=chunk_size,
+                    chunk_overlap=chunk_overlap
+                ),
+                task_id=task_id
+            )
+        except Exception:
+            for f in staged:
+                spool.release_claim(backend, collection_name, f['file_sha256'])
+                spool.release(f['file_sha256'])
+            raise
+    
+    logger.info(f"Queued {len(staged)} files for {collection_name} as task {task_id} "
+                f"({len(duplicates)} duplicates skipped)")
+    return {
+        'task_id': task_id if staged else None,
+        'queued': [f['file_name'] for f in staged],
+        'duplicates': duplicates
+    }
+
+
 @celery_app.task
 def get_ingestion_status(task_id: str) -> Dict[str, Any]:
     """
@@ -464,9 +754,13 @@ def cleanup_old_results(days: int = 7) -> Dict[str, Any]:
     # This would require iterating through Redis keys
     # Implementation depends on your Redis setup
     logger.info(f"Cleanup task triggered for results older than {days} days")
+    
+    # Staged files orphaned by lost tasks
+    spool_removed = get_ingestion_spool().purge(days * 86400)
     return {
         'status': 'completed',
-        'days': days
+        'days': days,
+        'spool_removed': spool_removed
     }
 
 
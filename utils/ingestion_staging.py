@@ -0,0 +1,437 @@
+"""
+Ingestion Staging - Claim-Check Spool
+=====================================
+
+Content-addressed spool for documents waiting to be ingested.
+
+The uploader writes a file once to the spool and enqueues only its reference
+and SHA-256; the worker reads it back from the same spool. Broker messages and
+result payloads therefore stay a few hundred bytes regardless of document size.
+
+* Blobs live at ``<root>/blobs/<sha[:2]>/<sha>`` and are written via a temp file
+  + rename, hashing while streaming (no full copy held in memory)
+* Identical content is stored once: staging an existing hash is a no-op
+* Per (backend, collection) claims record which hashes are queued or ingested,
+  so a re-upload of the same document is detected and skipped
+* A blob is removed once no pending claim references it
+* ``stage_claimed`` writes the claim and publishes the blob under a spool-wide
+  file lock that ``release`` also takes, so a concurrent release cannot delete
+  content that is about to be queued
+* Deleting a collection drops its claims (``forget_collection_claims``)
+
+The spool directory (``INGESTION_SPOOL_DIR``) must be shared by the API/UI
+processes and the Celery workers, e.g. a common volume or a locally mounted
+object store.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import shutil
+import tempfile
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, asdict
+from pathlib import Path
+from typing import Any, BinaryIO, Dict, Iterable, Iterator, Optional, Tuple, Union
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    try:
+        import portalocker
+    except ImportError:
+        portalocker = None
+
+logger = logging.getLogger(__name__)
+
+SPOOL_DIR = os.getenv('INGESTION_SPOOL_DIR', os.path.join('data', 'ingestion_spool'))
+# A pending claim older than this is assumed abandoned (worker lost, broker purged)
+PENDING_CLAIM_TTL = int(os.getenv('INGESTION_PENDING_CLAIM_TTL', str(6 * 3600)))
+
+REF_SCHEME = 'spool://'
+_READ_CHUNK = 1024 * 1024
+
+
+@dataclass
+class StagedBlob:
+    """Reference to a staged document"""
+    ref: str
+    sha256: str
+    size: int
+    existed: bool = False
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+class IngestionSpool:
+    """Content-addressed local spool plus ingestion claims"""
+
+    def __init__(self, root: Optional[Union[str, Path]] = None):
+        self.root = Path(root or SPOOL_DIR)
+        self.blob_dir = self.root / 'blobs'
+        self.claim_dir = self.root / 'claims'
+        self.tmp_dir = self.root / 'tmp'
+        for directory in (self.blob_dir, self.claim_dir, self.tmp_dir):
+            directory.mkdir(parents=True, exist_ok=True)
+
+    @contextmanager
+    def _spool_lock(self):
+        """Exclusive lock shared with other processes using this spool
+        
+        Held while a claim is taken and its blob published, and while
+        ``release`` checks claims and unlinks, so the two cannot interleave.
+        """
+        with open(self.root / 'spool.lock', 'a+b') as fh:
+            if fcntl is not None:
+                fcntl.flock(fh.fileno(), fcntl.LOCK_EX)
+            elif portalocker is not None:
+                portalocker.lock(fh, portalocker.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(fh.fileno(), fcntl.LOCK_UN)
+                elif portalocker is not None:
+                    portalocker.unlock(fh)
+    
+    # ---- blobs ------------------------------------------------------------
+
+    @staticmethod
+    def ref_for(sha256: str) -> str:
+        return f"{REF_SCHEME}{sha256}"
+
+    @staticmethod
+    def sha_from_ref(ref: str) -> str:
+        if not ref or not ref.startswith(REF_SCHEME):
+            raise ValueError(f"Not a spool reference: {ref!r}")
+        sha256 = ref[len(REF_SCHEME):]
+        if len(sha256) != 64 or any(c not in '0123456789abcdef' for c in sha256):
+            raise ValueError(f"Malformed spool reference: {ref!r}")
+        return sha256
+
+    def _blob_path(self, sha256: str) -> Path:
+        return self.blob_dir / sha256[:2] / sha256
+
+    def stage(self, content: Union[bytes, bytearray, memoryview, BinaryIO, str, Path]) -> StagedBlob:
+        """Write ``content`` (bytes, a binary file object or a path) to the spool once"""
+        if isinstance(content, (str, Path)):
+            with open(content, 'rb') as f:
+                return self._stage_stream(f)
+        if isinstance(content, (bytes, bytearray, memoryview)):
+            sha256 = hashlib.sha256(content).hexdigest()
+            existing = self._existing(sha256)
+            if existing is not None:
+                return existing
+            return self._commit(sha256, lambda f: f.write(content), len(content))
+        return self._stage_stream(content)
+
+    def _spool_stream(self, stream: BinaryIO) -> Tuple[str, str, int]:
+        """Copy a stream to a temp file, hashing on the way; returns (temp path, sha256, size)"""
+        digest = hashlib.sha256()
+        fd, tmp_name = tempfile.mkstemp(dir=self.tmp_dir)
+        size = 0
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                for chunk in iter(lambda: stream.read(_READ_CHUNK), b''):
+                    digest.update(chunk)
+                    f.write(chunk)
+                    size += len(chunk)
+        except BaseException:
+            os.unlink(tmp_name)
+            raise
+        return tmp_name, digest.hexdigest(), size
+    
+    def _stage_stream(self, stream: BinaryIO) -> StagedBlob:
+        tmp_name, sha256, size = self._spool_stream(stream)
+        try:
+            existing = self._existing(sha256)
+            if existing is not None:
+                os.unlink(tmp_name)
+                return existing
+            return self._publish(tmp_name, sha256, size)
+        except BaseException:
+            if os.path.exists(tmp_name):
+                os.unlink(tmp_name)
+            raise
+
+    def _commit(self, sha256: str, write, size: int) -> StagedBlob:
+        fd, tmp_name = tempfile.mkstemp(dir=self.tmp_dir)
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                write(f)
+            return self._publish(tmp_name, sha256, size)
+        except BaseException:
+            if os.path.exists(tmp_name):
+                os.unlink(tmp_name)
+            raise
+
+    def _publish(self, tmp_name: str, sha256: str, size: int) -> StagedBlob:
+        path = self._blob_path(sha256)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # Same content under the same name: a concurrent writer winning the race is harmless
+        os.replace(tmp_name, path)
+        logger.debug(f"Staged {size} bytes as {sha256[:12]}")
+        return StagedBlob(ref=self.ref_for(sha256), sha256=sha256, size=size)
+
+    def _existing(self, sha256: str) -> Optional[StagedBlob]:
+        path = self._blob_path(sha256)
+        try:
+            size = path.stat().st_size
+        except OSError:
+            return None
+        # Refresh mtime so purge() does not race a re-upload
+        os.utime(path, None)
+        return StagedBlob(ref=self.ref_for(sha256), sha256=sha256, size=size, existed=True)
+
+    def stage_claimed(self,
+                      content: Union[bytes, bytearray, memoryview, BinaryIO, str, Path],
+                      backend: str,
+                      collection_name: str,
+                      force: bool = False,
+                      **fields) -> Tuple[StagedBlob, Optional[Dict[str, Any]]]:
+        """
+        Claim ``content`` for ingestion into a collection, then stage it.
+        
+        ``release`` keeps blobs that a pending claim references, so taking the
+        claim before the blob is published means another worker finishing the
+        same content cannot delete it in between. With ``force`` an existing
+        claim is dropped first.
+        
+        Returns (blob, None) when the claim was taken, or (blob, existing claim)
+        for a duplicate, in which case nothing is added to the spool.
+        """
+        if isinstance(content, (str, Path)):
+            with open(content, 'rb') as f:
+                return self.stage_claimed(f, backend, collection_name, force, **fields)
+        
+        tmp_name = None
+        if isinstance(content, (bytes, bytearray, memoryview)):
+            sha256, size = hashlib.sha256(content).hexdigest(), len(content)
+        else:
+            tmp_name, sha256, size = self._spool_stream(content)
+        try:
+            if force:
+                self.release_claim(backend, collection_name, sha256)
+            with self._spool_lock():
+                existing = self.claim(backend, collection_name, sha256, **fields)
+                if existing is not None:
+                    present = self._blob_path(sha256).exists()
+                    return StagedBlob(ref=self.ref_for(sha256), sha256=sha256, size=size, existed=present), existing
+                try:
+                    blob = self._existing(sha256)
+                    if blob is None:
+                        if tmp_name is not None:
+                            blob, tmp_name = self._publish(tmp_name, sha256, size), None
+                        else:
+                            blob = self._commit(sha256, lambda f: f.write(content), size)
+                except BaseException:
+                    self.release_claim(backend, collection_name, sha256)
+                    raise
+            return blob, None
+        finally:
+            if tmp_name is not None and os.path.exists(tmp_name):
+                os.unlink(tmp_name)
+    
+    def path_for(self, ref: str) -> Path:
+        """Local path of a staged blob (workers may read it directly)"""
+        return self._blob_path(self.sha_from_ref(ref))
+
+    def exists(self, ref: str) -> bool:
+        return self._blob_path(self.sha_from_ref(ref)).exists()
+
+    def read(self, ref: str, expected_sha256: Optional[str] = None) -> bytes:
+        """Load a staged blob, verifying its content hash"""
+        sha256 = self.sha_from_ref(ref)
+        if expected_sha256 and expected_sha256 != sha256:
+            raise ValueError(f"Reference {ref} does not match hash {expected_sha256}")
+        data = self._blob_path(sha256).read_bytes()
+        if hashlib.sha256(data).hexdigest() != sha256:
+            raise ValueError(f"Staged blob {sha256[:12]} is corrupt")
+        return data
+
+    def release(self, ref_or_sha: str) -> bool:
+        """Delete a blob unless a pending claim still needs it"""
+        sha256 = self.sha_from_ref(ref_or_sha) if ref_or_sha.startswith(REF_SCHEME) else ref_or_sha
+        with self._spool_lock():
+            for claim in self._claims_for(sha256):
+                if claim.get('status') == 'pending' and not self._claim_expired(claim):
+                    return False
+            try:
+                self._blob_path(sha256).unlink()
+                return True
+            except FileNotFoundError:
+                return False
+
+    # ---- claims -----------------------------------------------------------
+
+    @staticmethod
+    def _scope(backend: str, collection_name: str) -> str:
+        return hashlib.blake2b(f"{backend}|{collection_name}".encode('utf-8'), digest_size=10).hexdigest()
+
+    def _claim_path(self, backend: str, collection_name: str, sha256: str) -> Path:
+        return self.claim_dir / self._scope(backend, collection_name) / f"{sha256}.json"
+
+    def _claims_for(self, sha256: str) -> Iterator[Dict[str, Any]]:
+        for path in self.claim_dir.glob(f"*/{sha256}.json"):
+            claim = self._read_json(path)
+            if claim is not None:
+                yield claim
+
+    @staticmethod
+    def _read_json(path: Path) -> Optional[Dict[str, Any]]:
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    @staticmethod
+    def _claim_expired(claim: Dict[str, Any]) -> bool:
+        return claim.get('status') == 'pending' and time.time() - claim.get('updated_at', 0) > PENDING_CLAIM_TTL
+
+    def claim(self, backend: str, collection_name: str, sha256: str, **fields) -> Optional[Dict[str, Any]]:
+        """
+        Reserve ``sha256`` for ingestion into a collection.
+
+        Returns None when the reservation was taken, or the existing claim when
+        the same content is already queued or ingested there (a duplicate).
+        """
+        path = self._claim_path(backend, collection_name, sha256)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        now = time.time()
+        record = dict(fields, sha256=sha256, collection_name=collection_name, backend=backend,
+                      status='pending', created_at=now, updated_at=now)
+        for _ in range(2):
+            try:
+                fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o644)
+            except FileExistsError:
+                existing = self._read_json(path)
+                if existing is not None and not self._claim_expired(existing):
+                    return existing
+                # Abandoned or unreadable claim: take it over
+                self._remove(path)
+                continue
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(record, f)
+            return None
+        return self._read_json(path)
+
+    def update_claim(self, backend: str, collection_name: str, sha256: str, **fields) -> None:
+        path = self._claim_path(backend, collection_name, sha256)
+        record = self._read_json(path) or {'sha256': sha256, 'collection_name': collection_name,
+                                           'backend': backend, 'created_at': time.time()}
+        record.update(fields, updated_at=time.time())
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_name = tempfile.mkstemp(dir=path.parent, suffix='.tmp')
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(record, f)
+        os.replace(tmp_name, path)
+
+    def release_claim(self, backend: str, collection_name: str, sha256: str,
+                      task_id: Optional[str] = None) -> None:
+        """Remove a claim; with ``task_id``, only if that task still owns it"""
+        path = self._claim_path(backend, collection_name, sha256)
+        if task_id is not None:
+            claim = self._read_json(path)
+            if claim is not None and claim.get('task_id') != task_id:
+                return
+        self._remove(path)
+
+    def forget_collection(self, collection_name: str, backends: Iterable[str]) -> int:
+        """Drop every claim for a collection (e.g. after it was deleted) and release the blobs
+        
+        Collection names are matched case-insensitively, since some backends
+        normalise them. Returns the number of claims removed.
+        """
+        wanted = {(b.lower(), collection_name.lower()) for b in backends}
+        removed = 0
+        for scope_dir in self.claim_dir.iterdir():
+            # Every claim in a scope directory has the same (backend, collection)
+            sample = next((self._read_json(p) for p in scope_dir.glob('*.json')), None)
+            if sample is None:
+                continue
+            key = (str(sample.get('backend', '')).lower(), str(sample.get('collection_name', '')).lower())
+            if key not in wanted:
+                continue
+            for path in list(scope_dir.glob('*.json')):
+                self._remove(path)
+                removed += 1
+                self.release(path.stem)
+            shutil.rmtree(scope_dir, ignore_errors=True)
+        return removed
+    
+    @staticmethod
+    def _remove(path: Path) -> None:
+        try:
+            path.unlink()
+        except FileNotFoundError:
+            pass
+
+    # ---- maintenance ------------------------------------------------------
+
+    def purge(self, max_age_seconds: float) -> Dict[str, int]:
+        """Drop blobs and temp files older than ``max_age_seconds`` that no live claim needs"""
+        cutoff = time.time() - max_age_seconds
+        removed = {'blobs': 0, 'tmp': 0, 'claims': 0}
+        for path in self.tmp_dir.iterdir():
+            try:
+                if path.stat().st_mtime < cutoff:
+                    path.unlink()
+                    removed['tmp'] += 1
+            except OSError:
+                continue
+        for path in self.claim_dir.glob('*/*.json'):
+            claim = self._read_json(path)
+            if claim is None or self._claim_expired(claim):
+                self._remove(path)
+                removed['claims'] += 1
+        for path in self.blob_dir.glob('*/*'):
+            try:
+                if path.stat().st_mtime < cutoff and self.release(path.name):
+                    removed['blobs'] += 1
+            except OSError:
+                continue
+        return removed
+
+    def get_stats(self) -> Dict[str, Any]:
+        blobs = [p for p in self.blob_dir.glob('*/*') if p.is_file()]
+        return {
+            'root': str(self.root),
+            'blobs': len(blobs),
+            'bytes': sum(p.stat().st_size for p in blobs),
+            'claims': sum(1 for _ in self.claim_dir.glob('*/*.json')),
+            'disk_free': shutil.disk_usage(self.root).free,
+        }
+
+
+_spool: Optional[IngestionSpool] = None
+
+
+def get_ingestion_spool() -> IngestionSpool:
+    """Process-wide spool rooted at ``INGESTION_SPOOL_DIR``"""
+    global _spool
+    if _spool is None:
+        _spool = IngestionSpool()
+    return _spool
+
+
+def forget_collection_claims(collection_name: str, backend: str) -> int:
+    """
+    Drop ingestion claims for a deleted collection so its documents can be ingested again.
+    
+    Claims queued with backend ``both`` cover the collection too and are dropped as well.
+    """
+    if _spool is None and not Path(SPOOL_DIR).exists():
+        return 0
+    try:
+        removed = get_ingestion_spool().forget_collection(collection_name, (backend, 'both'))
+    except Exception as e:
+        logger.warning(f"Could not clear ingestion claims for {collection_name}: {e}")
+        return 0
+    if removed:
+        logger.info(f"Cleared {removed} ingestion claims for deleted {backend} collection {collection_name}")
+    return removed
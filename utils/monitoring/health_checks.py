@@ -156,7 +156,9 @@ class HealthChecker:
                 }
             
             # Count indexes
-            indexes = list(faiss_dir.glob('**/index.faiss'))
+            # Legacy index.faiss directories and segment-store collections (manifest.json)
+            indexes = sorted({p.parent for pattern in ('**/index.faiss', '**/manifest.json')
+                              for p in faiss_dir.glob(pattern)})
             
             if len(indexes) > 0:
                 return {
@@ -164,7 +166,7 @@ class HealthChecker:
                     'message': 'FAISS indexes available',
                     'details': {
                         'index_count': len(indexes),
-                        'indexes': [idx.parent.name for idx in indexes[:5]]
+                        'indexes': [idx.name for idx in indexes[:5]]
                     }
                 }
             else:
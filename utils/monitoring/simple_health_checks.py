@@ -107,7 +107,9 @@ class SimpleHealthChecker:
                     'details': {}
                 }
             
-            indexes = list(faiss_dir.glob('**/index.faiss'))
+            # Legacy index.faiss directories and segment-store collections (manifest.json)
+            indexes = sorted({p.parent for pattern in ('**/index.faiss', '**/manifest.json')
+                              for p in faiss_dir.glob(pattern)})
             
             if len(indexes) > 0:
                 return {
@@ -115,7 +117,7 @@ class SimpleHealthChecker:
                     'message': f'{len(indexes)} FAISS index(es) available',
                     'details': {
                         'index_count': len(indexes),
-                        'indexes': [idx.parent.name for idx in indexes[:5]]
+                        'indexes': [idx.name for idx in indexes[:5]]
                     }
                 }
             else:
@@ -5,8 +5,13 @@ This module provides functions to search across multiple data sources.
 import os
 import logging
 import json
+import heapq
+import inspect
+import threading
 import requests
-from typing import List, Dict, Any, Optional
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
 import time
 import random
 from urllib.parse import quote_plus
@@ -73,22 +78,208 @@ class SearchResult:
             "metadata": self.metadata
         }
 
+# Source fan-out limits (overridable per engine / per source)
+DEFAULT_SOURCE_TIMEOUT = float(os.getenv("MULTI_SOURCE_TIMEOUT_SECONDS", "8"))
+DEFAULT_SEARCH_DEADLINE = float(os.getenv("MULTI_SOURCE_DEADLINE_SECONDS", "15"))
+DEFAULT_MAX_WORKERS = int(os.getenv("MULTI_SOURCE_MAX_WORKERS", "8"))
+_QUEUED_POLL_SECONDS = 0.05
+
+def _accepts_timeout(func: Callable) -> bool:
+    """Whether a source function takes a ``timeout`` keyword (seconds)"""
+    try:
+        params = inspect.signature(func).parameters.values()
+    except (TypeError, ValueError):
+        return False
+    return any(p.name == "timeout" or p.kind is inspect.Parameter.VAR_KEYWORD for p in params)
+
+@dataclass
+class SourceOutcome:
+    """What one source contributed to a search"""
+    source_name: str
+    source_type: str
+    status: str  # "ok", "error" or "timeout"
+    latency: float
+    results: List[SearchResult] = field(default_factory=list)
+    error: Optional[str] = None
+    
+    def to_dict(self):
+        return {
+            "source_name": self.source_name,
+            "source_type": self.source_type,
+            "status": self.status,
+            "latency": round(self.latency, 3),
+            "result_count": len(self.results),
+            "error": self.error,
+        }
+
 class MultiSourceSearchEngine:
     """
     Search engine that can query multiple sources and aggregate results.
+    
+    Each search runs its sources concurrently on its own thread pool, so a hung
+    source can only hold threads of the search that started it. Each source has
+    its own timeout, counted from when it starts running and passed to sources
+    that accept a ``timeout`` argument, and the whole search has a global
+    deadline; a source that misses either is reported as timed out and its late
+    results are discarded, so one slow feed cannot stall the request. ``search_iter`` yields results as each
+    source finishes, with the merged ranking updated incrementally.
     """
-    def __init__(self):
+    def __init__(self, max_workers: Optional[int] = None, source_timeout: Optional[float] = None,
+                 deadline: Optional[float] = None):
         self.registered_sources = {}
+        # Upper bound on the sources one search runs at the same time
+        self.max_workers = max(1, max_workers or DEFAULT_MAX_WORKERS)
+        self.source_timeout = source_timeout if source_timeout is not None else DEFAULT_SOURCE_TIMEOUT
+        self.deadline = deadline if deadline is not None else DEFAULT_SEARCH_DEADLINE
+        # source name -> rolling latency / outcome counters
+        self._source_stats: Dict[str, Dict[str, Any]] = {}
+        self._stats_lock = threading.Lock()
     
-    def register_source(self, source_name: str, search_function, source_type: str):
-        """Register a search function for a specific source"""
+    def register_source(self, source_name: str, search_function, source_type: str,
+                        timeout: Optional[float] = None):
+        """Register a search function for a specific source (``timeout`` overrides the engine default)"""
         self.registered_sources[source_name] = {
             "function": search_function,
-            "type": source_type
+            "type": source_type,
+            "timeout": timeout,
+            "accepts_timeout": _accepts_timeout(search_function)
         }
         logger.info(f"Registered search source: {source_name} (type: {source_type})")
     
-    def search(self, query: str, sources: List[str] = None, max_results_per_source: int = 3) -> List[SearchResult]:
+    def _source_timeout(self, source_name: str) -> float:
+        return self.registered_sources[source_name].get("timeout") or self.source_timeout
+    
+    def _run_source(self, source_name: str, query: str, max_results: int) -> List[SearchResult]:
+        """Call one source and normalize its results to SearchResult objects"""
+        source_config = self.registered_sources[source_name]
+        kwargs = {"max_results": max_results}
+        if source_config.get("accepts_timeout"):
+            # Let the source bound its own network calls instead of hanging a worker
+            kwargs["timeout"] = self._source_timeout(source_name)
+        source_results = source_config["function"](query, **kwargs) or []
+        
+        results = []
+        for result in source_results:
+            # Convert to SearchResult objects if they aren't already
+            if not isinstance(result, SearchResult):
+                result = SearchResult(
+                    content=result.get("content", ""),
+                    source_name=source_name,
+                    source_type=source_config["type"],
+                    relevance_score=result.get("relevance", 0.0),
+                    metadata=result.get("metadata", {})
+                )
+            results.append(result)
+        return results
+    
+    def _record_outcome(self, outcome: SourceOutcome) -> None:
+        with self._stats_lock:
+            stats = self._source_stats.setdefault(outcome.source_name, {
+                "calls": 0, "ok": 0, "errors": 0, "timeouts": 0,
+                "last_latency": 0.0, "avg_latency": 0.0, "max_latency": 0.0,
+            })
+            stats["calls"] += 1
+            stats[{"ok": "ok", "error": "errors", "timeout": "timeouts"}[outcome.status]] += 1
+            stats["last_latency"] = outcome.latency
+            stats["max_latency"] = max(stats["max_latency"], outcome.latency)
+            # Exponential moving average so recent behaviour dominates
+            alpha = 0.2 if stats["calls"] > 1 else 1.0
+            stats["avg_latency"] += alpha * (outcome.latency - stats["avg_latency"])
+    
+    def get_source_stats(self) -> Dict[str, Dict[str, Any]]:
+        """Per-source latency and outcome counters across searches"""
+        with self._stats_lock:
+            return {name: dict(stats) for name, stats in self._source_stats.items()}
+    
+    def search_iter(self, query: str, sources: List[str] = None, max_results_per_source: int = 3,
+                    deadline: Optional[float] = None) -> Iterator[Tuple[SourceOutcome, List[SearchResult]]]:
+        """
+        Search sources concurrently, yielding as each one finishes
+        
+        Yields:
+            (outcome, ranked) pairs: the finished source's outcome (status, latency,
+            results) and the merged ranking of everything received so far. Sources
+            that miss their timeout or the global ``deadline`` (seconds) are yielded
+            with status "timeout" once it passes.
+        """
+        sources_to_search = []
+        for source_name in (sources or list(self.registered_sources.keys())):
+            if source_name not in self.registered_sources:
+                logger.warning(f"Source '{source_name}' not registered. Skipping.")
+                continue
+            if source_name not in sources_to_search:
+                sources_to_search.append(source_name)
+        if not sources_to_search:
+            return
+        
+        started = time.monotonic()
+        global_deadline = started + (deadline if deadline is not None else self.deadline)
+        # Per-search pool: a source hung in this search cannot occupy workers of later ones
+        executor = ThreadPoolExecutor(max_workers=min(len(sources_to_search), self.max_workers),
+                                      thread_name_prefix="multi-source")
+        began: Dict[str, float] = {}
+        
+        def run(source_name: str) -> List[SearchResult]:
+            # The source's timeout starts when it runs, not while it waits for a worker
+            began[source_name] = time.monotonic()
+            return self._run_source(source_name, query, max_results_per_source)
+        
+        def source_deadline(source_name: str) -> float:
+            if source_name not in began:
+                return global_deadline
+            return min(began[source_name] + self._source_timeout(source_name), global_deadline)
+        
+        pending = {}
+        for position, source_name in enumerate(sources_to_search):
+            logger.info(f"Searching source: {source_name}")
+            pending[executor.submit(run, source_name)] = (position, source_name)
+        
+        # Ranked by relevance, ties in source registration order then source order
+        ranked: List[Tuple[Tuple[float, int, int], SearchResult]] = []
+        
+        try:
+            while pending:
+                now = time.monotonic()
+                expired = [f for f, (_, name) in pending.items() if source_deadline(name) <= now]
+                for future in expired:
+                    _, source_name = pending.pop(future)
+                    future.cancel()
+                    outcome = SourceOutcome(source_name, self.registered_sources[source_name]["type"],
+                                            "timeout", now - started,
+                                            error="Timed out before returning results")
+                    logger.warning(f"Source '{source_name}' timed out after {outcome.latency:.1f}s")
+                    self._record_outcome(outcome)
+                    yield outcome, [r for _, r in ranked]
+                if not pending:
+                    break
+                
+                wake_at = min(source_deadline(name) for _, name in pending.values())
+                if any(name not in began for _, name in pending.values()):
+                    # A queued source may start at any moment; re-check its deadline soon
+                    wake_at = min(wake_at, now + _QUEUED_POLL_SECONDS)
+                done, _ = wait(list(pending), timeout=max(0.0, wake_at - time.monotonic()),
+                               return_when=FIRST_COMPLETED)
+                for future in done:
+                    position, source_name = pending.pop(future)
+                    latency = time.monotonic() - started
+                    source_type = self.registered_sources[source_name]["type"]
+                    try:
+                        results = future.result()
+                        outcome = SourceOutcome(source_name, source_type, "ok", latency, results)
+                        new = sorted(((-r.relevance_score, position, i), r) for i, r in enumerate(results))
+                        ranked = list(heapq.merge(ranked, new, key=lambda item: item[0]))
+                    except Exception as e:
+                        logger.error(f"Error searching source '{source_name}': {str(e)}")
+                        outcome = SourceOutcome(source_name, source_type, "error", latency, error=str(e))
+                    self._record_outcome(outcome)
+                    yield outcome, [r for _, r in ranked]
+        finally:
+            # Never wait for stragglers; their results are discarded
+            executor.shutdown(wait=False, cancel_futures=True)
+    
+    def search(self, query: str, sources: List[str] = None, max_results_per_source: int = 3,
+               deadline: Optional[float] = None,
+               on_update: Optional[Callable[[SourceOutcome, List[SearchResult]], None]] = None) -> List[SearchResult]:
         """
         Search across multiple sources and return aggregated results
         
@@ -96,49 +287,20 @@ class MultiSourceSearchEngine:
             query: Search query string
             sources: List of source names to search (if None, search all registered sources)
             max_results_per_source: Maximum number of results to return per source
+            deadline: Global deadline in seconds (engine default if None)
+            on_update: Called with (outcome, ranked results so far) as each source finishes
             
         Returns:
             List of SearchResult objects sorted by relevance
         """
-        all_results = []
-        sources_to_search = sources or self.registered_sources.keys()
-        
-        for source_name in sources_to_search:
-            if source_name not in self.registered_sources:
-                logger.warning(f"Source '{source_name}' not registered. Skipping.")
-                continue
-                
-            source_config = self.registered_sources[source_name]
-            search_function = source_config["function"]
-            source_type = source_config["type"]
-            
-            try:
-                logger.info(f"Searching source: {source_name}")
-                source_results = search_function(query, max_results=max_results_per_source)
-                
-                # Convert to SearchResult objects if they aren't already
-                for result in source_results:
-                    if not isinstance(result, SearchResult):
-                        content = result.get("content", "")
-                        metadata = result.get("metadata", {})
-                        relevance = result.get("relevance", 0.0)
-                        
-                        result_obj = SearchResult(
-                            content=content,
-                            source_name=source_name,
-                            source_type=source_type,
-                            relevance_score=relevance,
-                            metadata=metadata
-                        )
-                        all_results.append(result_obj)
-                    else:
-                        all_results.append(result)
-                        
-            except Exception as e:
-                logger.error(f"Error searching source '{source_name}': {str(e)}")
-        
-        # Sort results by relevance score, highest first
-        all_results.sort(key=lambda x: x.relevance_score, reverse=True)
+        all_results: List[SearchResult] = []
+        for outcome, ranked in self.search_iter(query, sources, max_results_per_source, deadline):
+            all_results = ranked
+            if on_update is not None:
+                try:
+                    on_update(outcome, ranked)
+                except Exception as e:
+                    logger.debug(f"Search update callback failed: {e}")
         return all_results
 
 # Sample search functions for different source types
@@ -251,13 +413,25 @@ def search_vector_index(query: str, index_name: str, max_results: int = 3) -> Li
         )]
     return results
 
-def search_web_api(query: str, max_results: int = 3) -> List[SearchResult]:
+def search_web_api(query: str, max_results: int = 3, timeout: Optional[float] = None) -> List[SearchResult]:
     """
     Search the web for information. Tries real search via DuckDuckGo if available,
     otherwise falls back to curated RSS feeds for popular news sources (e.g., CNN),
     then to a generic safe fallback.
+
+    ``timeout`` (seconds) bounds the whole call: every HTTP request gets only the
+    time that is left of it.
     """
     logger.info(f"Searching web for query: {query}")
+    budget_end = time.monotonic() + timeout if timeout else None
+
+    def _request_timeout() -> float:
+        if budget_end is None:
+            return 10
+        remaining = budget_end - time.monotonic()
+        if remaining <= 0:
+            raise TimeoutError("Web search time budget exhausted")
+        return min(10, remaining)
 
     try:
         results: List[SearchResult] = []
@@ -361,7 +535,7 @@ def search_web_api(query: str, max_results: int = 3) -> List[SearchResult]:
         ddg_results: List[SearchResult] = []
         try:
             from duckduckgo_search import DDGS  # type: ignore
-            with DDGS() as ddgs:
+            with DDGS(timeout=max(1, int(_request_timeout()))) as ddgs:
                 for r in ddgs.text(query, max_results=max_results * 5):
                     title = (r.get("title") or "").strip()
                     body = (r.get("body") or title).strip()
@@ -388,7 +562,7 @@ def search_web_api(query: str, max_results: int = 3) -> List[SearchResult]:
             items: List[SearchResult] = []
             for feed in feed_urls:
                 try:
-                    resp = requests.get(feed, timeout=10, headers=UA)
+                    resp = requests.get(feed, timeout=_request_timeout(), headers=UA)
                     if resp.status_code != 200:
                         continue
                     root = ET.fromstring(resp.content)
@@ -435,7 +609,7 @@ def search_web_api(query: str, max_results: int = 3) -> List[SearchResult]:
                 url = (
                     f"https://news.google.com/rss/search?q={quote_plus(q)}&hl=en-US&gl=US&ceid=US:en"
                 )
-                resp = requests.get(url, timeout=10, headers=UA)
+                resp = requests.get(url, timeout=_request_timeout(), headers=UA)
                 if resp.status_code != 200:
                     return []
                 root = ET.fromstring(resp.content)
@@ -487,7 +661,7 @@ def search_web_api(query: str, max_results: int = 3) -> List[SearchResult]:
             items: List[SearchResult] = []
             for feed in feeds:
                 try:
-                    resp = requests.get(feed, timeout=10, headers=UA)
+                    resp = requests.get(feed, timeout=_request_timeout(), headers=UA)
                     if resp.status_code != 200:
                         continue
                     root = ET.fromstring(resp.content)
@@ -538,7 +712,7 @@ def search_web_api(query: str, max_results: int = 3) -> List[SearchResult]:
             # If not enough domain-specific items from generic DDG, try site: queries on DDG
             try:
                 from duckduckgo_search import DDGS  # type: ignore
-                with DDGS() as ddgs:
+                with DDGS(timeout=max(1, int(_request_timeout()))) as ddgs:
                     # Fill remaining slots up to ~max_results * 2 to allow later dedup and capping
                     target_fill = max_results * 2
                     filled = 0
@@ -927,15 +1101,21 @@ Consider:
     
     return output
 
-def perform_multi_source_search(query: str, knowledge_sources: List[str], max_results: int = 5, use_placeholders: bool = False) -> List[SearchResult]:
+def perform_multi_source_search(query: str, knowledge_sources: List[str], max_results: int = 5, use_placeholders: bool = False,
+                                on_update: Optional[Callable[[SourceOutcome, List[SearchResult]], None]] = None,
+                                deadline: Optional[float] = None) -> List[SearchResult]:
     """
     Perform search across multiple sources based on user query and selected knowledge sources.
     
+    Sources are searched concurrently; see ``MultiSourceSearchEngine.search``.
+    
     Args:
         query: The user's query string
         knowledge_sources: List of knowledge source names to search
         max_results: Maximum number of results to return per source
         use_placeholders: Whether to return placeholder results (for testing)
+        on_update: Called with (outcome, ranked results so far) as each source finishes
+        deadline: Global deadline in seconds for the whole search (engine default if None)
     
     Returns:
         List of SearchResult objects
@@ -950,48 +1130,45 @@ def perform_multi_source_search(query: str, knowledge_sources: List[str], max_re
         # Register search sources based on availability
         register_default_search_sources(search_engine)
     
-    results = []
-    
     if use_placeholders:
         # Return placeholder results for testing
         return generate_placeholder_results(query, knowledge_sources)
     
-    # Perform real search across selected knowledge sources
+    # Map friendly names to registered keys
+    mapped_keys = []
     for source in knowledge_sources:
-        try:
-            # Map friendly names to registered keys
-            normalized = source.strip().lower()
-            mapped_key = None
-            if normalized in ("web search (external)", "web search", "web", "external web"):
-                mapped_key = "web_search"
-            elif normalized in ("structured data (external)", "structured data", "financial data"):
-                mapped_key = "financial_data"
-            elif normalized in ("indexed documents", "documents", "index", "knowledge base"):
-                # Choose a sensible default; could be made configurable
-                mapped_key = "company_docs"
-            else:
-                # Fallback to normalized key expected by registry
-                mapped_key = source.lower().replace(" ", "_").replace("(", "").replace(")", "")
-
-            if mapped_key in search_engine.registered_sources:
-                source_func = search_engine.registered_sources[mapped_key]["function"]
-                source_type = search_engine.registered_sources[mapped_key]["type"]
-                
-                logger.info(f"Searching source: {source} (type: {source_type})")
-                source_results = source_func(query, max_results=max_results)
-                
-                if source_results:
-                    results.extend(source_results)
-                    logger.info(f"Found {len(source_results)} results from {source}")
-                else:
-                    logger.info(f"No results found from {source}")
-            else:
-                logger.warning(f"No search function registered for source: {source} (mapped key: {mapped_key})")
-        except Exception as e:
-            logger.error(f"Error searching {source}: {str(e)}")
+        normalized = source.strip().lower()
+        if normalized in ("web search (external)", "web search", "web", "external web"):
+            mapped_key = "web_search"
+        elif normalized in ("structured data (external)", "structured data", "financial data"):
+            mapped_key = "financial_data"
+        elif normalized in ("indexed documents", "documents", "index", "knowledge base"):
+            # Choose a sensible default; could be made configurable
+            mapped_key = "company_docs"
+        else:
+            # Fallback to normalized key expected by registry
+            mapped_key = source.lower().replace(" ", "_").replace("(", "").replace(")", "")
+        
+        if mapped_key in search_engine.registered_sources:
+            mapped_keys.append(mapped_key)
+        else:
+            logger.warning(f"No search function registered for source: {source} (mapped key: {mapped_key})")
+    
+    if not mapped_keys:
+        return []
+    
+    # Perform real search across selected knowledge sources, concurrently
+    outcomes: List[SourceOutcome] = []
+    
+    def _collect(outcome: SourceOutcome, ranked: List[SearchResult]) -> None:
+        outcomes.append(outcome)
+        if on_update is not None:
+            on_update(outcome, ranked)
     
-    # Sort results by relevance score (highest first)
-    results.sort(key=lambda x: x.relevance_score if hasattr(x, 'relevance_score') else 0, reverse=True)
+    results = search_engine.search(query, mapped_keys, max_results, deadline=deadline, on_update=_collect)
+    for outcome in outcomes:
+        logger.info(f"Source {outcome.source_name}: {outcome.status}, {len(outcome.results)} results "
+                    f"in {outcome.latency:.2f}s")
     
     # Limit to max_results total
     if len(results) > max_results:
@@ -4,10 +4,16 @@ Unified interface for all vector storage backends in VaultMind GenAI Knowledge A
 """
 
 from abc import ABC, abstractmethod
-from typing import List, Dict, Any, Optional, Tuple, Union
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple, Union
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
 from enum import Enum
+import asyncio
+import functools
 import logging
+import os
+import threading
 from pathlib import Path
 
 logger = logging.getLogger(__name__)
@@ -61,6 +67,72 @@ class BaseVectorStore(ABC):
         self.store_type = config.store_type
         self._client = None
         self._connected = False
+        # Bounded per-store pool for blocking client calls (see _run_blocking)
+        self._executor: Optional[ThreadPoolExecutor] = None
+        # Separate pool driving whole search() coroutines (see search_off_loop)
+        self._search_executor: Optional[ThreadPoolExecutor] = None
+        self._executor_lock = threading.Lock()
+        self.max_blocking_workers = int(
+            (config.connection_params or {}).get('max_workers')
+            or os.getenv('VECTOR_STORE_MAX_WORKERS', '8')
+        )
+    
+    def _get_executor(self) -> ThreadPoolExecutor:
+        with self._executor_lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_blocking_workers,
+                    thread_name_prefix=f"vs-{getattr(self.store_type, 'value', self.store_type)}",
+                )
+            return self._executor
+    
+    def _get_search_executor(self) -> ThreadPoolExecutor:
+        with self._executor_lock:
+            if self._search_executor is None:
+                self._search_executor = ThreadPoolExecutor(
+                    max_workers=self.max_blocking_workers,
+                    thread_name_prefix=f"vs-search-{getattr(self.store_type, 'value', self.store_type)}",
+                )
+            return self._search_executor
+    
+    async def _run_blocking(self, func: Callable, *args, **kwargs):
+        """Run a synchronous client call on this store's worker pool
+        
+        Adapters whose SDKs are blocking wrap every network call with this, so
+        the event loop stays free and fan-out across stores (asyncio.gather)
+        actually overlaps. The pool is per store, so a slow backend can only
+        tie up its own workers.
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._get_executor(), functools.partial(func, *args, **kwargs))
+    
+    @property
+    def native_async(self) -> bool:
+        """True when search() awaits a loop-bound async driver and must run on the caller's loop"""
+        return False
+    
+    async def search_off_loop(self, *args, **kwargs) -> List[VectorSearchResult]:
+        """``search`` that cannot stall the caller's event loop
+        
+        An adapter that still blocks inside its ``search`` coroutine would
+        freeze the loop, so ``asyncio.wait_for`` deadlines and hedge timers
+        around it never fire. Unless the adapter is ``native_async``, the whole
+        coroutine is driven in a private event loop on a per-store pool (kept
+        apart from the ``_run_blocking`` pool so nested calls cannot deadlock).
+        """
+        if self.native_async:
+            return await self.search(*args, **kwargs)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._get_search_executor(),
+                                          lambda: asyncio.run(self.search(*args, **kwargs)))
+    
+    def _shutdown_executor(self) -> None:
+        with self._executor_lock:
+            executors = (self._executor, self._search_executor)
+            self._executor = self._search_executor = None
+        for executor in executors:
+            if executor is not None:
+                executor.shutdown(wait=False)
         
     @abstractmethod
     async def connect(self) -> bool:
@@ -163,12 +235,41 @@ class VectorStoreStatus:
     """Status information for vector stores"""
     
     def __init__(self, store_type: VectorStoreType, connected: bool, 
-                 collections: List[str], error: Optional[str] = None):
+                 collections: List[str], error: Optional[str] = None,
+                 latency_window: int = 200):
         self.store_type = store_type
         self.connected = connected
         self.collections = collections
         self.error = error
         self.collection_count = len(collections)
+        # Rolling window of (seconds, ok) per request, used for latency-aware routing
+        self._samples: Deque[Tuple[float, bool]] = deque(maxlen=latency_window)
+        self._samples_lock = threading.Lock()
+        self.demoted = False
+    
+    def record_request(self, latency: float, ok: bool = True) -> None:
+        with self._samples_lock:
+            self._samples.append((float(latency), bool(ok)))
+    
+    @property
+    def sample_count(self) -> int:
+        return len(self._samples)
+    
+    def latency_percentile(self, pct: float) -> Optional[float]:
+        """Rolling latency percentile in seconds (None until a request was recorded)"""
+        with self._samples_lock:
+            latencies = sorted(lat for lat, _ in self._samples)
+        if not latencies:
+            return None
+        idx = min(len(latencies) - 1, max(0, int(round(pct / 100.0 * len(latencies))) - 1))
+        return latencies[idx]
+    
+    @property
+    def error_rate(self) -> float:
+        with self._samples_lock:
+            if not self._samples:
+                return 0.0
+            return sum(1 for _, ok in self._samples if not ok) / len(self._samples)
     
     def to_dict(self) -> Dict[str, Any]:
         return {
@@ -176,7 +277,11 @@ class VectorStoreStatus:
             "connected": self.connected,
             "collections": self.collections,
             "collection_count": self.collection_count,
-            "error": self.error
+            "error": self.error,
+            "p50_latency": self.latency_percentile(50),
+            "p95_latency": self.latency_percentile(95),
+            "error_rate": self.error_rate,
+            "demoted": self.demoted
         }
 
 class VectorStoreFactory:
@@ -227,39 +332,10 @@ def cosine_similarity(vec1: List[float], vec2: List[float]) -> float:
 
 def batch_embeddings(texts: List[str], 
                     model_name: str = "all-MiniLM-L6-v2") -> List[List[float]]:
-    """Generate embeddings for a batch of texts"""
+    """Generate embeddings for a batch of texts using the shared embedding service"""
     try:
-        from sentence_transformers import SentenceTransformer
-        # Prefer local models directory if present to avoid network fetch
-        model_dir = Path("models")
-        candidates: List[Path] = []
-        if model_dir.exists():
-            # Exact name directory (case-insensitive)
-            for p in model_dir.iterdir():
-                if p.is_dir() and p.name.lower() == model_name.lower():
-                    candidates.append(p)
-            # Common alias for MiniLM local folder naming
-            aliases = []
-            if model_name.lower() == "all-minilm-l6-v2":
-                aliases = ["all-minLM-L6-v2", "all-MiniLM-L6-v2"]
-            for alias in aliases:
-                ap = model_dir / alias
-                if ap.exists():
-                    candidates.append(ap)
-            # Direct path fallback
-            direct = model_dir / model_name
-            if direct.exists():
-                candidates.append(direct)
-        model = None
-        for c in candidates:
-            try:
-                model = SentenceTransformer(str(c))
-                break
-            except Exception:
-                continue
-        if model is None:
-            model = SentenceTransformer(model_name)
-        embeddings = model.encode(texts)
+        from .embedding_service import get_embedding_service
+        embeddings = get_embedding_service(model_name).encode(texts)
         return [emb.tolist() for emb in embeddings]
     except ImportError:
         logger.error("sentence-transformers not available for embedding generation")
@@ -5,10 +5,11 @@ Config-driven routing system for vector store selection with fallback mechanisms
 
 import os
 import json
+import time
 import logging
 from typing import List, Dict, Any, Optional, Tuple, Union
 from pathlib import Path
-from dataclasses import dataclass, asdict
+from dataclasses import dataclass, asdict, field
 import asyncio
 from concurrent.futures import ThreadPoolExecutor
 
@@ -29,6 +30,8 @@ from .multi_vector_storage_interface import (
     VectorStoreFactory, VectorStoreStatus
 )
 
+from .ingestion_staging import forget_collection_claims
+
 # Import adapters to register them
 from . import adapters
 
@@ -43,6 +46,17 @@ class MultiVectorConfig:
     query_fallback: bool = True
     health_check_interval: int = 300  # seconds
     max_concurrent_operations: int = 5
+    # Federated search: query every connected store (or federated_stores) concurrently
+    federated_search: bool = False
+    federated_stores: List[str] = field(default_factory=list)  # store type values; empty = all
+    federated_timeout: float = 10.0  # per-store deadline, seconds
+    rrf_k: int = 60
+    # Latency-aware routing: hedge slow primaries, demote consistently slow/failing stores
+    hedged_search: bool = False
+    latency_budget: float = 2.0  # p95 budget per store, seconds (connection_params 'latency_budget' overrides)
+    hedge_min_samples: int = 20
+    max_error_rate: float = 0.5
+    demotion_cooldown: float = 60.0  # seconds before a demoted store is tried first again
     
     @classmethod
     def from_dict(cls, config_dict: Dict[str, Any]) -> 'MultiVectorConfig':
@@ -62,7 +76,16 @@ class MultiVectorConfig:
             parallel_ingestion=config_dict.get('parallel_ingestion', False),
             query_fallback=config_dict.get('query_fallback', True),
             health_check_interval=config_dict.get('health_check_interval', 300),
-            max_concurrent_operations=config_dict.get('max_concurrent_operations', 5)
+            max_concurrent_operations=config_dict.get('max_concurrent_operations', 5),
+            federated_search=config_dict.get('federated_search', False),
+            federated_stores=list(config_dict.get('federated_stores', []) or []),
+            federated_timeout=float(config_dict.get('federated_timeout', 10.0)),
+            rrf_k=int(config_dict.get('rrf_k', 60)),
+            hedged_search=config_dict.get('hedged_search', False),
+            latency_budget=float(config_dict.get('latency_budget', 2.0)),
+            hedge_min_samples=int(config_dict.get('hedge_min_samples', 20)),
+            max_error_rate=float(config_dict.get('max_error_rate', 0.5)),
+            demotion_cooldown=float(config_dict.get('demotion_cooldown', 60.0))
         )
     
     def to_dict(self) -> Dict[str, Any]:
@@ -73,7 +96,36 @@ class MultiVectorConfig:
             'parallel_ingestion': self.parallel_ingestion,
             'query_fallback': self.query_fallback,
             'health_check_interval': self.health_check_interval,
-            'max_concurrent_operations': self.max_concurrent_operations
+            'max_concurrent_operations': self.max_concurrent_operations,
+            'federated_search': self.federated_search,
+            'federated_stores': self.federated_stores,
+            'federated_timeout': self.federated_timeout,
+            'rrf_k': self.rrf_k,
+            'hedged_search': self.hedged_search,
+            'latency_budget': self.latency_budget,
+            'hedge_min_samples': self.hedge_min_samples,
+            'max_error_rate': self.max_error_rate,
+            'demotion_cooldown': self.demotion_cooldown
+        }
+
+@dataclass
+class FederatedSearchResult:
+    """Fused results of a federated search plus per-target timing"""
+    results: List[VectorSearchResult]
+    latencies: Dict[str, float] = field(default_factory=dict)  # target -> seconds
+    result_counts: Dict[str, int] = field(default_factory=dict)
+    slow_stores: List[str] = field(default_factory=list)  # targets that missed the deadline
+    failed_stores: Dict[str, str] = field(default_factory=dict)  # target -> error
+    fallbacks: Dict[str, str] = field(default_factory=dict)  # missed target -> substitute target
+    
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'results': [r.to_dict() for r in self.results],
+            'latencies': self.latencies,
+            'result_counts': self.result_counts,
+            'slow_stores': self.slow_stores,
+            'failed_stores': self.failed_stores,
+            'fallbacks': self.fallbacks
         }
 
 class MultiVectorStorageManager:
@@ -88,6 +140,7 @@ class MultiVectorStorageManager:
         self._primary_stores: Dict[str, BaseVectorStore] = {}
         self._fallback_stores: Dict[str, BaseVectorStore] = {}
         self._store_status: Dict[str, VectorStoreStatus] = {}
+        self._demoted_at: Dict[str, float] = {}
         self._executor = ThreadPoolExecutor(max_workers=10)
         
         # Ensure environment variables from local config files are loaded early
@@ -300,6 +353,8 @@ class MultiVectorStorageManager:
             query_fallback = bool(cfg.get('query', {}).get('enable_fallback', True))
             health_interval = int(cfg.get('monitoring', {}).get('health_check_interval', 300))
             max_concurrent = int(cfg.get('performance', {}).get('max_concurrent_operations', 5))
+            federated = cfg.get('query', {}).get('federated_search', {}) or {}
+            hedging = cfg.get('query', {}).get('hedging', {}) or {}
 
             return MultiVectorConfig(
                 primary_stores=primary,
@@ -307,7 +362,16 @@ class MultiVectorStorageManager:
                 parallel_ingestion=parallel_enabled,
                 query_fallback=query_fallback,
                 health_check_interval=health_interval,
-                max_concurrent_operations=max_concurrent
+                max_concurrent_operations=max_concurrent,
+                federated_search=bool(federated.get('enabled', False)),
+                federated_stores=list(federated.get('stores', []) or []),
+                federated_timeout=float(federated.get('timeout', 10.0)),
+                rrf_k=int(federated.get('rrf_k', 60)),
+                hedged_search=bool(hedging.get('enabled', False)),
+                latency_budget=float(hedging.get('latency_budget', 2.0)),
+                hedge_min_samples=int(hedging.get('min_samples', 20)),
+                max_error_rate=float(hedging.get('max_error_rate', 0.5)),
+                demotion_cooldown=float(hedging.get('demotion_cooldown', 60.0))
             )
         except Exception as e:
             logger.error(f"Failed to convert legacy multi-vector config: {e}")
@@ -483,7 +547,11 @@ class MultiVectorStorageManager:
                 'collections': status.collections,
                 'collection_count': status.collection_count,
                 'error': status.error,
-                'is_fallback': store_key.startswith('fallback_')
+                'is_fallback': store_key.startswith('fallback_'),
+                'p50_latency': status.latency_percentile(50),
+                'p95_latency': status.latency_percentile(95),
+                'error_rate': status.error_rate,
+                'demoted': status.demoted
             }
             stores.append(store_info)
         
@@ -596,6 +664,7 @@ class MultiVectorStorageManager:
             success = await store.delete_collection(collection_name)
             if success:
                 logger.info(f"Deleted collection '{collection_name}' from {store.store_type.value}")
+                forget_collection_claims(collection_name, store.store_type.value)
             return success
         except Exception as e:
             logger.error(f"Failed to delete collection '{collection_name}': {e}")
@@ -685,37 +754,355 @@ class MultiVectorStorageManager:
                     filters: Optional[Dict[str, Any]] = None,
                     limit: int = 10,
                     store_type: Optional[VectorStoreType] = None,
+                    federated: Optional[bool] = None,
                     **kwargs) -> List[VectorSearchResult]:
-        """Search in specified store or with fallback"""
+        """Search in specified store, federated across stores, or with fallback"""
         if store_type:
             store = self.get_store_by_type(store_type)
             if store:
                 return await store.search(collection_name, query, query_embedding, filters, limit, **kwargs)
             return []
         
-        # Try primary store first
-        primary_store = self.get_primary_store()
-        if primary_store:
+        if self.config.federated_search if federated is None else federated:
+            federated_result = await self.federated_search(
+                collection_name, query, query_embedding, filters, limit, **kwargs
+            )
+            return federated_result.results
+        
+        # Primary first unless it has been demoted for latency/errors; the other
+        # store is hedged once the first exceeds its latency budget
+        first, second = self._search_route()
+        if first is None:
+            return []
+        if not self.config.query_fallback:
+            second = None
+        
+        search_args = (collection_name, query, query_embedding, filters, limit)
+        answered_by = None
+        try:
+            answered_by, results = await self._hedged_search(first, second, search_args, kwargs)
+            if results or second is None:
+                if answered_by is not first:
+                    logger.info(f"Used {answered_by.store_type.value} for search (hedged/demoted routing)")
+                return results
+        except Exception as e:
+            logger.error(f"Search failed in {first.store_type.value}: {e}")
+        
+        # First answer was empty or failed: fall back sequentially if not already answered by it
+        if second is not None and answered_by is not second:
             try:
-                results = await primary_store.search(collection_name, query, query_embedding, filters, limit, **kwargs)
-                if results or not self.config.query_fallback:
-                    return results
+                results = await self._timed_search(second, search_args, kwargs)
+                logger.info(f"Used fallback store {second.store_type.value} for search")
+                return results
             except Exception as e:
-                logger.error(f"Primary search failed in {primary_store.store_type.value}: {e}")
-        
-        # Fallback to fallback store if enabled and primary failed
-        if self.config.query_fallback:
-            fallback_store = self.get_fallback_store()
-            if fallback_store:
-                try:
-                    results = await fallback_store.search(collection_name, query, query_embedding, filters, limit, **kwargs)
-                    logger.info(f"Used fallback store {fallback_store.store_type.value} for search")
-                    return results
-                except Exception as e:
-                    logger.error(f"Fallback search failed in {fallback_store.store_type.value}: {e}")
+                logger.error(f"Fallback search failed in {second.store_type.value}: {e}")
         
         return []
     
+    def _status_key(self, store: BaseVectorStore) -> Optional[str]:
+        for stores in (self._primary_stores, self._fallback_stores):
+            for store_key, candidate in stores.items():
+                if candidate is store:
+                    return store_key
+        return None
+    
+    def _latency_budget(self, store: BaseVectorStore) -> float:
+        return float((store.config.connection_params or {}).get('latency_budget', self.config.latency_budget))
+    
+    def _is_demoted(self, store: BaseVectorStore) -> bool:
+        if not self.config.hedged_search:
+            return False
+        store_key = self._status_key(store)
+        status = self._store_status.get(store_key) if store_key else None
+        if status is None or not status.demoted:
+            return False
+        # Give a demoted store a fresh chance after the cooldown
+        if time.monotonic() - self._demoted_at.get(store_key, 0.0) >= self.config.demotion_cooldown:
+            status.demoted = False
+            with status._samples_lock:
+                status._samples.clear()
+            logger.info(f"Re-promoting {store_key} after demotion cooldown")
+            return False
+        return True
+    
+    def _search_route(self) -> Tuple[Optional[BaseVectorStore], Optional[BaseVectorStore]]:
+        """(first, second) stores for a search, with demoted stores moved behind healthy ones"""
+        primary = self.get_primary_store()
+        fallback = self.get_fallback_store()
+        if primary is None:
+            return fallback, None
+        if fallback is not None and self._is_demoted(primary) and not self._is_demoted(fallback):
+            return fallback, primary
+        return primary, fallback
+    
+    def _record_request(self, store: BaseVectorStore, latency: float, ok: bool) -> None:
+        """Feed a request outcome into the store's rolling stats and (de)mote it"""
+        store_key = self._status_key(store)
+        status = self._store_status.get(store_key) if store_key else None
+        if status is None:
+            return
+        status.record_request(latency, ok)
+        # Demotion is part of latency-aware routing and off together with hedging
+        if not self.config.hedged_search or status.sample_count < self.config.hedge_min_samples:
+            return
+        budget = self._latency_budget(store)
+        p95 = status.latency_percentile(95) or 0.0
+        error_rate = status.error_rate
+        if not status.demoted and (p95 > budget or error_rate > self.config.max_error_rate):
+            status.demoted = True
+            self._demoted_at[store_key] = time.monotonic()
+            logger.warning(f"Demoting {store_key}: p95={p95:.3f}s (budget {budget:.3f}s), "
+                           f"error rate {error_rate:.0%}")
+        elif status.demoted and p95 <= 0.8 * budget and error_rate <= self.config.max_error_rate / 2:
+            status.demoted = False
+            logger.info(f"Re-promoting {store_key}: p95={p95:.3f}s, error rate {error_rate:.0%}")
+    
+    async def _timed_search(self, store: BaseVectorStore, search_args: tuple,
+                            kwargs: Dict[str, Any]) -> List[VectorSearchResult]:
+        started = time.perf_counter()
+        ok = False
+        try:
+            results = await store.search_off_loop(*search_args, **kwargs)
+            ok = True
+            return results
+        except asyncio.CancelledError:
+            # Interrupted (e.g. loop shutdown): elapsed time is still a lower-bound sample
+            ok = True
+            raise
+        finally:
+            self._record_request(store, time.perf_counter() - started, ok)
+    
+    def _hedge_delay(self, store: BaseVectorStore) -> float:
+        """How long to wait on ``store`` before hedging: its rolling p95, capped by its budget"""
+        budget = self._latency_budget(store)
+        store_key = self._status_key(store)
+        status = self._store_status.get(store_key) if store_key else None
+        if status is None or status.sample_count < self.config.hedge_min_samples:
+            return budget
+        p95 = status.latency_percentile(95)
+        return min(budget, p95) if p95 else budget
+    
+    async def _hedged_search(self, first: BaseVectorStore, second: Optional[BaseVectorStore],
+                             search_args: tuple, kwargs: Dict[str, Any]
+                             ) -> Tuple[BaseVectorStore, List[VectorSearchResult]]:
+        """Search ``first``; if it runs past its hedge delay, race ``second`` and take the first answer
+        
+        The losing request is left to finish in the background rather than
+        cancelled, so its true latency still feeds the store's p95 (a blocking
+        SDK call cannot be interrupted anyway).
+        """
+        first_task = asyncio.ensure_future(self._timed_search(first, search_args, kwargs))
+        if second is None or not self.config.hedged_search:
+            return first, await first_task
+        
+        done, _ = await asyncio.wait({first_task}, timeout=self._hedge_delay(first))
+        if done:
+            return first, first_task.result()
+        
+        logger.info(f"Hedging slow {first.store_type.value} search with {second.store_type.value}")
+        pending = {first_task: first,
+                   asyncio.ensure_future(self._timed_search(second, search_args, kwargs)): second}
+        last_error: Optional[BaseException] = None
+        fallback_answer = None
+        try:
+            while pending:
+                done, _ = await asyncio.wait(list(pending), return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    store = pending.pop(task)
+                    if task.exception() is not None:
+                        last_error = task.exception()
+                        logger.error(f"Hedged search failed in {store.store_type.value}: {last_error}")
+                    elif task.result():
+                        return store, task.result()
+                    elif fallback_answer is None:
+                        fallback_answer = (store, task.result())
+        finally:
+            for task in pending:
+                # Retrieve the loser's outcome so a late failure is not reported as unhandled
+                task.add_done_callback(lambda t: t.cancelled() or t.exception())
+        if fallback_answer is not None:
+            return fallback_answer
+        raise last_error
+    
+    def _federated_targets(self,
+                           collection_name: Optional[str],
+                           store_types: Optional[List[VectorStoreType]] = None,
+                           targets: Optional[Dict[VectorStoreType, List[str]]] = None
+                           ) -> List[Tuple[str, BaseVectorStore, str]]:
+        """Resolve (label, store, collection) triples for a federated search"""
+        if targets:
+            resolved = []
+            for vstype, collections in targets.items():
+                store = self.get_store_by_type(vstype)
+                if store is None:
+                    logger.warning(f"Federated search: {vstype.value} is not connected, skipping")
+                    continue
+                for coll in collections:
+                    resolved.append((f"{vstype.value}/{coll}", store, coll))
+            return resolved
+        
+        wanted = {t.value if isinstance(t, VectorStoreType) else str(t).lower()
+                  for t in (store_types or self.config.federated_stores or [])}
+        resolved = []
+        seen_types = set()
+        # Primary stores first, then fallbacks, each in priority order; one store per type
+        for stores in (self._primary_stores, self._fallback_stores):
+            for store_key, store in sorted(stores.items(), key=lambda x: int(x[0].split('_')[-1])):
+                vstype = store.store_type.value
+                if vstype in seen_types or (wanted and vstype not in wanted):
+                    continue
+                status = self._store_status.get(store_key)
+                if not (status and status.connected):
+                    continue
+                seen_types.add(vstype)
+                resolved.append((f"{vstype}/{collection_name}", store, collection_name))
+        return resolved
+    
+    @staticmethod
+    def _normalize_scores(results: List[VectorSearchResult]) -> List[float]:
+        """Min-max normalise one backend's scores to [0, 1]; backends use different scales"""
+        if not results:
+            return []
+        scores = [float(r.score or 0.0) for r in results]
+        lo, hi = min(scores), max(scores)
+        if hi - lo <= 1e-12:
+            return [1.0] * len(scores)
+        return [(sc - lo) / (hi - lo) for sc in scores]
+    
+    def _fuse_results(self,
+                      ranked_lists: Dict[str, List[VectorSearchResult]],
+                      limit: int) -> List[VectorSearchResult]:
+        """Reciprocal-rank fusion of per-target result lists
+        
+        Documents are matched across targets by collection and id (or content
+        when a backend has no ids), so equal ids in different collections stay
+        separate results. The fused list is ordered by RRF score; each result's
+        ``score`` is its best per-backend normalised score so similarity
+        thresholds keep working, and the RRF score is kept in metadata.
+        """
+        k = max(1, int(self.config.rrf_k))
+        fused: Dict[Any, Dict[str, Any]] = {}
+        for label, results in ranked_lists.items():
+            normalized = self._normalize_scores(results)
+            collection = label.partition('/')[2]
+            for rank, (result, norm) in enumerate(zip(results, normalized), start=1):
+                key = (collection, 'id', result.id) if result.id else (collection, 'content', result.content)
+                entry = fused.get(key)
+                if entry is None:
+                    entry = fused[key] = {'result': result, 'rrf': 0.0, 'norm': 0.0, 'targets': []}
+                entry['rrf'] += 1.0 / (k + rank)
+                entry['norm'] = max(entry['norm'], norm)
+                entry['targets'].append(label)
+        
+        ordered = sorted(fused.values(), key=lambda e: (e['rrf'], e['norm']), reverse=True)[:limit]
+        merged = []
+        for entry in ordered:
+            original = entry['result']
+            vstype, _, collection = entry['targets'][0].partition('/')
+            metadata = dict(original.metadata or {})
+            metadata.setdefault('vector_store', vstype)
+            metadata.setdefault('collection', collection)
+            metadata['federated_sources'] = entry['targets']
+            metadata['rrf_score'] = entry['rrf']
+            metadata['raw_score'] = original.score
+            merged.append(VectorSearchResult(
+                content=original.content,
+                metadata=metadata,
+                score=entry['norm'],
+                source=original.source,
+                id=original.id
+            ))
+        return merged
+    
+    async def federated_search(self,
+                               collection_name: Optional[str] = None,
+                               query: Optional[str] = None,
+                               query_embedding: Optional[List[float]] = None,
+                               filters: Optional[Dict[str, Any]] = None,
+                               limit: int = 10,
+                               store_types: Optional[List[VectorStoreType]] = None,
+                               targets: Optional[Dict[VectorStoreType, List[str]]] = None,
+                               timeout: Optional[float] = None,
+                               fallback: bool = False,
+                               **kwargs) -> FederatedSearchResult:
+        """Search several stores concurrently and merge with reciprocal-rank fusion
+        
+        Queries every connected store (or ``store_types`` / the configured
+        ``federated_stores``) for ``collection_name``, or the explicit
+        ``targets`` mapping of store type -> collections. Each target gets its
+        own deadline (``timeout``, a store's ``search_timeout`` connection
+        param, or ``federated_timeout``); whatever has arrived by then is fused
+        and late targets are reported in ``slow_stores``.
+        
+        With ``fallback``, a target that fails or misses its deadline is retried
+        once on the next connected store (in priority order) for the same
+        collection; substitutions are reported in ``fallbacks``.
+        """
+        resolved = self._federated_targets(collection_name, store_types, targets)
+        if not resolved:
+            logger.error("No available vector stores for federated search")
+            return FederatedSearchResult(results=[])
+        
+        default_timeout = float(timeout if timeout is not None else self.config.federated_timeout)
+        
+        async def run_target(store: BaseVectorStore, coll: str) -> Tuple[List[VectorSearchResult], float]:
+            started = time.perf_counter()
+            deadline = float((store.config.connection_params or {}).get('search_timeout', default_timeout)
+                             if timeout is None else default_timeout)
+            try:
+                results = await asyncio.wait_for(
+                    store.search_off_loop(coll, query, query_embedding, filters, limit, **kwargs),
+                    timeout=deadline
+                )
+            except Exception:
+                self._record_request(store, time.perf_counter() - started, ok=False)
+                raise
+            elapsed = time.perf_counter() - started
+            self._record_request(store, elapsed, ok=True)
+            return results or [], elapsed
+        
+        report = FederatedSearchResult(results=[])
+        ranked_lists: Dict[str, List[VectorSearchResult]] = {}
+        attempted = {(id(store), coll) for _, store, coll in resolved}
+        pending = resolved
+        while pending:
+            outcomes = await asyncio.gather(
+                *(run_target(store, coll) for _, store, coll in pending),
+                return_exceptions=True
+            )
+            
+            missed = []
+            for (label, _store, coll), outcome in zip(pending, outcomes):
+                if isinstance(outcome, asyncio.TimeoutError):
+                    report.slow_stores.append(label)
+                    missed.append((label, coll))
+                    logger.warning(f"Federated search: {label} missed its deadline")
+                elif isinstance(outcome, BaseException):
+                    report.failed_stores[label] = str(outcome)
+                    missed.append((label, coll))
+                    logger.error(f"Federated search failed for {label}: {outcome}")
+                else:
+                    results, elapsed = outcome
+                    ranked_lists[label] = results
+                    report.latencies[label] = round(elapsed, 4)
+                    report.result_counts[label] = len(results)
+            
+            pending = []
+            if not fallback:
+                break
+            for label, coll in missed:
+                for alt_label, alt_store, alt_coll in self._federated_targets(coll):
+                    if (id(alt_store), alt_coll) in attempted:
+                        continue
+                    attempted.add((id(alt_store), alt_coll))
+                    report.fallbacks[label] = alt_label
+                    pending.append((alt_label, alt_store, alt_coll))
+                    logger.info(f"Federated search: retrying {label} on {alt_label}")
+                    break
+        
+        report.results = self._fuse_results(ranked_lists, limit)
+        return report
+    
     async def delete_documents(self, 
                              collection_name: str,
                              document_ids: List[str],
@@ -10,12 +10,22 @@ Features:
 - Cache invalidation strategies
 - Performance metrics
 - Enterprise security features
+
+Layout: each entry is a single Redis hash (``data`` plus its metadata) with a
+Redis TTL, so a hit is one ``HMGET`` round-trip; Redis expiry is
+authoritative. Access counters are batched and flushed in the background.
+A small in-process near-cache (L1) sits in front of Redis and is kept
+coherent across processes by invalidation messages published on
+``query_cache:invalidate`` in the same round-trip as each write; L1 entries
+also expire on a short TTL, never later than the Redis entry.
 """
 
 import json
 import hashlib
 import logging
+import threading
 import time
+import uuid
 from typing import Dict, Any, Optional, Tuple
 from datetime import datetime, timedelta
 import os
@@ -39,8 +49,25 @@ except ImportError:
     def decrypt_data(data: str) -> str:
         return data
 
+from utils.query_result_cache import QueryResultCache
+
 logger = logging.getLogger(__name__)
 
+INVALIDATION_CHANNEL = "query_cache:invalidate"
+
+# Bump access counters only for entries that still exist, so a late flush
+# never recreates an expired hash without a TTL
+_ACCESS_SCRIPT = """
+local now = ARGV[1]
+for i, key in ipairs(KEYS) do
+    if redis.call('EXISTS', key) == 1 then
+        redis.call('HINCRBY', key, 'access_count', ARGV[i + 1])
+        redis.call('HSET', key, 'last_accessed', now)
+    end
+end
+return #KEYS
+"""
+
 class QueryCache:
     """Enterprise-grade query caching with Redis backend (with in-memory fallback)"""
 
@@ -57,6 +84,19 @@ class QueryCache:
         self.compression_threshold = int(os.getenv("CACHE_COMPRESSION_THRESHOLD", "1024"))  # 1KB
         self.encryption_enabled = os.getenv("CACHE_ENCRYPTION_ENABLED", "true").lower() == "true" and SECURITY_AVAILABLE
 
+        # Near-cache (L1) and background access-stat flushing
+        self.l1_ttl = float(os.getenv("QUERY_CACHE_L1_TTL", "30"))
+        self.l1_max_entries = int(os.getenv("QUERY_CACHE_L1_MAX_ENTRIES", "512"))
+        self.stats_flush_interval = float(os.getenv("QUERY_CACHE_STATS_FLUSH_SECONDS", "2"))
+        self._instance_id = uuid.uuid4().hex
+        self._l1: Optional[QueryResultCache] = None
+        self._pubsub_thread = None
+        self._access_script = None
+        self._pending_access: Dict[str, int] = {}
+        self._access_lock = threading.Lock()
+        self._flush_stop = threading.Event()
+        self._flush_thread: Optional[threading.Thread] = None
+
         self._connection = None
         self._memory_cache: Dict[str, Tuple[Any, float, Dict[str, Any]]] = {}  # In-memory fallback: {key: (data, expiry, metadata)}
         self._connect()
@@ -87,6 +127,8 @@ class QueryCache:
 
             # Configure Redis for enterprise use
             self._configure_redis()
+            self._start_near_cache()
+            self._access_script = self._connection.register_script(_ACCESS_SCRIPT)
 
             return self._connection
 
@@ -110,6 +152,76 @@ class QueryCache:
         except Exception as e:
             logger.warning(f"Failed to configure Redis: {e}")
 
+    def _start_near_cache(self):
+        """Create the L1 near-cache and subscribe to invalidations from other processes"""
+        if self.l1_ttl <= 0 or self.l1_max_entries <= 0:
+            return
+        # Entries are the serialized JSON, so every hit decodes its own copy
+        self._l1 = QueryResultCache(max_entries=self.l1_max_entries, ttl_seconds=self.l1_ttl,
+                                    sizeof=len)
+        try:
+            pubsub = self._connection.pubsub(ignore_subscribe_messages=True)
+            pubsub.subscribe(**{INVALIDATION_CHANNEL: self._on_invalidation})
+            self._pubsub_thread = pubsub.run_in_thread(sleep_time=1.0, daemon=True)
+        except Exception as e:
+            # Without invalidations, a stale L1 entry could outlive a remote write
+            logger.warning(f"Near-cache disabled, invalidation channel unavailable: {e}")
+            self._l1 = None
+
+    def _on_invalidation(self, message: Dict[str, Any]):
+        """Drop L1 entries invalidated by another process (message: "<origin>|<key or pattern>")"""
+        if self._l1 is None:
+            return
+        origin, _, target = str(message.get('data', '')).partition('|')
+        if origin == self._instance_id:
+            return
+        if any(ch in target for ch in '*?['):
+            self._l1.clear()
+        else:
+            self._l1.discard(target)
+
+    def _publish_invalidation(self, target: str, pipe=None):
+        """Tell other processes' near-caches to drop ``target`` (a key or pattern)"""
+        (pipe if pipe is not None else self._connection).publish(INVALIDATION_CHANNEL, f"{self._instance_id}|{target}")
+
+    def _record_access(self, cache_key: str):
+        """Count a hit; counters reach Redis on the next background flush"""
+        with self._access_lock:
+            self._pending_access[cache_key] = self._pending_access.get(cache_key, 0) + 1
+            if self._flush_thread is None or not self._flush_thread.is_alive():
+                self._flush_thread = threading.Thread(target=self._flush_loop,
+                                                      name="query-cache-stats", daemon=True)
+                self._flush_thread.start()
+
+    def _flush_loop(self):
+        while not self._flush_stop.wait(self.stats_flush_interval):
+            self.flush_access_stats()
+
+    def flush_access_stats(self) -> int:
+        """Write batched access counters to Redis in one call; returns the number of keys"""
+        with self._access_lock:
+            pending, self._pending_access = self._pending_access, {}
+        if not pending or not self._connection or self._access_script is None:
+            return 0
+        try:
+            keys = list(pending)
+            self._access_script(keys=keys, args=[time.time()] + [pending[k] for k in keys])
+            return len(keys)
+        except Exception as e:
+            logger.debug(f"Failed to flush cache access stats: {e}")
+            return 0
+
+    def close(self):
+        """Flush pending access stats and stop background threads"""
+        self._flush_stop.set()
+        self.flush_access_stats()
+        if self._pubsub_thread is not None:
+            try:
+                self._pubsub_thread.stop()
+            except Exception:
+                pass
+            self._pubsub_thread = None
+
     def _generate_cache_key(self, query: str, index_name: str, backend: str, top_k: int, user_id: str = None) -> str:
         """Generate deterministic cache key with security considerations"""
         # Include user_id for multi-tenancy
@@ -175,37 +287,37 @@ class QueryCache:
                 logger.warning(f"In-memory cache retrieval failed: {e}")
                 return None
 
-        try:
-            # Get cache metadata
-            meta_key = f"{cache_key}:meta"
-            meta_data = self._connection.hgetall(meta_key)
+        # Near-cache hit: no network round-trip
+        if self._l1 is not None:
+            result_json = self._l1.get(cache_key, default=None)
+            if result_json is not None:
+                self._record_access(cache_key)
+                logger.debug(f"Near-cache hit for query: {query[:50]}...")
+                return json.loads(result_json)
 
-            if not meta_data:
-                return None
-
-            # Check TTL
-            created_at = float(meta_data.get('created_at', 0))
-            ttl = int(meta_data.get('ttl', self.ttl_default))
-
-            if time.time() - created_at > ttl:
-                # Expired, clean up
-                self._connection.delete(cache_key, meta_key)
-                return None
-
-            # Get cached data
-            cached_data = self._connection.get(cache_key)
+        try:
+            # Data and metadata live in one hash; Redis expiry is authoritative
+            cached_data, compressed, created_at, ttl = self._connection.hmget(
+                cache_key, 'data', 'compressed', 'created_at', 'ttl'
+            )
             if not cached_data:
                 return None
 
             # Decrypt and decompress
             decrypted_data = self._decrypt_data(cached_data)
-            decompressed_data = self._decompress_data(decrypted_data, meta_data.get('compressed') == 'true')
+            decompressed_data = self._decompress_data(decrypted_data, compressed == 'true')
 
             result = json.loads(decompressed_data)
 
-            # Update access metrics
-            self._connection.hincrby(meta_key, 'access_count', 1)
-            self._connection.hset(meta_key, 'last_accessed', time.time())
+            # Update access metrics (batched, off the request path)
+            self._record_access(cache_key)
+
+            if self._l1 is not None and created_at and ttl:
+                # Never keep the L1 copy past the Redis entry's expiry
+                remaining = float(created_at) + int(ttl) - time.time()
+                if remaining > 0:
+                    self._l1.put(cache_key, decompressed_data,
+                                 ttl_seconds=min(self.l1_ttl, remaining))
 
             logger.debug(f"Cache hit for query: {query[:50]}...")
             return result
@@ -255,28 +367,34 @@ class QueryCache:
             # Encrypt if enabled
             encrypted_data = self._encrypt_data(processed_data)
 
-            # Store data
-            self._connection.setex(cache_key, ttl, encrypted_data)
-
-            # Store metadata
-            meta_key = f"{cache_key}:meta"
-            meta_data = {
+            # Store data and metadata as one hash, replace any previous entry
+            # and notify other near-caches - all in one round-trip
+            now = time.time()
+            entry = {
+                'data': encrypted_data,
                 'query': query[:200],  # Truncate for storage
                 'index_name': index_name,
                 'backend': backend,
                 'top_k': top_k,
                 'user_id': user_id or "anonymous",
-                'created_at': time.time(),
+                'created_at': now,
                 'ttl': ttl,
                 'compressed': str(compressed).lower(),
                 'encrypted': str(self.encryption_enabled).lower(),
                 'size_bytes': len(encrypted_data),
                 'access_count': 0,
-                'last_accessed': time.time()
+                'last_accessed': now
             }
 
-            self._connection.hset(meta_key, mapping=meta_data)
-            self._connection.expire(meta_key, ttl)
+            pipe = self._connection.pipeline(transaction=True)
+            pipe.delete(cache_key, f"{cache_key}:meta")  # also drops the pre-hash layout
+            pipe.hset(cache_key, mapping=entry)
+            pipe.expire(cache_key, ttl)
+            self._publish_invalidation(cache_key, pipe)
+            pipe.execute()
+
+            if self._l1 is not None:
+                self._l1.put(cache_key, result_json, ttl_seconds=min(self.l1_ttl, ttl))
 
             logger.debug(f"Cached query result: {query[:50]}... (TTL: {ttl}s)")
             return True
@@ -291,25 +409,28 @@ class QueryCache:
             return 0
 
         try:
-            if pattern:
-                # Find keys matching pattern
-                keys = self._connection.keys(pattern)
-                if keys:
-                    # Also find metadata keys
-                    meta_keys = [f"{key}:meta" for key in keys]
-                    all_keys = keys + meta_keys
-                    deleted = self._connection.delete(*all_keys)
-                    logger.info(f"Invalidated {deleted} cache entries matching {pattern}")
-                    return deleted
-            else:
-                # Clear all query cache
-                query_keys = self._connection.keys("query:*")
-                if query_keys:
-                    deleted = self._connection.delete(*query_keys)
-                    logger.info(f"Cleared all {deleted} query cache entries")
-                    return deleted
-
-            return 0
+            match = pattern or "query:*"
+            if self._l1 is not None:
+                if pattern and not any(ch in pattern for ch in '*?['):
+                    self._l1.discard(pattern)
+                else:
+                    self._l1.clear()
+            self._publish_invalidation(match)
+
+            # SCAN rather than KEYS so a large cache does not block Redis
+            deleted = 0
+            batch = []
+            for key in self._connection.scan_iter(match=match, count=500):
+                batch.append(key)
+                if len(batch) >= 500:
+                    deleted += self._connection.delete(*batch)
+                    batch = []
+            if batch:
+                deleted += self._connection.delete(*batch)
+
+            if deleted:
+                logger.info(f"Invalidated {deleted} cache entries matching {match}")
+            return deleted
 
         except Exception as e:
             logger.error(f"Cache invalidation failed: {e}")
@@ -336,34 +457,36 @@ class QueryCache:
                 return {"status": "in-memory", "error": str(e)}
 
         try:
+            self.flush_access_stats()
             info = self._connection.info()
-            keys = self._connection.keys("query:*")
+            keys = [k for k in self._connection.scan_iter(match="query:*", count=500) if not k.endswith(":meta")]
 
             total_size = 0
             total_accesses = 0
             oldest_entry = time.time()
             newest_entry = 0
 
+            pipe = self._connection.pipeline(transaction=False)
             for key in keys:
-                if key.endswith(":meta"):
-                    meta = self._connection.hgetall(key)
-                    if meta:
-                        total_size += int(meta.get('size_bytes', 0))
-                        total_accesses += int(meta.get('access_count', 0))
-
-                        created_at = float(meta.get('created_at', time.time()))
-                        oldest_entry = min(oldest_entry, created_at)
-                        newest_entry = max(newest_entry, created_at)
+                pipe.hmget(key, 'size_bytes', 'access_count', 'created_at')
+            for size_bytes, access_count, created_at in (pipe.execute() if keys else []):
+                if created_at is None:
+                    continue
+                total_size += int(size_bytes or 0)
+                total_accesses += int(access_count or 0)
+                oldest_entry = min(oldest_entry, float(created_at))
+                newest_entry = max(newest_entry, float(created_at))
 
             return {
                 "status": "connected",
-                "total_entries": len([k for k in keys if not k.endswith(":meta")]),
+                "total_entries": len(keys),
                 "total_size_bytes": total_size,
                 "total_size_mb": round(total_size / (1024 * 1024), 2),
                 "total_accesses": total_accesses,
-                "avg_accesses_per_entry": round(total_accesses / max(1, len(keys) // 2), 2),
+                "avg_accesses_per_entry": round(total_accesses / max(1, len(keys)), 2),
                 "oldest_entry_age_seconds": int(time.time() - oldest_entry),
-                "newest_entry_age_seconds": int(time.time() - newest_entry),
+                "newest_entry_age_seconds": int(time.time() - newest_entry) if newest_entry else 0,
+                "near_cache": self._l1.get_stats() if self._l1 is not None else None,
                 "redis_info": {
                     "used_memory": info.get('used_memory_human', 'unknown'),
                     "connected_clients": info.get('connected_clients', 0),
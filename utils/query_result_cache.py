@@ -0,0 +1,198 @@
+"""
+Query Result Cache
+==================
+
+Bounded in-process cache for search results.
+
+* LRU eviction bounded by both entry count and estimated bytes
+* Per-entry TTL (expired entries are dropped on access)
+* Index-version tagging: every entry records the version of the index it was
+  computed against, and a lookup with a different version is a miss. Versions
+  come from :func:`bump_index_version` (called by ingestion in this process)
+  combined with whatever on-disk signature the caller adds, so re-ingesting a
+  collection invalidates its cached queries without flushing the rest.
+* Hit / miss / eviction / expiry counters for monitoring
+
+Configuration (environment):
+    QUERY_CACHE_MAX_ENTRIES   default 1000
+    QUERY_CACHE_MAX_BYTES     default 67108864 (64 MB)
+    QUERY_CACHE_TTL_SECONDS   default 300
+"""
+
+import os
+import time
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+_MISSING = object()
+
+# index name -> generation, bumped whenever the index is (re)ingested in this process
+_index_generations: Dict[str, int] = {}
+_generations_lock = threading.Lock()
+_ALL_INDEXES = "*"
+
+
+def bump_index_version(index_name: Optional[str] = None) -> int:
+    """Mark an index as changed; cached results computed against it become stale.
+
+    ``None`` bumps the version of cross-index searches (index_name=None) only;
+    a named bump also invalidates them, since "all indexes" includes it.
+    """
+    with _generations_lock:
+        names = {_ALL_INDEXES} if index_name is None else {index_name.lower(), _ALL_INDEXES}
+        for name in names:
+            _index_generations[name] = _index_generations.get(name, 0) + 1
+        return _index_generations[_ALL_INDEXES if index_name is None else index_name.lower()]
+
+
+def get_index_generation(index_name: Optional[str] = None) -> int:
+    """Current in-process generation of an index (0 if never bumped)."""
+    with _generations_lock:
+        return _index_generations.get(_ALL_INDEXES if index_name is None else index_name.lower(), 0)
+
+
+class _Entry:
+    __slots__ = ("value", "version", "size", "expires_at", "index_name")
+
+    def __init__(self, value, version, size, expires_at, index_name):
+        self.value = value
+        self.version = version
+        self.size = size
+        self.expires_at = expires_at
+        self.index_name = index_name
+
+
+class QueryResultCache:
+    """Thread-safe LRU cache with byte budget, TTL and version-tagged entries."""
+
+    def __init__(self,
+                 max_entries: Optional[int] = None,
+                 max_bytes: Optional[int] = None,
+                 ttl_seconds: Optional[float] = None,
+                 sizeof: Optional[Callable[[Any], int]] = None):
+        self.max_entries = int(max_entries if max_entries is not None
+                               else os.getenv("QUERY_CACHE_MAX_ENTRIES", "1000"))
+        self.max_bytes = int(max_bytes if max_bytes is not None
+                             else os.getenv("QUERY_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+        self.ttl_seconds = float(ttl_seconds if ttl_seconds is not None
+                                 else os.getenv("QUERY_CACHE_TTL_SECONDS", "300"))
+        self._sizeof = sizeof or (lambda value: 256)
+
+        self._entries: "OrderedDict[Hashable, _Entry]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "stale": 0, "expired": 0,
+                       "evictions": 0, "invalidations": 0, "rejected": 0}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: Hashable) -> bool:
+        """True if an unexpired entry exists for ``key`` (any version); never drops or reorders entries."""
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry is not None and (entry.expires_at is None or entry.expires_at > time.monotonic())
+
+    def _drop(self, key: Hashable) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= entry.size
+
+    def get(self, key: Hashable, version: Any = None, default: Any = _MISSING, count: bool = True) -> Any:
+        """Return the cached value, or ``default`` if missing, expired or computed for another version."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                outcome = "misses"
+            elif entry.expires_at is not None and entry.expires_at <= time.monotonic():
+                self._drop(key)
+                outcome = "expired"
+            elif entry.version != version:
+                self._drop(key)
+                outcome = "stale"
+            else:
+                self._entries.move_to_end(key)
+                if count:
+                    self._stats["hits"] += 1
+                return entry.value
+            if count:
+                self._stats[outcome] += 1
+                if outcome != "misses":
+                    self._stats["misses"] += 1
+            return default
+
+    def put(self, key: Hashable, value: Any, version: Any = None,
+            index_name: Optional[str] = None, ttl_seconds: Optional[float] = None) -> bool:
+        """Store a value; returns False if it is larger than the whole byte budget."""
+        size = int(self._sizeof(value))
+        ttl = self.ttl_seconds if ttl_seconds is None else ttl_seconds
+        expires_at = time.monotonic() + ttl if ttl and ttl > 0 else None
+        with self._lock:
+            self._drop(key)
+            if size > self.max_bytes:
+                self._stats["rejected"] += 1
+                return False
+            self._entries[key] = _Entry(value, version, size, expires_at,
+                                        index_name.lower() if index_name else None)
+            self._bytes += size
+            while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= evicted.size
+                self._stats["evictions"] += 1
+            return True
+
+    def discard(self, key: Hashable) -> bool:
+        """Drop a single entry (e.g. on a remote invalidation); True if it was cached."""
+        with self._lock:
+            present = key in self._entries
+            self._drop(key)
+            if present:
+                self._stats["invalidations"] += 1
+            return present
+
+    def invalidate_index(self, index_name: Optional[str] = None) -> int:
+        """Drop entries computed against ``index_name`` (and cross-index entries)."""
+        name = index_name.lower() if index_name else None
+        with self._lock:
+            keys = [k for k, e in self._entries.items()
+                    if name is None or e.index_name in (name, None)]
+            for key in keys:
+                self._drop(key)
+            self._stats["invalidations"] += len(keys)
+            return len(keys)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Hit-rate and occupancy metrics."""
+        with self._lock:
+            stats = dict(self._stats)
+            lookups = stats["hits"] + stats["misses"]
+            stats.update({
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "ttl_seconds": self.ttl_seconds,
+                "hit_rate": (stats["hits"] / lookups) if lookups else 0.0,
+            })
+        return stats
+
+
+def path_signature(*paths) -> Tuple:
+    """(mtime_ns, size) of each existing path, for use as part of an index version."""
+    sig = []
+    for path in paths:
+        try:
+            st = os.stat(path)
+            sig.append((st.st_mtime_ns, st.st_size))
+        except (OSError, TypeError):
+            sig.append(None)
+    return tuple(sig)
@@ -0,0 +1,388 @@
+"""
+Shared Cross-Encoder Reranker Service
+
+Process-wide registry of cross-encoder models so every reranking path
+(hybrid search, enhanced retrieval, the advanced re-ranker) shares one loaded
+copy per (model, device) and one scoring queue.
+
+Features:
+- One model instance per (model_name, device) per process, loaded lazily
+- ``score()`` coalesces concurrent small requests into shared batches
+- Pairs are tokenized without padding, sorted by token length and cut into
+  length buckets bounded by pair count and a token budget, so each forward
+  pass pads only to the longest pair in its bucket
+- Configurable truncation (max length and strategy)
+- LRU cache of (query, chunk) -> score, so follow-up questions that rerank
+  the same chunks skip the model entirely
+
+Configuration (environment):
+    RERANKER_MODEL_NAME          default cross-encoder/ms-marco-MiniLM-L-6-v2
+    RERANKER_DEVICE              default auto
+    RERANKER_MAX_LENGTH          default 512 (tokens per query/chunk pair)
+    RERANKER_TRUNCATION          default only_second (truncate the chunk, keep the query)
+    RERANKER_BATCH_SIZE          default 32 pairs per forward pass
+    RERANKER_MAX_BATCH_TOKENS    default 8192 padded tokens per forward pass
+    RERANKER_MAX_WAIT_MS         default 5
+    RERANKER_CACHE_SIZE          default 20000 scores
+"""
+
+import os
+import hashlib
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_RERANKER_MODEL = "cross-encoder/ms-marco-MiniLM-L-6-v2"
+
+
+def chunk_key(content: str) -> str:
+    """Stable identity of a chunk's text, used as the chunk id in the score cache."""
+    return hashlib.blake2b((content or "").encode("utf-8"), digest_size=16).hexdigest()
+
+
+class _ScoreRequest:
+    """A pending ``score`` call waiting for its batch."""
+
+    __slots__ = ("pairs", "done", "result", "error")
+
+    def __init__(self, pairs: List[Tuple[str, str]]):
+        self.pairs = pairs
+        self.done = threading.Event()
+        self.result: Optional[np.ndarray] = None
+        self.error: Optional[BaseException] = None
+
+
+class RerankerService:
+    """Shared, thread-safe cross-encoder with dynamic batching and a score cache.
+
+    Instances are obtained through :func:`get_reranker_service`.
+    """
+
+    def __init__(self, model_name: str, device: Optional[str] = None,
+                 max_length: int = 512, truncation: str = "only_second",
+                 batch_size: int = 32, max_batch_tokens: int = 8192,
+                 max_wait_ms: float = 5.0, cache_size: int = 20000):
+        from transformers import AutoTokenizer, AutoModelForSequenceClassification
+        import torch
+
+        self.model_name = model_name
+        self.device = device
+        self.max_length = max(8, int(max_length))
+        self.truncation = truncation
+        self.batch_size = max(1, int(batch_size))
+        self.max_batch_tokens = max(self.max_length, int(max_batch_tokens))
+        self.max_wait = max(0.0, float(max_wait_ms)) / 1000.0
+        self.cache_size = max(0, int(cache_size))
+
+        started = time.time()
+        self.torch = torch
+        self.tokenizer = AutoTokenizer.from_pretrained(model_name)
+        self._model = AutoModelForSequenceClassification.from_pretrained(model_name)
+        if device:
+            self._model.to(device)
+        self._model.eval()
+        self.load_time = time.time() - started
+        self._model_lock = threading.Lock()
+
+        # Dynamic batching state
+        self._cond = threading.Condition()
+        self._pending: List[_ScoreRequest] = []
+        self._worker: Optional[threading.Thread] = None
+
+        # (query, chunk key) -> score
+        self._cache: "OrderedDict[Hashable, float]" = OrderedDict()
+        self._cache_lock = threading.Lock()
+
+        self._stats = {
+            "score_calls": 0,
+            "pairs_requested": 0,
+            "cache_hits": 0,
+            "pairs_scored": 0,
+            "model_invocations": 0,
+            "coalesced_batches": 0,
+            "tokens": 0,
+            "padded_tokens": 0,
+        }
+        logger.info(f"Loaded shared cross-encoder {model_name} (device={device or 'auto'}) "
+                    f"in {self.load_time:.2f}s")
+
+    @property
+    def model(self):
+        """The underlying sequence-classification model."""
+        return self._model
+
+    # ---- public API -------------------------------------------------------
+
+    def score(self, query: str, documents: Sequence[str], doc_ids: Optional[Sequence[Hashable]] = None,
+              timeout: Optional[float] = 60.0, use_cache: bool = True) -> np.ndarray:
+        """Relevance scores (cross-encoder logits) of ``query`` against each document.
+
+        Args:
+            query: Query text
+            documents: Chunk texts to score
+            doc_ids: Optional chunk ids for the score cache (default: a digest of the text)
+            timeout: Seconds to wait for the batch before raising ``TimeoutError``
+            use_cache: Reuse and record scores in the (query, chunk) cache
+
+        Returns:
+            float32 array of shape ``(len(documents),)``
+        """
+        return self.score_pairs([(query, d) for d in documents], doc_ids=doc_ids,
+                                timeout=timeout, use_cache=use_cache)
+
+    def score_pairs(self, pairs: Sequence[Tuple[str, str]], doc_ids: Optional[Sequence[Hashable]] = None,
+                    timeout: Optional[float] = 60.0, use_cache: bool = True) -> np.ndarray:
+        """Scores for (query, document) pairs that may mix several queries, e.g. expanded
+        query variants, so they share one batch. Same caching as :meth:`score`."""
+        pairs = [(q or "", "" if d is None else str(d)) for q, d in pairs]
+        scores = np.zeros(len(pairs), dtype=np.float32)
+        if not pairs:
+            return scores
+        if doc_ids is None or len(doc_ids) != len(pairs):
+            doc_ids = [chunk_key(d) for _, d in pairs]
+        keys = [(q, doc_id) for (q, _), doc_id in zip(pairs, doc_ids)]
+
+        # Serve what we can from the cache; duplicate pairs are scored once
+        missing: Dict[Hashable, List[int]] = {}
+        with self._cache_lock:
+            self._stats["score_calls"] += 1
+            self._stats["pairs_requested"] += len(pairs)
+            for i, key in enumerate(keys):
+                cached = self._cache.get(key) if use_cache and self.cache_size else None
+                if cached is not None:
+                    self._cache.move_to_end(key)
+                    scores[i] = cached
+                    self._stats["cache_hits"] += 1
+                else:
+                    missing.setdefault(key, []).append(i)
+        if not missing:
+            return scores
+
+        miss_keys = list(missing)
+        computed = self._score_uncached([pairs[missing[key][0]] for key in miss_keys], timeout)
+        for key, value in zip(miss_keys, computed):
+            scores[missing[key]] = value
+
+        if use_cache and self.cache_size:
+            with self._cache_lock:
+                for key, value in zip(miss_keys, computed):
+                    self._cache[key] = float(value)
+                    self._cache.move_to_end(key)
+                while len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+        return scores
+
+    def clear_cache(self) -> None:
+        with self._cache_lock:
+            self._cache.clear()
+
+    # ---- batching ---------------------------------------------------------
+
+    def _score_uncached(self, pairs: List[Tuple[str, str]], timeout: Optional[float]) -> np.ndarray:
+        # Large requests are already a batch; skip the queue.
+        if len(pairs) >= self.batch_size:
+            return self._predict(pairs)
+
+        request = _ScoreRequest(pairs)
+        with self._cond:
+            self._pending.append(request)
+            self._ensure_worker()
+            self._cond.notify()
+
+        if not request.done.wait(timeout):
+            raise TimeoutError(f"Rerank request timed out after {timeout}s")
+        if request.error is not None:
+            raise request.error
+        return request.result
+
+    def _ensure_worker(self) -> None:
+        """Start the batching worker thread if needed (caller holds ``_cond``)."""
+        if self._worker is None or not self._worker.is_alive():
+            self._worker = threading.Thread(
+                target=self._batch_loop,
+                name=f"reranker-batcher-{self.model_name}",
+                daemon=True,
+            )
+            self._worker.start()
+
+    def _take_batch(self) -> List[_ScoreRequest]:
+        """Wait for pending requests and collect up to ``batch_size`` pairs."""
+        with self._cond:
+            while not self._pending:
+                self._cond.wait()
+            deadline = time.time() + self.max_wait
+            while sum(len(r.pairs) for r in self._pending) < self.batch_size:
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+
+            batch: List[_ScoreRequest] = []
+            size = 0
+            while self._pending and (not batch or size + len(self._pending[0].pairs) <= self.batch_size):
+                req = self._pending.pop(0)
+                batch.append(req)
+                size += len(req.pairs)
+            return batch
+
+    def _batch_loop(self) -> None:
+        while True:
+            requests = self._take_batch()
+            flat: List[Tuple[str, str]] = []
+            for req in requests:
+                flat.extend(req.pairs)
+            try:
+                scores = self._predict(flat)
+                with self._cond:
+                    self._stats["coalesced_batches"] += 1
+                offset = 0
+                for req in requests:
+                    n = len(req.pairs)
+                    req.result = scores[offset:offset + n]
+                    offset += n
+            except BaseException as e:  # propagate to every waiting caller
+                for req in requests:
+                    req.error = e
+            finally:
+                for req in requests:
+                    req.done.set()
+
+    # ---- model ------------------------------------------------------------
+
+    def _tokenize(self, pairs: List[Tuple[str, str]]):
+        queries = [q for q, _ in pairs]
+        docs = [d for _, d in pairs]
+        try:
+            return self.tokenizer(queries, docs, truncation=self.truncation, max_length=self.max_length)
+        except Exception:
+            # e.g. only_second cannot fit a query longer than max_length on its own
+            return self.tokenizer(queries, docs, truncation="longest_first", max_length=self.max_length)
+
+    def _buckets(self, lengths: List[int]) -> List[np.ndarray]:
+        """Group pair indices by token length: each bucket respects batch size and token budget."""
+        order = np.argsort(np.asarray(lengths), kind="stable")
+        buckets: List[np.ndarray] = []
+        start = 0
+        for end in range(1, len(order) + 1):
+            # Sorted ascending, so the padded width of [start, end) is lengths[order[end - 1]]
+            count = end - start
+            if end < len(order):
+                width = lengths[order[end]]
+                if count < self.batch_size and (count + 1) * width <= self.max_batch_tokens:
+                    continue
+            buckets.append(order[start:end])
+            start = end
+        return buckets
+
+    def _predict(self, pairs: List[Tuple[str, str]]) -> np.ndarray:
+        """Score pairs with length-bucketed forward passes."""
+        scores = np.zeros(len(pairs), dtype=np.float32)
+        if not pairs:
+            return scores
+        encoded = self._tokenize(pairs)
+        fields = list(encoded.keys())
+        lengths = [len(ids) for ids in encoded["input_ids"]]
+
+        with self._model_lock:
+            for bucket in self._buckets(lengths):
+                features = self.tokenizer.pad(
+                    [{k: encoded[k][i] for k in fields} for i in bucket],
+                    padding=True, return_tensors="pt",
+                )
+                if self.device:
+                    features = {k: v.to(self.device) for k, v in features.items()}
+                with self.torch.no_grad():
+                    logits = self._model(**features).logits
+                # Single-logit relevance heads; otherwise take the "relevant" class
+                logits = logits[:, 0] if logits.shape[-1] == 1 else logits[:, -1]
+                scores[bucket] = logits.float().cpu().numpy()
+
+                width = int(features["input_ids"].shape[1])
+                self._stats["model_invocations"] += 1
+                self._stats["pairs_scored"] += len(bucket)
+                self._stats["tokens"] += int(sum(lengths[i] for i in bucket))
+                self._stats["padded_tokens"] += width * len(bucket)
+        return scores
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Return usage counters for this model instance."""
+        with self._cond:
+            stats = dict(self._stats)
+            stats["pending_requests"] = len(self._pending)
+        with self._cache_lock:
+            stats["cache_entries"] = len(self._cache)
+        requested = stats["pairs_requested"]
+        stats.update({
+            "model_name": self.model_name,
+            "device": self.device or "auto",
+            "max_length": self.max_length,
+            "truncation": self.truncation,
+            "cache_hit_rate": (stats["cache_hits"] / requested) if requested else 0.0,
+            "padding_efficiency": (stats["tokens"] / stats["padded_tokens"]) if stats["padded_tokens"] else 1.0,
+            "load_time_seconds": round(self.load_time, 3),
+        })
+        return stats
+
+
+# Global registry: one service per (model_name, device)
+_registry: Dict[Tuple[str, str], RerankerService] = {}
+_registry_lock = threading.Lock()
+_load_locks: Dict[Tuple[str, str], threading.Lock] = {}
+
+
+def get_reranker_service(model_name: Optional[str] = None, device: Optional[str] = None) -> RerankerService:
+    """Get or load the shared cross-encoder service for a model/device pair.
+
+    Raises:
+        ImportError if transformers/torch are missing, or the model load error.
+    """
+    name = model_name or os.getenv("RERANKER_MODEL_NAME") or DEFAULT_RERANKER_MODEL
+    dev = device or os.getenv("RERANKER_DEVICE") or None
+    key = (name, dev or "auto")
+
+    service = _registry.get(key)
+    if service is not None:
+        return service
+
+    with _registry_lock:
+        service = _registry.get(key)
+        if service is not None:
+            return service
+        load_lock = _load_locks.setdefault(key, threading.Lock())
+
+    # Load outside the registry lock so other models can load in parallel
+    with load_lock:
+        service = _registry.get(key)
+        if service is None:
+            service = RerankerService(
+                name, dev,
+                max_length=int(os.getenv("RERANKER_MAX_LENGTH", "512")),
+                truncation=os.getenv("RERANKER_TRUNCATION", "only_second"),
+                batch_size=int(os.getenv("RERANKER_BATCH_SIZE", "32")),
+                max_batch_tokens=int(os.getenv("RERANKER_MAX_BATCH_TOKENS", "8192")),
+                max_wait_ms=float(os.getenv("RERANKER_MAX_WAIT_MS", "5")),
+                cache_size=int(os.getenv("RERANKER_CACHE_SIZE", "20000")),
+            )
+            with _registry_lock:
+                _registry[key] = service
+    return service
+
+
+def list_loaded_rerankers() -> List[Dict[str, Any]]:
+    """Describe every cross-encoder currently resident in this process."""
+    with _registry_lock:
+        services = list(_registry.values())
+    return [s.get_stats() for s in services]
+
+
+def clear_reranker_services() -> None:
+    """Drop all cached models (mainly for tests and memory pressure)."""
+    with _registry_lock:
+        _registry.clear()
+        _load_locks.clear()
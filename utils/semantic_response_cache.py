@@ -0,0 +1,305 @@
+"""
+Semantic Response Cache
+
+Reuses synthesized LLM answers across paraphrased questions.
+
+* Each cached question is embedded once (normalized) and kept in a per-collection
+  in-memory matrix; lookups are a single matrix-vector product over it
+* The retrieved context is fingerprinted by its set of chunk ids, so an answer is
+  only reused when the paraphrase retrieved exactly the same chunks
+* Every collection index carries the index version it was built against; a new
+  version (re-ingest) drops it, and the version is part of the response key
+* Answers themselves live in the ``EnterpriseCacheManager`` (Redis when
+  available, TTL + LRU bounded), keyed by the canonical question, the collection,
+  the index version and the context fingerprint
+* Exact repeats are answered from the cache manager without embedding the query
+"""
+
+import hashlib
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from utils.query_result_cache import get_index_generation
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SIMILARITY_THRESHOLD = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.92"))
+DEFAULT_MAX_ENTRIES = int(os.getenv("SEMANTIC_CACHE_MAX_ENTRIES", "5000"))
+DEFAULT_TTL = int(os.getenv("SEMANTIC_CACHE_TTL_SECONDS", "86400"))
+
+_ALL_COLLECTIONS = "__all__"
+
+
+def context_fingerprint(chunk_ids: Iterable[Any]) -> str:
+    """Order-independent digest of the retrieved chunk ids"""
+    ids = sorted({str(c) for c in chunk_ids if c is not None})
+    return hashlib.blake2b("\x1f".join(ids).encode("utf-8"), digest_size=16).hexdigest()
+
+
+def _version_token(version: Hashable) -> str:
+    return hashlib.blake2b(repr(version).encode("utf-8"), digest_size=8).hexdigest()
+
+
+class _CollectionIndex:
+    """Normalized query vectors of one collection with their fingerprints (LRU bounded)"""
+
+    def __init__(self, version: Hashable):
+        self.version = version
+        self.vectors: Optional[np.ndarray] = None
+        self.size = 0
+        # row -> (canonical query, fingerprint); key -> row; keys in LRU order
+        self.rows: List[Tuple[str, str]] = []
+        self.row_of: "OrderedDict[Tuple[str, str], int]" = OrderedDict()
+
+    def add(self, query: str, fingerprint: str, vector: np.ndarray) -> None:
+        key = (query, fingerprint)
+        if key in self.row_of:
+            self.row_of.move_to_end(key)
+            return
+        if self.vectors is None:
+            self.vectors = np.zeros((16, vector.shape[0]), dtype=np.float32)
+        elif self.size == self.vectors.shape[0]:
+            grown = np.zeros((self.size * 2, self.vectors.shape[1]), dtype=np.float32)
+            grown[:self.size] = self.vectors[:self.size]
+            self.vectors = grown
+        self.vectors[self.size] = vector
+        self.rows.append(key)
+        self.row_of[key] = self.size
+        self.size += 1
+
+    def remove(self, key: Tuple[str, str]) -> None:
+        row = self.row_of.pop(key, None)
+        if row is None:
+            return
+        # Swap-remove: move the last row into the freed slot
+        last = self.size - 1
+        if row != last:
+            moved = self.rows[last]
+            self.vectors[row] = self.vectors[last]
+            self.rows[row] = moved
+            self.row_of[moved] = row
+        self.rows.pop()
+        self.size -= 1
+
+    def pop_oldest(self) -> None:
+        if self.row_of:
+            self.remove(next(iter(self.row_of)))
+
+    def search(self, vector: np.ndarray, fingerprint: str, threshold: float) -> Optional[Tuple[str, float]]:
+        """Most similar cached query with the same context fingerprint, if above threshold"""
+        if not self.size:
+            return None
+        scores = self.vectors[:self.size] @ vector
+        candidates = np.flatnonzero(scores >= threshold)
+        for row in candidates[np.argsort(-scores[candidates])]:
+            query, fp = self.rows[row]
+            if fp == fingerprint:
+                self.row_of.move_to_end((query, fp))
+                return query, float(scores[row])
+        return None
+
+
+class SemanticResponseCache:
+    """Embedding-similarity cache of LLM answers per collection and retrieved context"""
+
+    def __init__(self,
+                 cache_manager=None,
+                 embed: Optional[Callable[[List[str]], np.ndarray]] = None,
+                 similarity_threshold: float = DEFAULT_SIMILARITY_THRESHOLD,
+                 max_entries: int = DEFAULT_MAX_ENTRIES,
+                 ttl: int = DEFAULT_TTL):
+        """
+        Args:
+            cache_manager: Store for the answers (defaults to the global EnterpriseCacheManager)
+            embed: Callable returning L2-normalized embeddings for a list of texts
+                   (defaults to the shared embedding service)
+            similarity_threshold: Minimum cosine similarity for a paraphrase hit
+            max_entries: Cached questions kept per collection (least recently used dropped)
+            ttl: Lifetime of a cached answer in seconds
+        """
+        self._cache_manager = cache_manager
+        self._embed = embed
+        self.similarity_threshold = similarity_threshold
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._indexes: Dict[str, _CollectionIndex] = {}
+        self._lock = threading.Lock()
+        self.stats = {
+            "exact_hits": 0,
+            "semantic_hits": 0,
+            "misses": 0,
+            "stores": 0,
+            "stale_entries": 0,
+            "version_resets": 0,
+            "errors": 0,
+        }
+
+    # ---- dependencies -----------------------------------------------------
+
+    @property
+    def cache_manager(self):
+        if self._cache_manager is None:
+            from utils.enterprise_caching_system import get_global_cache_manager
+            self._cache_manager = get_global_cache_manager()
+        return self._cache_manager
+
+    def _embed_query(self, query: str) -> Optional[np.ndarray]:
+        try:
+            if self._embed is None:
+                from utils.embedding_service import get_embedding_service
+                service = get_embedding_service()
+                self._embed = lambda texts: service.encode_many(texts, normalize_embeddings=True)
+            return np.asarray(self._embed([query]), dtype=np.float32)[0]
+        except Exception as e:
+            logger.warning(f"Semantic cache could not embed query: {e}")
+            self.stats["errors"] += 1
+            return None
+
+    # ---- keys -------------------------------------------------------------
+
+    @staticmethod
+    def _canonical(query: str) -> str:
+        return " ".join((query or "").lower().split())
+
+    @staticmethod
+    def _context_token(collection: str, version: Hashable, fingerprint: str) -> str:
+        return f"semantic|{collection}|{_version_token(version)}|{fingerprint}"
+
+    def _index_for(self, collection: str, version: Hashable) -> _CollectionIndex:
+        """Collection index for ``version``; an index built against another version is dropped"""
+        index = self._indexes.get(collection)
+        if index is None or index.version != version:
+            if index is not None:
+                self.stats["version_resets"] += 1
+            index = self._indexes[collection] = _CollectionIndex(version)
+        return index
+
+    # ---- public API -------------------------------------------------------
+
+    def lookup(self,
+               query: str,
+               chunk_ids: Iterable[Any],
+               collection: Optional[str] = None,
+               index_version: Hashable = None,
+               model_params: Dict[str, Any] = None) -> Optional[Dict[str, Any]]:
+        """
+        Cached answer for ``query`` (or a paraphrase of it) over the same retrieved chunks
+
+        Returns the stored response dict with ``cache`` set to ``"exact"`` or
+        ``"semantic"`` (plus ``similarity`` / ``matched_query``), or None on a miss.
+        """
+        collection = (collection or _ALL_COLLECTIONS).lower()
+        if index_version is None:
+            index_version = get_index_generation(None if collection == _ALL_COLLECTIONS else collection)
+        canonical = self._canonical(query)
+        fingerprint = context_fingerprint(chunk_ids)
+        context = self._context_token(collection, index_version, fingerprint)
+
+        response = self.cache_manager.get_cached_response(canonical, context, model_params)
+        if response is not None:
+            self.stats["exact_hits"] += 1
+            return dict(response, cache="exact")
+
+        with self._lock:
+            index = self._index_for(collection, index_version)
+            if not index.size:
+                self.stats["misses"] += 1
+                return None
+
+        vector = self._embed_query(canonical)
+        if vector is None:
+            self.stats["misses"] += 1
+            return None
+
+        with self._lock:
+            match = self._index_for(collection, index_version).search(
+                vector, fingerprint, self.similarity_threshold)
+        if match is None:
+            self.stats["misses"] += 1
+            return None
+
+        matched_query, similarity = match
+        response = self.cache_manager.get_cached_response(matched_query, context, model_params)
+        if response is None:
+            # Answer expired or was evicted from the store: forget the question too
+            with self._lock:
+                self._index_for(collection, index_version).remove((matched_query, fingerprint))
+            self.stats["stale_entries"] += 1
+            self.stats["misses"] += 1
+            return None
+
+        self.stats["semantic_hits"] += 1
+        logger.info(f"Semantic cache hit ({similarity:.3f}) for query: {query[:50]}...")
+        return dict(response, cache="semantic", similarity=similarity, matched_query=matched_query)
+
+    def store(self,
+              query: str,
+              chunk_ids: Iterable[Any],
+              response: Dict[str, Any],
+              collection: Optional[str] = None,
+              index_version: Hashable = None,
+              model_params: Dict[str, Any] = None) -> bool:
+        """Cache ``response`` for ``query`` over the retrieved chunks and index it for paraphrases"""
+        collection = (collection or _ALL_COLLECTIONS).lower()
+        if index_version is None:
+            index_version = get_index_generation(None if collection == _ALL_COLLECTIONS else collection)
+        canonical = self._canonical(query)
+        fingerprint = context_fingerprint(chunk_ids)
+        context = self._context_token(collection, index_version, fingerprint)
+
+        if not self.cache_manager.cache_response(canonical, context, response, self.ttl, model_params):
+            return False
+
+        vector = self._embed_query(canonical)
+        if vector is None:
+            # Still served to exact repeats
+            return True
+
+        with self._lock:
+            index = self._index_for(collection, index_version)
+            index.add(canonical, fingerprint, vector)
+            while index.size > self.max_entries:
+                index.pop_oldest()
+        self.stats["stores"] += 1
+        return True
+
+    def clear(self, collection: Optional[str] = None) -> None:
+        """Forget indexed questions (answers already stored expire through the cache manager)"""
+        with self._lock:
+            if collection is None:
+                self._indexes.clear()
+            else:
+                self._indexes.pop(collection.lower(), None)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Hit/miss counters and indexed questions per collection"""
+        lookups = self.stats["exact_hits"] + self.stats["semantic_hits"] + self.stats["misses"]
+        hits = self.stats["exact_hits"] + self.stats["semantic_hits"]
+        with self._lock:
+            indexed = {name: index.size for name, index in self._indexes.items()}
+        return {
+            **self.stats,
+            "hit_rate": (hits / lookups) if lookups else 0.0,
+            "similarity_threshold": self.similarity_threshold,
+            "indexed_queries": indexed,
+            "timestamp": time.time(),
+        }
+
+
+_global_semantic_cache: Optional[SemanticResponseCache] = None
+_global_lock = threading.Lock()
+
+
+def get_semantic_response_cache() -> SemanticResponseCache:
+    """Process-wide semantic response cache"""
+    global _global_semantic_cache
+    with _global_lock:
+        if _global_semantic_cache is None:
+            _global_semantic_cache = SemanticResponseCache()
+        return _global_semantic_cache
@@ -0,0 +1,259 @@
+"""
+Sparse Keyword Index
+
+Postings-based BM25 / term-overlap scoring shared by the keyword retrievers.
+
+* Tokenized vocabulary (term -> id) built once per corpus
+* CSR postings per term: ``indptr[t]:indptr[t + 1]`` slices ``doc_ids`` and the
+  precomputed BM25 impact of the term in each document (IDF and the
+  document-length norm are folded in at build time)
+* Queries touch only the postings of their terms: scores are accumulated with
+  NumPy over those postings and top-k is taken with ``argpartition``, so cost
+  grows with the postings read rather than with corpus size
+* Per-document distinct-term counts allow Jaccard / coverage scoring from the
+  same postings
+* Persisted as a directory of ``.npy`` arrays (memory-mapped on load) plus a
+  JSON header with the vocabulary and a signature of the source corpus
+"""
+
+import json
+import logging
+import os
+import re
+from collections import Counter
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+INDEX_DIRNAME = "keyword_index"
+_FORMAT_VERSION = 1
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+_ARRAYS = ("indptr", "doc_ids", "tfs", "impacts", "doc_len", "doc_unique")
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercased word tokens (punctuation is not part of a term)"""
+    return _TOKEN_RE.findall((text or "").lower())
+
+
+class SparseKeywordIndex:
+    """Immutable CSR keyword index over a list of texts"""
+
+    def __init__(self, vocab: Dict[str, int], arrays: Dict[str, np.ndarray],
+                 k1: float = 1.2, b: float = 0.75, signature: Any = None):
+        self.vocab = vocab
+        self.k1 = k1
+        self.b = b
+        self.signature = signature
+        self.indptr = arrays["indptr"]
+        self.doc_ids = arrays["doc_ids"]
+        self.tfs = arrays["tfs"]
+        self.impacts = arrays["impacts"]
+        self.doc_len = arrays["doc_len"]
+        self.doc_unique = arrays["doc_unique"]
+        self.num_docs = int(self.doc_len.shape[0])
+
+    def __len__(self) -> int:
+        return self.num_docs
+
+    @classmethod
+    def build(cls, texts: Iterable[str], k1: float = 1.2, b: float = 0.75,
+              signature: Any = None) -> "SparseKeywordIndex":
+        """Tokenize ``texts`` and build postings with precomputed BM25 impacts"""
+        vocab: Dict[str, int] = {}
+        term_ids: List[np.ndarray] = []
+        term_tfs: List[np.ndarray] = []
+        doc_len: List[int] = []
+        for text in texts:
+            tokens = tokenize(text)
+            counts = Counter(tokens)
+            term_ids.append(np.fromiter((vocab.setdefault(t, len(vocab)) for t in counts),
+                                        dtype=np.int64, count=len(counts)))
+            term_tfs.append(np.fromiter(counts.values(), dtype=np.float32, count=len(counts)))
+            doc_len.append(len(tokens))
+
+        num_docs = len(doc_len)
+        doc_len_arr = np.asarray(doc_len, dtype=np.float32)
+        doc_unique = np.fromiter((len(t) for t in term_ids), dtype=np.int32, count=num_docs)
+        if num_docs and doc_unique.sum():
+            flat_terms = np.concatenate(term_ids)
+            flat_tfs = np.concatenate(term_tfs)
+            flat_docs = np.repeat(np.arange(num_docs, dtype=np.int32), doc_unique)
+        else:
+            flat_terms = np.zeros(0, dtype=np.int64)
+            flat_tfs = np.zeros(0, dtype=np.float32)
+            flat_docs = np.zeros(0, dtype=np.int32)
+
+        # Group postings by term (stable: doc ids stay ascending within a term)
+        order = np.argsort(flat_terms, kind="stable")
+        flat_terms, flat_tfs, flat_docs = flat_terms[order], flat_tfs[order], flat_docs[order]
+        df = np.bincount(flat_terms, minlength=len(vocab)).astype(np.int64)
+        indptr = np.zeros(len(vocab) + 1, dtype=np.int64)
+        np.cumsum(df, out=indptr[1:])
+
+        # Lucene-style IDF (always positive) and per-document length norm
+        idf = np.log1p((num_docs - df + 0.5) / (df + 0.5)).astype(np.float32)
+        avg_len = float(doc_len_arr.mean()) if num_docs else 0.0
+        norms = k1 * (1.0 - b + b * (doc_len_arr / avg_len)) if avg_len else np.full(num_docs, k1, np.float32)
+        impacts = (idf[flat_terms] * flat_tfs * (k1 + 1.0) /
+                   (flat_tfs + norms[flat_docs])).astype(np.float32)
+
+        arrays = {
+            "indptr": indptr,
+            "doc_ids": flat_docs,
+            "tfs": flat_tfs,
+            "impacts": impacts,
+            "doc_len": doc_len_arr,
+            "doc_unique": doc_unique,
+        }
+        return cls(vocab, arrays, k1=k1, b=b, signature=signature)
+
+    def _query_postings(self, query: str, distinct: bool = False) -> Tuple[List[int], List[int], int]:
+        """Known term ids of ``query`` with their query frequencies, plus the distinct query size"""
+        counts = Counter(tokenize(query))
+        term_ids, weights = [], []
+        for term, qtf in counts.items():
+            tid = self.vocab.get(term)
+            if tid is not None:
+                term_ids.append(tid)
+                weights.append(1 if distinct else qtf)
+        return term_ids, weights, len(counts)
+
+    def _accumulate(self, term_ids: Sequence[int], values: Optional[np.ndarray],
+                    weights: Sequence[int]) -> Tuple[np.ndarray, np.ndarray]:
+        """Sum per-posting values over the query terms -> (candidate doc ids, scores)"""
+        if not term_ids:
+            return np.zeros(0, dtype=np.int32), np.zeros(0, dtype=np.float32)
+        slices = [slice(int(self.indptr[t]), int(self.indptr[t + 1])) for t in term_ids]
+        docs = np.concatenate([self.doc_ids[s] for s in slices])
+        if values is None:
+            contrib = np.concatenate([np.full(s.stop - s.start, w, dtype=np.float32)
+                                      for s, w in zip(slices, weights)])
+        else:
+            contrib = np.concatenate([values[s] * np.float32(w) for s, w in zip(slices, weights)])
+        candidates, inverse = np.unique(docs, return_inverse=True)
+        scores = np.bincount(inverse, weights=contrib, minlength=candidates.shape[0])
+        return candidates, scores.astype(np.float32)
+
+    @staticmethod
+    def _top_k(candidates: np.ndarray, scores: np.ndarray, k: int) -> List[Tuple[int, float]]:
+        if k <= 0 or candidates.shape[0] == 0:
+            return []
+        if candidates.shape[0] > k:
+            part = np.argpartition(-scores, k - 1)[:k]
+            # Ties at the cut-off go to the lowest doc ids (candidates are sorted ascending)
+            kth = scores[part].min()
+            above = np.flatnonzero(scores > kth)
+            tied = np.flatnonzero(scores == kth)[:k - above.shape[0]]
+            keep = np.concatenate([above, tied])
+            candidates, scores = candidates[keep], scores[keep]
+        # Highest score first; ties broken by document order
+        order = np.lexsort((candidates, -scores))
+        return [(int(candidates[i]), float(scores[i])) for i in order]
+
+    def search(self, query: str, k: int = 10) -> List[Tuple[int, float]]:
+        """BM25 top-k as (doc index, score); only documents sharing a term are returned"""
+        term_ids, weights, _ = self._query_postings(query)
+        candidates, scores = self._accumulate(term_ids, self.impacts, weights)
+        return self._top_k(candidates, scores, k)
+
+    def overlap_search(self, query: str, k: int = 10, mode: str = "jaccard") -> List[Tuple[int, float]]:
+        """Distinct-term overlap top-k: ``jaccard`` (|Q∩D| / |Q∪D|) or ``coverage`` (|Q∩D| / |Q|)"""
+        term_ids, weights, query_size = self._query_postings(query, distinct=True)
+        candidates, overlap = self._accumulate(term_ids, None, weights)
+        if mode == "coverage":
+            scores = overlap / max(1, query_size)
+        else:
+            union = query_size + self.doc_unique[candidates].astype(np.float32) - overlap
+            scores = overlap / np.maximum(union, 1.0)
+        return self._top_k(candidates, scores.astype(np.float32), k)
+
+    # ---- persistence ------------------------------------------------------
+
+    def save(self, directory) -> Path:
+        """Write the index to ``directory`` (arrays first, header last so readers never see a partial index)"""
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        for name in _ARRAYS:
+            tmp = directory / f"{name}.tmp.npy"
+            np.save(tmp, np.ascontiguousarray(getattr(self, name)))
+            os.replace(tmp, directory / f"{name}.npy")
+        terms = [None] * len(self.vocab)
+        for term, tid in self.vocab.items():
+            terms[tid] = term
+        header = {
+            "version": _FORMAT_VERSION,
+            "k1": self.k1,
+            "b": self.b,
+            "num_docs": self.num_docs,
+            "signature": self.signature,
+            "terms": terms,
+        }
+        tmp = directory / "header.json.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(header, f)
+        os.replace(tmp, directory / "header.json")
+        return directory
+
+    @classmethod
+    def load(cls, directory, signature: Any = None, k1: Optional[float] = None,
+             b: Optional[float] = None) -> Optional["SparseKeywordIndex"]:
+        """Memory-map a saved index; None if missing or built for another corpus / parameters"""
+        directory = Path(directory)
+        try:
+            with open(directory / "header.json", "r", encoding="utf-8") as f:
+                header = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if header.get("version") != _FORMAT_VERSION:
+            return None
+        if signature is not None and header.get("signature") != _jsonable(signature):
+            return None
+        if (k1 is not None and header.get("k1") != k1) or (b is not None and header.get("b") != b):
+            return None
+        try:
+            arrays = {name: np.load(directory / f"{name}.npy", mmap_mode="r") for name in _ARRAYS}
+        except (OSError, ValueError) as e:
+            logger.warning(f"Keyword index at {directory} is unreadable: {e}")
+            return None
+        if arrays["doc_len"].shape[0] != header.get("num_docs"):
+            return None
+        vocab = {term: tid for tid, term in enumerate(header.get("terms") or [])}
+        return cls(vocab, arrays, k1=header["k1"], b=header["b"], signature=header.get("signature"))
+
+    @classmethod
+    def load_or_build(cls, directory, texts: Sequence[str], signature: Any,
+                      k1: float = 1.2, b: float = 0.75) -> "SparseKeywordIndex":
+        """Reuse the persisted index for this corpus signature, else build and (best effort) save it"""
+        signature = _jsonable(signature)
+        if directory is not None:
+            index = cls.load(directory, signature=signature, k1=k1, b=b)
+            if index is not None and index.num_docs == len(texts):
+                return index
+        index = cls.build(texts, k1=k1, b=b, signature=signature)
+        if directory is not None:
+            try:
+                index.save(directory)
+            except OSError as e:
+                logger.debug(f"Could not persist keyword index to {directory}: {e}")
+        return index
+
+
+def _jsonable(value: Any) -> Any:
+    """Round-trip through JSON so signatures compare equal to what was saved"""
+    return json.loads(json.dumps(value, default=str))
+
+
+def corpus_signature(paths: Iterable, extra: Any = None) -> List:
+    """(name, mtime_ns, size) of each source file, for keyword index invalidation"""
+    sig = []
+    for path in sorted(str(p) for p in paths):
+        try:
+            st = os.stat(path)
+            sig.append([os.path.basename(path), st.st_mtime_ns, st.st_size])
+        except OSError:
+            sig.append([os.path.basename(path), None, None])
+    return [sig, extra]
@@ -8,7 +8,6 @@ import pickle
 import faiss
 import numpy as np
 from typing import List, Dict, Any, Optional, Tuple
-from sentence_transformers import SentenceTransformer
 # Optional OpenAI SDK import (do not fail if missing)
 try:
     from openai import OpenAI as _OpenAIClient  # new SDK client
@@ -20,6 +19,7 @@ from pathlib import Path
 
 # Import text cleaning utility
 from .text_cleaning import clean_document_text, is_noise_text
+from .embedding_service import get_embedding_service
 
 logger = logging.getLogger(__name__)
 
@@ -38,8 +38,8 @@ class UnifiedSearchEngine:
     def _initialize_components(self):
         """Initialize embedding model and OpenAI client"""
         try:
-            # Initialize sentence transformer
-            self.model = SentenceTransformer('all-MiniLM-L6-v2')
+            # Attach the shared sentence transformer
+            self.model = get_embedding_service('all-MiniLM-L6-v2')
             logger.info("Sentence transformer model loaded successfully")
         except Exception as e:
             logger.error(f"Failed to load sentence transformer: {str(e)}")
@@ -161,7 +161,7 @@ class UnifiedSearchEngine:
                 logger.error("Sentence transformer model not available")
                 return self._fallback_search(query, os.path.basename(index_path))
             
-            query_embedding = self.model.encode([query])
+            query_embedding = self.model.encode_many([query])
             
             # Search FAISS index
             scores, indices = faiss_index.search(query_embedding, top_k)
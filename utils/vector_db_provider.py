@@ -18,15 +18,119 @@ from pathlib import Path
 import pickle
 from datetime import datetime
 from functools import lru_cache
-from sentence_transformers import SentenceTransformer
 import traceback
 
 # Import the centralized configuration
 from config.vector_db_config import get_vector_db_config, VectorDBType
+from utils.embedding_service import get_embedding_service
+from utils.chunk_store import open_sidecar, write_sidecar
+from utils.faiss_segment_store import MANIFEST_NAME, FAISSSegmentStore, load_collection
 
 # Configure logging
 logger = logging.getLogger(__name__)
 
+def _docstore_dict(docstore: Any) -> Optional[Dict[str, Any]]:
+    """Return the uid -> Document dict of a LangChain-style docstore, if exposed"""
+    for attr in ("_dict", "dict", "docs", "_docs", "store", "_store"):
+        d = getattr(docstore, attr, None)
+        if isinstance(d, dict):
+            return d
+    return None
+
+def _index_key(key: Any) -> int:
+    return int(key) if isinstance(key, (int, str)) and str(key).isdigit() else 0
+
+def _docstore_rows(docstore: Any, idx_map: Dict[Any, Any]) -> Tuple[List[Any], List[Any]]:
+    """Resolve (docstore, index_to_docstore_id) into row-ordered documents and uids"""
+    doc_dict = _docstore_dict(docstore)
+    docs: List[Any] = []
+    ids: List[Any] = []
+    for _, uid in sorted(idx_map.items(), key=lambda kv: _index_key(kv[0])):
+        doc_obj = None
+        try:
+            if isinstance(doc_dict, dict) and uid in doc_dict:
+                doc_obj = doc_dict.get(uid)
+            elif hasattr(docstore, "search"):
+                doc_obj = docstore.search(uid)
+        except Exception:
+            doc_obj = None
+        docs.append(doc_obj)
+        ids.append(uid)
+    return docs, ids
+
+def _document_row(doc_item: Any) -> Tuple[str, Dict[str, Any]]:
+    """Text and metadata of one stored document (Document object, dict or plain value)"""
+    if doc_item is None:
+        return "", {}
+    if hasattr(doc_item, "page_content"):
+        content = getattr(doc_item, "page_content", "") or ""
+        meta = getattr(doc_item, "metadata", None) or {}
+    elif isinstance(doc_item, dict) and "page_content" in doc_item:
+        content = doc_item.get("page_content") or ""
+        meta = doc_item.get("metadata") or {}
+    else:
+        content, meta = doc_item, {}
+    if not isinstance(meta, dict):
+        try:
+            meta = dict(meta)
+        except Exception:
+            meta = {}
+    return (content if isinstance(content, str) else str(content)), meta
+
+def _flatten_faiss_metadata(metadata: Any) -> Dict[str, Any]:
+    """
+    Normalize any supported FAISS metadata pickle into flat, row-aligned arrays.
+    
+    Handles LangChain ``(docstore, index_to_docstore_id)`` tuples (top level or
+    leaked into ``documents``), ``{"docstore", "index_to_docstore_id"}`` dicts,
+    ``texts``/``metadata`` key variants and bare lists. Runs once per load so
+    search only indexes into the result.
+    
+    Returns:
+        {"documents": List[str], "metadatas": List[dict], "ids": List[str]}
+    """
+    docs: List[Any] = []
+    metas: List[Any] = []
+    ids: List[Any] = []
+    
+    if isinstance(metadata, tuple) and len(metadata) == 2 and isinstance(metadata[1], dict):
+        docs, ids = _docstore_rows(*metadata)
+    elif isinstance(metadata, dict):
+        idx_map = metadata.get("index_to_docstore_id")
+        raw_docs = metadata.get("documents")
+        if raw_docs is None:
+            raw_docs = metadata.get("texts", [])
+        if "docstore" in metadata and isinstance(idx_map, dict) and idx_map:
+            docs, ids = _docstore_rows(metadata.get("docstore"), idx_map)
+        elif (isinstance(raw_docs, list) and raw_docs and isinstance(raw_docs[0], tuple)
+              and len(raw_docs[0]) == 2 and isinstance(raw_docs[0][1], dict)):
+            docs, ids = _docstore_rows(*raw_docs[0])
+        else:
+            docs = list(raw_docs) if isinstance(raw_docs, (list, tuple)) else []
+            if isinstance(metadata.get("ids"), list):
+                ids = list(metadata["ids"])
+            elif isinstance(idx_map, dict):
+                ids = [idx_map.get(i, idx_map.get(str(i))) for i in range(len(docs))]
+            metas = metadata.get("metadatas")
+            if metas is None and isinstance(metadata.get("metadata"), list):
+                metas = metadata["metadata"]
+            metas = list(metas or [])
+    elif isinstance(metadata, list):
+        docs = metadata
+    else:
+        docs = [metadata]
+    
+    documents: List[str] = []
+    metadatas: List[Dict[str, Any]] = []
+    for i, doc_item in enumerate(docs):
+        content, doc_meta = _document_row(doc_item)
+        explicit = metas[i] if i < len(metas) else None
+        documents.append(content)
+        # Explicit metadatas win; fall back to the Document's own metadata
+        metadatas.append(explicit if isinstance(explicit, dict) and explicit else doc_meta)
+    flat_ids = [str(ids[i]) if i < len(ids) and ids[i] is not None else str(i) for i in range(len(documents))]
+    return {"documents": documents, "metadatas": metadatas, "ids": flat_ids}
+
 class VectorDBProvider:
     """
     Centralized provider for vector database access
@@ -57,10 +161,10 @@ class VectorDBProvider:
         }
     
     def _initialize_embedding_model(self):
-        """Initialize the sentence transformer embedding model"""
+        """Attach the shared sentence transformer embedding model"""
         try:
             embedding_config = self.config.get_embedding_config()
-            self.embedding_model = SentenceTransformer(embedding_config["model_name"])
+            self.embedding_model = get_embedding_service(embedding_config["model_name"])
             logger.info(f"Initialized embedding model: {embedding_config['model_name']}")
         except Exception as e:
             logger.error(f"Failed to initialize embedding model: {e}")
@@ -109,12 +213,8 @@ class VectorDBProvider:
                 continue
 
             for item in path.iterdir():
-                if item.is_dir():
-                    # Check if it's a valid FAISS index (contains index.faiss and at least one .pkl)
-                    has_faiss = (item / "index.faiss").exists()
-                    has_metadata = any(item.glob("*.pkl"))
-                    if has_faiss and has_metadata:
-                        indexes.append(item.name)
+                if item.is_dir() and self._is_faiss_index_dir(item):
+                    indexes.append(item.name)
         
         logger.info(f"Discovered {len(indexes)} FAISS indexes")
         return indexes
@@ -151,26 +251,36 @@ class VectorDBProvider:
         
         for base_path in faiss_paths:
             index_path = base_path / index_name
-            if index_path.exists() and index_path.is_dir():
-                has_faiss = (index_path / "index.faiss").exists()
-                has_metadata = any(index_path.glob("*.pkl"))
-                if has_faiss and has_metadata:
-                    return index_path
+            if index_path.exists() and index_path.is_dir() and self._is_faiss_index_dir(index_path):
+                return index_path
     
         return None
     
+    @staticmethod
+    def _is_faiss_index_dir(path: Path) -> bool:
+        """A segment-store collection (manifest.json) or index.faiss with at least one .pkl"""
+        if (path / MANIFEST_NAME).exists():
+            return True
+        return (path / "index.faiss").exists() and any(path.glob("*.pkl"))
+    
     @lru_cache(maxsize=16)
-    def _load_faiss_index(self, index_path: Path) -> Tuple[Any, Dict[str, Any]]:
+    def _load_faiss_index(self, index_path: Path, signature: Optional[Tuple] = None) -> Tuple[Any, Dict[str, Any]]:
         """
         Load a FAISS index and its metadata from disk with robust fallbacks.
         
         Args:
-            index_path: Directory containing index.faiss and metadata pickle.
+            index_path: Directory containing index.faiss and metadata pickle,
+                or a segment-store collection (manifest.json).
+            signature: On-disk change token; part of the cache key so a
+                rewritten index is loaded again.
         
         Returns:
             Tuple of (faiss_index, metadata_dict)
         """
         try:
+            if (index_path / MANIFEST_NAME).exists():
+                return self._load_segment_collection(index_path)
+            
             # Expected files
             faiss_file = index_path / "index.faiss"
             # Prefer common names but accept any .pkl present
@@ -190,184 +300,19 @@ class VectorDBProvider:
             logger.info(f"Loading FAISS index from {faiss_file}")
             faiss_index = faiss.read_index(str(faiss_file))
             
+            # Previously converted chunk store: map it instead of unpickling
+            sidecar_file = metadata_file.with_name(metadata_file.name + ".flat.chunks")
+            store = open_sidecar(sidecar_file, metadata_file, layout="flat")
+            if store is not None:
+                logger.info(f"Mapped {len(store)} chunks from {sidecar_file}")
+                return faiss_index, self._chunk_store_metadata(store)
+            
             logger.info(f"Loading metadata from {metadata_file}")
             with open(metadata_file, "rb") as f:
                 metadata = pickle.load(f)
             
-            # Handle tuple-based LangChain FAISS pickles: (docstore, index_to_docstore_id)
-            try:
-                if isinstance(metadata, tuple) and len(metadata) == 2:
-                    docstore, idx_map = metadata
-                    if isinstance(idx_map, dict) and idx_map:
-                        def _get_doc_dict(ds: Any) -> Optional[Dict[str, Any]]:
-                            for attr in ("_dict", "dict", "docs", "_docs", "store", "_store"):
-                                d = getattr(ds, attr, None)
-                                if isinstance(d, dict):
-                                    return d
-                            return None
-                        doc_dict = _get_doc_dict(docstore)
-                        ordered = sorted(
-                            [
-                                (int(k) if isinstance(k, (int, str)) and str(k).isdigit() else k, v)
-                                for k, v in idx_map.items()
-                            ],
-                            key=lambda x: int(x[0]) if isinstance(x[0], (int, str)) and str(x[0]).isdigit() else 0,
-                        )
-                        docs: List[str] = []
-                        metas: List[Dict[str, Any]] = []
-                        ids: List[str] = []
-                        for _, uid in ordered:
-                            ids.append(uid)
-                            doc_obj = None
-                            try:
-                                if isinstance(doc_dict, dict) and uid in doc_dict:
-                                    doc_obj = doc_dict.get(uid)
-                                elif hasattr(docstore, "search"):
-                                    try:
-                                        doc_obj = docstore.search(uid)
-                                    except Exception:
-                                        doc_obj = None
-                            except Exception:
-                                doc_obj = None
-                            if doc_obj is not None:
-                                content = getattr(doc_obj, "page_content", "")
-                                meta_obj = getattr(doc_obj, "metadata", {}) or {}
-                                if not isinstance(meta_obj, dict):
-                                    try:
-                                        meta_obj = dict(meta_obj)
-                                    except Exception:
-                                        meta_obj = {}
-                            else:
-                                content = ""
-                                meta_obj = {}
-                            docs.append(content if isinstance(content, str) else str(content))
-                            metas.append(meta_obj)
-                        metadata = {"documents": docs, "metadatas": metas, "ids": ids}
-            except Exception as tuple_recon_err:
-                logger.debug(f"Failed tuple-based FAISS metadata reconstruction: {tuple_recon_err}")
-            
-            # If this is a LangChain FAISS pickle, reconstruct documents from the docstore
-            try:
-                if isinstance(metadata, dict) and ("docstore" in metadata) and ("index_to_docstore_id" in metadata):
-                    docstore = metadata.get("docstore")
-                    idx_map = metadata.get("index_to_docstore_id") or {}
-                    if isinstance(idx_map, dict) and len(idx_map) > 0:
-                        def _get_doc_dict(ds: Any) -> Optional[Dict[str, Any]]:
-                            for attr in ("_dict", "dict", "docs", "_docs", "store", "_store"):
-                                d = getattr(ds, attr, None)
-                                if isinstance(d, dict):
-                                    return d
-                            return None
-                        doc_dict = _get_doc_dict(docstore)
-                        # Build ordered lists aligned to index positions
-                        ordered = sorted(
-                            [(int(k), v) for k, v in idx_map.items()], key=lambda x: x[0]
-                        )
-                        docs: List[str] = []
-                        metas: List[Dict[str, Any]] = []
-                        ids: List[str] = []
-                        for _, uid in ordered:
-                            ids.append(uid)
-                            doc_obj = None
-                            try:
-                                if isinstance(doc_dict, dict) and uid in doc_dict:
-                                    doc_obj = doc_dict.get(uid)
-                                elif hasattr(docstore, "search"):
-                                    try:
-                                        doc_obj = docstore.search(uid)
-                                    except Exception:
-                                        doc_obj = None
-                            except Exception:
-                                doc_obj = None
-                            # Extract page_content and metadata from LangChain Document
-                            if doc_obj is not None:
-                                content = getattr(doc_obj, "page_content", "")
-                                meta_obj = getattr(doc_obj, "metadata", {}) or {}
-                                if not isinstance(meta_obj, dict):
-                                    try:
-                                        meta_obj = dict(meta_obj)
-                                    except Exception:
-                                        meta_obj = {}
-                            else:
-                                content = ""
-                                meta_obj = {}
-                            docs.append(content if isinstance(content, str) else str(content))
-                            metas.append(meta_obj)
-                        metadata = {"documents": docs, "metadatas": metas, "ids": ids}
-            except Exception as recon_err:
-                logger.debug(f"Failed to reconstruct documents from LangChain FAISS pickle: {recon_err}")
-            
-            # Handle mis-saved metadata where 'documents' contains a single tuple (docstore, index_to_docstore_id)
-            try:
-                if isinstance(metadata, dict) and isinstance(metadata.get("documents"), list) and metadata["documents"]:
-                    first_doc = metadata["documents"][0]
-                    if isinstance(first_doc, tuple) and len(first_doc) == 2:
-                        docstore, idx_map = first_doc
-                        if isinstance(idx_map, dict):
-                            def _get_doc_dict(ds: Any) -> Optional[Dict[str, Any]]:
-                                for attr in ("_dict", "dict", "docs", "_docs", "store", "_store"):
-                                    d = getattr(ds, attr, None)
-                                    if isinstance(d, dict):
-                                        return d
-                                return None
-                            doc_dict = _get_doc_dict(docstore)
-                            ordered = sorted(
-                                [
-                                    (int(k) if isinstance(k, (int, str)) and str(k).isdigit() else k, v)
-                                    for k, v in idx_map.items()
-                                ],
-                                key=lambda x: int(x[0]) if isinstance(x[0], (int, str)) and str(x[0]).isdigit() else 0,
-                            )
-                            docs: List[str] = []
-                            metas: List[Dict[str, Any]] = []
-                            ids: List[str] = []
-                            for _, uid in ordered:
-                                ids.append(uid)
-                                doc_obj = None
-                                try:
-                                    if isinstance(doc_dict, dict) and uid in doc_dict:
-                                        doc_obj = doc_dict.get(uid)
-                                    elif hasattr(docstore, "search"):
-                                        try:
-                                            doc_obj = docstore.search(uid)
-                                        except Exception:
-                                            doc_obj = None
-                                except Exception:
-                                    doc_obj = None
-                                if doc_obj is not None:
-                                    content = getattr(doc_obj, "page_content", "")
-                                    meta_obj = getattr(doc_obj, "metadata", {}) or {}
-                                    if not isinstance(meta_obj, dict):
-                                        try:
-                                            meta_obj = dict(meta_obj)
-                                        except Exception:
-                                            meta_obj = {}
-                                else:
-                                    content = ""
-                                    meta_obj = {}
-                                docs.append(content if isinstance(content, str) else str(content))
-                                metas.append(meta_obj)
-                            metadata = {"documents": docs, "metadatas": metas, "ids": ids}
-            except Exception as recon2_err:
-                logger.debug(f"Failed to reconstruct from tuple-in-documents format: {recon2_err}")
-            
-            # Normalize metadata structure
-            if isinstance(metadata, dict):
-                # Map alternate keys
-                if "texts" in metadata and "documents" not in metadata:
-                    metadata["documents"] = metadata.get("texts", [])
-                if "metadatas" not in metadata and "metadata" in metadata and isinstance(metadata["metadata"], list):
-                    metadata["metadatas"] = metadata["metadata"]
-                if "documents" not in metadata:
-                    metadata["documents"] = []
-                if "metadatas" not in metadata:
-                    metadata["metadatas"] = [{} for _ in range(len(metadata.get("documents", [])))]
-            else:
-                # Convert non-dict metadata to a standard dict
-                if isinstance(metadata, list):
-                    metadata = {"documents": metadata, "metadatas": [{} for _ in metadata]}
-                else:
-                    metadata = {"documents": [str(metadata)], "metadatas": [{}]}
+            # Flatten any supported pickle layout into contiguous documents/metadatas/ids
+            metadata = _flatten_faiss_metadata(metadata)
             
             # Validate sizes
             index_size = getattr(faiss_index, "ntotal", 0)
@@ -375,6 +320,13 @@ class VectorDBProvider:
             if index_size and doc_size and doc_size != index_size:
                 logger.warning(f"Index vectors ({index_size}) != documents ({doc_size}) in {index_path}")
             
+            # Persist the flattened rows once so later loads (and other workers) map them
+            if metadata["documents"]:
+                store = write_sidecar(sidecar_file, metadata_file, "flat", metadata["documents"],
+                                      metadata["metadatas"], metadata["ids"])
+                if store is not None:
+                    metadata = self._chunk_store_metadata(store)
+            
             logger.info(f"Successfully loaded FAISS index with {index_size} vectors")
             return faiss_index, metadata
         except Exception as e:
@@ -382,9 +334,30 @@ class VectorDBProvider:
             logger.debug("Traceback:\n" + traceback.format_exc())
             # Graceful fallback to empty structures
             empty_index = faiss.IndexFlatL2(1)
-            empty_metadata: Dict[str, Any] = {"documents": [], "metadatas": []}
+            empty_metadata: Dict[str, Any] = {"documents": [], "metadatas": [], "ids": []}
             return empty_index, empty_metadata
     
+    @staticmethod
+    def _load_segment_collection(index_path: Path) -> Tuple[Any, Dict[str, Any]]:
+        """Load a collection written by the FAISS adapter (base + segments)"""
+        faiss_index, rows, documents = load_collection(index_path)
+        metadatas = []
+        for row in rows:
+            # Nested metadata first; row fields (id, source, deleted) win
+            meta = dict(row.get("metadata") or {})
+            meta.update({k: v for k, v in row.items() if k != "metadata"})
+            metadatas.append(meta)
+        ids = [meta.get("id", str(i)) for i, meta in enumerate(metadatas)]
+        logger.info(f"Loaded FAISS collection {index_path} with {faiss_index.ntotal} vectors")
+        return faiss_index, {"documents": documents, "metadatas": metadatas, "ids": ids}
+    
+    @staticmethod
+    def _chunk_store_metadata(store) -> Dict[str, Any]:
+        """Expose a chunk store as the documents/metadatas/ids dict used by search"""
+        ids = store.ids if store.ids is not None else [str(i) for i in range(len(store))]
+        metadatas = store.metadatas if store.metadatas is not None else [{} for _ in range(len(store))]
+        return {"documents": store.texts, "metadatas": metadatas, "ids": ids}
+    
     def get_vector_db_status(self) -> Tuple[str, str]:
         """
         Get the current status of the vector database provider
@@ -513,10 +486,10 @@ class VectorDBProvider:
             raise ValueError(f"Index '{index_name}' not found")
         
         # Load the index and metadata
-        faiss_index, metadata = self._load_faiss_index(index_path)
+        faiss_index, metadata = self._load_faiss_index(index_path, FAISSSegmentStore(index_path).signature())
         
         # Generate query embedding
-        query_embedding = self.embedding_model.encode([query])[0]
+        query_embedding = self.embedding_model.encode_many([query])[0]
         # Ensure proper dtype and shape
         query_embedding = np.asarray(query_embedding, dtype=np.float32).reshape(1, -1)
         
@@ -537,68 +510,18 @@ class VectorDBProvider:
         
         # Format results
         results = []
+        # Rows were flattened at load time, so each hit is a plain positional lookup
+        documents = metadata.get("documents") or []
+        metadatas = metadata.get("metadatas") or []
+        ids = metadata.get("ids") or []
         for i, doc_idx in enumerate(indices[0]):
             if doc_idx != -1:  # -1 indicates no more results
-                # Get the document from metadata
-                doc_id: Optional[str] = None
-                if isinstance(metadata.get("ids"), list) and len(metadata["ids"]) > doc_idx:
-                    doc_id = metadata["ids"][doc_idx]
-                elif isinstance(metadata.get("index_to_docstore_id"), dict):
-                    # Fallback if raw mapping is present
-                    doc_id = metadata["index_to_docstore_id"].get(doc_idx) or metadata["index_to_docstore_id"].get(str(doc_idx))
-                if doc_id is None:
-                    doc_id = str(doc_idx)
-                
-                # Try to get content from different metadata formats
-                content: str = ""
-                if "documents" in metadata and len(metadata["documents"]) > doc_idx:
-                    doc_item = metadata["documents"][doc_idx]
-                    try:
-                        # Handle tuple of (docstore, idx_map) leaked into documents
-                        if isinstance(doc_item, tuple) and len(doc_item) == 2:
-                            ds, idx_map = doc_item
-                            uid = None
-                            if isinstance(idx_map, dict):
-                                uid = idx_map.get(doc_idx) or idx_map.get(str(doc_idx))
-                            doc_obj = None
-                            if uid is not None:
-                                # Try common docstore dict attributes
-                                for attr in ("_dict", "dict", "docs", "_docs", "store", "_store"):
-                                    d = getattr(ds, attr, None)
-                                    if isinstance(d, dict) and uid in d:
-                                        doc_obj = d.get(uid)
-                                        break
-                                if doc_obj is None and hasattr(ds, "search"):
-                                    try:
-                                        doc_obj = ds.search(uid)
-                                    except Exception:
-                                        doc_obj = None
-                            if doc_obj is not None:
-                                content = getattr(doc_obj, "page_content", "") or ""
-                            else:
-                                content = ""
-                        elif hasattr(doc_item, "page_content"):
-                            content = getattr(doc_item, "page_content", "") or ""
-                        elif isinstance(doc_item, dict) and "page_content" in doc_item:
-                            content = str(doc_item.get("page_content") or "")
-                        else:
-                            content = doc_item if isinstance(doc_item, str) else str(doc_item)
-                    except Exception:
-                        content = doc_item if isinstance(doc_item, str) else str(doc_item)
-                elif "texts" in metadata and len(metadata["texts"]) > doc_idx:
-                    content = metadata["texts"][doc_idx]
-                doc_metadata: Dict[str, Any] = {}
-                if "metadatas" in metadata and len(metadata["metadatas"]) > doc_idx:
-                    doc_metadata = metadata["metadatas"][doc_idx]
-                # If not present, try to extract from Document object
-                try:
-                    if (not doc_metadata) and "documents" in metadata and len(metadata["documents"]) > doc_idx:
-                        doc_item2 = metadata["documents"][doc_idx]
-                        meta2 = getattr(doc_item2, "metadata", None)
-                        if isinstance(meta2, dict):
-                            doc_metadata = meta2
-                except Exception:
-                    pass
+                doc_idx = int(doc_idx)
+                content = documents[doc_idx] if doc_idx < len(documents) else ""
+                doc_metadata: Dict[str, Any] = metadatas[doc_idx] if doc_idx < len(metadatas) else {}
+                if doc_metadata.get("deleted"):
+                    continue  # tombstone still in an index without removal support
+                doc_id = ids[doc_idx] if doc_idx < len(ids) else str(doc_idx)
                 
                 # Extract source and page information
                 source = (
@@ -15,7 +15,8 @@ import httpx
 
 from utils.weaviate_manager import get_weaviate_manager
 from utils.semantic_chunking_strategy import create_semantic_chunks
-from sentence_transformers import SentenceTransformer
+from utils.embedding_service import get_embedding_service
+from utils.query_result_cache import bump_index_version
 from io import BytesIO
 
 # Optional PDF page counter
@@ -451,8 +452,8 @@ class WeaviateIngestionHelper:
             vectors = None
             if use_local_embeddings:
                 try:
-                    model = SentenceTransformer(embedding_model)
-                    vectors_np = model.encode(chunk_texts, convert_to_numpy=True, show_progress_bar=False, normalize_embeddings=False)
+                    model = get_embedding_service(embedding_model)
+                    vectors_np = model.encode_cached(chunk_texts, normalize_embeddings=False)
                     # Ensure list of lists for JSON serialization
                     vectors = vectors_np.tolist()
                     logger.info(f"Computed {len(vectors)} local embeddings with model='{embedding_model}' for collection '{collection_name}'")
@@ -486,6 +487,10 @@ class WeaviateIngestionHelper:
             # Add documents to Weaviate with detailed diagnostics
             # Always write into the sanitized class name the SDK/REST expect
             diag = self.weaviate_manager.add_documents_with_stats(actual, documents)
+            # Cached query results for this collection are now stale
+            bump_index_version(collection_name)
+            if actual != collection_name:
+                bump_index_version(actual)
 
             # Attach additional context and phase timings
             diag = dict(diag) if isinstance(diag, dict) else {"success": bool(diag)}
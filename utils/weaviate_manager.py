@@ -10,13 +10,14 @@ from typing import List, Dict, Any, Optional, Tuple, Union
 from datetime import datetime, timezone
 import time
 import re
+import threading
 import weaviate
 from weaviate.classes.config import Configure
 from weaviate.classes.query import Filter
 import numpy as np
 import httpx
 import atexit
-from sentence_transformers import SentenceTransformer
+from .embedding_service import get_embedding_service
 from .schema_sync_guard import refresh_sdk_schema, wait_for_class_in_sdk, diff_sdk_rest_classes
 
 logger = logging.getLogger(__name__)
@@ -123,6 +124,14 @@ class WeaviateManager:
         self._name_aliases: Dict[str, str] = {}
         # Local query embedding cache
         self._query_embedder = None
+        # Per-class schema cache (raw class schema, known properties, named vectors,
+        # primary text property), shared by ingestion and search; invalidated on create/delete
+        self._schema_cache: Dict[str, Dict[str, Any]] = {}
+        self._schema_cache_lock = threading.Lock()
+        try:
+            self._schema_cache_ttl = float(os.getenv("WEAVIATE_SCHEMA_CACHE_TTL", "300"))
+        except ValueError:
+            self._schema_cache_ttl = 300.0
         # Track the prefix hint used at construction (for rebuild detection)
         try:
             pref = os.getenv("WEAVIATE_PATH_PREFIX", "").strip()
@@ -404,18 +413,58 @@ class WeaviateManager:
             name = model_name or self._get_query_model_name()
             # Reload if name changed
             if getattr(self, "_query_embedder", None) is None or getattr(self, "_query_model_loaded", None) != name:
-                logger.info(f"Loading SentenceTransformer model for queries: {name}")
-                self._query_embedder = SentenceTransformer(name)
+                logger.info(f"Attaching shared embedding model for queries: {name}")
+                self._query_embedder = get_embedding_service(name)
                 self._query_model_loaded = name
             return self._query_embedder
         except Exception as e:
             logger.error(f"Failed to load query embedding model: {e}")
             return None
 
+    def _schema_cache_get(self, class_name: str, key: str, default: Any = None) -> Any:
+        """Return a cached schema fact for a class, or ``default`` if absent or expired."""
+        actual = self._resolve_collection_name(class_name)
+        with self._schema_cache_lock:
+            entry = self._schema_cache.get(actual)
+            if entry is None:
+                return default
+            if time.time() >= entry["expires_at"]:
+                del self._schema_cache[actual]
+                return default
+            return entry.get(key, default)
+
+    def _schema_cache_put(self, class_name: str, key: str, value: Any) -> Any:
+        actual = self._resolve_collection_name(class_name)
+        with self._schema_cache_lock:
+            entry = self._schema_cache.get(actual)
+            if entry is None or time.time() >= entry["expires_at"]:
+                entry = {"expires_at": time.time() + self._schema_cache_ttl}
+                self._schema_cache[actual] = entry
+            entry[key] = value
+        return value
+
+    def invalidate_schema_cache(self, class_name: Optional[str] = None) -> None:
+        """Drop cached schema facts for a class (or all classes)."""
+        with self._schema_cache_lock:
+            if class_name is None:
+                self._schema_cache.clear()
+            else:
+                self._schema_cache.pop(class_name, None)
+                self._schema_cache.pop(self._resolve_collection_name(class_name), None)
+
     def _get_class_schema_via_schema(self, class_name: str) -> Optional[Dict[str, Any]]:
-        """Return raw class schema dict.
+        """Return raw class schema dict (cached per class for WEAVIATE_SCHEMA_CACHE_TTL seconds).
         Tries /v1/schema/{class} first; if unavailable, falls back to /v1/schema and selects the class.
         """
+        cached = self._schema_cache_get(class_name, "schema")
+        if cached is not None:
+            return cached
+        schema = self._fetch_class_schema(class_name)
+        if schema is not None:
+            self._schema_cache_put(class_name, "schema", schema)
+        return schema
+
+    def _fetch_class_schema(self, class_name: str) -> Optional[Dict[str, Any]]:
         try:
             actual = self._resolve_collection_name(class_name)
             base = self._get_base()
@@ -450,13 +499,16 @@ class WeaviateManager:
     def _get_known_properties_for_class(self, class_name: str) -> Optional[set]:
         """Return a set of property names defined for the class, if obtainable."""
         try:
+            cached = self._schema_cache_get(class_name, "known_properties")
+            if cached is not None:
+                return cached
             info = self._get_class_schema_via_schema(class_name)
             if info and isinstance(info.get("properties"), list):
                 names = set()
                 for p in info.get("properties", []) or []:
                     if isinstance(p, dict) and p.get("name"):
                         names.add(str(p["name"]))
-                return names
+                return self._schema_cache_put(class_name, "known_properties", frozenset(names))
         except Exception:
             pass
         return None
@@ -487,37 +539,51 @@ class WeaviateManager:
                 return False
             if self.detect_api_version() != "v2":
                 return False
+            named_vectors = self._schema_cache_get(class_name, "named_vectors")
+            if named_vectors is None:
+                named_vectors = self._fetch_named_vectors(class_name)
+                if named_vectors is None:
+                    return False
+                self._schema_cache_put(class_name, "named_vectors", named_vectors)
+            return vector_name in named_vectors
+        except Exception:
+            return False
+
+    def _fetch_named_vectors(self, class_name: str) -> Optional[frozenset]:
+        """Names of the vectors defined on a v2 collection, or None if the lookup failed."""
+        try:
             base = self._get_base()
             actual = self._resolve_collection_name(class_name)
             url = f"{base}/v2/collections/{actual}"
             resp = self._http_request("GET", url, timeout=15)
             if resp.status_code != 200:
-                return False
+                return None
             data = resp.json() if resp.content else {}
+            names = set()
             # Try a few common shapes
             # 1) { vectors: [ { name: "content", ... }, ... ] }
             try:
                 vectors = data.get("vectors")
                 if isinstance(vectors, list):
                     for v in vectors:
-                        if isinstance(v, dict) and str(v.get("name")) == vector_name:
-                            return True
+                        if isinstance(v, dict) and v.get("name") is not None:
+                            names.add(str(v.get("name")))
                 # 2) { vector_config: { content: {...}, ... } }
                 vc = data.get("vector_config") or data.get("namedVectors")
-                if isinstance(vc, dict) and vector_name in vc:
-                    return True
+                if isinstance(vc, dict):
+                    names.update(str(k) for k in vc.keys())
             except Exception:
                 pass
-            return False
+            return frozenset(names)
         except Exception:
-            return False
+            return None
 
     def _encode_query_text(self, text: str, model_name: Optional[str] = None) -> Optional[List[float]]:
         try:
             embedder = self._get_or_load_query_embedder(model_name)
             if embedder is None:
                 return None
-            vec = embedder.encode([text])
+            vec = embedder.encode_many([text])
             # vec shape (1, d)
             try:
                 return vec[0].tolist()
@@ -585,6 +651,7 @@ class WeaviateManager:
         Returns:
             True if successful, False otherwise
         """
+        self.invalidate_schema_cache(collection_name)
         try:
             # Default properties for document storage
             default_properties = [
@@ -1935,6 +2002,15 @@ class WeaviateManager:
             if override:
                 logger.info(f"Using WEAVIATE_PRIMARY_TEXT_PROP override: {override}")
                 return override
+            cached = self._schema_cache_get(class_name, "primary_text_property")
+            if cached is not None:
+                return cached
+            # Reuse a cached class schema before listing the whole schema again
+            cached_schema = self._schema_cache_get(class_name, "schema")
+            if cached_schema is not None:
+                primary = self._pick_primary_text_property(cached_schema.get("properties", []) or [])
+                if primary:
+                    return self._schema_cache_put(class_name, "primary_text_property", primary)
             base = self._get_base()
             urls: List[str] = []
             try:
@@ -1957,31 +2033,39 @@ class WeaviateManager:
                 cname = c.get("class") or c.get("name")
                 if not cname or cname != self._resolve_collection_name(class_name):
                     continue
-                props = c.get("properties", []) or []
-                # normalize types to lowercase strings
-                def is_text_type(dt: Any) -> bool:
-                    try:
-                        if isinstance(dt, str):
-                            return dt.lower() in ("text", "string")
-                        if isinstance(dt, list) and dt:
-                            return any(isinstance(x, str) and x.lower() in ("text", "string") for x in dt)
-                    except Exception:
-                        return False
-                    return False
-                # prefer 'content'
-                for p in props:
-                    pname = p.get("name")
-                    if pname == "content" and is_text_type(p.get("dataType")):
-                        return "content"
-                # otherwise first text-like property
-                for p in props:
-                    pname = p.get("name")
-                    if pname and is_text_type(p.get("dataType")):
-                        return pname
+                self._schema_cache_put(class_name, "schema", c)
+                primary = self._pick_primary_text_property(c.get("properties", []) or [])
+                if primary:
+                    return self._schema_cache_put(class_name, "primary_text_property", primary)
             return None
         except Exception as e:
             logger.debug(f"Primary text property detection failed for '{class_name}': {e}")
             return None
+
+    @staticmethod
+    def _pick_primary_text_property(props: List[Dict[str, Any]]) -> Optional[str]:
+        """'content' if it is a text property, else the first text-like property."""
+        # normalize types to lowercase strings
+        def is_text_type(dt: Any) -> bool:
+            try:
+                if isinstance(dt, str):
+                    return dt.lower() in ("text", "string")
+                if isinstance(dt, list) and dt:
+                    return any(isinstance(x, str) and x.lower() in ("text", "string") for x in dt)
+            except Exception:
+                return False
+            return False
+        # prefer 'content'
+        for p in props:
+            pname = p.get("name")
+            if pname == "content" and is_text_type(p.get("dataType")):
+                return "content"
+        # otherwise first text-like property
+        for p in props:
+            pname = p.get("name")
+            if pname and is_text_type(p.get("dataType")):
+                return pname
+        return None
     
     def _list_collections_v2(self) -> List[str]:
         """List collections via v2 REST using the canonical endpoint only.
@@ -2570,9 +2654,13 @@ class WeaviateManager:
         """Delete a collection"""
         try:
             self.client.collections.delete(collection_name)
+            self.invalidate_schema_cache(collection_name)
             if collection_name in self._collections:
                 del self._collections[collection_name]
             logger.info(f"Deleted collection '{collection_name}'")
+            # Let documents queued into the old collection be ingested again
+            from utils.ingestion_staging import forget_collection_claims
+            forget_collection_claims(collection_name, 'weaviate')
             return True
         except Exception as e:
             logger.error(f"Error deleting collection '{collection_name}': {str(e)}")